@@ -75,7 +75,7 @@ def schedule(sch, target = 'cuda'):
 sys.meta_path.insert(0, AKGMetaPathFinder())
 
 from . import autodiff
-from .build_module import build, build_to_func, lower, build_config
+from .build_module import build, build_to_func, lower, build_config, get_pass_report
 from .autodiff import differentiate
 from .autodiff import get_variables
 from .autodiff import register_variables
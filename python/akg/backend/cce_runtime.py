@@ -30,13 +30,15 @@ def write_code(js_dict, fname):
                   sort_keys=True, indent=4, separators=(',', ':'))
 # block_dim: cpu num,default value is 1.
 @akg.tvm.register_func
-def tvm_callback_cce_postproc(code, block_dim=1):
+def tvm_callback_cce_postproc(code, block_dim=1, binary_kernel_name=None):
     """
     Function for dumping json datas from cce code.
 
     Args:
         code: cce code.
         block_dim: Default: 1.
+        binary_kernel_name: kernel name in the binary if it differs from the kernel name of code,
+                            when the binary is reused from a cache. Default: None.
 
     Returns:
         code.
@@ -71,6 +73,9 @@ def tvm_callback_cce_postproc(code, block_dim=1):
         title_dict["kernelName"] = kernel_name + "_kernel0"
         title_dict["binFileSuffix"] = bin_file_suffix
         title_dict["binFileName"] = bin_file_name
+    if binary_kernel_name:
+        # the kernel is launched by its symbol in the binary
+        title_dict["kernelName"] = binary_kernel_name + "_kernel0"
 
     # the op json file used by domi
     file_name = "kernel_meta/" + kernel_name + ".json"
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""fast CPU simulation of CCE kernels."""
+import os
+import shutil
+import ctypes
+import logging
+import tempfile
+import subprocess
+from threading import Lock
+import numpy as np
+
+# set by the CCE build of RUNTIME_MODE csim or ccesim to the shared library of the last kernel built in the process,
+# only used when the module of the launch is not known
+CSIM_KERNEL_LIB = "CSIM_KERNEL_LIB"
+CCE_KERNEL_NAME = "CCE_KERNEL-NAME"
+CSIM_LAUNCH_FUNC = "akg_csim_launch"
+CSIM_NUM_ARGS_FUNC = "akg_csim_num_args"
+CSIM_PERF_STAT_FUNC = "akg_csim_perf_stat"
+CDIFF_PASS = "cdiff"
+
+# statistics of the cycle-approximate performance model, in the order of akg_csim_perf_stat
+CSIM_PERF_STATS = ("cycles", "vector_repeats", "dma_bursts", "dma_bytes", "mad_fractals", "stall_cycles",
+                   "pipe_s_busy_cycles", "pipe_v_busy_cycles", "pipe_m_busy_cycles", "pipe_mte1_busy_cycles",
+                   "pipe_mte2_busy_cycles", "pipe_mte3_busy_cycles")
+
+_libc = ctypes.CDLL(None)
+_libc.getenv.argtypes = [ctypes.c_char_p]
+_libc.getenv.restype = ctypes.c_char_p
+
+
+def _getenv(name):
+    """environment of the process, including the variables set by the compiler after python started."""
+    value = _libc.getenv(name.encode("utf-8"))
+    if value is not None:
+        return value.decode("utf-8")
+    return os.getenv(name)
+
+
+class CsimKernel:
+    """
+    A simulated kernel loaded in-process.
+
+    Args:
+        path (str): path of the shared library of the kernel.
+        snapshot (bool): load a private copy of the library, a library is not loaded twice from the same
+                         path, so a rebuilt kernel must be loaded from another path.
+    """
+
+    def __init__(self, path, snapshot=False):
+        self.path = path
+        load_path = path
+        if snapshot:
+            fd, load_path = tempfile.mkstemp(suffix=".so", dir=os.path.dirname(path))
+            os.close(fd)
+            shutil.copyfile(path, load_path)
+        try:
+            lib = ctypes.CDLL(load_path)
+        finally:
+            if snapshot:
+                # the mapping of a loaded library outlives its file
+                os.remove(load_path)
+        self._launch = getattr(lib, CSIM_LAUNCH_FUNC)
+        self._launch.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.c_int]
+        self._launch.restype = ctypes.c_int
+        num_args = getattr(lib, CSIM_NUM_ARGS_FUNC)
+        num_args.restype = ctypes.c_int
+        self.num_args = num_args()
+        # resolved from the simulator library the kernel is linked with
+        self._perf_stat = getattr(lib, CSIM_PERF_STAT_FUNC)
+        self._perf_stat.argtypes = [ctypes.POINTER(ctypes.c_uint64), ctypes.c_int]
+        self._perf_stat.restype = ctypes.c_int
+        self._lib = lib
+
+    def __call__(self, args):
+        """Run the kernel on the buffers of numpy arrays, which are updated in place."""
+        if len(args) != self.num_args:
+            raise RuntimeError("kernel %s takes %d arguments, but %d are given" % (self.path, self.num_args, len(args)))
+        ptrs = (ctypes.c_void_p * len(args))(*[arg.ctypes.data for arg in args])
+        ret = self._launch(ptrs, len(args))
+        if ret != 0:
+            raise RuntimeError("launch kernel %s failed with %d" % (self.path, ret))
+
+    def perf_stat(self):
+        """Statistics of the performance model for the last launch, a dict keyed by CSIM_PERF_STATS."""
+        stat = (ctypes.c_uint64 * len(CSIM_PERF_STATS))()
+        num_stats = self._perf_stat(stat, len(CSIM_PERF_STATS))
+        if num_stats != len(CSIM_PERF_STATS):
+            logging.warning("csim library of %s reports %d performance statistics, expect %d",
+                            self.path, num_stats, len(CSIM_PERF_STATS))
+        return dict(zip(CSIM_PERF_STATS, stat[:min(num_stats, len(CSIM_PERF_STATS))]))
+
+
+_kernels = {}
+_kernels_lock = Lock()
+
+
+def load_kernel(path):
+    """Get the loaded kernel of a shared library, the library is loaded again after it is rebuilt."""
+    path = os.path.realpath(path)
+    if not os.path.isfile(path):
+        raise RuntimeError("csim kernel library %s not found" % path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _kernels_lock:
+        loaded = _kernels.get(path)
+        if loaded is None or loaded[0] != version:
+            _kernels[path] = (version, CsimKernel(path, snapshot=loaded is not None))
+        return _kernels[path][1]
+
+
+def module_kernel_lib(mod):
+    """
+    Shared library of the csim kernel of a module built in RUNTIME_MODE csim or ccesim.
+
+    The CCE build compiles the kernel to csim/cce_<kernel name>/libcce_<kernel name>.so under the working
+    directory, the kernel name is the prefix of the first "_kernel" symbol of the module source.
+
+    Args:
+        mod (Module): module returned by the CCE build.
+
+    Returns:
+        path of the shared library.
+    """
+    source_mod = mod.imported_modules[0] if mod.imported_modules else mod
+    code = source_mod.get_source()
+    if "_kernel" not in code:
+        raise RuntimeError("no kernel found in the source of the csim module")
+    kernel_name = "cce_" + code.split("_kernel")[0].split()[-1]
+    return os.path.realpath(os.path.join("csim", kernel_name, "lib%s.so" % kernel_name))
+
+
+def _kernel_lib():
+    """shared library of the last kernel built in csim mode by this process."""
+    kernel_lib = _getenv(CSIM_KERNEL_LIB)
+    if kernel_lib:
+        return kernel_lib
+    kernel_name = _getenv(CCE_KERNEL_NAME)
+    if not kernel_name:
+        raise RuntimeError("no csim kernel is built, please build the kernel with RUNTIME_MODE csim or ccesim")
+    return os.path.join("csim", kernel_name, "lib%s.so" % kernel_name)
+
+
+def _as_buffer(arg):
+    """C contiguous writable buffer of an argument, the argument itself unless it must be copied."""
+    if not isinstance(arg, np.ndarray):
+        return np.ascontiguousarray(arg)
+    if arg.flags.c_contiguous and arg.flags.writeable:
+        return arg
+    return np.array(arg, order='C')
+
+
+def _cdiff_launch(args, outputs):
+    """
+    Run the cdiff binary, which compares the computation of two passes.
+
+    cdiff is a standalone executable tracking every computation, its arguments are exchanged through files
+    in the cdiff build directory.
+    """
+    cdiff_dir = os.path.realpath(os.path.join("csim", CDIFF_PASS))
+    binary = os.path.join(cdiff_dir, CDIFF_PASS)
+    if not os.path.isfile(binary):
+        raise RuntimeError("cdiff binary %s not found, please set DUMP_C_PASS to the two passes to compare" % binary)
+    for i, arg in enumerate(args):
+        np.ascontiguousarray(arg).tofile(os.path.join(cdiff_dir, "in_%d.bin" % i))
+    ret = subprocess.call([binary], cwd=cdiff_dir)
+    if ret != 0:
+        raise RuntimeError("cdiff found differences or failed, return code %d" % ret)
+    out_list = []
+    for i in outputs:
+        idx = len(args) + i if i < 0 else i
+        out = np.fromfile(os.path.join(cdiff_dir, "out_%d.bin" % idx), dtype=args[idx].dtype)
+        out_list.append(out.reshape(args[idx].shape))
+    return out_list[0] if len(out_list) == 1 else tuple(out_list)
+
+
+def csim_launch(args, outputs=(-1,), kernel_lib=None):
+    """
+    simulated run CCE kernel on CPU.
+
+    The kernel runs in-process on the memory of the numpy arguments, the outputs are computed in place
+    without any copy of inputs or outputs.
+
+    Args:
+        args (Union[list, tuple]): list or tuple of numpy array.
+        outputs (Union[list, tuple]): list or tuple of output argment index.
+        kernel_lib (str): shared library of the kernel, see module_kernel_lib, by default the last kernel
+                          built in csim mode by this process.
+
+    Returns:
+        output numpy array, or tuple of numpy array if multi-output.
+    """
+    if _getenv("RUNTIME_MODE") == "cdiff":
+        return _cdiff_launch(args, outputs)
+
+    kernel = load_kernel(kernel_lib if kernel_lib else _kernel_lib())
+    buffers = [_as_buffer(arg) for arg in args]
+    kernel(buffers)
+
+    out_list = []
+    for i in outputs:
+        idx = len(args) + i if i < 0 else i
+        out = buffers[idx]
+        if out is not args[idx]:
+            if isinstance(args[idx], np.ndarray) and args[idx].flags.writeable:
+                np.copyto(args[idx], out)
+                out = args[idx]
+            else:
+                logging.debug("output %d of csim kernel is not a writable numpy array, return a copy", idx)
+        out_list.append(out)
+    return out_list[0] if len(out_list) == 1 else tuple(out_list)
+
+
+def get_perf_stat(stat_info, kernel_lib=None):
+    """
+    get estimated cycles of the last csim launch from the performance model of the simulator.
+
+    The model counts vector repeats, DMA bursts and bytes, MAD fractals and the stalls of set_flag/wait_flag on
+    every pipe, it is meant to rank the schedules of a kernel without a device rather than to predict the cycles
+    of the hardware.
+
+    Args:
+        stat_info (dict): statistic info, run_time is set to the estimated cycles.
+        kernel_lib (str): shared library of the kernel, see module_kernel_lib, by default the last kernel
+                          built in csim mode by this process.
+    """
+    if _getenv("RUNTIME_MODE") == "cdiff":
+        raise RuntimeError("performance model is not supported in cdiff mode")
+    stat = load_kernel(kernel_lib if kernel_lib else _kernel_lib()).perf_stat()
+    stat_info.update(stat)
+    stat_info['run_time'] = stat["cycles"]
@@ -16,14 +16,47 @@
 
 """parsing_profiling_data"""
 import os
-import subprocess
-import struct
 import re
-from tabulate import tabulate
+import numpy as np
 
 OUTPUT_FORMAT_DATA = "./jobs/output_format_data_hwts.txt"
 BLOCK_LEN = 32
 max_time_consume = 9999999999
+# task id of the kernel launched for profiling
+PROFILING_TASK_ID = 60000
+# write the text report of the parsed data to OUTPUT_FORMAT_DATA if it is "true"
+PROFILING_REPORT = "PROFILING_REPORT"
+
+# records of the profiling files, little endian with the alignment of the device structs
+RUNTIME_TASK_TRACE_DTYPE = np.dtype([('mode', '<u1'), ('rpttype', '<u1'), ('bufsize', '<u2'), ('reserved', '<u4'),
+                                     ('timestamp', '<u8'), ('eventname', '<u2'), ('tasktype', '<u2'),
+                                     ('streamid', '<u2'), ('task_id', '<u2'), ('thread', '<u4'),
+                                     ('device_id', '<u4'), ('kernelname', 'S63'), ('flags', '<u1')])
+AI_CORE_DTYPE = np.dtype([('flags', '<u1'), ('reserved0', '<u1'), ('reserved1', '<u2'), ('reserved2', '<u2'),
+                          ('reserved3', '<u2'), ('reserved4', '<u4'), ('reserved5', '<u4'), ('total_cyc', '<i8'),
+                          ('ov_cyc', '<i8'), ('pmu_cnt', '<i8', (8,)), ('stream_id', '<u4'),
+                          ('reserved6', '<u4', (7,))])
+TSCH_FW_TIMELINE_DTYPE = np.dtype([('mode', '<u1'), ('rptType', '<u1'), ('bufSize', '<u2'), ('reserved', '<u4'),
+                                   ('task_type', '<u2'), ('task_state', '<u2'), ('stream_id', '<u2'),
+                                   ('task_id', '<u2'), ('timestamp', '<u8'), ('thread', '<u4'),
+                                   ('device_id', '<u4')])
+TRAINING_TRACE_DTYPE = np.dtype([('id_lo', '<u4'), ('id_hi', '<u4'), ('task_id', '<u2'), ('stream_id', '<u2'),
+                                 ('syscnt_lo', '<u4'), ('syscnt_hi', '<u4')])
+# syscnt is the cycle counter of log types 0-3, cyc is the warn status of log type 3 and the cycles of log type 4
+HWTS_DTYPE = np.dtype([('flags', '<u1'), ('core_id', '<u1'), ('reserved0', '<u2'), ('blk_id', '<u2'),
+                       ('task_id', '<u2'), ('syscnt', '<u8'), ('stream_id', '<u4'), ('reserved1', '<u4'),
+                       ('cyc', '<u8'), ('pmu_events', '<u4', (8,))])
+
+HWTS_LOG_TYPE = ['Start of task', 'End of task', 'Start of block', 'End of block', 'Block PMU']
+HWTS_START_OF_TASK = 0
+HWTS_END_OF_TASK = 1
+HWTS_END_OF_BLOCK = 3
+HWTS_BLOCK_PMU = 4
+
+# bytes stripped by bytes.strip(), a record of only these bytes is a blank record
+_BLANK_BYTES = np.array([ord(c) for c in ' \t\n\r\x0b\x0c'], dtype=np.uint8)
+
+
 def get_log_slice_id(file_name):
     pattern = re.compile(r'(?<=slice_)\d+')
     slice_ = pattern.findall(file_name)
@@ -31,173 +64,160 @@ def get_log_slice_id(file_name):
     return int(index[0])
 
 
-def get_file_join_name(input_path=None, file_name=None):
-    """Function for getting join name from input path."""
+def get_slice_names(input_path, file_name):
+    """slices of a profiling file in input_path, in order of slice id."""
     name_list = []
-    file_join_name = ''
     if os.path.exists(input_path):
-        files = os.listdir(input_path)
-        for f in files:
+        for f in os.listdir(input_path):
             if file_name in f and not f.endswith('.done') and not f.endswith('.join'):
                 name_list.append(f)
-        # resort name_list
         name_list.sort(key=get_log_slice_id)
+    return [input_path + os.sep + name for name in name_list]
+
 
+def get_file_join_name(input_path=None, file_name=None):
+    """Function for getting join name from input path."""
+    name_list = get_slice_names(input_path, file_name)
+    file_join_name = ''
     if len(name_list) == 1:
-        file_join_name = input_path + os.sep + name_list[0]
+        file_join_name = name_list[0]
     elif len(name_list) > 1:
         file_join_name = input_path + os.sep + '%s.join' % file_name
         if os.path.exists(file_join_name):
             os.remove(file_join_name)
         with open(file_join_name, 'ab') as bin_data:
-            for i in name_list:
-                file = input_path + os.sep + i
+            for file in name_list:
                 with open(file, 'rb') as txt:
                     bin_data.write(txt.read())
     return file_join_name
 
 
+def read_profiling_data(input_path, file_name):
+    """
+    Read the slices of a profiling file in input_path as one buffer, without joining them on disk.
+
+    Returns:
+        numpy.ndarray of uint8, None if there is no such file.
+    """
+    name_list = get_slice_names(input_path, file_name)
+    if not name_list:
+        return None
+    return np.concatenate([np.fromfile(name, dtype=np.uint8) for name in name_list])
+
+
+def read_records(data, dtype):
+    """
+    Decode fixed size records.
+
+    Blank records, which consist of whitespace bytes only, and an incomplete record at the end are dropped.
+
+    Args:
+        data (Union[numpy.ndarray, bytes, str]): raw bytes of records, or name of the file holding them.
+        dtype (numpy.dtype): structured dtype of a record.
+
+    Returns:
+        numpy.ndarray of dtype.
+    """
+    if isinstance(data, str):
+        data = np.fromfile(data, dtype=np.uint8)
+    elif isinstance(data, (bytes, bytearray)):
+        data = np.frombuffer(data, dtype=np.uint8)
+    num = len(data) // dtype.itemsize
+    rows = data[:num * dtype.itemsize].reshape(num, dtype.itemsize)
+    rows = rows[~np.all(np.isin(rows, _BLANK_BYTES), axis=1)]
+    return np.ascontiguousarray(rows).view(dtype).reshape(-1)
+
+
+def hwts_log_type(records):
+    return records['flags'] & 0x7
+
+
+def hwts_warn_or_overflow(records):
+    return (records['flags'] >> 3) & 0x1
+
+
+def hwts_cnt(records):
+    return records['flags'] >> 4
+
+
+def get_task_cycles(records):
+    """
+    Cycle counters of the first start and end of every task in HWTS records.
+
+    Args:
+        records (numpy.ndarray): records of HWTS_DTYPE.
+
+    Returns:
+        task ids, start cycles and end cycles, numpy arrays in order of task id, 0 if a task has no such record.
+    """
+    log_type = hwts_log_type(records)
+    task_ids = np.unique(records['task_id'][(log_type == HWTS_START_OF_TASK) | (log_type == HWTS_END_OF_TASK)])
+    cycles = []
+    for event in (HWTS_START_OF_TASK, HWTS_END_OF_TASK):
+        event_records = records[log_type == event]
+        ids, first = np.unique(event_records['task_id'], return_index=True)
+        event_cycles = np.zeros(len(task_ids), dtype=np.uint64)
+        event_cycles[np.searchsorted(task_ids, ids)] = event_records['syscnt'][first]
+        cycles.append(event_cycles)
+    return task_ids, cycles[0], cycles[1]
+
+
 def get_first_runtime_task_trace(input_file=None):
     """Function for getting first task trace from runtime."""
+    records = read_records(input_file, RUNTIME_TASK_TRACE_DTYPE)
+    fields = ['mode', 'rpttype', 'bufsize', 'reserved', 'timestamp', 'eventname', 'tasktype', 'streamid', 'task_id',
+              'thread', 'device_id']
     result_data = []
-    format_ = "BBHIQHHHHII"
-    format_last = "B"
-    with open(input_file, 'rb') as bin_data:
-        while True:
-            line_ = bin_data.read(96)
-            if line_:
-                if not line_.strip():
-                    continue
-            else:
-                break
-            if len(line_) == 96:
-                unpack_tuple = struct.unpack(format_, line_[0:32])
-                char_string = line_[32:95].decode().strip(b'\x00'.decode())
-                result_last = [hex(i) for i in struct.unpack(format_last, line_[95:96])]
-                byte01 = bin(int(result_last[0].replace('0x', ''), 16)).replace('0b', '').zfill(8)
-                persistant_1bit = byte01[-1]
-                reserved_7bit = byte01[0:7]
-                kernelname = char_string
-                result_data.append((unpack_tuple[0], unpack_tuple[1], unpack_tuple[2], unpack_tuple[3],
-                                    unpack_tuple[4], unpack_tuple[5], unpack_tuple[6], unpack_tuple[7],
-                                    unpack_tuple[8], unpack_tuple[9], unpack_tuple[10],
-                                    kernelname, persistant_1bit, reserved_7bit))
+    for record in records:
+        flags = int(record['flags'])
+        result_data.append(tuple(int(record[f]) for f in fields) +
+                           (record['kernelname'].decode().strip('\x00'), str(flags & 0x1),
+                            format(flags >> 1, '07b')))
     return result_data
 
 
 def get_44_tsch_fw_timeline(input_file=None):
     """Function for getting tsch_fw_timeline from input file."""
-    result_data = []
-    format_ = "BBHIHHHHQII"
-    with open(input_file, 'rb') as bin_data:
-        while True:
-            line_ = bin_data.read(32)
-            if line_:
-                if not line_.strip():
-                    continue
-            else:
-                break
-            if len(line_) == 32:
-                result_ = struct.unpack(format_, line_)
-                result_data.append((result_[0], result_[1], result_[2], result_[3], result_[4], result_[5], result_[6],
-                                    result_[7], result_[8], result_[9], result_[10]))
-    return result_data
+    return [tuple(int(i) for i in record) for record in read_records(input_file, TSCH_FW_TIMELINE_DTYPE).tolist()]
 
 
 def get_43_ai_core_data(input_file=None):
     """Function for getting datas from aicore: ov/cnt/total_cyc/ov_cyc/pmu_cnt/stream_id."""
-    result_data = []
-    with open(input_file, 'rb') as ai_core_file:
-        while True:
-            line_ = ai_core_file.read(128)
-            if line_:
-                if not line_.strip():
-                    continue
-            else:
-                break
-            format_ = "BBHHHIIqqqqqqqqqqIIIIIIII"
-            result_ = [hex(i) for i in struct.unpack(format_, line_)]
-            byte01 = bin(int(result_[0].replace('0x', ''), 16)).replace('0b', '').zfill(8)
-            ov = byte01[-4]
-            cnt = byte01[0:4]
-            total_cyc = int(result_[7].replace('0x', ''), 16)
-            ov_cyc = int(result_[8].replace('0x', ''), 16)
-            pmu_cnt = tuple(int(i.replace('0x', ''), 16) for i in result_[9:17])
-            stream_id = int(result_[17].replace('0x', ''), 16)
-            result_data.append((ov, cnt, total_cyc, ov_cyc, stream_id, pmu_cnt))
-    return result_data
+    records = read_records(input_file, AI_CORE_DTYPE)
+    flags = records['flags']
+    return [(str(ov), format(cnt, '04b'), int(total_cyc), int(ov_cyc), int(stream_id), tuple(int(i) for i in pmu))
+            for ov, cnt, total_cyc, ov_cyc, stream_id, pmu in
+            zip((flags >> 3) & 0x1, flags >> 4, records['total_cyc'], records['ov_cyc'], records['stream_id'],
+                records['pmu_cnt'])]
 
 
 def get_last_tsch_training_trace(input_file=None):
     """Function for getting last tsch training trace from input file."""
-    result_data = []
-    format_ = "LLHHLL"
-    with open(input_file, 'rb') as bin_data:
-        while True:
-            line_ = bin_data.read(20)
-            if line_:
-                if not line_.strip():
-                    continue
-            else:
-                break
-            if len(line_) == 20:
-                result_ = struct.unpack(format_, line_)
-                result_data.append((result_[0], result_[1], result_[3], result_[2], result_[4], result_[5]))
-    return result_data
+    records = read_records(input_file, TRAINING_TRACE_DTYPE)
+    return list(zip(*(records[f].tolist() for f in ['id_lo', 'id_hi', 'stream_id', 'task_id', 'syscnt_lo',
+                                                      'syscnt_hi'])))
 
 
 def get_45_hwts_log(input_file=None):
     """Function for getting hwts log from input file."""
-    format_ = ['QIIIIIIIIIIII', 'QIIQIIIIIIII', 'IIIIQIIIIIIII']
-    log_type = ['Start of task', 'End of task', 'Start of block', 'End of block', 'Block PMU']
+    records = read_records(input_file, HWTS_DTYPE)
     type1, type2, type3 = [], [], []
-    with open(input_file, 'rb') as hwts_data:
-        while True:
-            line_ = hwts_data.read(64)
-            if line_:
-                if not line_.strip():
-                    continue
-            else:
-                break
-            byte_first_four = struct.unpack('BBHHH', line_[0:8])
-            byte_first = bin(byte_first_four[0]).replace('0b', '').zfill(8)
-            type_ = byte_first[-3:]
-            is_warn_res0_ov = byte_first[4]
-            cnt = int(byte_first[0:4], 2)
-            core_id = byte_first_four[1]
-            blk_id, task_id = byte_first_four[3], byte_first_four[4]
-            if type_ in ['000', '001', '010']:  # log type 0,1,2
-                result_ = struct.unpack(format_[0], line_[8:])
-                syscnt = result_[0]
-                stream_id = result_[1]
-                type1.append((log_type[int(type_, 2)], cnt, core_id, blk_id, task_id, syscnt, stream_id))
-
-            elif type_ == '011':  # log type 3
-                result_ = struct.unpack(format_[1], line_[8:])
-                syscnt = result_[0]
-                stream_id = result_[1]
-                if is_warn_res0_ov == '1':
-                    warn_status = result_[3]
-                else:
-                    warn_status = None
-                type2.append(
-                    (log_type[int(type_, 2)], cnt, is_warn_res0_ov, core_id, blk_id, task_id, syscnt, stream_id,
-                     warn_status))
-                type1.append((log_type[int(type_, 2)], cnt, core_id, blk_id, task_id, syscnt, stream_id))
-            elif type_ == '100':  # log type 4
-                result_ = struct.unpack(format_[2], line_[8:])
-                stream_id = result_[2]
-                if is_warn_res0_ov == '0':
-                    total_cyc = result_[4]
-                    ov_cyc = None
-                else:
-                    total_cyc = None
-                    ov_cyc = result_[4]
-                pmu_events = result_[-8:]
-                type3.append((log_type[int(type_, 2)], cnt, is_warn_res0_ov, core_id, blk_id, task_id, stream_id,
-                              total_cyc, ov_cyc, pmu_events))
-                type1.append((log_type[int(type_, 2)], cnt, core_id, blk_id, task_id, total_cyc, stream_id))
-
+    for record, type_, flag, cnt in zip(records, hwts_log_type(records).tolist(),
+                                        hwts_warn_or_overflow(records).tolist(), hwts_cnt(records).tolist()):
+        if type_ > HWTS_BLOCK_PMU:
+            continue
+        core_id, blk_id, task_id = int(record['core_id']), int(record['blk_id']), int(record['task_id'])
+        stream_id, cyc = int(record['stream_id']), int(record['cyc'])
+        if type_ < HWTS_BLOCK_PMU:
+            type1.append((HWTS_LOG_TYPE[type_], cnt, core_id, blk_id, task_id, int(record['syscnt']), stream_id))
+        if type_ == HWTS_END_OF_BLOCK:
+            type2.append((HWTS_LOG_TYPE[type_], cnt, str(flag), core_id, blk_id, task_id, int(record['syscnt']),
+                          stream_id, cyc if flag else None))
+        elif type_ == HWTS_BLOCK_PMU:
+            total_cyc, ov_cyc = (None, cyc) if flag else (cyc, None)
+            type3.append((HWTS_LOG_TYPE[type_], cnt, str(flag), core_id, blk_id, task_id, stream_id, total_cyc, ov_cyc,
+                          tuple(record['pmu_events'].tolist())))
+            type1.append((HWTS_LOG_TYPE[type_], cnt, core_id, blk_id, task_id, total_cyc, stream_id))
     return type1, type2, type3
 
 
@@ -209,50 +229,38 @@ def fwrite_format(output_data_path=OUTPUT_FORMAT_DATA, data_source=None, is_star
         f.write("\n")
 
 
-def parsing(source_path):
-    """Function for parsing aicore data/tsch fw timeline data/HWTS data/last tsch training trace data."""
-    subprocess.run("cp -r %s ./jobs/" % source_path, shell=True)
-    job_name = source_path.split('/')[-1]
-    job_path = "./jobs/" + job_name
+def write_report(job_path):
+    """Write the text report of aicore data/tsch fw timeline data/HWTS data/last tsch training trace data."""
+    from tabulate import tabulate
+    os.makedirs(os.path.dirname(OUTPUT_FORMAT_DATA), exist_ok=True)
     fwrite_format(data_source='====================starting  parse task ==================', is_start=True)
-    result = get_file_join_name(input_path=job_path, file_name='runtime.host.runtime')
-    if result:
-        runtime_task_trace_data = get_first_runtime_task_trace(input_file=result)
+    data = read_profiling_data(job_path, 'runtime.host.runtime')
+    if data is not None:
         fwrite_format(data_source='====================first runtime task trace data==================')
-        fwrite_format(data_source=tabulate(runtime_task_trace_data,
+        fwrite_format(data_source=tabulate(get_first_runtime_task_trace(data),
                                            ['mode', 'rpttype', 'bufsize', 'reserved', 'timestamp', 'eventname',
                                             'tasktype', 'streamid',
                                             'task_id', 'thread', 'device_id', 'kernelname', 'persistant_1bit',
                                             'reserved_7bit'],
                                            tablefmt='simple'))
-    result = get_file_join_name(input_path=job_path, file_name='aicore.data.43.dev.profiler_default_tag')
-    if result:
-        ai_core_data = get_43_ai_core_data(input_file=result)
+    data = read_profiling_data(job_path, 'aicore.data.43.dev.profiler_default_tag')
+    if data is not None:
         fwrite_format(data_source='============================43 AI core data =========================')
-        fwrite_format(data_source=tabulate(ai_core_data,
+        fwrite_format(data_source=tabulate(get_43_ai_core_data(data),
                                            ['Overflow', 'cnt', 'Total cycles', 'overflowed cycles', 'Stream ID',
                                             'PMU events'],
                                            tablefmt='simple'))
-    result = get_file_join_name(input_path=job_path, file_name='ts_track.data.44.dev.profiler_default_tag')
-    if result:
-        tsch_fw_timeline_data = get_44_tsch_fw_timeline(input_file=result)
+    data = read_profiling_data(job_path, 'ts_track.data.44.dev.profiler_default_tag')
+    if data is not None:
         fwrite_format(data_source='============================44 tsch fw timeline  data =========================')
-        fwrite_format(data_source=tabulate(tsch_fw_timeline_data,
+        fwrite_format(data_source=tabulate(get_44_tsch_fw_timeline(data),
                                            ['mode', 'rptType', 'bufSize', 'reserved', 'task_type', 'task_state',
                                             'stream_id',
                                             'task_id', 'timestamp', 'thread', 'device_id'], tablefmt='simple'))
-    result = get_file_join_name(input_path=job_path, file_name='hwts.log.data.45.dev.profiler_default_tag')
-    start_time = 0
-    end_time = 0
-    if result:
-        data_1, data_2, data_3 = get_45_hwts_log(input_file=result)
+    data = read_profiling_data(job_path, 'hwts.log.data.45.dev.profiler_default_tag')
+    if data is not None:
+        data_1, data_2, data_3 = get_45_hwts_log(data)
         fwrite_format(data_source='============================45 HWTS data ============================')
-        for i in data_1:
-            if i[0] == 'Start of task' and i[4] == 60000 and start_time == 0:
-                start_time = i[5]
-            if i[0] == 'End of task' and i[4] == 60000 and end_time == 0:
-                end_time = i[5]
-
         fwrite_format(data_source=tabulate(data_1,
                                            ['Type', 'cnt', 'Core ID', 'Block ID', 'Task ID', 'Cycle counter',
                                             'Stream ID'],
@@ -266,17 +274,38 @@ def parsing(source_path):
                                             'Total cycles',
                                             'Overflowed cycles',
                                             'PMU events'], tablefmt='simple'))
-
-    result = get_file_join_name(input_path=job_path, file_name='training_trace.dev.profiler_default_tag')
-    if result:
-        tsch_training_trace_data = get_last_tsch_training_trace(input_file=result)
+    data = read_profiling_data(job_path, 'training_trace.dev.profiler_default_tag')
+    if data is not None:
         fwrite_format(data_source='============================last tsch training_trace data=========================')
-        fwrite_format(data_source=tabulate(tsch_training_trace_data,
+        fwrite_format(data_source=tabulate(get_last_tsch_training_trace(data),
                                            ['id_lo', 'id_hi', 'stream_id', 'task_id', 'syscnt_lo', 'syscnt_hi'],
                                            tablefmt='simple'))
 
-    try:
-        time_consume = abs(int(start_time) - int(end_time))
-        return time_consume if time_consume != 0 else max_time_consume
-    except SyntaxError:
+
+def parsing(source_path, task_id=PROFILING_TASK_ID, report=None):
+    """
+    Get the cycles of a task from the HWTS data of a profiling job.
+
+    Args:
+        source_path (str): directory of the profiling job.
+        task_id (int): task id of the kernel.
+        report (bool): write the text report of all profiling data to OUTPUT_FORMAT_DATA,
+            by default if environment PROFILING_REPORT is "true".
+
+    Returns:
+        cycles from the start to the end of the task, max_time_consume if they are not found.
+    """
+    if report is None:
+        report = os.environ.get(PROFILING_REPORT, "").lower() == "true"
+    if report:
+        write_report(source_path)
+
+    data = read_profiling_data(source_path, 'hwts.log.data.45.dev.profiler_default_tag')
+    if data is None:
+        return max_time_consume
+    task_ids, start_cycles, end_cycles = get_task_cycles(read_records(data, HWTS_DTYPE))
+    idx = np.searchsorted(task_ids, task_id)
+    if idx == len(task_ids) or task_ids[idx] != task_id:
         return max_time_consume
+    time_consume = abs(int(start_cycles[idx]) - int(end_cycles[idx]))
+    return time_consume if time_consume != 0 else max_time_consume
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""locating the profiling jobs of kernel launches"""
+import os
+import time
+import logging
+from threading import Lock
+from akg.backend import parsing_profiling_data as prof
+
+PROFILING_ROOT = "/var/log/npu/profiling"
+JOB_PREFIX = "JOB"
+HWTS_FILE = "hwts.log.data.45.dev.profiler_default_tag"
+DONE_SUFFIX = ".done"
+# job directories are looked up at most this depth below the root, e.g. container/<device id>/JOB*
+MAX_SCAN_DEPTH = 3
+DEFAULT_WAIT_TIMEOUT = 5.0
+MIN_POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+
+
+class JobInfo:
+    """files of a job directory, listed again when the mtime of the directory changes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.dir_mtime = None
+        # device id -> names of the *.log.<device id> files
+        self.device_logs = {}
+        self.hwts_slices = []
+        self.hwts_done = 0
+
+    def refresh(self, dir_mtime):
+        if dir_mtime == self.dir_mtime:
+            return
+        self.dir_mtime = dir_mtime
+        self.device_logs = {}
+        self.hwts_slices = []
+        self.hwts_done = 0
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                name = entry.name
+                if HWTS_FILE in name:
+                    if name.endswith(DONE_SUFFIX):
+                        self.hwts_done += 1
+                    elif not name.endswith('.join'):
+                        self.hwts_slices.append(name)
+                _, dot, device = name.lower().rpartition('.log.')
+                if dot and device.isdigit():
+                    self.device_logs.setdefault(int(device), []).append(name)
+
+    def device_mtime(self, device_id):
+        """latest mtime of the logs of device, appending to a file does not change the mtime of the directory"""
+        mtime = None
+        for name in self.device_logs.get(device_id, []):
+            try:
+                file_mtime = os.stat(os.path.join(self.path, name)).st_mtime
+            except OSError:
+                continue
+            mtime = file_mtime if mtime is None else max(mtime, file_mtime)
+        return mtime
+
+    @property
+    def hwts_ready(self):
+        """all the slices of HWTS data are complete"""
+        return bool(self.hwts_slices) and self.hwts_done >= len(self.hwts_slices)
+
+
+class ProfilingJobLocator:
+    """
+    Locator of the profiling jobs of devices.
+
+    Job directories under root are found with os.scandir and indexed by the mtime of their directories, so that
+    only the directories changed since the last lookup are rescanned.
+
+    Args:
+        root (str): root directory of profiling data.
+    """
+
+    def __init__(self, root=PROFILING_ROOT):
+        self.root = root
+        self._jobs = {}
+        self._lock = Lock()
+
+    def _scan(self):
+        """refresh the index of job directories"""
+        found = set()
+        dirs = [(self.root, 0)]
+        while dirs:
+            path, depth = dirs.pop()
+            try:
+                with os.scandir(path) as entries:
+                    subdirs = [entry for entry in entries if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                continue
+            for entry in subdirs:
+                if entry.name.startswith(JOB_PREFIX):
+                    job = self._jobs.get(entry.path)
+                    if job is None:
+                        job = self._jobs[entry.path] = JobInfo(entry.path)
+                    try:
+                        job.refresh(entry.stat().st_mtime)
+                    except OSError:
+                        continue
+                    found.add(entry.path)
+                elif depth + 1 < MAX_SCAN_DEPTH:
+                    dirs.append((entry.path, depth + 1))
+        for path in set(self._jobs) - found:
+            del self._jobs[path]
+
+    def find_job(self, device_id, since=None, task_id=None, stream_id=None):
+        """
+        Find the latest job of a device.
+
+        Args:
+            device_id (int): device id.
+            since (float): only the jobs with device logs modified since this time are considered.
+            task_id (int): only the jobs whose HWTS data has this task are considered.
+            stream_id (int): only the jobs whose HWTS data has the task in this stream are considered.
+
+        Returns:
+            JobInfo, None if not found.
+        """
+        with self._lock:
+            self._scan()
+            jobs = [job for job in self._jobs.values() if device_id in job.device_logs]
+        candidates = []
+        for job in jobs:
+            mtime = job.device_mtime(device_id)
+            if mtime is not None and (since is None or mtime >= since):
+                candidates.append((mtime, job))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        for _, job in candidates:
+            if task_id is None or self._has_task(job, task_id, stream_id):
+                return job
+        return None
+
+    @staticmethod
+    def _has_task(job, task_id, stream_id):
+        data = prof.read_profiling_data(job.path, HWTS_FILE)
+        if data is None:
+            return False
+        records = prof.read_records(data, prof.HWTS_DTYPE)
+        match = records['task_id'] == task_id
+        if stream_id is not None:
+            match &= records['stream_id'] == stream_id
+        return bool(match.any())
+
+    def wait_job(self, device_id, since=None, task_id=None, stream_id=None, timeout=DEFAULT_WAIT_TIMEOUT):
+        """
+        Wait until the job of a launch is found and its HWTS data is complete.
+
+        The file system is polled with an exponential backoff. If the HWTS data of the job is not marked complete
+        before timeout, the job is returned as it is.
+
+        Args:
+            device_id (int): device id.
+            since (float): time of the launch.
+            task_id (int): task id of the launch.
+            stream_id (int): stream id of the launch.
+            timeout (float): seconds to wait.
+
+        Returns:
+            path of the job directory, None if not found.
+        """
+        deadline = time.time() + timeout
+        interval = MIN_POLL_INTERVAL
+        job = None
+        while True:
+            job = self.find_job(device_id, since, task_id, stream_id) or job
+            if job is not None and job.hwts_ready:
+                return job.path
+            if time.time() >= deadline:
+                break
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+        if job is not None:
+            logging.debug("HWTS data of profiling job %s is not marked done", job.path)
+            return job.path
+        return None
+
+
+_locators = {}
+_locators_lock = Lock()
+
+
+def get_locator(root=PROFILING_ROOT):
+    """the locator of root, shared in process so that its index is reused"""
+    with _locators_lock:
+        if root not in _locators:
+            _locators[root] = ProfilingJobLocator(root)
+        return _locators[root]
@@ -21,8 +21,10 @@ LoweredFunc and compiled Module.
 """
 from __future__ import absolute_import as _abs
 import sys
+import json
 import logging
 from akg.utils import validation_check as vc_util
+from akg.utils.tiling_space import get_tiling_space
 import akg.tvm
 from akg.tvm import _api_internal
 from akg.tvm import schedule
@@ -74,6 +76,25 @@ def dump_tiling_info(level):
     sys.exit()
 
 
+def get_pass_report():
+    """
+    Get timing report of the passes run by the last lowering in current thread.
+
+    The report is also dumped to file when build attribute "dump_pass_report" is set to a path.
+    It is loadable by chrome://tracing.
+
+    Returns:
+        dict, "passes" holds name, count, total_us, max_us, node_count, changed, unchanged and skipped of each pass
+        in running order, "traceEvents" holds each pass call. "changed" and "unchanged" count the calls which did or
+        did not modify the IR, "skipped" counts the idempotent pass calls skipped with build attribute
+        "skip_idempotent_pass".
+    """
+    report = _api_internal._GetPassReport()
+    if not report:
+        return {}
+    return json.loads(report)
+
+
 def build_config(**kwargs):
     """build config."""
     return akg.tvm.build_config(**kwargs)
@@ -109,7 +130,7 @@ def lower(sch, args, shape_params=None, name="default_function", binds=None, att
         tuning_spaces["l1_mod"] = ret.l1_tile_mod_table.asnumpy().tolist()
         tuning_spaces["l0_mod"] = ret.l0_tile_mod_table.asnumpy().tolist()
         if level >= help_tiling_level["Candidates"]:
-            tuning_spaces["tuning_space"] = ret.tiling_candidate.asnumpy().tolist()
+            tuning_spaces["tuning_space"] = get_tiling_space(ret)
         if not tuning:
             dump_tiling_info(level)
     return ret
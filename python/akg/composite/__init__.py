@@ -13,4 +13,4 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from .build_module import build, _build, _build_to_func, generate_trait, get_tiling_space
+from .build_module import build, build_batch, _build, _build_to_func, generate_trait, get_tiling_space
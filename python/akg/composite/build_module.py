@@ -15,12 +15,26 @@
 # limitations under the License.
 
 """build module"""
+import os
 import json
+import shutil
+import logging
+import tempfile
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from akg import tvm
 from akg.tvm import _api_internal
 from .repository import __all__ as repository
+from .kernel_cache import get_kernel_cache
 import topi
 from akg.utils import dump_cuda_meta
+from akg.utils import tiling_space
+from akg.utils.tuning_db import get_tuning_db, flatten_shape
+
+# start method of the worker processes of build_batch
+BATCH_START_METHOD = "spawn"
 
 def generate_trait(desc):
     """ generate trait of kernel description """
@@ -79,6 +93,38 @@ def generate_trait(desc):
     dtype = generate_dtype_trait()
     return compute, shape, dtype
 
+def _get_repo(keys, default=None):
+    repo = repository
+    for key in keys:
+        repo = repo.get(key)
+        if not repo:
+            return default
+    return repo
+
+def tuning_db_key(desc_d):
+    """ get the family, key and shape extents of kernel description in tuning database """
+    compute, shape, dtype = generate_trait(desc_d)
+    extents = [in_desc[0]['shape'] for in_desc in desc_d['input_desc']]
+    extents += [out_desc['shape'] for out_desc in desc_d['output_desc']]
+    return '%s:%s' % (compute, dtype), shape, flatten_shape(extents)
+
+def _get_repo_entry(desc_d):
+    """ get the repository attrs and tiling which apply to kernel description """
+    compute, shape, dtype = generate_trait(desc_d)
+    repo_attr = _get_repo([compute, shape, dtype, 'metadata', 'attrs'], {})
+    if not repo_attr:
+        repo_attr = _get_repo([compute, 'metadata', 'attrs'], {})
+    repo_dim = _get_repo([compute, shape, dtype, 'dim'])
+    db = get_tuning_db()
+    if db is not None:
+        # tuned tiling of the same shape wins over repository, the nearest shape only fills a gap.
+        family, key, extents = tuning_db_key(desc_d)
+        entry = db.lookup(family, key, extents, nearest=repo_dim is None)
+        if entry is not None:
+            repo_attr = dict(repo_attr, **entry['attrs'])
+            repo_dim = entry['dim']
+    return {'attrs': repo_attr, 'dim': repo_dim}
+
 def _build_to_func(desc_s, desc_d, attr=None):
     """
     build kernel with compute description in json format
@@ -90,38 +136,39 @@ def _build_to_func(desc_s, desc_d, attr=None):
     Returns:
        Module.
     """
-    def get_repo(keys, default=None):
-        repo = repository
-        for key in keys:
-            repo = repo.get(key)
-            if not repo:
-                return default
-        return repo
     if attr is None:
         attr = {'dim': ''}
     # turn 'enable_auto_inline' off for composite op by default.
     if 'enable_auto_inline' not in attr:
         attr['enable_auto_inline'] = False
-    compute, shape, dtype = generate_trait(desc_d)
-    repo_attr = get_repo([compute, shape, dtype, 'metadata', 'attrs'], {})
-    if not repo_attr:
-        repo_attr = get_repo([compute, 'metadata', 'attrs'], {})
+    repo_entry = _get_repo_entry(desc_d)
+    repo_attr = repo_entry['attrs']
     for a in repo_attr:
         if not attr.get(a):
             attr[a] = repo_attr[a]
     if attr.get('dim') in (None, ''):
-        tiling = get_repo([compute, shape, dtype, 'dim'])
+        tiling = repo_entry['dim']
         if tiling:
             attr['dim'] = tiling
     func = tvm.get_global_func("composite_with_json_to_func")
     return func(desc_s, attr)
 
 def _build(desc_s, desc_d, attr=None):
-    if desc_d['process'] == 'cuda':
+    if desc_d.get('process') == 'cuda':
         func = tvm.get_global_func("composite_with_json")
         return func(desc_s, attr)
-    rst = _build_to_func(desc_s, desc_d, attr)
-    return _api_internal._BuildToModule(rst)
+    cache = get_kernel_cache()
+    if cache is None:
+        rst = _build_to_func(desc_s, desc_d, attr)
+        return _api_internal._BuildToModule(rst)
+    # attr is updated by _build_to_func, so the key is made from the attributes given by caller.
+    key = cache.key(desc_d, attr, _get_repo_entry(desc_d))
+    mod = cache.load(key, desc_d['op'])
+    if mod is None:
+        rst = _build_to_func(desc_s, desc_d, attr)
+        mod = _api_internal._BuildToModule(rst)
+        cache.store(key, desc_d['op'], mod)
+    return mod
 
 def build(kernel_desc, attr=None):
     """
@@ -142,13 +189,84 @@ def build(kernel_desc, attr=None):
         desc_d = kernel_desc
     return _build(desc_s, desc_d, attr)
 
+def _build_batch_worker(kernel_desc, attr, mod_path):
+    """ build one kernel in a worker process and save the module to mod_path """
+    try:
+        mod = build(kernel_desc, attr)
+        mod.save(mod_path)
+    except Exception:
+        return traceback.format_exc()
+    return None
+
+def _run_batch(tasks, max_workers, worker):
+    """ run tasks on a process pool, returns result of each task, or BrokenProcessPool if its worker died """
+    results = {}
+    # the caller may have threads, e.g. the ir dump writer or rpc sessions, which a forked worker would inherit
+    # in an unknown state
+    context = multiprocessing.get_context(BATCH_START_METHOD)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        futures = {i: executor.submit(worker, *task) for i, task in tasks.items()}
+        for i, future in futures.items():
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool as e:
+                results[i] = e
+    return results
+
+def _build_batch(kernel_descs, attrs, max_workers, worker):
+    """ build kernels by worker, which saves the module of a kernel to a path, or returns the error """
+    if not isinstance(attrs, (list, tuple)):
+        attrs = [attrs] * len(kernel_descs)
+    assert len(attrs) == len(kernel_descs)
+    mod_dir = tempfile.mkdtemp(prefix="akg_batch_")
+    try:
+        tasks = {}
+        for i, (desc, attr) in enumerate(zip(kernel_descs, attrs)):
+            mod_path = os.path.join(mod_dir, "%d.stackvm" % i)
+            tasks[i] = (desc, dict(attr) if attr else None, mod_path)
+
+        results = _run_batch(tasks, max_workers, worker)
+        # a worker crashed in native code, which breaks the whole pool. Rebuild the kernels it took down one by
+        # one, so that only the crashing kernel fails.
+        crashed = [i for i, rst in results.items() if isinstance(rst, BrokenProcessPool)]
+        for i in crashed:
+            results.update(_run_batch({i: tasks[i]}, 1, worker))
+
+        mods = []
+        for i in range(len(kernel_descs)):
+            mod_path = tasks[i][2]
+            if results[i] is None:
+                mods.append(tvm.module.load(mod_path))
+            else:
+                logging.error("build kernel %d of batch failed: %s", i, results[i])
+                mods.append(None)
+        return mods
+    finally:
+        shutil.rmtree(mod_dir, ignore_errors=True)
+
+def build_batch(kernel_descs, attrs=None, max_workers=None):
+    """
+    build kernels with compute descriptions in json format on a process pool
+    The workers are spawned rather than forked from a caller which may have threads, so a script calling
+    build_batch must guard its entry point with if __name__ == "__main__".
+    Args:
+       kernel_descs : list of str or dict of compute description
+       attrs        : dict of build attributes shared by all kernels, or list of dict for each kernel
+       max_workers  : number of worker processes, default to number of cpus
+
+    Returns:
+       list of Module in the order of kernel_descs, None for the kernels failed to build.
+    """
+    return _build_batch(kernel_descs, attrs, max_workers, _build_batch_worker)
+
 def get_tiling_space(kernel_desc, level=1, attr=None):
     """
     get tiling space of composite kernel
     Args:
        kernel_desc : str of compute description
        level       : info level
-       attr        : dict of build attributes
+       attr        : dict of build attributes, "lazy_tiling_space" keeps the
+                     tuning space as a TilingSpace combined on demand
 
     Returns:
        Module.
@@ -165,7 +283,7 @@ def get_tiling_space(kernel_desc, level=1, attr=None):
     spaces['l1_mod'] = ret.l1_tile_mod_table.asnumpy().tolist()
     spaces['l0_mod'] = ret.l0_tile_mod_table.asnumpy().tolist()
     if level >= 2:
-        spaces['tuning_space'] = ret.tiling_candidate.asnumpy().tolist()
+        spaces['tuning_space'] = tiling_space.get_tiling_space(ret)
     return spaces
 
 @tvm.register_func("akg_build_gpu_module")
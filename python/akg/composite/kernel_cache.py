@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""persistent content-addressed cache of composite kernels"""
+import os
+import json
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import akg.tvm
+
+MS_AKG_KERNEL_CACHE_DIR = "MS_AKG_KERNEL_CACHE_DIR"
+MS_AKG_KERNEL_CACHE_SIZE = "MS_AKG_KERNEL_CACHE_SIZE"
+KERNEL_META_PATH = "./kernel_meta/"
+DEFAULT_CACHE_SIZE_MB = 1024
+MODULE_FILE = "module.stackvm"
+INFO_FILE = "info.json"
+LOCK_FILE = ".lock"
+TMP_DIR = ".tmp"
+# keys of a kernel description which only name it and do not change the kernel
+NAME_KEYS = ("op", "composite_graph", "id")
+
+
+def compiler_version():
+    """version tag of the loaded compiler, changes whenever libakg is rebuilt."""
+    lib_path = getattr(akg.tvm._ffi.base._LIB, "_name", None)
+    tag = akg.tvm.__version__
+    if lib_path and os.path.isfile(lib_path):
+        st = os.stat(lib_path)
+        tag = "%s-%d-%d" % (tag, st.st_size, st.st_mtime_ns)
+    return tag
+
+
+def normalize_desc(desc_d):
+    """
+    Normalize a kernel description, so that the descriptions of the same subgraph have the same key.
+
+    The names of the kernel are dropped and tensors are renamed in the order of their first appearance, keys of
+    dicts are visited in sorted order, i.e. inputs, ops then outputs.
+
+    Args:
+        desc_d (dict): kernel description.
+
+    Returns:
+        dict, the normalized description.
+    """
+    tensor_names = {}
+
+    def normalize(value):
+        if isinstance(value, dict):
+            res = {}
+            for k in sorted(value):
+                if k == "tensor_name":
+                    res[k] = tensor_names.setdefault(value[k], "t%d" % len(tensor_names))
+                else:
+                    res[k] = normalize(value[k])
+            return res
+        if isinstance(value, list):
+            return [normalize(v) for v in value]
+        return value
+
+    return normalize({k: v for k, v in desc_d.items() if k not in NAME_KEYS})
+
+
+def _restore_kernel_meta(src, file_name, cached_name, kernel_name):
+    """copy a kernel_meta file of a cached kernel, renamed to kernel_name"""
+    dst_name = kernel_name + file_name[len(cached_name):]
+    dst = os.path.join(KERNEL_META_PATH, dst_name)
+    tmp_dst = "%s.%s" % (dst, uuid.uuid4().hex)
+    if cached_name != kernel_name and file_name.endswith(".json"):
+        with open(src, 'r') as f:
+            meta = json.load(f)
+        # the binary is launched by its symbol, which is named after the kernel that was cached
+        meta["kernelName"] = cached_name + "_kernel0"
+        if "binFileName" in meta:
+            meta["binFileName"] = kernel_name
+        with open(tmp_dst, 'w') as f:
+            json.dump(meta, f, sort_keys=True, indent=4, separators=(',', ':'))
+    else:
+        shutil.copyfile(src, tmp_dst)
+    os.chmod(tmp_dst, 0o400)
+    os.replace(tmp_dst, dst)
+
+
+class KernelCache:
+    """
+    On-disk cache of built composite kernels.
+
+    Every entry is a directory named by the sha256 of the normalized kernel description, the build
+    attributes, the repository tiling entry and the compiler version, so kernels of the same subgraph share an
+    entry whatever their names are. It holds the host module saved
+    as stackvm (with the cce binary imported) and the kernel_meta files of the kernel. Entries are
+    published with an atomic rename, so readers never observe a partial entry, and eviction of the
+    least recently used entries runs under an exclusive file lock shared by all processes.
+
+    Args:
+        cache_dir (str): root directory of the cache.
+        max_size (int): size limit of the cache in bytes.
+    """
+
+    def __init__(self, cache_dir, max_size=DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.cache_dir = os.path.realpath(cache_dir)
+        self.max_size = max_size
+        os.makedirs(os.path.join(self.cache_dir, TMP_DIR), exist_ok=True)
+
+    @staticmethod
+    def key(desc_d, attr, tiling):
+        """content hash of a kernel build."""
+        content = {
+            "desc": normalize_desc(desc_d),
+            "attrs": attr if attr else {},
+            "tiling": tiling if tiling else {},
+            "version": compiler_version(),
+        }
+        content_s = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(content_s.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def load(self, key, kernel_name):
+        """
+        Load a kernel from cache and restore its kernel_meta files.
+
+        If the kernel was cached under another name, its kernel_meta files are restored as kernel_name, and the
+        module and binary keep the functions of the cached name.
+
+        Returns:
+            Module, or None if the kernel is not cached.
+        """
+        entry = self._entry_path(key)
+        if not os.path.isdir(entry):
+            return None
+        try:
+            with open(os.path.join(entry, INFO_FILE), 'r') as f:
+                info = json.load(f)
+            os.makedirs(KERNEL_META_PATH, exist_ok=True)
+            for file_name in info["kernel_meta"]:
+                _restore_kernel_meta(os.path.join(entry, file_name), file_name, info["kernel_name"], kernel_name)
+            mod = akg.tvm.module.load(os.path.join(entry, MODULE_FILE))
+            # touch the entry so that eviction keeps the recently used kernels
+            os.utime(entry)
+        except (OSError, ValueError, KeyError, akg.tvm.TVMError):
+            logging.warning("kernel cache entry %s of %s is unreadable, rebuild it.", key, kernel_name)
+            return None
+        logging.info("kernel cache hit: %s", kernel_name)
+        return mod
+
+    def store(self, key, kernel_name, mod):
+        """Save a built kernel and its kernel_meta files into the cache."""
+        entry = self._entry_path(key)
+        if os.path.isdir(entry):
+            return
+        kernel_meta = [f for f in (kernel_name + ".o", kernel_name + ".json")
+                       if os.path.isfile(os.path.join(KERNEL_META_PATH, f))]
+        tmp_entry = os.path.join(self.cache_dir, TMP_DIR, uuid.uuid4().hex)
+        try:
+            os.makedirs(tmp_entry)
+            mod.save(os.path.join(tmp_entry, MODULE_FILE))
+            for file_name in kernel_meta:
+                shutil.copyfile(os.path.join(KERNEL_META_PATH, file_name), os.path.join(tmp_entry, file_name))
+            with open(os.path.join(tmp_entry, INFO_FILE), 'w') as f:
+                json.dump({"kernel_name": kernel_name, "kernel_meta": kernel_meta}, f)
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            os.rename(tmp_entry, entry)
+        except OSError:
+            # another process published the same entry first, or the disk is full.
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_size."""
+        with open(os.path.join(self.cache_dir, LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            entries = []
+            total = 0
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir() or sub.name == TMP_DIR:
+                    continue
+                for entry in os.scandir(sub.path):
+                    try:
+                        size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                        entries.append((entry.stat().st_mtime, size, entry.path))
+                    except OSError:
+                        continue
+                    total += size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_size:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+def get_kernel_cache():
+    """
+    Get the kernel cache configured by environment.
+
+    MS_AKG_KERNEL_CACHE_DIR enables the cache and sets its directory, MS_AKG_KERNEL_CACHE_SIZE sets its
+    size limit in MB.
+
+    Returns:
+        KernelCache, or None if the cache is disabled.
+    """
+    cache_dir = os.getenv(MS_AKG_KERNEL_CACHE_DIR)
+    if not cache_dir:
+        return None
+    size = int(os.getenv(MS_AKG_KERNEL_CACHE_SIZE, DEFAULT_CACHE_SIZE_MB))
+    return KernelCache(cache_dir, size * 1024 * 1024)
@@ -143,6 +143,19 @@ def compilewithjson_to_func(json_str):
     return op_build([op_name], output, tsr, schedule_func, processor, kernel_info['op'], attrs)
 
 def compilewithjson(json_str):
+    """compile with json, composite kernels of aicore are built through the kernel cache."""
+    try:
+        kernel_info = json.loads(json_str)
+    except jd.JSONDecodeError:
+        logging.error(traceback.format_exc())
+        return False
+    if kernel_info.get('composite') is True and kernel_info.get('process', 'aicore') != 'cuda':
+        try:
+            return composite._build(json_str, kernel_info)
+        except Exception:
+            logging.error(traceback.format_exc())
+            return False
+
     tmp_rst = compilewithjson_to_func(json_str)
     if isinstance(tmp_rst, bool):
         return tmp_rst
@@ -20,14 +20,13 @@ import gc
 import inspect
 import datetime
 import os
-import uuid
 import logging
 import time
-import random
-import subprocess
 import re
+import hashlib
+from collections import OrderedDict, namedtuple
 from timeit import default_timer as timer
-from threading import Thread
+from threading import Thread, Lock
 from functools import reduce
 import numpy as np
 
@@ -36,7 +35,9 @@ from akg.backend import aic_model
 from akg.build_module import help_tiling_level
 from akg import backend as cce
 import akg.tvm
-from akg.tvm import rpc
+from akg.utils.rpc_pool import rpc_session_pool
+from akg.utils.rpc_scheduler import get_rpc_scheduler
+from akg.utils.tuning_db import get_tuning_db, flatten_shape
 from akg.utils import result_analysis as ra_util
 from akg.utils import format_transform as ft_util
 from akg.utils import custom_tiling as ct_util
@@ -49,11 +50,14 @@ logging.getLogger().addHandler(sh)
 logging.getLogger().setLevel(logging.INFO)
 
 rpc_machine = {}
-rpc_lb = {}
 PERFORMANCE_TEST_FILE = "PERFORMANCE_TEST_FILE"
 BINDS = "binds"
 RANDOM_SEED_NUM = 20
 PROF_ERROR_CODE = 9999999999
+OP_BUILD_CACHE_SIZE = "OP_BUILD_CACHE_SIZE"
+DEFAULT_OP_BUILD_CACHE_SIZE = 0
+# runtime modes which launch the kernel built last, rather than the module, so that builds cannot be skipped
+UNCACHED_BUILD_MODES = ("csim", "ccesim", "cdiff")
 
 
 def func_time_required(func_name):
@@ -149,98 +153,73 @@ def load_rpc_server_info(mode):
 
     for i in info:
         rpc_machine[i] = info[i]
-        rpc_lb[i] = 0.0
     return None
 
 
-def dispatch(rank=0):
-    """Function for lock waiting dispatch handle version 1."""
-    def _sort_by_value(d):
-        items = list(d.items())
-        random.shuffle(items)
-        items.sort(key=lambda x: x[1])
-        return [item[0] for item in items]
-    for k, v in rpc_lb.items():
-        logging.info("######rpc_lb[%s]=%f", rpc_machine[k][0], v)
-    lb_list = _sort_by_value(rpc_lb)
-    if len(lb_list) > rank:
-        return lb_list[rank]
-    return lb_list[len(lb_list) - 1]
-
-
-def commit(remote, weight):
-    rpc_lb[remote] = weight
+def rpc_boards():
+    """boards of rpc launches, mapping "host:port" to host and port."""
+    env_dic = os.environ
+    if env_dic.get('RPC_HOST') and env_dic.get('RPC_PORT'):
+        machines = [(env_dic.get('RPC_HOST'), int(env_dic.get('RPC_PORT')))]
+    else:
+        machines = [(v[0], int(v[1])) for v in rpc_machine.values()]
+    return {"%s:%d" % (host, port): (host, port) for host, port in machines}
 
 
 @func_time_required
 def mod_launch_rpc_worker(mod, args, outputs, host, port, tuning=False):
     """internal RPC worker, should be called by mod_launch_rpc_thread."""
-    logging.info("%s:====start connect to rpc ip: %s, rpc port: %d ",
-                 datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), host, port)
-    remote = rpc.connect(host, port, session_timeout=300)
-    logging.info("%s:====connect to rpc ip: %s, rpc port: %d finished ",
-                 datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), host, port)
-    uuid_str = uuid.uuid4().hex
-    temp_file_name = "stackvm_%s.o" % uuid_str
-    mod.save(temp_file_name)
-    remote.upload(temp_file_name)
-    remote_mod = remote.load_module(temp_file_name)
-    ctx = remote.cce()
-    arg_list = []
-    for a in args:
-        arg_list.append(akg.tvm.nd.array(a, ctx))
-    start_time = timer()
-    remote_mod(*arg_list)
-    ctx.sync()
-    if os.path.exists(temp_file_name):
-        os.remove(temp_file_name)
-    out_list = []
-    for i in outputs:
-        out = arg_list[len(arg_list) + i if i < 0 else i].asnumpy()
-        out_list.append(out)
-    # this time measure is no accurate now, to be improved soon
-    t = timer() - start_time
+    with rpc_session_pool.session(host, port) as sess:
+        logging.info("%s:====rpc session to ip: %s, rpc port: %d ready",
+                     datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), host, port)
+        remote_mod = sess.load_module(mod)
+        # outputs, including the inplace assigned inputs, are written by the kernel,
+        # so only the read-only inputs are kept resident on the remote
+        output_idx = set(len(args) + i if i < 0 else i for i in outputs)
+        written = [args[i] for i in output_idx]
+        arg_list = []
+        in_use = set()
+        for i, a in enumerate(args):
+            resident = i not in output_idx and not any(np.may_share_memory(a, w) for w in written)
+            arg_list.append(sess.array(a, resident=resident, in_use=in_use))
+        start_time = timer()
+        remote_mod(*arg_list)
+        sess.ctx.sync()
+        out_list = []
+        for i in outputs:
+            out = arg_list[len(arg_list) + i if i < 0 else i].asnumpy()
+            out_list.append(out)
+        # this time measure is no accurate now, to be improved soon
+        t = timer() - start_time
     if not tuning:
         return out_list[0] if len(out_list) == 1 else tuple(out_list)
     stat_info = {"run_time": t}
     return out_list[0] if len(out_list) == 1 else tuple(out_list), stat_info
 
 
-def mod_launch_rpc_thread(mode, mod, args, outputs, results, need_retry, retry, tuning=False):
+def mod_launch_rpc_thread(mode, mod, args, outputs, results, need_retry, retry, used_boards, tuning=False):
     """internal RPC thread, should be called by mod_launch_rpc_multithread."""
-    remoteevb = '0'
-    host = None
-    port = None
-    env_dic = os.environ
-    if env_dic.get('RPC_HOST') and env_dic.get('RPC_PORT'):
-        host = env_dic.get('RPC_HOST')
-        port = int(env_dic.get('RPC_PORT'))
-    else:
-        if mode == 'rpc_cloud':
-            logging.error("runtime_mode=rpc_cloud must set 1980 host ip and port!")
-            raise Exception("ERROR:runtime_mode=rpc_cloud must set 1980 host ip and port!")
-        remoteevb = dispatch(retry)
-        host = rpc_machine[remoteevb][0]
-        port = rpc_machine[remoteevb][1]
+    boards = rpc_boards()
+    scheduler = get_rpc_scheduler(list(boards))
+    board, token = scheduler.acquire(list(boards), exclude=used_boards)
+    used_boards.append(board)
+    host, port = boards[board]
 
     start_time = timer()
-    end_time = 0.0
+    success = False
     logging.debug("rpc ip: %s, rpc port: %d", host, port)
     try:
         out_list = mod_launch_rpc_worker(mod, args, outputs, host, port, tuning=tuning)
-        end_time = timer()
-        t = end_time - start_time
-        if not env_dic.get('RPC_HOST'):
-            commit(remoteevb, 20 if t > 20 else t)
-        logging.info("===this round host is %s time is %f", host, (end_time - start_time))
+        success = True
+        logging.info("===this round host is %s time is %f", host, (timer() - start_time))
         results[retry] = out_list
     except RuntimeError:
         need_retry[retry] = True
-        end_time = timer()
-        logging.error("===Failed! this round host is %s time is %f", host, (end_time - start_time))
-        if not env_dic.get('RPC_HOST'):
-            commit(remoteevb, end_time - start_time + 20 * (retry + 1))
+        logging.error("===Failed! this round host is %s time is %f", host, (timer() - start_time))
         logging.error("rpc retry error: %d %s", retry, sys.exc_info())
+    finally:
+        # the launch is always given back, otherwise the board stays busy in the shared state
+        scheduler.release(board, token, timer() - start_time, success)
 
 
 def mod_launch_rpc(mode, mod, args, outputs, tuning=False):
@@ -249,12 +228,12 @@ def mod_launch_rpc(mode, mod, args, outputs, tuning=False):
 
     Note:
         To minimize waiting time of struggler RPC servers, we wait for a short timeout and spawn
-        a new thread after the timeout.
+        a new thread after the timeout. The timeout adapts to the latency percentile observed on the boards.
         In normal case, RPC would complete before the short timeout, so, only one thread will be created.
         When the RPC server is slow, we create multiple threads that run concurrently.
         We wait for the first thread that successfully completes its work and return the result.
         If a thread fails (an exception is raised), we spawn a new thread to retry.
-        Newly spawned threads will use different RPC servers.
+        Newly spawned threads will use different RPC servers, chosen by the shared rpc scheduler.
         We bound the maximum number of threads, i.e. maximum number of retries.
     """
     max_num_threads = 5
@@ -266,22 +245,24 @@ def mod_launch_rpc(mode, mod, args, outputs, tuning=False):
     expected_upload_speed = 5e6
     expected_upload_time = int(tensor_size / expected_upload_speed)
 
-    timeout_before_spawning_new_thread = 200 + expected_upload_time
+    load_rpc_server_info(mode)
+    boards = list(rpc_boards())
+    timeout_before_spawning_new_thread = get_rpc_scheduler(boards).hedge_timeout(boards, expected_upload_time)
     poll_interval = 1
     thread_timeout = 400 + expected_upload_time * 3
 
-    load_rpc_server_info(mode)
-
     threads = [None] * max_num_threads
     results = [None] * max_num_threads
     need_retry = [None] * max_num_threads
     retried = [False] * max_num_threads
+    used_boards = []
     for thread_index in range(max_num_threads):
         if thread_index > 0:
             logging.error("Thread %d run for %d seconds, spawn a new thread to retry",
                           (thread_index - 1), timeout_before_spawning_new_thread)
         threads[thread_index] = Thread(target=mod_launch_rpc_thread,
-                                       args=(mode, mod, args, outputs, results, need_retry, thread_index, tuning))
+                                       args=(mode, mod, args, outputs, results, need_retry, thread_index,
+                                             used_boards, tuning))
         # daemonize the thread to prevent long running threads from hanging the whole process
         threads[thread_index].daemon = True
         threads[thread_index].start()
@@ -332,10 +313,11 @@ def profiling_mode_run(mod, args, outputs, tuning, device_id):
     arg_list = []
     for a in args:
         arg_list.append(akg.tvm.nd.array(a, ctx))
+    launch_time = time.time()
     mod(*arg_list)
     ctx.sync()
     out_list = []
-    cycle = profiling_analyse(device_id)
+    cycle = profiling_analyse(device_id, launch_time)
     for i in outputs:
         out = arg_list[len(arg_list) + i if i < 0 else i].asnumpy()
         out_list.append(out)
@@ -351,52 +333,30 @@ def profiling_mode_run(mod, args, outputs, tuning, device_id):
     return out_list[0] if len(out_list) == 1 else tuple(out_list)
 
 
-def profiling_analyse(device_id):
-    """analyse profiling."""
+def profiling_analyse(device_id, launch_time=None):
+    """
+    analyse profiling.
 
-    def exec_cmds_with_pipe(cmd_list):
-        cmd_num = len(cmd_list)
-        if cmd_num <= 1:
-            raise RuntimeError("length of cmd_list should be greater than 1.")
-        ps = []
-        for i, cmd in enumerate(cmd_list):
-            if i == 0:
-                p = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-            else:
-                p = subprocess.Popen(cmd, stdin=ps[-1].stdout, stdout=subprocess.PIPE)
-            ps.append(p)
-        for p in ps:
-            p.wait()
-        return ps[-1].communicate()
+    Args:
+        device_id (int): device id of the launch.
+        launch_time (float): time of the launch, profiling jobs older than it are ignored.
 
+    Returns:
+        cycles of the kernel, PROF_ERROR_CODE if its profiling job is not found.
+    """
     if not isinstance(device_id, int):
         raise TypeError("device_id must be an integer.")
 
-    try:
-        public_path = "/var/log/npu/profiling"
-        cmd_list = [
-            ["find", public_path, "-iname", "*.log.%d" % device_id, "-printf", "'%T+\t%p\n'"],
-            ["grep", "JOB"],
-            ["sort", "-r"],
-            ["head", "-n10"],
-            ["awk", "{print $2}"],
-            ["head", "-n1"],
-        ]
-        p = exec_cmds_with_pipe(cmd_list)
-        for _ in range(5):
-            if p[0].decode('utf8').strip() == '':
-                time.sleep(1)
-        try:
-            job_file = p[0].decode('utf8').strip().split('/')[-2]
-        except BaseException:
-            logging.warning("failed to decode profiling result")
-            return None
-        logging.debug("job file is: %s", job_file)
-        from akg.backend import parsing_profiling_data
-        return parsing_profiling_data.parsing(public_path + '/' + job_file)
-    except SyntaxError as e:
-        logging.error(e)
+    from akg.backend import parsing_profiling_data
+    from akg.backend import profiling_job
+    job_path = profiling_job.get_locator().wait_job(device_id, since=launch_time,
+                                                    task_id=parsing_profiling_data.PROFILING_TASK_ID)
+    if job_path is None:
+        logging.warning("failed to find the profiling job of device %d", device_id)
         return PROF_ERROR_CODE
+    logging.debug("job file is: %s", job_path)
+    return parsing_profiling_data.parsing(job_path)
+
 
 def mod_launch_air(mod, args, outputs):
     """launch mod on kc_air."""
@@ -431,7 +391,7 @@ def mod_launch_air(mod, args, outputs):
     return None
 
 @func_time_required
-def mod_launch(mod, args, outputs=(-1,), tuning=False, device_id=0, expect=None):
+def mod_launch(mod, args, outputs=(-1,), tuning=False, device_id=0, expect=None, kernel_lib=None):
     """
     unified run CCE kernel api.
 
@@ -442,6 +402,8 @@ def mod_launch(mod, args, outputs=(-1,), tuning=False, device_id=0, expect=None)
         tuning (bool): tuning model.
         device_id: device_id on device.
         expect: when mode in ["compile_cloud", "compile_mini"], return it.
+        kernel_lib (str): shared library of the kernel in mode csim or ccesim, by default resolved from the
+                          source of mod, which is lost when mod is saved and loaded again.
 
     Returns:
         output numpy array, or tuple of numpy array if multi-output.
@@ -479,8 +441,14 @@ def mod_launch(mod, args, outputs=(-1,), tuning=False, device_id=0, expect=None)
     if mode in ("compile_cloud", "compile_mini"):
         return expect
     if mode in ("csim", "ccesim", "cdiff"):
-        from akg.backend.csim import csim_launch
-        return csim_launch(args, outputs)
+        from akg.backend import csim
+        if kernel_lib is None and mode != "cdiff":
+            kernel_lib = csim.module_kernel_lib(mod)
+        output = csim.csim_launch(args, outputs, kernel_lib=kernel_lib)
+        if not tuning:
+            return output
+        csim.get_perf_stat(stat_info, kernel_lib=kernel_lib)
+        return output, stat_info
     if mode == "cpu":
         tvm_array = []
         ctx = akg.tvm.context("llvm", 0)
@@ -605,12 +573,127 @@ def recursive_copy(obj):
     return obj
 
 
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class BuildCache:
+    """
+    In-process LRU cache of modules built by op_build.
+
+    Args:
+        maxsize (int): maximal number of cached modules, 0 disables the cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """Get the cached module of key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, op_func, mod):
+        """Cache mod, op_func is kept alive so that its id in key is not reused."""
+        with self._lock:
+            self._entries[key] = (op_func, mod)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def info(self):
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+op_build_cache = BuildCache(int(os.environ.get(OP_BUILD_CACHE_SIZE, DEFAULT_OP_BUILD_CACHE_SIZE)))
+
+
+def op_build_cache_info():
+    """hit/miss statistics of op_build cache."""
+    return op_build_cache.info()
+
+
+def op_build_cache_clear():
+    """clear op_build cache and its statistics."""
+    op_build_cache.clear()
+
+
+def _hashable(obj):
+    """convert build parameters into a hashable key, raise TypeError for values which cannot be keyed."""
+    if isinstance(obj, (list, tuple)):
+        return tuple(_hashable(i) for i in obj)
+    if isinstance(obj, dict):
+        return tuple(sorted((str(k), _hashable(v)) for k, v in obj.items()))
+    if isinstance(obj, np.ndarray):
+        return ("ndarray", obj.shape, str(obj.dtype), hashlib.sha1(obj.tobytes()).hexdigest())
+    if isinstance(obj, np.generic):
+        return (type(obj).__name__, obj.item())
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return (type(obj).__name__, obj)
+    raise TypeError("unhashable build parameter type %s" % type(obj))
+
+
+def _func_key(func):
+    qualname = getattr(func, "__qualname__", "")
+    if "<locals>" in qualname or "<lambda>" in qualname:
+        return ("local", id(func))
+    return ("global", "%s.%s" % (func.__module__, qualname))
+
+
+def _tiling_state(op_func, attrs):
+    """state of the set_dim map that the tiling of a build without "dim" comes from."""
+    if attrs is not None and attrs.get('dim'):
+        return None
+    set_dim = ct_util.set_dim_func_map.get(op_func.__name__, ct_util.gen_key_func_map.get(op_func.__name__))
+    if inspect.isfunction(set_dim):
+        set_dim = _func_key(set_dim)
+    return _hashable(set_dim)
+
+
+def _op_build_cache_key(op_func, input_shapes, input_types, op_attrs, kernel_name, attrs, polyhedral,
+                        log_cce=False, dump_ir=False, dump_code=False):
+    """key of op_build cache, None if the build cannot be cached."""
+    try:
+        return (_func_key(op_func), _hashable(input_shapes), _hashable(input_types), _hashable(op_attrs),
+                kernel_name, _hashable(attrs), polyhedral, log_cce, dump_ir, dump_code, get_runtime_mode(),
+                _tiling_state(op_func, attrs))
+    except TypeError:
+        # shapes with tvm Var, placeholders or binds given as parameters.
+        return None
+
+
+def _op_build_cacheable(tuning):
+    """tuning builds, and builds whose module is not launched by itself, are not cached."""
+    return not tuning and get_runtime_mode() not in UNCACHED_BUILD_MODES
+
+
 def op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
              attrs=None, log_cce=False, dump_ir=True, dump_code=True,
              polyhedral=True, tuning=False):
     """
     Return module built from op_func with given inputs.
 
+    Modules can be cached in process, so that identical builds return the module of the first build. The cache is
+    enabled by setting its size by environment OP_BUILD_CACHE_SIZE. The dump flags are part of the key, a cache hit
+    does not dump again, as the first build already did. Tuning builds, and builds in runtime mode csim, ccesim or
+    cdiff are never cached.
+
     Args:
         op_func (function returning an op or (op, [op_vars])): The op build function.
         input_shapes(iterable of iterable of int): the dim sizes for input for op.
@@ -627,8 +710,69 @@ def op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
     Return:
         module.
     """
-    inputs = []
+    key = None
+    if op_build_cache.maxsize > 0 and _op_build_cacheable(tuning):
+        key = _op_build_cache_key(op_func, input_shapes, input_types, op_attrs, kernel_name, attrs, polyhedral,
+                                  log_cce, dump_ir, dump_code)
+    if key is not None:
+        mod = op_build_cache.get(key)
+        if mod is not None:
+            logging.debug("op_build cache hit: %s", kernel_name)
+            return mod
+    mod = _op_build(op_func, input_shapes, input_types, op_attrs, kernel_name, attrs, log_cce, dump_ir,
+                    dump_code, polyhedral, tuning)
+    # help tiling returns the tiling spaces instead of a module.
+    if key is not None and mod is not None and not isinstance(mod, tuple):
+        op_build_cache.put(key, op_func, mod)
+    return mod
+
+
+def _set_dim_key(op_func, args):
+    """key of the op in its set_dim map."""
     set_dim_key = ""
+    if op_func.__name__ in ct_util.set_dim_func_map.keys():
+        func_ = ct_util.set_dim_func_map[op_func.__name__]
+        if inspect.isfunction(func_):
+            set_dim_key = func_(*args)[1]
+    elif op_func.__name__ in ct_util.gen_key_func_map.keys():
+        func_ = ct_util.gen_key_func_map[op_func.__name__]
+        if inspect.isfunction(func_):
+            set_dim_key = func_(*args)
+    if set_dim_key == "":
+        set_dim_key = str(args)
+    return set_dim_key
+
+
+def _tuning_db_key(op_func, args, input_shapes, input_types, op_attrs):
+    """family, key and shape extents of the op in tuning database."""
+    scalar_attrs = [a for a in (op_attrs or []) if not isinstance(a, (list, tuple))]
+    family = "%s:%s:%s" % (op_func.__name__, ft_util.convert_to_list(input_types), scalar_attrs)
+    return family, str(_set_dim_key(op_func, args)), flatten_shape([input_shapes, op_attrs or []])
+
+
+def _op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
+              attrs=None, log_cce=False, dump_ir=True, dump_code=True,
+              polyhedral=True, tuning=False):
+    """
+    Return module built from op_func with given inputs.
+
+    Args:
+        op_func (function returning an op or (op, [op_vars])): The op build function.
+        input_shapes(iterable of iterable of int): the dim sizes for input for op.
+        input_types (iterable of iterable of str): the dtypes for each input.
+        op_attrs (list or tuple): extra attributes for the op.
+        kernel_name (str): name of op.
+        attrs (dict): tiling parameter.
+        log_cce (bool): False by default.
+        dump_ir (bool): True by default.
+        dump_code (bool): False by default.
+        polyhedral (bool): True by default.
+        tuning (bool): False by default.
+
+    Return:
+        module.
+    """
+    inputs = []
     shape_params = []
     for i, (shape, dtype) in enumerate(zip(input_shapes, input_types)):
         if isinstance(shape, (list, tuple)) and shape and isinstance(shape[0], (list, tuple)):
@@ -676,7 +820,14 @@ def op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
         if attrs is None:
             attrs = dict()
 
-        if op_func.__name__ in ct_util.set_dim_func_map.keys():
+        db = get_tuning_db()
+        db_key = _tuning_db_key(op_func, args, input_shapes, input_types, op_attrs) if db is not None else None
+        db_entry = db.lookup(*db_key, nearest=False) if db is not None else None
+        if db_entry is not None:
+            dim_info = db_entry['dim']
+            for key, value in db_entry['attrs'].items():
+                attrs.setdefault(key, value)
+        elif op_func.__name__ in ct_util.set_dim_func_map.keys():
             value = ct_util.set_dim_func_map[op_func.__name__]
             if inspect.isfunction(value):
                 dim_info = value(*args)
@@ -694,6 +845,13 @@ def op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
                 raise RuntimeError("Registered set_dim_map is invalid. Must be a function or a dict!")
         if isinstance(dim_info, (list, tuple)):
             dim_info = dim_info[0]
+        if not dim_info and db is not None:
+            db_entry = db.lookup(*db_key)
+            if db_entry is not None:
+                logging.info("use tiling tuned for the nearest shape of %s", op_func.__name__)
+                dim_info = db_entry['dim']
+                for key, value in db_entry['attrs'].items():
+                    attrs.setdefault(key, value)
 
         attrs['dim'] = dim_info
 
@@ -769,18 +927,13 @@ def op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="",
     mode = get_runtime_mode()
     level = attrs.get("help_tiling")
     if tuning or (level is not None and level > help_tiling_level['None']):
-        if op_func.__name__ in ct_util.set_dim_func_map.keys():
-            func_ = ct_util.set_dim_func_map[op_func.__name__]
-            if inspect.isfunction(func_):
-                set_dim_key = func_(*args)[1]
-        elif op_func.__name__ in ct_util.gen_key_func_map.keys():
-            func_ = ct_util.gen_key_func_map[op_func.__name__]
-            if inspect.isfunction(func_):
-                set_dim_key = func_(*args)
+        set_dim_key = _set_dim_key(op_func, args)
         with akg.build_config(add_lower_pass=cce.debug_mode(0), dump_pass_ir=True):
             spaces = akg.lower(s, op_var, name=kernel_name, attrs=attrs, polyhedral=polyhedral, tuning=tuning)
-            if set_dim_key == "":
-                set_dim_key = str(args)
+            if tuning and akg.build_module.tuning_spaces is not None:
+                # the tuner records its result under this key
+                akg.build_module.tuning_spaces["tuning_db_key"] = \
+                    _tuning_db_key(op_func, args, input_shapes, input_types, op_attrs)
             return spaces, set_dim_key
 
     if mode == "cpu":
@@ -208,42 +208,90 @@ def flattened_index_to_real_index(idx, shape):
     index.reverse()
     return index
 
-def count_unequal_element(data_expected, data_actual, rtol, atol):
-    """Function for asserting unequal elements in data_actual and data_expected."""
+def _log_mismatch(index, a, b, is_numeric, eps=1e-10):
+    if is_numeric:
+        b_1 = b + eps if b == 0.0 else b
+        logging.error("%s: Actual[%s] Expected[%s] Ratio[%s]",
+                      str(index), str(a), str(b), str(abs(a - b) / abs(b_1)))
+    else:
+        logging.error("%s: Actual[%s] Expected[%s]", str(index), str(a), str(b))
+
+
+def _unequal_mask(expected, actual, rtol, atol, is_bool):
+    """mismatch mask and nan mask of flat chunks, as the element-wise check of count_unequal_element"""
+    if is_bool:
+        return actual != expected, np.zeros(expected.shape, np.bool_)
+    with np.errstate(invalid='ignore', over='ignore'):
+        is_nan = np.isnan(actual) | np.isnan(expected)
+        unequal = np.abs(actual - expected) > (atol + rtol * np.abs(expected))
+    return unequal | is_nan, is_nan
+
+
+def count_unequal_element(data_expected, data_actual, rtol, atol, max_print=100, worst_print=10,
+                          chunk_size=1 << 22):
+    """
+    Function for asserting unequal elements in data_actual and data_expected.
+
+    The first max_print mismatches are logged in index order, followed by the total count and the worst_print
+    mismatches with the largest ratio. Inputs are checked chunk by chunk, so numpy memmaps are never loaded whole.
+
+    Args:
+        data_expected (numpy.ndarray): expected data.
+        data_actual (numpy.ndarray): actual data.
+        rtol (float): relative tolerance.
+        atol (float): absolute tolerance.
+        max_print (int): number of mismatches logged in index order.
+        worst_print (int): number of the worst mismatches logged.
+        chunk_size (int): number of elements checked at a time.
+    """
     if not data_expected.shape == data_actual.shape:
         raise AssertionError("'data_expected' and 'data_actual' should have the same shape")
-    list_a = data_expected.flatten()
-    list_b = data_actual.flatten()
+    shape = data_expected.shape
+    list_a = data_expected.reshape(-1)
+    list_b = data_actual.reshape(-1)
     count = 0
     eps = 1e-10
-    all_printed = True
-    for i, aa in enumerate(list_a):
-        a = list_b[i]
-        b = aa
-        is_bool = isinstance(a, np.bool_) or isinstance(b, np.bool_)
-        is_nan = np.isnan(a) or np.isnan(b)
-        is_numeric = not (is_bool or is_nan)
-        if (is_bool and a != b) or (is_numeric and abs(a - b) > (atol + rtol * abs(b))) or is_nan:
-            if count < 100:
-                index = flattened_index_to_real_index(i, data_expected.shape)
-                if is_numeric:
-                    b_1 = b + eps if b == 0.0 else b
-                    logging.error("%s: Actual[%s] Expected[%s] Ratio[%s]",
-                                  str(index), str(a), str(b), str(abs(a - b) / abs(b_1)))
-                else:
-                    logging.error("%s: Actual[%s] Expected[%s]", str(index), str(a), str(b))
-            else:
-                all_printed = False
-            count += 1
+    # flat indexes and ratios of the worst mismatches so far
+    worst_idx = np.zeros(0, np.int64)
+    worst_ratio = np.zeros(0, np.float64)
+    is_bool = data_expected.dtype == np.bool_ or data_actual.dtype == np.bool_
+    for start in range(0, list_a.size, chunk_size):
+        expected = np.asarray(list_a[start:start + chunk_size])
+        actual = np.asarray(list_b[start:start + chunk_size])
+        unequal, is_nan = _unequal_mask(expected, actual, rtol, atol, is_bool)
+        idx = np.flatnonzero(unequal)
+        if idx.size == 0:
+            continue
+        for i in idx[:max(0, max_print - count)]:
+            index = [int(x) for x in np.unravel_index(start + i, shape)]
+            _log_mismatch(index, actual[i], expected[i], not (is_bool or is_nan[i]), eps)
+        count += idx.size
+
+        numeric_idx = idx[~is_nan[idx]]
+        if worst_print > 0 and numeric_idx.size > 0 and not is_bool:
+            b = expected[numeric_idx].astype(np.float64)
+            a = actual[numeric_idx].astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = np.abs(a - b) / np.abs(np.where(b == 0.0, b + eps, b))
+            worst_idx = np.concatenate((worst_idx, numeric_idx + start))
+            worst_ratio = np.concatenate((worst_ratio, ratio))
+            if worst_idx.size > worst_print:
+                keep = np.argpartition(-worst_ratio, worst_print - 1)[:worst_print]
+                worst_idx, worst_ratio = worst_idx[keep], worst_ratio[keep]
 
     if count != 0:
-        if not all_printed:
+        if count > max_print:
             logging.error("...")
-            logging.error("Total %s mismatch detected!!!, Only print 100...", str(count))
+            logging.error("Total %s mismatch detected!!!, Only print %d...", str(count), max_print)
         else:
             logging.error("Total %s mismatch detected!!!", str(count))
+        if count > max_print and worst_idx.size > 0:
+            logging.error("Worst %d mismatch:", worst_idx.size)
+            for i in worst_idx[np.lexsort((worst_idx, -worst_ratio))]:
+                index = [int(x) for x in np.unravel_index(i, shape)]
+                _log_mismatch(index, list_b[i], list_a[i], True, eps)
 
-    if not count <= int(len(list_a)):
+    if not count <= int(list_a.size):
         raise AssertionError
 
 
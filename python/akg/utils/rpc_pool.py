@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""pool of persistent rpc sessions"""
+import os
+import time
+import uuid
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+import akg.tvm
+from akg.tvm import rpc
+
+RPC_SESSION_TIMEOUT = "RPC_SESSION_TIMEOUT"
+RPC_SESSION_IDLE = "RPC_SESSION_IDLE"
+RPC_RESIDENT_SIZE = "RPC_RESIDENT_SIZE"
+DEFAULT_SESSION_TIMEOUT = 300
+DEFAULT_SESSION_IDLE = 60
+DEFAULT_RESIDENT_SIZE_MB = 1024
+# retire a session before the server kills it for exceeding its session timeout
+SESSION_RETIRE_MARGIN = 30
+MAX_MODULES_PER_SESSION = 32
+MAX_IDLE_SESSIONS_PER_HOST = 4
+
+
+def module_hash(mod):
+    """
+    Content hash of a module and the local file it is saved to.
+
+    Returns:
+        tuple of hash and file name, the caller removes the file.
+    """
+    file_name = "stackvm_%s.o" % uuid.uuid4().hex
+    mod.save(file_name)
+    with open(file_name, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return digest, file_name
+
+
+def tensor_key(arr):
+    """key of a numpy array, identifying its content, so that an array modified in place gets another key."""
+    buf = arr.data if arr.flags.c_contiguous else arr.tobytes()
+    return hashlib.sha1(buf).hexdigest(), arr.shape, arr.dtype.str
+
+
+class RpcSession:
+    """
+    A persistent rpc session with the modules and input tensors resident on the remote.
+
+    Modules are uploaded and loaded once per content hash. Read-only input tensors are kept on the
+    remote device keyed by the content hash of the numpy array, so that unchanged inputs of repeated
+    launches are not uploaded again. Resident tensors are evicted in least recently used order beyond
+    a size limit.
+    """
+
+    def __init__(self, host, port, session_timeout, resident_size):
+        self.host = host
+        self.port = port
+        self.remote = rpc.connect(host, port, session_timeout=session_timeout)
+        self.ctx = self.remote.cce()
+        self.created = time.time()
+        self.last_used = self.created
+        self.session_timeout = session_timeout
+        self.resident_size = resident_size
+        self.modules = OrderedDict()
+        self.tensors = OrderedDict()
+        self.tensor_bytes = 0
+
+    def expired(self, idle):
+        now = time.time()
+        if self.session_timeout and now - self.created > self.session_timeout - SESSION_RETIRE_MARGIN:
+            return True
+        return now - self.last_used > idle
+
+    def load_module(self, mod):
+        """Get the remote module of mod, uploading it if the session has not seen its content."""
+        digest, file_name = module_hash(mod)
+        try:
+            if digest in self.modules:
+                self.modules.move_to_end(digest)
+                return self.modules[digest]
+            remote_name = "stackvm_%s.o" % digest
+            self.remote.upload(file_name, remote_name)
+            remote_mod = self.remote.load_module(remote_name)
+        finally:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        self.modules[digest] = remote_mod
+        if len(self.modules) > MAX_MODULES_PER_SESSION:
+            self.modules.popitem(last=False)
+        return remote_mod
+
+    def array(self, arr, resident=True, in_use=None):
+        """
+        Get the remote array of a numpy array, reusing the resident one of the same content.
+
+        Args:
+            arr (numpy.ndarray): host array.
+            resident (bool): keep the remote array for later launches, only for read-only inputs.
+            in_use (set): keys of the remote arrays already taken by the current launch, a remote
+                array is never passed twice to one launch.
+
+        Returns:
+            remote array.
+        """
+        if not resident:
+            return akg.tvm.nd.array(arr, self.ctx)
+        key = tensor_key(arr)
+        if in_use is not None:
+            if key in in_use:
+                return akg.tvm.nd.array(arr, self.ctx)
+            in_use.add(key)
+        if key in self.tensors:
+            self.tensors.move_to_end(key)
+            return self.tensors[key][0]
+        remote_arr = akg.tvm.nd.array(arr, self.ctx)
+        self.tensors[key] = (remote_arr, arr.nbytes)
+        self.tensor_bytes += arr.nbytes
+        while self.tensor_bytes > self.resident_size and len(self.tensors) > 1:
+            self._evict(next(iter(self.tensors)))
+        return remote_arr
+
+    def _evict(self, key):
+        _, nbytes = self.tensors.pop(key)
+        self.tensor_bytes -= nbytes
+
+
+class RpcSessionPool:
+    """
+    Pool of persistent rpc sessions per host.
+
+    A session serves one launch at a time, concurrent launches on the same host open more sessions.
+    Sessions are kept alive between launches, and dropped when they fail, stay idle too long or get
+    close to the session timeout of the server.
+    """
+
+    def __init__(self):
+        self.session_timeout = int(os.getenv(RPC_SESSION_TIMEOUT, DEFAULT_SESSION_TIMEOUT))
+        self.idle = int(os.getenv(RPC_SESSION_IDLE, DEFAULT_SESSION_IDLE))
+        self.resident_size = int(os.getenv(RPC_RESIDENT_SIZE, DEFAULT_RESIDENT_SIZE_MB)) * 1024 * 1024
+        self._idle_sessions = dict()
+        self._lock = Lock()
+
+    def _checkout(self, host, port):
+        with self._lock:
+            sessions = self._idle_sessions.get((host, port), [])
+            while sessions:
+                sess = sessions.pop()
+                if not sess.expired(self.idle):
+                    return sess
+        return None
+
+    def _checkin(self, sess):
+        sess.last_used = time.time()
+        with self._lock:
+            sessions = self._idle_sessions.setdefault((sess.host, sess.port), [])
+            sessions.append(sess)
+            if len(sessions) > MAX_IDLE_SESSIONS_PER_HOST:
+                sessions.pop(0)
+
+    @contextmanager
+    def session(self, host, port):
+        """Borrow a session of host, the session is dropped if the caller raises."""
+        sess = self._checkout(host, port)
+        if sess is None:
+            logging.info("open rpc session to %s:%d", host, port)
+            sess = RpcSession(host, port, self.session_timeout, self.resident_size)
+        yield sess
+        self._checkin(sess)
+
+    def clear(self):
+        """Close all idle sessions."""
+        with self._lock:
+            self._idle_sessions.clear()
+
+
+rpc_session_pool = RpcSessionPool()
+
+
+# sessions inherited by a forked child, never released, as closing them would shut down the connections of the parent
+_inherited_sessions = []
+
+
+def _reset_pool_in_child():
+    """the sockets of the sessions are shared with the parent after fork, so a forked child opens its own"""
+    _inherited_sessions.append(rpc_session_pool._idle_sessions)
+    rpc_session_pool._idle_sessions = dict()
+    rpc_session_pool._lock = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_in_child)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""load balancing of rpc launches across boards, shared by all processes of a host"""
+import os
+import json
+import time
+import uuid
+import fcntl
+import random
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+
+RPC_SCHEDULER_STATE = "RPC_SCHEDULER_STATE"
+EWMA_ALPHA = 0.3
+LATENCY_WINDOW = 64
+MIN_HEDGE_SAMPLES = 8
+HEDGE_PERCENTILE = 95
+HEDGE_FACTOR = 1.5
+MIN_HEDGE_TIMEOUT = 10
+DEFAULT_HEDGE_TIMEOUT = 200
+QUARANTINE_BASE = 30
+QUARANTINE_MAX = 1800
+# launches running longer than this are considered lost, e.g. their process was killed
+IN_FLIGHT_EXPIRE = 3600
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RpcScheduler:
+    """
+    Scheduler of rpc launches over a farm of boards.
+
+    Every board keeps an EWMA of its launch latency, its launches in flight and a window of recent
+    latencies. A launch goes to the board with the least expected wait, i.e. EWMA latency scaled by
+    its launches in flight. Failing boards are quarantined with exponential backoff. The hedging
+    timeout, after which a straggling launch is duplicated on another board, is derived from the
+    observed latency percentile.
+
+    The state lives in a json file guarded by an exclusive file lock, so that all processes on the
+    host, e.g. the workers of a regression suite, balance against each other.
+
+    Args:
+        state_file (str): path of the shared state file.
+    """
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.lock_file = state_file + ".lock"
+
+    @contextmanager
+    def _state(self):
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            yield state
+            tmp_file = "%s.%s" % (self.state_file, uuid.uuid4().hex)
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+
+    @staticmethod
+    def _board(state, board):
+        if board not in state:
+            state[board] = {"ewma": 0.0, "latency": [], "in_flight": {}, "fails": 0, "quarantine": 0.0}
+        stat = state[board]
+        now = time.time()
+        stat["in_flight"] = {token: (pid, start) for token, (pid, start) in stat["in_flight"].items()
+                             if now - start < IN_FLIGHT_EXPIRE and _pid_alive(pid)}
+        return stat
+
+    def acquire(self, boards, exclude=()):
+        """
+        Choose a board for a launch and count the launch in flight on it.
+
+        Args:
+            boards (list): candidate boards.
+            exclude (list): boards already serving the same launch, chosen only if nothing else is left.
+
+        Returns:
+            tuple of board and token, the token is given back by release.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._state() as state:
+            stats = {board: self._board(state, board) for board in boards}
+            candidates = [b for b in boards if b not in exclude] or list(boards)
+            healthy = [b for b in candidates if stats[b]["quarantine"] <= now]
+            if healthy:
+                # boards never measured are tried first, ties are broken by the launches in flight,
+                # then randomly
+                random.shuffle(healthy)
+                board = min(healthy, key=lambda b: (stats[b]["ewma"] * (1 + len(stats[b]["in_flight"])),
+                                                    len(stats[b]["in_flight"])))
+            else:
+                board = min(candidates, key=lambda b: stats[b]["quarantine"])
+                logging.warning("all rpc boards are quarantined, use %s", board)
+            stats[board]["in_flight"][token] = (os.getpid(), now)
+        return board, token
+
+    def release(self, board, token, latency, success):
+        """Record the latency and the result of a launch acquired on board."""
+        with self._state() as state:
+            stat = self._board(state, board)
+            stat["in_flight"].pop(token, None)
+            if success:
+                stat["ewma"] = latency if not stat["ewma"] else \
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * stat["ewma"]
+                stat["latency"] = (stat["latency"] + [latency])[-LATENCY_WINDOW:]
+                stat["fails"] = 0
+                stat["quarantine"] = 0.0
+            else:
+                stat["fails"] += 1
+                backoff = min(QUARANTINE_BASE * 2 ** (stat["fails"] - 1), QUARANTINE_MAX)
+                stat["quarantine"] = time.time() + backoff
+                logging.warning("rpc board %s failed %d time(s), quarantine it for %d seconds",
+                                board, stat["fails"], backoff)
+
+    def hedge_timeout(self, boards, extra=0):
+        """
+        Seconds to wait for a launch before hedging it on another board.
+
+        Args:
+            boards (list): candidate boards.
+            extra (int): expected seconds of data uploading of the launch.
+        """
+        with self._state() as state:
+            latency = sorted(sum((self._board(state, b)["latency"] for b in boards), []))
+        if len(latency) < MIN_HEDGE_SAMPLES:
+            return DEFAULT_HEDGE_TIMEOUT + extra
+        pos = min(len(latency) - 1, len(latency) * HEDGE_PERCENTILE // 100)
+        timeout = max(MIN_HEDGE_TIMEOUT, latency[pos] * HEDGE_FACTOR)
+        return int(min(timeout, DEFAULT_HEDGE_TIMEOUT)) + extra
+
+    def summary(self):
+        """Statistics of all boards."""
+        with self._state() as state:
+            return {board: {"ewma": stat["ewma"], "in_flight": len(self._board(state, board)["in_flight"]),
+                            "fails": stat["fails"], "quarantine": stat["quarantine"]}
+                    for board, stat in state.items()}
+
+
+_schedulers = {}
+
+
+def get_rpc_scheduler(boards):
+    """
+    Get the scheduler of a farm of boards.
+
+    The state file is set by RPC_SCHEDULER_STATE, by default it is derived from the boards so that
+    processes using the same farm share it.
+    """
+    state_file = os.getenv(RPC_SCHEDULER_STATE)
+    if not state_file:
+        farm = hashlib.sha256(json.dumps(sorted(boards)).encode("utf-8")).hexdigest()[:16]
+        state_file = os.path.join(tempfile.gettempdir(), "akg_rpc_scheduler_%s.json" % farm)
+    if state_file not in _schedulers:
+        _schedulers[state_file] = RpcScheduler(state_file)
+    return _schedulers[state_file]
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""dispatch of dynamic shape ops to static kernels built for shape buckets"""
+import math
+import logging
+from threading import Lock
+import numpy as np
+
+import akg
+import akg.tvm
+from akg.utils import kernel_exec as utils
+from akg.utils.dsl_create import TensorUtils
+
+DEFAULT_BUCKET_BOUND = 4096
+# keys of build attrs which only apply to the parametric kernel
+DYNAMIC_ATTRS = ("dynamic", "enable_dynamic", "dim")
+# a dynamic kernel has at most this number of blocks
+MAX_BLOCK_DIM = 32
+BLOCK_SIZE = 8192
+
+
+def power_of_two_buckets(bound, min_bucket=1):
+    """
+    Powers of two from min_bucket up to bound, and bound itself if it is not a power of two.
+
+    Args:
+        bound (int): the largest bucket.
+        min_bucket (int): the smallest bucket.
+
+    Returns:
+        list of int.
+    """
+    if bound < 1 or min_bucket < 1:
+        raise ValueError("bound and min_bucket of buckets should be positive, but got %d and %d"
+                         % (bound, min_bucket))
+    buckets = []
+    bucket = 1 << max(0, int(math.ceil(math.log2(min_bucket))))
+    while bucket < bound:
+        buckets.append(bucket)
+        bucket <<= 1
+    buckets.append(bound)
+    return buckets
+
+
+def default_block_dim(var_values, arg_shapes):
+    """block_dim of the parametric kernel used by the dynamic shape tests: one block per 8192 elements of input 0."""
+    size = 1
+    for dim in arg_shapes[0]:
+        size *= dim
+    return min(MAX_BLOCK_DIM, int(math.ceil(size / BLOCK_SIZE + 1)))
+
+
+def _flatten_tensors(output):
+    """tensors returned by an op, in the order of the arguments of its kernel."""
+    if isinstance(output, akg.tvm.tensor.Tensor):
+        return [output] if TensorUtils.is_output_value(output) else []
+    tensors = []
+    if isinstance(output, (list, tuple)):
+        for elem in output:
+            tensors += _flatten_tensors(elem)
+    return tensors
+
+
+def _to_int(expr):
+    if isinstance(expr, int):
+        return expr
+    expr = akg.tvm.ir_pass.Simplify(expr)
+    if not isinstance(expr, akg.tvm.expr.IntImm):
+        raise ValueError("shape %s cannot be evaluated to a constant" % str(expr))
+    return expr.value
+
+
+class BucketedKernel:
+    """
+    A dynamic shape op with static kernels specialized for shape buckets, and the parametric kernel as fallback.
+
+    Every shape var of input_shapes is rounded up to the smallest bucket which holds it, and the static kernel of
+    these buckets is built on first use and reused afterwards. Shapes beyond the largest bucket run the parametric
+    kernel, which takes the shape vars and block_dim after the tensors.
+
+    A static kernel runs a shape smaller than its bucket only if pad is set: the tensors are padded with pad_value
+    along the dynamic axes and the outputs are sliced back. This is correct for ops whose outputs do not depend on
+    the padded elements, e.g. elementwise ops or reductions over static axes. Otherwise only the shapes which are
+    exactly on the buckets run static kernels.
+
+    Args:
+        op_func (function): the op build function, as op_build.
+        input_shapes (list): the shapes of inputs, dynamic dims are tvm Var.
+        input_types (list): the dtypes of inputs.
+        op_attrs (list): extra attributes for the op.
+        kernel_name (str): name of the kernels, static kernels are suffixed by their buckets.
+        attrs (dict): build attrs of the parametric kernel.
+        static_attrs (dict): build attrs of the static kernels, attrs without the dynamic ones by default.
+        buckets (list of int): buckets of every shape var, power_of_two_buckets(attrs["dynamic_shape_bound"])
+            by default.
+        pad (bool): run shapes between buckets by padding.
+        pad_value: value of padded elements.
+        max_pad_ratio (float): if the padded tensors are larger than the original ones by this ratio, run the
+            parametric kernel instead.
+        block_dim_func (function): block_dim of the parametric kernel from the values of shape vars and the shapes
+            of tensors, default_block_dim by default.
+    """
+
+    def __init__(self, op_func, input_shapes, input_types, op_attrs=None, kernel_name="", attrs=None,
+                 static_attrs=None, buckets=None, pad=False, pad_value=0, max_pad_ratio=None,
+                 block_dim_func=default_block_dim):
+        self.op_func = op_func
+        self.input_shapes = input_shapes
+        self.input_types = input_types
+        self.op_attrs = op_attrs
+        self.kernel_name = kernel_name if kernel_name else op_func.__name__
+        self.attrs = dict(attrs) if attrs else {}
+        self.attrs.setdefault("dynamic", True)
+        if static_attrs is None:
+            static_attrs = {k: v for k, v in self.attrs.items() if k not in DYNAMIC_ATTRS}
+        self.static_attrs = static_attrs
+        if buckets is None:
+            buckets = power_of_two_buckets(int(self.attrs.get("dynamic_shape_bound", DEFAULT_BUCKET_BOUND)))
+        self.buckets = sorted(set(buckets))
+        self.pad = pad
+        self.pad_value = pad_value
+        self.max_pad_ratio = max_pad_ratio
+        self.block_dim_func = block_dim_func
+
+        # shape vars in the order of the parametric kernel arguments, and where to read them from the inputs
+        self.shape_vars = []
+        self._var_pos = {}
+        for i, shape in enumerate(input_shapes):
+            for j, dim in enumerate(shape):
+                if isinstance(dim, akg.tvm.expr.Var) and dim.name not in self._var_pos:
+                    self.shape_vars.append(dim)
+                    self._var_pos[dim.name] = (i, j)
+        if not self.shape_vars:
+            raise ValueError("input_shapes of %s have no shape var" % self.kernel_name)
+        self._arg_shapes = self._symbolic_arg_shapes()
+
+        self._dynamic_mod = None
+        self._static_mods = {}
+        self._lock = Lock()
+        self.launch_count = {"static": 0, "padded": 0, "dynamic": 0}
+
+    def _symbolic_arg_shapes(self):
+        """shapes of the tensor arguments of the kernel, inputs then outputs, in terms of the shape vars."""
+        inputs = [akg.tvm.placeholder(shape, dtype, "input_%d" % (i + 1))
+                  for i, (shape, dtype) in enumerate(zip(self.input_shapes, self.input_types))]
+        args = inputs + list(self.op_attrs) if self.op_attrs is not None else inputs
+        outputs = _flatten_tensors(self.op_func(*args))
+        return [list(shape) for shape in self.input_shapes] + [list(t.shape) for t in outputs]
+
+    def _eval_shape(self, shape, var_map):
+        return tuple(dim if isinstance(dim, int) else _to_int(akg.tvm.ir_pass.Substitute(dim, var_map))
+                     for dim in shape)
+
+    def _build_static(self, bucket):
+        """build the static kernel of bucket, the values of shape vars."""
+        var_map = {var: akg.tvm.const(value, var.dtype) for var, value in zip(self.shape_vars, bucket)}
+        static_shapes = [list(self._eval_shape(shape, var_map)) for shape in self.input_shapes]
+        kernel_name = "%s_bucket_%s" % (self.kernel_name, "_".join(str(b) for b in bucket))
+        logging.info("build %s for shape bucket %s", kernel_name, bucket)
+        return utils.op_build(self.op_func, static_shapes, self.input_types, self.op_attrs, kernel_name,
+                              attrs=dict(self.static_attrs))
+
+    def get_static_mod(self, bucket):
+        """the static kernel of bucket, built on first use."""
+        bucket = tuple(bucket)
+        with self._lock:
+            if bucket not in self._static_mods:
+                self._static_mods[bucket] = self._build_static(bucket)
+            return self._static_mods[bucket]
+
+    def get_dynamic_mod(self):
+        """the parametric kernel, built on first use."""
+        with self._lock:
+            if self._dynamic_mod is None:
+                self._dynamic_mod = utils.op_build(self.op_func, self.input_shapes, self.input_types, self.op_attrs,
+                                                   self.kernel_name, attrs=dict(self.attrs))
+            return self._dynamic_mod
+
+    def precompile(self):
+        """build the parametric kernel and the static kernels of all buckets."""
+        self.get_dynamic_mod()
+        for bucket in np.ndindex(*([len(self.buckets)] * len(self.shape_vars))):
+            self.get_static_mod([self.buckets[i] for i in bucket])
+
+    def select(self, var_values, arg_shapes):
+        """
+        Select the kernel to run.
+
+        Args:
+            var_values (list of int): the values of shape vars.
+            arg_shapes (list of tuple): the shapes of tensor arguments.
+
+        Returns:
+            the bucket to run, or None for the parametric kernel.
+        """
+        bucket = []
+        for value in var_values:
+            idx = int(np.searchsorted(self.buckets, value))
+            if idx == len(self.buckets):
+                return None
+            bucket.append(self.buckets[idx])
+        if bucket == list(var_values):
+            return tuple(bucket)
+        if not self.pad:
+            return None
+        if self.max_pad_ratio is not None:
+            var_map = {var: akg.tvm.const(value, var.dtype) for var, value in zip(self.shape_vars, bucket)}
+            size = sum(int(np.prod(shape)) for shape in arg_shapes)
+            padded_size = sum(int(np.prod(self._eval_shape(shape, var_map))) for shape in self._arg_shapes)
+            if padded_size > size * self.max_pad_ratio:
+                return None
+        return tuple(bucket)
+
+    def launch(self, args, outputs=(-1,), device_id=0, expect=None):
+        """
+        Run the op on args, as mod_launch.
+
+        Args:
+            args (Union[list, tuple]): numpy arrays of inputs and outputs, without shape vars and block_dim.
+            outputs (Union[list, tuple]): output argument indexes.
+            device_id (int): device id.
+            expect: returned in compile only runtime modes.
+
+        Returns:
+            output numpy array, or tuple of numpy array if multi-output.
+        """
+        if len(args) != len(self._arg_shapes):
+            raise ValueError("%s takes %d tensors, but got %d" % (self.kernel_name, len(self._arg_shapes), len(args)))
+        var_values = [args[i].shape[j] for i, j in (self._var_pos[var.name] for var in self.shape_vars)]
+        arg_shapes = [tuple(arg.shape) for arg in args]
+        bucket = self.select(var_values, arg_shapes)
+        # the parametric kernel takes more arguments, so negative indexes are resolved against the tensors
+        outputs = [len(args) + i if i < 0 else i for i in outputs]
+
+        if bucket is None:
+            self.launch_count["dynamic"] += 1
+            dynamic_args = list(args) + var_values + [self.block_dim_func(var_values, arg_shapes)]
+            return utils.mod_launch(self.get_dynamic_mod(), dynamic_args, outputs=outputs, device_id=device_id,
+                                    expect=expect)
+
+        mod = self.get_static_mod(bucket)
+        if list(bucket) == var_values:
+            self.launch_count["static"] += 1
+            return utils.mod_launch(mod, list(args), outputs=outputs, device_id=device_id, expect=expect)
+
+        self.launch_count["padded"] += 1
+        var_map = {var: akg.tvm.const(value, var.dtype) for var, value in zip(self.shape_vars, bucket)}
+        padded_args = []
+        for arg, shape in zip(args, self._arg_shapes):
+            padded_shape = self._eval_shape(shape, var_map)
+            pad_width = [(0, p - s) for p, s in zip(padded_shape, arg.shape)]
+            padded_args.append(np.pad(arg, pad_width, "constant", constant_values=self.pad_value))
+        output = utils.mod_launch(mod, padded_args, outputs=outputs, device_id=device_id, expect=expect)
+        if output is expect:
+            return output
+
+        out_list = output if isinstance(output, tuple) else (output,)
+        out_list = [out[tuple(slice(0, s) for s in arg_shapes[i])] for out, i in zip(out_list, outputs)]
+        return out_list[0] if len(out_list) == 1 else tuple(out_list)
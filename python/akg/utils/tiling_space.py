@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""lazily enumerated tiling space"""
+import bisect
+import itertools
+import numpy as np
+
+
+class TilingSpace:
+    """
+    Tiling candidates of a kernel, combined from the candidates of its bands on demand.
+
+    A tiling candidate concatenates one candidate of every band, and all the chosen band candidates
+    agree on their first `shared_size` tiles. Candidates are numbered in the same order as the dense
+    tiling_candidate table generated by poly, so that the k-th candidate is computed without
+    materializing the whole space.
+
+    Args:
+        band_candidate (numpy.ndarray): candidates of all bands flattened.
+        band_table (numpy.ndarray): offset, candidate number and tile size of each band.
+        shared_size (int): number of leading tiles shared by all bands.
+    """
+
+    def __init__(self, band_candidate, band_table, shared_size=0):
+        band_candidate = np.asarray(band_candidate, dtype=np.int64).reshape(-1)
+        band_table = np.asarray(band_table, dtype=np.int64).reshape(-1, 3)
+        self._bands = [band_candidate[offset:offset + rows * size].reshape(rows, size)
+                       for offset, rows, size in band_table.tolist()]
+        self._shared_size = int(shared_size) if len(self._bands) > 1 else 0
+        self._tile_size = sum(band.shape[1] for band in self._bands)
+        # row indices of later bands grouped by their shared prefix, kept in candidate order
+        self._groups = []
+        for band in self._bands[1:]:
+            group = {}
+            for row, prefix in enumerate(self._prefixes(band)):
+                group.setdefault(prefix, []).append(row)
+            self._groups.append(group)
+        self._first = []
+        self._offsets = [0]
+        self._same_prefix = {}
+        if not self._bands or any(band.shape[0] == 0 for band in self._bands):
+            return
+        completions = {}
+        for row, prefix in enumerate(self._prefixes(self._bands[0])):
+            if prefix not in completions:
+                count = 1
+                for group in self._groups:
+                    count *= len(group.get(prefix, ()))
+                completions[prefix] = count
+            if completions[prefix] > 0:
+                self._same_prefix.setdefault(prefix, []).append(len(self._first))
+                self._first.append((row, prefix))
+                self._offsets.append(self._offsets[-1] + completions[prefix])
+
+    def _prefixes(self, band):
+        return [tuple(prefix) for prefix in band[:, :self._shared_size].tolist()]
+
+    def __len__(self):
+        return self._offsets[-1]
+
+    @property
+    def tile_size(self):
+        return self._tile_size
+
+    def _compose(self, first_row, rows):
+        tile = self._bands[0][first_row].tolist()
+        for band, row in zip(self._bands[1:], rows):
+            tile.extend(band[row].tolist())
+        return tile
+
+    def _decompose(self, k):
+        """position of the band 0 candidate and the row digits of later bands of the k-th candidate."""
+        k = int(k)
+        if k < 0:
+            k += len(self)
+        if k < 0 or k >= len(self):
+            raise IndexError("tiling candidate index out of range")
+        pos = bisect.bisect_right(self._offsets, k) - 1
+        prefix = self._first[pos][1]
+        k -= self._offsets[pos]
+        # mixed radix decomposition, the last band changes fastest
+        digits = []
+        for group in reversed(self._groups):
+            k, digit = divmod(k, len(group[prefix]))
+            digits.append(digit)
+        digits.reverse()
+        return pos, digits
+
+    def _recompose(self, pos, digits):
+        prefix = self._first[pos][1]
+        k = 0
+        for group, digit in zip(self._groups, digits):
+            k = k * len(group[prefix]) + digit
+        return self._offsets[pos] + k
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        pos, digits = self._decompose(k)
+        first_row, prefix = self._first[pos]
+        return self._compose(first_row, [group[prefix][digit] for group, digit in zip(self._groups, digits)])
+
+    def __iter__(self):
+        for first_row, prefix in self._first:
+            for rows in itertools.product(*[group[prefix] for group in self._groups]):
+                yield self._compose(first_row, rows)
+
+    def sample(self, rng=None):
+        """Draw a random legal tiling candidate."""
+        if not self:
+            raise IndexError("empty tiling space")
+        rng = np.random if rng is None else rng
+        return self[int(rng.randint(len(self)))]
+
+    def neighbor(self, k, rng=None):
+        """Index of a random candidate which differs from the k-th candidate in the choice of one band."""
+        rng = np.random if rng is None else rng
+        pos, digits = self._decompose(k)
+        prefix = self._first[pos][1]
+        band = int(rng.randint(len(self._bands)))
+        if band == 0:
+            # band 0 candidates with the same prefix have the same completions
+            same_prefix = self._same_prefix[prefix]
+            pos = same_prefix[int(rng.randint(len(same_prefix)))]
+        else:
+            digits[band - 1] = int(rng.randint(len(self._groups[band - 1][prefix])))
+        return self._recompose(pos, digits)
+
+    def tolist(self):
+        """Materialize the whole space as the dense tiling candidate table."""
+        return list(self)
+
+
+def get_tiling_space(ret):
+    """
+    Get the tiling candidates of a tiling space node returned by lowering.
+
+    Returns:
+        TilingSpace when the node holds the candidates of each band, otherwise list of candidates.
+    """
+    band_table = ret.band_table.asnumpy()
+    if band_table.ndim == 2:
+        return TilingSpace(ret.band_candidate.asnumpy(), band_table, ret.shared_size)
+    return ret.tiling_candidate.asnumpy().tolist()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# coding: utf-8
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""database of tuned tilings"""
+import os
+import json
+import math
+import sqlite3
+import datetime
+import logging
+from threading import Lock
+
+AKG_TUNING_DB = "AKG_TUNING_DB"
+# a tuned tiling is reused for a shape whose extents are all within this ratio of the tuned shape
+NEAREST_MAX_RATIO = 2.0
+BUSY_TIMEOUT = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tuning (
+    family TEXT NOT NULL,
+    key TEXT NOT NULL,
+    shape TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    dim TEXT NOT NULL,
+    attrs TEXT NOT NULL,
+    cycles REAL,
+    original REAL,
+    date TEXT,
+    PRIMARY KEY (family, key)
+);
+CREATE INDEX IF NOT EXISTS tuning_family ON tuning (family, rank);
+"""
+
+
+class TuningDatabase:
+    """
+    Transactional store of the best tiling found by the tuner for each kernel.
+
+    An entry is identified by the family of the kernel, i.e. the kernel without its shapes, and an
+    exact key within the family. Entries of the same family are the candidates of the nearest shape
+    fallback. Concurrent tuners append to the same sqlite file, an entry is only replaced by a
+    result with less cycles.
+
+    Args:
+        path (str): path of the sqlite database file.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.realpath(path)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def record(self, family, key, shape, dim, attrs=None, cycles=None, original=None):
+        """
+        Record a tuning result, keeping the existing entry if it has less cycles.
+
+        Args:
+            family (str): kernel identity without shapes.
+            key (str): exact key of the kernel in its family.
+            shape (list): all shape extents of the kernel.
+            dim (str): tiling in the format of attribute "dim".
+            attrs (dict): other build attributes of the tuned kernel.
+            cycles (float): cycles of the tuned kernel.
+            original (float): cycles of the kernel with the default tiling.
+        """
+        row = (family, key, json.dumps(list(shape)), len(shape), dim, json.dumps(attrs if attrs else {}),
+               cycles, original, str(datetime.datetime.now()))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT INTO tuning VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                             "ON CONFLICT (family, key) DO UPDATE SET "
+                             "shape = excluded.shape, rank = excluded.rank, dim = excluded.dim, "
+                             "attrs = excluded.attrs, cycles = excluded.cycles, original = excluded.original, "
+                             "date = excluded.date "
+                             "WHERE tuning.cycles IS NULL OR excluded.cycles < tuning.cycles", row)
+        finally:
+            conn.close()
+
+    def lookup(self, family, key, shape=None, nearest=True):
+        """
+        Get the tuned tiling of a kernel.
+
+        Args:
+            family (str): kernel identity without shapes.
+            key (str): exact key of the kernel in its family.
+            shape (list): all shape extents of the kernel, used by the nearest shape fallback.
+            nearest (bool): whether to fall back to the tuned kernel of the nearest shape.
+
+        Returns:
+            dict with "dim" and "attrs", or None if nothing applies.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT dim, attrs FROM tuning WHERE family = ? AND key = ?",
+                               (family, key)).fetchone()
+            if row is None and nearest and shape:
+                rows = conn.execute("SELECT dim, attrs, shape FROM tuning WHERE family = ? AND rank = ?",
+                                    (family, len(shape))).fetchall()
+                row = self._nearest(rows, shape)
+        except sqlite3.Error as e:
+            logging.warning("read tuning database %s failed: %s", self.path, e)
+            return None
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return {"dim": row[0], "attrs": json.loads(row[1])}
+
+    @staticmethod
+    def _nearest(rows, shape):
+        best = None
+        best_dist = None
+        for row in rows:
+            tuned = json.loads(row[2])
+            dist = 0.0
+            for a, b in zip(shape, tuned):
+                if a <= 0 or b <= 0 or max(a, b) > NEAREST_MAX_RATIO * min(a, b):
+                    dist = None
+                    break
+                dist += abs(math.log2(a / b))
+            if dist is not None and (best_dist is None or dist < best_dist):
+                best, best_dist = row, dist
+        return best
+
+
+_tuning_db = {}
+_tuning_db_lock = Lock()
+
+
+def get_tuning_db():
+    """
+    Get the tuning database configured by environment AKG_TUNING_DB.
+
+    Returns:
+        TuningDatabase, or None if the database is disabled.
+    """
+    path = os.getenv(AKG_TUNING_DB)
+    if not path:
+        return None
+    with _tuning_db_lock:
+        if path not in _tuning_db:
+            try:
+                _tuning_db[path] = TuningDatabase(path)
+            except sqlite3.Error as e:
+                logging.warning("open tuning database %s failed: %s", path, e)
+                _tuning_db[path] = None
+        return _tuning_db[path]
+
+
+def flatten_shape(shapes):
+    """all int extents of nested shapes, in order."""
+    ret = []
+    for s in shapes:
+        if isinstance(s, (list, tuple)):
+            ret.extend(flatten_shape(s))
+        elif isinstance(s, int) and not isinstance(s, bool):
+            ret.append(s)
+    return ret
@@ -30,6 +30,8 @@
 #include <regex>
 #include <ctime>
 #include <algorithm>
+#include <functional>
+#include <mutex>
 
 #include "tvm.h"
 #include "codegen/codegen_cce.h"
@@ -46,6 +48,11 @@ constexpr int CC_SIZE = 256 * 1024;
 constexpr int CBUF_SIZE = 1024 * 1024;
 constexpr int STATUS_BUFFER_SIZE = 64;
 constexpr int GM_SIZE = 1024 * 1024 * 8;
+constexpr char CSIM_LAUNCH_FUNC[] = "akg_csim_launch";
+constexpr char CSIM_NUM_ARGS_FUNC[] = "akg_csim_num_args";
+constexpr char CSIM_LIB[] = "akg_csim";
+constexpr char CSIM_LIB_KEY[] = "key";
+constexpr char CSIM_COMPILE_OPTIONS[] = " -O2 -fPIC -pthread -std=c++11";
 
 namespace akg {
 namespace codegen {
@@ -143,7 +150,8 @@ std::string GenerateMulticoreBlockidx() {
   if (IsInMode("cdiff")) {
     return "static iterator_t(block_idx, 0);\n";
   }
-  return "static size_t block_idx = 0;\n";
+  // each block runs on its own thread in the shared library of the kernel
+  return "static thread_local size_t block_idx = 0;\n";
 }
 
 // Replace for(int i = ...) to for(iterator_t(i) = ...)
@@ -351,8 +359,9 @@ std::string GenerateKernelCall(const std::string &kernel_name, const std::vector
   }
 }
 
-// Generate main function (input, output) for CCE fast CPU simulation
-std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim = -1) {
+// Parse kernel name, parameter types and parameter names of CCE code
+std::string ParseCsimKernel(const std::string &cce_code, std::vector<std::string> *type_strings,
+                            std::vector<std::string> *name_strings) {
   std::string::size_type func_start_loc = cce_code.find("__aicore__");
   CHECK_NE(std::string::npos, func_start_loc) << "__aicore__ not found in CCE code";
 
@@ -385,8 +394,6 @@ std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim
   }
   CHECK(func_params.size()) << "CCE kernel has params";
 
-  std::vector<std::string> type_strings;
-  std::vector<std::string> name_strings;
   for (auto param : func_params) {
     std::vector<std::string> idents_raw = Split(param);
     std::vector<std::string> idents;
@@ -401,9 +408,44 @@ std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim
     if ('t' != type_string.back()) {
       type_string = type_string + "_t";
     }
-    type_strings.push_back(type_string);
-    name_strings.push_back(idents[2]);
+    type_strings->push_back(type_string);
+    name_strings->push_back(idents[2]);
   }
+  return kernel_name;
+}
+
+// Generate the entry of CCE kernel in shared library for in-process fast CPU simulation.
+// GM buffers are passed by the caller as pointers, so no data is copied in or out.
+std::string GenerateLaunchForCsim(const std::string &cce_code, const int block_dim = -1) {
+  std::vector<std::string> type_strings;
+  std::vector<std::string> name_strings;
+  std::string kernel_name = ParseCsimKernel(cce_code, &type_strings, &name_strings);
+  std::string num_args = std::to_string(name_strings.size());
+
+  std::string launch("extern \"C\" int " + std::string(CSIM_NUM_ARGS_FUNC) + "() { return " + num_args + "; }\n\n");
+  launch += "extern \"C\" int " + std::string(CSIM_LAUNCH_FUNC) + "(void **args, int num_args) {\n";
+  launch += "  if (num_args != " + num_args + ") {\n    return -1;\n  }\n";
+  for (size_t i = 0; i < name_strings.size(); ++i) {
+    launch += "  " + type_strings[i] + " *" + name_strings[i] + " = static_cast<" + type_strings[i] + " *>(args[" +
+              std::to_string(i) + "]);\n";
+  }
+  // a single-core kernel runs as one block too, so that it is timed by the performance model
+  std::string kernel_call = GenerateKernelCall(kernel_name, name_strings);
+  if (block_dim != -1) {
+    launch += "  csim_run_blocks(" + std::to_string(block_dim) + ", [&](size_t block) {\n";
+    launch += "    block_idx = block;\n";
+  } else {
+    launch += "  csim_run_blocks(1, [&](size_t) {\n";
+  }
+  launch += "    " + kernel_call + "  });\n";
+  return launch + "  return 0;\n}\n";
+}
+
+// Generate main function (input, output) for CCE fast CPU simulation
+std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim = -1) {
+  std::vector<std::string> type_strings;
+  std::vector<std::string> name_strings;
+  std::string kernel_name = ParseCsimKernel(cce_code, &type_strings, &name_strings);
 
   std::string main("int main() {\n");
   std::vector<std::string> signals_to_capture(
@@ -412,7 +454,7 @@ std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim
     main += "  signa(" + signal + ", signal_handler);\n";
   }
   main += "\n  const int alignment = 1024;\n  int retval = 0;\n  FILE *fp;\n";
-  for (unsigned int i = 0; i < func_params.size(); ++i) {
+  for (unsigned int i = 0; i < name_strings.size(); ++i) {
     std::string param = std::to_string(i);
     main += "\n";
     main += "  fp = fopen(\"in_" + param + ".bin\", \"rb\");\n";
@@ -451,7 +493,7 @@ std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim
     main += GenerateCopyDataFromTracker(name_strings);
   }
 
-  for (unsigned int param = 0; param < func_params.size(); ++param) {
+  for (unsigned int param = 0; param < name_strings.size(); ++param) {
     main += "\n";
     main += "  fp = fopen(\"out_" + std::to_string(param) + ".bin\", \"wb\");\n";
     main += "  CHECK(fp);\n";
@@ -467,7 +509,7 @@ std::string GenerateMainForCsim(const std::string &cce_code, const int block_dim
 
 // Mangle CCE code so that GCC can compile it
 void MangleCceCode(const std::string &cce_fname, bool need_replace_storage_scope = false, bool need_add_main = false,
-                   int block_dim = -1) {
+                   int block_dim = -1, bool need_add_launch = false) {
   int ret = access(cce_fname.c_str(), F_OK);
   CHECK_EQ(ret, 0) << "CCE source file " + cce_fname + "not found";
 
@@ -491,6 +533,10 @@ void MangleCceCode(const std::string &cce_fname, bool need_replace_storage_scope
     new_cce_file << "\n";
     new_cce_file << GenerateMainForCsim(cce, block_dim);
   }
+  if (need_add_launch) {
+    new_cce_file << "\n";
+    new_cce_file << GenerateLaunchForCsim(cce, block_dim);
+  }
   new_cce_file.close();
 }
 
@@ -504,7 +550,9 @@ std::string CcePostprocCsimMangleCode(const std::string &code, uint32_t block_di
   source_file << code;
   source_file.close();
 
-  MangleCceCode(source_filename, true, true, block_dim);
+  // cdiff tracks computation through a standalone binary, other modes load the kernel in-process
+  bool shared = !IsInMode("cdiff");
+  MangleCceCode(source_filename, true, !shared, block_dim, shared);
   return source_filename;
 }
 
@@ -566,7 +614,7 @@ std::string MakeCsimDir(const std::string &csim_pass) {
   std::string csim_dir = csim_base_dir + "/" + csim_pass;
   bool is_exist(0 == access(csim_dir.c_str(), F_OK));
   if (!is_exist) {
-    CHECK_EQ(0, mkdir(csim_dir.c_str(), F_OK));
+    CHECK_EQ(0, mkdir(csim_dir.c_str(), 0777));
   }
 
   return csim_dir;
@@ -576,7 +624,7 @@ std::string MakeCsimDir(const std::string &csim_pass) {
 void AddHeader2File(const std::string &write_file_name, const std::string &source_code,
                     const std::vector<std::string> &header_files) {
   std::ofstream new_source_file(write_file_name);
-  CHECK(!new_source_file.is_open());
+  CHECK(new_source_file.is_open());
   for (auto header_file : header_files) {
     new_source_file << "#include \"" << header_file << "\"\n";
   }
@@ -649,6 +697,108 @@ void RunCmd(const std::string &cmd) {
   LOG(INFO) << "cmd execute complete, elapsed time: " << elapse << " s\n";
 }
 
+std::string ReadFile(const std::string &file_path) {
+  std::ifstream f(file_path);
+  CHECK(f.is_open()) << "Failed to open " << file_path;
+  std::stringstream buffer;
+  buffer << f.rdbuf();
+  f.close();
+  return buffer.str();
+}
+
+// Claim the csim library directory lib_dir for key, and return whether it holds the library of key.
+// The key is compared in full, so a directory of another key with the same hash is never reused.
+bool ClaimCsimLibraryDir(const std::string &lib_dir, const std::string &key) {
+  int ret = mkdir(lib_dir.c_str(), 0777);
+  CHECK(ret == 0 || errno == EEXIST) << "mkdir " << lib_dir << " failed";
+  std::string key_file = lib_dir + "/" + CSIM_LIB_KEY;
+  if (access(key_file.c_str(), F_OK) != 0) {
+    // link fails if the key file exists, so the first of concurrent builders owns the directory
+    std::string tmp_key_file = key_file + "." + std::to_string(getpid());
+    std::ofstream tmp_key(tmp_key_file);
+    CHECK(tmp_key.is_open());
+    tmp_key << key;
+    tmp_key.close();
+    ret = link(tmp_key_file.c_str(), key_file.c_str());
+    CHECK(ret == 0 || errno == EEXIST) << "link " << key_file << " failed";
+    static_cast<void>(std::remove(tmp_key_file.c_str()));
+  }
+  return ReadFile(key_file) == key;
+}
+
+// Build the fast simulator into a shared library once, and return the directory holding it and its headers.
+// The directory is named by the hash of simulator sources, so that changed sources get a new library, and holds
+// the sources in full to tell hash collisions apart. It is under CSIM_LIB_DIR if set, otherwise ./csim/lib.
+std::string GetCsimLibrary() {
+  static std::mutex mutex;
+  std::lock_guard<std::mutex> lock(mutex);
+  std::string header_path = GetCsimHeaderPath();
+  CHECK(!header_path.empty()) << "csim headers not found";
+  std::vector<std::string> files{"aicore_fast_sim.h", "aicore_fast_sim.cc", "half_float.h", "halide_intrinsics.h",
+                                 "aicore_debug_funcs.h"};
+  std::string content(CSIM_COMPILE_OPTIONS);
+  for (const auto &filename : files) {
+    content += ReadFile(header_path + "/" + filename);
+  }
+  std::stringstream hash;
+  hash << std::hex << std::hash<std::string>()(content);
+
+  const char *lib_base_dir = getenv("CSIM_LIB_DIR");
+  std::string base_dir;
+  if (lib_base_dir != nullptr) {
+    base_dir = std::string(lib_base_dir);
+    int ret = mkdir(base_dir.c_str(), 0777);
+    CHECK(ret == 0 || errno == EEXIST) << "mkdir " << base_dir << " failed";
+  } else {
+    base_dir = MakeCsimDir("lib");
+  }
+  std::string lib_dir = base_dir + "/" + hash.str();
+  for (int collision = 1; !ClaimCsimLibraryDir(lib_dir, content); ++collision) {
+    LOG(INFO) << "csim library " << lib_dir << " holds other sources";
+    lib_dir = base_dir + "/" + hash.str() + "_" + std::to_string(collision);
+  }
+  std::string lib_file = lib_dir + "/lib" + CSIM_LIB + ".so";
+  if (access(lib_file.c_str(), F_OK) == 0) {
+    return lib_dir;
+  }
+
+  for (const auto &filename : files) {
+    Copyfile(header_path + "/" + filename, lib_dir + "/" + filename);
+  }
+  // compile to a private file then rename, so that concurrent builders never load a partial library
+  std::string tmp_lib_file = lib_file + "." + std::to_string(getpid());
+  std::string compile_cmd = "cd " + lib_dir + " && g++" + CSIM_COMPILE_OPTIONS + " -shared -o " + tmp_lib_file +
+                            " aicore_fast_sim.cc >/dev/null 2>&1";
+  LOG(INFO) << "csim library compile cmd: " + compile_cmd;
+  RunCmd(compile_cmd);
+  CHECK_EQ(0, access(tmp_lib_file.c_str(), F_OK)) << "Failed to build csim library " << lib_file;
+  CHECK_EQ(0, rename(tmp_lib_file.c_str(), lib_file.c_str()));
+  return lib_dir;
+}
+
+// Compile C kernel to shared library for in-process fast CPU simulation, linking the prebuilt simulator library
+// csim_pass: the library is named lib<csim_pass>.so
+// source_code: C kernel source code (string) with launch entry
+std::string CompileCsimShared(const std::string &csim_pass, const std::string &source_code) {
+  CheckFilename(csim_pass);
+  std::string lib_dir = GetCsimLibrary();
+  std::string csim_dir = MakeCsimDir(csim_pass);
+  std::string new_source_file_name = csim_pass + ".cpp";
+  AddHeader2File(csim_dir + "/" + new_source_file_name, source_code, {"aicore_fast_sim.h"});
+
+  std::string kernel_lib = "lib" + csim_pass + ".so";
+  std::string compile_cmd = "g++" + std::string(CSIM_COMPILE_OPTIONS) + " -shared -I" + lib_dir + " -o " +
+                            kernel_lib + " " + new_source_file_name + " -L" + lib_dir + " -l" + CSIM_LIB +
+                            " -Wl,-rpath," + lib_dir;
+  LOG(INFO) << "csim compile cmd: " + compile_cmd + "\n";
+  compile_cmd = "cd " + csim_dir + " && " + compile_cmd + " >/dev/null 2>&1";
+  RunCmd(compile_cmd);
+
+  std::string kernel_lib_path = csim_dir + "/" + kernel_lib;
+  CHECK_EQ(access(kernel_lib_path.c_str(), F_OK), 0) << "Shared library " + kernel_lib_path + " not found";
+  return kernel_lib_path;
+}
+
 // Compile C kernel to binary for fast CPU simulation
 // csim_pass: the binary file name to be generated
 // source_code: C kernel source code (string)
@@ -714,7 +864,7 @@ void CompileCsim(const std::string &csim_pass, const std::string &source_code,
   }
   std::string compile_cmd = "g++" + c_compile_options + " -o" + csim_pass + " " + all_source_files;
   LOG(INFO) << "csim compile cmd: " + compile_cmd + "\n";
-  compile_cmd = "cd " + csim_dir + " && " + compile_cmd + " &>/dev/null";
+  compile_cmd = "cd " + csim_dir + " && " + compile_cmd + " >/dev/null 2>&1";
   RunCmd(compile_cmd);
 
   std::string executable_file = csim_dir + "/" + csim_pass;
@@ -722,31 +872,15 @@ void CompileCsim(const std::string &csim_pass, const std::string &source_code,
   CHECK_EQ(ret, 0) << "Executable file " + executable_file + " not found";
 }
 
-// Compile C kernel to binary for fast CPU simulation
-// csim_pass: generate binary file name
-// csim_fname: C kernel file path (full path)
-void CompileCsimFile(const std::string &csim_pass, const std::string &csim_fname) {
-  int access_ret = access(csim_fname.c_str(), F_OK);
-  CHECK_NE(access_ret, -1) << "C kernel source file " << csim_fname << " not found";
-
-  std::ifstream source_file(csim_fname);
-  CHECK(source_file.is_open());
-  std::stringstream buffer;
-  buffer << source_file.rdbuf();
-  std::string source_code(buffer.str());
-  source_file.close();
-
-  CompileCsim(csim_pass, source_code);
-}
-
 void CcePostprocCcesim(const std::string &code, uint32_t block_dim, const std::string &kernel_name) {
-  if (!IsInMode("ccesim")) {
+  if (!IsInMode("ccesim") && !IsInMode("csim")) {
     return;
   }
   std::string binary_filename = "cce_" + kernel_name;
   std::string source_filename = CcePostprocCsimMangleCode(code, block_dim, kernel_name);
-  CompileCsimFile(binary_filename, source_filename);
+  std::string kernel_lib = CompileCsimShared(binary_filename, ReadFile(source_filename));
   CHECK_EQ(0, setenv("CCE_KERNEL-NAME", binary_filename.c_str(), 1));
+  CHECK_EQ(0, setenv("CSIM_KERNEL_LIB", kernel_lib.c_str(), 1));
 }
 
 const char VERSION_CCE_ARCH_ES[] = "3.5";
@@ -1043,11 +1177,114 @@ std::string CompileCce(const std::string &code, const std::string &target, std::
   return BinFile2String(file_target);
 }
 
+// Object cache of aicore kernels, so that the same CCE code is compiled once even under another kernel name.
+// An entry is keyed by the code with its kernel name masked, the compile command and the compiler, and holds the
+// object with the kernel name it was compiled under. It is enabled by setting AKG_CCE_CACHE_DIR to its directory,
+// a hit renames the kernel of the module to the name in the cached object.
+constexpr char CCE_CACHE_MASKED_NAME[] = "__akg_cached";
+constexpr char CCE_CACHE_OBJECT[] = "kernel.o";
+constexpr char CCE_CACHE_KEY[] = "key";
+constexpr char CCE_CACHE_KERNEL_NAME[] = "kernel_name";
+
+bool IsCceCacheEnabled() {
+  const char *cache_dir = getenv("AKG_CCE_CACHE_DIR");
+  return cache_dir != nullptr && cache_dir[0] != '\0';
+}
+
+std::string GetCceCacheDir() {
+  std::string dir = getenv("AKG_CCE_CACHE_DIR");
+  int ret = mkdir(dir.c_str(), 0777);
+  CHECK(ret == 0 || errno == EEXIST) << "mkdir " << dir << " failed";
+  return dir;
+}
+
+// Path, size and modification time of ccec in PATH, so that an updated compiler does not hit old objects
+std::string GetCompilerIdentity() {
+  const char *path_env = getenv("PATH");
+  std::stringstream paths(path_env != nullptr ? path_env : "");
+  std::string path;
+  while (std::getline(paths, path, ':')) {
+    std::string compiler = path + "/ccec";
+    struct stat st;
+    if (!path.empty() && stat(compiler.c_str(), &st) == 0) {
+      return compiler + " " + std::to_string(st.st_size) + " " + std::to_string(st.st_mtime);
+    }
+  }
+  return "ccec";
+}
+
+std::string GetCceCacheKey(const std::string &code, const std::string &kernel_name) {
+  std::string masked_code;
+  const std::string symbol_prefix = kernel_name + "_kernel";
+  size_t begin = 0;
+  for (size_t pos = code.find(symbol_prefix); pos != std::string::npos; pos = code.find(symbol_prefix, begin)) {
+    masked_code += code.substr(begin, pos - begin) + CCE_CACHE_MASKED_NAME + "_kernel";
+    begin = pos + symbol_prefix.length();
+  }
+  masked_code += code.substr(begin);
+  return BuildAicoreCompileCmd("<src>", "<dst>") + "\n" + GetCompilerIdentity() + "\n" + masked_code;
+}
+
+std::string GetCceCacheEntry(const std::string &key) {
+  std::stringstream hash;
+  hash << std::hex << std::hash<std::string>()(key);
+  return GetCceCacheDir() + "/" + hash.str();
+}
+
+// Copy the cached object of key to path_target, and return the kernel name it was compiled under,
+// or an empty string if it is not cached
+std::string LoadCceCache(const std::string &key, const std::string &path_target) {
+  std::string entry = GetCceCacheEntry(key);
+  std::string object_file = entry + "/" + CCE_CACHE_OBJECT;
+  std::string name_file = entry + "/" + CCE_CACHE_KERNEL_NAME;
+  if (access(object_file.c_str(), R_OK) != 0 || access(name_file.c_str(), R_OK) != 0) {
+    return "";
+  }
+  // the key is compared in full, a hash collision is a miss
+  if (ReadFile(entry + "/" + CCE_CACHE_KEY) != key) {
+    LOG(INFO) << "cce cache entry " << entry << " holds another kernel";
+    return "";
+  }
+  Copyfile(object_file, path_target);
+  return ReadFile(name_file);
+}
+
+void StoreCceCache(const std::string &key, const std::string &object_file, const std::string &kernel_name) {
+  std::string entry = GetCceCacheEntry(key);
+  if (access(entry.c_str(), F_OK) == 0) {
+    return;
+  }
+  // fill a private directory then rename, so that concurrent builders never read a partial entry
+  std::string tmp_entry = entry + "." + std::to_string(getpid());
+  int ret = mkdir(tmp_entry.c_str(), 0777);
+  CHECK(ret == 0 || errno == EEXIST) << "mkdir " << tmp_entry << " failed";
+  std::vector<std::string> files{CCE_CACHE_OBJECT, CCE_CACHE_KEY, CCE_CACHE_KERNEL_NAME};
+  Copyfile(object_file, tmp_entry + "/" + CCE_CACHE_OBJECT);
+  std::ofstream key_file(tmp_entry + "/" + CCE_CACHE_KEY);
+  CHECK(key_file.is_open());
+  key_file << key;
+  key_file.close();
+  std::ofstream name_file(tmp_entry + "/" + CCE_CACHE_KERNEL_NAME);
+  CHECK(name_file.is_open());
+  name_file << kernel_name;
+  name_file.close();
+  if (rename(tmp_entry.c_str(), entry.c_str()) != 0) {
+    // another builder stored the entry first
+    for (const auto &file : files) {
+      static_cast<void>(std::remove((tmp_entry + "/" + file).c_str()));
+    }
+    static_cast<void>(rmdir(tmp_entry.c_str()));
+  }
+}
+
 /*
  *Function for putting "lib", kernel_name and ".so" together from code,
  *so that ccec can compile cce file.
+ *binary_kernel_name is set to the kernel name in the binary, which differs from the kernel name of code
+ *if the binary is cached from the same code under another name.
  */
-std::string TvmCallbackCceCompile(const std::string &code, const Array<NodeRef> &third_libs) {
+std::string TvmCallbackCceCompile(const std::string &code, const Array<NodeRef> &third_libs,
+                                  std::string *binary_kernel_name = nullptr) {
   const char *runtime_mode = getenv("RUNTIME_MODE");
   if (runtime_mode) {
     std::string rt_mode = runtime_mode;
@@ -1099,7 +1336,23 @@ std::string TvmCallbackCceCompile(const std::string &code, const Array<NodeRef>
     auto ret = std::remove(path_target.c_str());
     CHECK_EQ(ret, 0);
   }
-  std::string ccebin = CompileCce(code, target, path_target, third_libs);
+  // objects linked with third libs depend on more than the code, they are not cached
+  bool use_cache = target == "cce_core" && third_libs.empty() && IsCceCacheEnabled();
+  std::string cache_key = use_cache ? GetCceCacheKey(code, kernel_name) : "";
+  std::string cached_kernel_name = use_cache ? LoadCceCache(cache_key, path_target) : "";
+  std::string ccebin;
+  if (!cached_kernel_name.empty()) {
+    LOG(INFO) << "cce cache hit: " << kernel_name << " is compiled as " << cached_kernel_name;
+    ccebin = BinFile2String(path_target);
+  } else {
+    ccebin = CompileCce(code, target, path_target, third_libs);
+    if (use_cache) {
+      StoreCceCache(cache_key, path_target, kernel_name);
+    }
+  }
+  if (binary_kernel_name != nullptr) {
+    *binary_kernel_name = cached_kernel_name.empty() ? kernel_name : cached_kernel_name;
+  }
   if (chmod(path_target.c_str(), S_IRUSR) == -1) {
     LOG(FATAL) << "modify file to readonly fail!";
   }
@@ -1276,16 +1529,33 @@ air::runtime::Module BuildCCE(const Array<LoweredFunc> &funcs, const Array<NodeR
   std::string fmt = "cce";
   std::string ptx;
 
-  ptx = TvmCallbackCceCompile(code, third_libs);
+  std::string binary_kernel_name;
+  ptx = TvmCallbackCceCompile(code, third_libs, &binary_kernel_name);
   std::string kernel_name = Split(Split(code, "_kernel"), " ", true);
   CcePostprocCcesim(code, block_dim, kernel_name);
   CcePostprocCdiff(code, block_dim, kernel_name);
 
+  auto fmap = air::codegen::ExtractFuncInfo(funcs);
+  bool is_renamed = !binary_kernel_name.empty() && binary_kernel_name != kernel_name;
+  if (is_renamed) {
+    // the functions are registered under their names in the cached binary
+    const std::string symbol_prefix = kernel_name + "_kernel";
+    for (auto &it : fmap) {
+      if (it.second.name.compare(0, symbol_prefix.length(), symbol_prefix) == 0) {
+        it.second.name = binary_kernel_name + it.second.name.substr(kernel_name.length());
+      }
+    }
+  }
+
   if (const PackedFunc *f = Registry::Get("tvm_callback_cce_postproc")) {
-    code = (*f)(code, block_dim).operator std::string();
+    if (is_renamed) {
+      code = (*f)(code, block_dim, binary_kernel_name).operator std::string();
+    } else {
+      code = (*f)(code, block_dim).operator std::string();
+    }
   }
 
-  return air::runtime::CceModuleCreate(ptx, fmt, air::codegen::ExtractFuncInfo(funcs), code);
+  return air::runtime::CceModuleCreate(ptx, fmt, fmap, code);
 }
 
 #ifdef UT_TEST
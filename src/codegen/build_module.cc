@@ -34,6 +34,35 @@
 namespace akg {
 AttrMap global_attrs;
 Array<NodeRef> g_external_call_name;
+// pass timing report of the last Lower call in this thread
+thread_local std::string tl_pass_report;
+
+static void SavePassReport(const PassTimer &pass_timer) {
+  tl_pass_report = pass_timer.ToJson();
+  std::string report_file;
+  if (global_attrs.GetStringAttr(kDumpPassReport, &report_file)) {
+    std::ofstream of(report_file);
+    if (!of.is_open()) {
+      LOG(WARNING) << "Failed to open " << report_file << " to dump pass report.";
+      return;
+    }
+    of << tl_pass_report;
+    of.close();
+  }
+}
+
+/*!
+ * \brief Save the pass report when the scope exits, so that every return path of Lower has its report.
+ */
+class PassReportScope {
+ public:
+  PassReportScope() = default;
+  ~PassReportScope() {
+    PassTimer *pass_timer = PassTimer::GetInstance();
+    LOG(INFO) << *pass_timer;
+    SavePassReport(*pass_timer);
+  }
+};
 
 Tensor CreatePlaceholder(const NodeRef &arg) {
   auto n = air::make_node<PlaceholderOpNode>();
@@ -456,9 +485,16 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
   }
   PassMgr::ClearPassId();
   PassTimer *pass_timer = PassTimer::GetInstance();
+  pass_timer->Clear();
+  PassReportScope save_pass_report;
+  // counting ir nodes walks the whole ir after each pass, so only do it when the report is dumped
+  pass_timer->SetCountNodes(global_attrs.count(kDumpPassReport) > 0);
+  PassMgr::SetSkipIdempotent(global_attrs.GetBoolAttr(kSkipIdempotentPass, false));
   global_attrs.Set(kKernelName, StringImm::make(name));
 
   global_attrs.Set(kDumpPassIr, air::make_const(Int(32), config->dump_pass_ir));
+  // the ir dumps are written asynchronously, make sure the dumps of this kernel are complete when Lower returns
+  IrDumpFlushScope flush_ir_dumps;
   if (config->dump_pass_ir) {
     std::string dump_ir_dir;
     if (global_attrs.GetStringAttr(kDumpIrDir, &dump_ir_dir)) {
@@ -473,6 +509,8 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       global_attrs.Set(kDumpPolyDir, StringImm::make(dump_poly_dir));
     }
     CreateDir(dump_poly_dir);
+    flush_ir_dumps.AddDir(PassMgr::GetDir());
+    flush_ir_dumps.AddDir(dump_poly_dir);
   }
 
   Array<NodeRef> arg_list_0;
@@ -491,7 +529,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
     // Phase 1
     stmt = NEXT_PASS(RewriteForTensorCore, stmt, new_sch, binds_0);
     stmt = NEXT_PASS(StorageFlatten, stmt, binds_0, 64, config->instrument_bound_checkers);
-    stmt = NEXT_PASS(CanonicalSimplify, stmt);
+    stmt = NEXT_PASS(CanonicalSimplify, stmt).idempotent();
 
     // Phase 2
     if (!simple_mode) {
@@ -509,8 +547,8 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
                      config->auto_unroll_max_extent, config->unroll_explicit);
 
     // Phase 3
-    stmt = NEXT_PASS(Simplify, stmt);
-    stmt = NEXT_PASS(RemoveNoOp, stmt);
+    stmt = NEXT_PASS(Simplify, stmt).idempotent();
+    stmt = NEXT_PASS(RemoveNoOp, stmt).idempotent();
     if (config->instrument_bound_checkers) {
       stmt = NEXT_PASS(InstrumentBoundCheckers, stmt);
     }
@@ -696,7 +734,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       }
 
       stmt = NEXT_PASS(LowerWith, stmt);
-      stmt = NEXT_PASS(ForEliminate, stmt);
+      stmt = NEXT_PASS(ForEliminate, stmt).idempotent();
       stmt = NEXT_PASS(RealizeCompress, stmt);
 
       if (!global_attrs.GetBoolAttr(kCoarsenImg2Col, false)) {
@@ -707,7 +745,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       stmt = NEXT_PASS(ModDivEliminate, stmt);
       if (enable_convert_if) {
         stmt = NEXT_PASS(AlignLastAxisLoopExtent, stmt, binds_0);
-        stmt = NEXT_PASS(FixLoopExtent, stmt);
+        stmt = NEXT_PASS(FixLoopExtent, stmt).idempotent();
         stmt = NEXT_PASS(ConvertIfToSelect, stmt);
       }
     }
@@ -722,7 +760,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
     }
     stmt = NEXT_PASS(DmaFlatten, stmt, global_attrs.GetBoolAttr(kTileSizeIsVar, false));
     if (global_attrs.GetBoolAttr(kAlgebraSimplify, false) && is_dynamic) {
-      stmt = NEXT_PASS(AlgebraSimplify, stmt);
+      stmt = NEXT_PASS(AlgebraSimplify, stmt).idempotent();
     }
     if (is_dynamic) {
       stmt = NEXT_PASS(UnifyAllocate, stmt);
@@ -757,14 +795,14 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       stmt = NEXT_PASS(FixMadAttrs, stmt);
     }
     if (!is_dynamic) {
-      stmt = NEXT_PASS(CanonicalSimplify, stmt);
+      stmt = NEXT_PASS(CanonicalSimplify, stmt).idempotent();
     }
-    stmt = NEXT_PASS(ForEliminate, stmt);
+    stmt = NEXT_PASS(ForEliminate, stmt).idempotent();
     if (global_attrs.GetBoolAttr(kAlgebraSimplify, false) && is_dynamic) {
-      stmt = NEXT_PASS(AlgebraSimplify, stmt);
+      stmt = NEXT_PASS(AlgebraSimplify, stmt).idempotent();
     }
     if (!is_dynamic) {
-      stmt = NEXT_PASS(FixLoopExtent, stmt);
+      stmt = NEXT_PASS(FixLoopExtent, stmt).idempotent();
     }
 
     if (target != "aicpu") {
@@ -861,7 +899,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       stmt = NEXT_PASS(LoopPartitionCCE, stmt, config->partition_const_loop, true, !polyhedral);
     }
     if (global_attrs.GetBoolAttr(kEnablePreStorageWriteSimplify, false)) {
-      stmt = NEXT_PASS(AlgebraSimplify, stmt);
+      stmt = NEXT_PASS(AlgebraSimplify, stmt).idempotent();
     }
     std::string maxsat_filename = global_attrs.GetStringAttr(kMaxsatFile, std::string());
     // attempt to optimize UB memory layout to reduce bank conflicts and pipeline conflicts
@@ -888,7 +926,7 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
                      config->auto_unroll_max_extent, config->unroll_explicit);
 
   stmt = NEXT_PASS(SpecialValueReplacer, stmt);
-  stmt = NEXT_PASS(Simplify, stmt);
+  stmt = NEXT_PASS(Simplify, stmt).idempotent();
   if (target != "aicpu") {
     stmt = NEXT_PASS(InjectSync, stmt);
   }
@@ -906,13 +944,13 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
       stmt = NEXT_PASS(PromoteConstExpr, stmt);
     }
   }
-  stmt = NEXT_PASS(Simplify, stmt);
+  stmt = NEXT_PASS(Simplify, stmt).idempotent();
   stmt = NEXT_PASS(LowerStorageAccessInfoCCE, stmt);
   if (is_dynamic) {
     stmt = NEXT_PASS(RewriteFloorDiv, stmt);
     stmt = NEXT_PASS(RemoveAssert, stmt);
   }
-  stmt = NEXT_PASS(RemoveNoOp, stmt);
+  stmt = NEXT_PASS(RemoveNoOp, stmt).idempotent();
   if (is_dynamic) {
     stmt = NEXT_PASS(SpecifyMinMaxDataType, stmt);
   }
@@ -945,9 +983,6 @@ NodeRef Lower(Schedule sch, const Array<NodeRef> &in_args, const Array<NodeRef>
   PassMgr::SetArgs(arg_list_0);
   LoweredFunc lowered_func = NEXT_PASS(MakeAPI, stmt, name, arg_list_0, 0, config->restricted_func);
 
-  LOG(INFO) << *pass_timer;
-  pass_timer->Clear();
-
   return lowered_func;
 }
 
@@ -1151,6 +1186,8 @@ TVM_REGISTER_API("_Lower").set_body([](const TVMArgs &args, TVMRetValue *ret) {
   }
 });
 
+TVM_REGISTER_API("_GetPassReport").set_body_typed<std::string()>([]() { return tl_pass_report; });
+
 TVM_REGISTER_API("akg.build_module.get_binds").set_body([](const TVMArgs &args, TVMRetValue *ret) {
   auto config = BuildConfig::Current();
   Array<NodeRef> inputs;
@@ -0,0 +1,271 @@
+/**
+ * Copyright 2020 Huawei Technologies Co., Ltd
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "codegen/ir_dump.h"
+
+#include <dmlc/logging.h>
+
+#include <limits.h>
+#include <pthread.h>
+#include <stdlib.h>
+
+#include <algorithm>
+#include <cstdlib>
+#include <new>
+#include <vector>
+
+#include "common/util_cce.h"
+
+namespace akg {
+constexpr auto kIrDumpArchive = "ir_dump.txt";
+constexpr auto kIrDumpIndex = "ir_dump.index";
+
+static std::string GetEnv(const char *name) {
+  const char *value = std::getenv(name);
+  return value == nullptr ? "" : std::string(value);
+}
+
+static std::pair<std::string, std::string> SplitPath(const std::string &file_name) {
+  auto pos = file_name.find_last_of('/');
+  if (pos == std::string::npos) {
+    return std::make_pair(std::string("."), file_name);
+  }
+  return std::make_pair(file_name.substr(0, pos), file_name.substr(pos + 1));
+}
+
+// Absolute path of an existing directory, so that the dumps of a directory are matched under any spelling
+static std::string CanonicalDir(const std::string &dir) {
+  char real_path[PATH_MAX] = {0};
+  if (realpath(dir.c_str(), real_path) == nullptr) {
+    return dir;
+  }
+  return std::string(real_path);
+}
+
+// Whether path is one of dirs or under one of them
+static bool IsUnder(const std::string &path, const std::vector<std::string> &dirs) {
+  return std::any_of(dirs.begin(), dirs.end(), [&path](const std::string &dir) {
+    return path.compare(0, dir.size(), dir) == 0 && (path.size() == dir.size() || path[dir.size()] == '/');
+  });
+}
+
+// End of the dumps in an archive, as recorded by the last line of its index
+static size_t ArchiveEnd(const std::string &index_file) {
+  std::ifstream index(index_file);
+  std::string name;
+  size_t offset = 0;
+  size_t size = 0;
+  size_t end = 0;
+  while (index >> name >> offset >> size) {
+    end = offset + size;
+  }
+  return end;
+}
+
+IrDumpWriter::IrDumpWriter() { pthread_atfork(ForkPrepare, ForkParent, ForkChild); }
+
+IrDumpWriter::~IrDumpWriter() {
+  Flush();
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    stop_ = true;
+  }
+  cv_.notify_all();
+  if (worker_.joinable()) {
+    worker_.join();
+  }
+}
+
+IrDumpWriter *IrDumpWriter::GetInstance() {
+  static IrDumpWriter writer;
+  return &writer;
+}
+
+void IrDumpWriter::ForkPrepare() {
+  auto writer = GetInstance();
+  writer->mutex_.lock();
+  writer->archives_mutex_.lock();
+}
+
+void IrDumpWriter::ForkParent() {
+  auto writer = GetInstance();
+  writer->archives_mutex_.unlock();
+  writer->mutex_.unlock();
+}
+
+void IrDumpWriter::ForkChild() {
+  auto writer = GetInstance();
+  // the dumps queued by the parent are written by the parent
+  writer->queue_.clear();
+  writer->busy_.clear();
+  writer->stop_ = false;
+  // the thread of the parent does not exist in the child, leak its handle as it can be neither joined nor destroyed
+  if (writer->worker_.joinable()) {
+    new std::thread(std::move(writer->worker_));
+  }
+  // the archives are written and closed by the parent, leak them so that their buffers are not flushed twice
+  for (auto &archive : writer->archives_) {
+    archive.second.release();
+  }
+  writer->archives_.clear();
+  // the threads of the parent waiting on the condition variables do not exist in the child
+  new (&writer->cv_) std::condition_variable();
+  new (&writer->idle_cv_) std::condition_variable();
+  writer->archives_mutex_.unlock();
+  writer->mutex_.unlock();
+}
+
+bool IrDumpWriter::IsPassSelected(const std::string &pass_name, int pass_id) {
+  std::string selected = GetEnv("DUMP_IR_PASS");
+  if (selected.empty()) {
+    return true;
+  }
+  for (const auto &pass : common::Split(selected, ",")) {
+    if (pass == pass_name || pass == std::to_string(pass_id)) {
+      return true;
+    }
+  }
+  return false;
+}
+
+bool IrDumpWriter::SkipUnchanged() { return std::getenv("DUMP_IR_SKIP_UNCHANGED") != nullptr; }
+
+void IrDumpWriter::Write(const std::string &file_name, std::string content) {
+  auto path = SplitPath(file_name);
+  std::string canonical_name = CanonicalDir(path.first) + "/" + path.second;
+  {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (!worker_.joinable()) {
+      worker_ = std::thread(&IrDumpWriter::Run, this);
+    }
+    queue_.emplace_back(std::move(canonical_name), std::move(content));
+  }
+  cv_.notify_one();
+}
+
+void IrDumpWriter::Flush() {
+  {
+    std::unique_lock<std::mutex> lock(mutex_);
+    idle_cv_.wait(lock, [this] { return queue_.empty() && busy_.empty(); });
+  }
+  CloseArchives(nullptr);
+}
+
+void IrDumpWriter::Flush(const std::vector<std::string> &dirs) {
+  std::vector<std::string> canonical_dirs;
+  for (const auto &dir : dirs) {
+    canonical_dirs.push_back(CanonicalDir(dir));
+  }
+  {
+    std::unique_lock<std::mutex> lock(mutex_);
+    auto is_own_dump = [&canonical_dirs](const std::pair<std::string, std::string> &dump) {
+      return IsUnder(dump.first, canonical_dirs);
+    };
+    idle_cv_.wait(lock, [this, &canonical_dirs, &is_own_dump] {
+      return !IsUnder(busy_, canonical_dirs) && std::none_of(queue_.begin(), queue_.end(), is_own_dump);
+    });
+  }
+  CloseArchives(&canonical_dirs);
+}
+
+void IrDumpWriter::CloseArchives(const std::vector<std::string> *dirs) {
+  std::lock_guard<std::mutex> lock(archives_mutex_);
+  for (auto it = archives_.begin(); it != archives_.end();) {
+    if (dirs != nullptr && !IsUnder(it->first, *dirs)) {
+      ++it;
+      continue;
+    }
+    it->second->data.close();
+    it->second->index.close();
+    Compress(it->first + "/" + kIrDumpArchive, true);
+    it = archives_.erase(it);
+  }
+}
+
+void IrDumpWriter::Run() {
+  std::unique_lock<std::mutex> lock(mutex_);
+  while (true) {
+    cv_.wait(lock, [this] { return stop_ || !queue_.empty(); });
+    if (queue_.empty()) {
+      return;
+    }
+    auto dump = std::move(queue_.front());
+    queue_.pop_front();
+    busy_ = dump.first;
+    lock.unlock();
+    if (std::getenv("DUMP_IR_ARCHIVE") != nullptr) {
+      WriteArchive(dump.first, dump.second);
+    } else {
+      WriteFile(dump.first, dump.second);
+    }
+    lock.lock();
+    busy_.clear();
+    // Flush of a directory waits for its own dumps only
+    idle_cv_.notify_all();
+  }
+}
+
+void IrDumpWriter::WriteFile(const std::string &file_name, const std::string &content) {
+  std::ofstream of(file_name);
+  if (!of.is_open()) {
+    LOG(WARNING) << "Failed to open " << file_name << " to dump ir.";
+    return;
+  }
+  of << content;
+  of.close();
+  Compress(file_name);
+}
+
+void IrDumpWriter::WriteArchive(const std::string &file_name, const std::string &content) {
+  auto path = SplitPath(file_name);
+  std::lock_guard<std::mutex> lock(archives_mutex_);
+  auto &archive = archives_[path.first];
+  if (archive == nullptr) {
+    // an archive flushed before is reopened by a later kernel dumping to the same directory, so append to it
+    archive.reset(new Archive());
+    archive->offset = ArchiveEnd(path.first + "/" + kIrDumpIndex);
+    archive->data.open(path.first + "/" + kIrDumpArchive, std::ios::out | std::ios::app);
+    archive->index.open(path.first + "/" + kIrDumpIndex, std::ios::out | std::ios::app);
+  }
+  if (!archive->data.is_open() || !archive->index.is_open()) {
+    LOG(WARNING) << "Failed to open the ir dump archive in " << path.first;
+    return;
+  }
+  archive->data << content;
+  archive->index << path.second << " " << archive->offset << " " << content.size() << "\n";
+  archive->offset += content.size();
+}
+
+void IrDumpWriter::Compress(const std::string &file_name, bool append) {
+  std::string compress = GetEnv("DUMP_IR_COMPRESS");
+  std::string cmd;
+  if (compress == "gzip") {
+    cmd = append ? "gzip -c '" + file_name + "' >> '" + file_name + ".gz' && rm -f '" + file_name + "'"
+                 : "gzip -f '" + file_name + "'";
+  } else if (compress == "zstd") {
+    cmd = append ? "zstd -q -c '" + file_name + "' >> '" + file_name + ".zst' && rm -f '" + file_name + "'"
+                 : "zstd -q -f --rm '" + file_name + "'";
+  } else {
+    if (!compress.empty()) {
+      LOG(WARNING) << "Unsupported DUMP_IR_COMPRESS " << compress << ", expect gzip or zstd";
+    }
+    return;
+  }
+  if (std::system(cmd.c_str()) != 0) {
+    LOG(WARNING) << "Failed to compress ir dump: " << cmd;
+  }
+}
+}  // namespace akg
@@ -0,0 +1,112 @@
+/**
+ * Copyright 2020 Huawei Technologies Co., Ltd
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#ifndef CODEGEN_IR_DUMP_H_
+#define CODEGEN_IR_DUMP_H_
+#include <condition_variable>
+#include <deque>
+#include <fstream>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+namespace akg {
+/*!
+ * \brief Writer of the ir dumps of passes (dump_pass_ir).
+ *
+ * The dumps are written by a background thread, so that the compilation does not wait for the disk.
+ * It is configured by environment variables:
+ *   DUMP_IR_PASS: comma separated pass names or pass ids, only the dumps of these passes are written.
+ *   DUMP_IR_SKIP_UNCHANGED: if set, a dump is not written if the ir is unchanged since the previous dump.
+ *   DUMP_IR_ARCHIVE: if set, the dumps of a directory are appended to a single archive ir_dump.txt in it,
+ *                    and every dump is indexed by a line "<name> <offset> <size>" in ir_dump.index.
+ *   DUMP_IR_COMPRESS: gzip or zstd, the dump files or the archives are compressed by the command line tool,
+ *                     an archive flushed more than once is a concatenation of compressed streams.
+ */
+class IrDumpWriter {
+ public:
+  ~IrDumpWriter();
+
+  static IrDumpWriter *GetInstance();
+
+  // Whether the dump of a pass is selected by DUMP_IR_PASS
+  static bool IsPassSelected(const std::string &pass_name, int pass_id);
+  // Whether the dumps of unchanged ir are skipped
+  static bool SkipUnchanged();
+
+  // Write the content of a dump to file_name, the directory must exist
+  void Write(const std::string &file_name, std::string content);
+  // Wait until all dumps are written, then close and compress the archives
+  void Flush();
+  // Wait until the dumps under dirs are written, then close and compress the archives under dirs
+  void Flush(const std::vector<std::string> &dirs);
+
+ private:
+  struct Archive {
+    std::ofstream data;
+    std::ofstream index;
+    size_t offset{0};
+  };
+
+  IrDumpWriter();
+  // pthread_atfork handlers, the child of a fork has no worker thread, so it drops the state of the parent
+  static void ForkPrepare();
+  static void ForkParent();
+  static void ForkChild();
+  void Run();
+  void WriteFile(const std::string &file_name, const std::string &content);
+  void WriteArchive(const std::string &file_name, const std::string &content);
+  void CloseArchives(const std::vector<std::string> *dirs);
+  void Compress(const std::string &file_name, bool append = false);
+
+  std::mutex mutex_;
+  std::condition_variable cv_;
+  std::condition_variable idle_cv_;
+  std::deque<std::pair<std::string, std::string>> queue_;
+  // file name of the dump being written by the worker, empty if the worker is idle
+  std::string busy_;
+  bool stop_{false};
+  std::thread worker_;
+  // archives of directories, guarded by archives_mutex_ as Flush of one directory runs while others are written
+  std::mutex archives_mutex_;
+  std::unordered_map<std::string, std::unique_ptr<Archive>> archives_;
+};
+
+/*!
+ * \brief Flush the ir dumps under dirs when the scope exits, so that the dumps of a kernel are complete after it is
+ * built, while the dumps of kernels built by other threads are left open.
+ */
+class IrDumpFlushScope {
+ public:
+  IrDumpFlushScope() = default;
+  ~IrDumpFlushScope() {
+    if (!dirs_.empty()) {
+      IrDumpWriter::GetInstance()->Flush(dirs_);
+    }
+  }
+
+  void AddDir(const std::string &dir) { dirs_.push_back(dir); }
+
+ private:
+  std::vector<std::string> dirs_;
+};
+}  // namespace akg
+
+#endif  // CODEGEN_IR_DUMP_H_
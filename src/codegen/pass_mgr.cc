@@ -16,8 +16,8 @@
 
 #include "codegen/pass_mgr.h"
 
+#include <sstream>
 #include <unordered_set>
-#include <chrono>
 
 #include "common/util_cce.h"
 
@@ -31,21 +31,51 @@ TVMRetValue PassMgr::Run() const {
   const auto *packed_func = air::runtime::Registry::Get(pass_name_);
   CHECK(packed_func != nullptr) << "PackedFunc " << pass_name_ << " not found";
 
+  TVMArgs args(args_values_.data(), args_types_.data(), args_values_.size() - 1);
+  NodeRef input;
+  if (args.size() > 0 && args[0].type_code() == kObjectHandle) {
+    input = args[0].operator NodeRef();
+  }
+
   TVMRetValue res;
+  // an idempotent pass does not change its own output, so running it again is a no-op
+  if (idempotent_ && tl_skip_idempotent_ && input.defined()) {
+    auto iter = tl_last_outputs_.find(sub_name_);
+    if (iter != tl_last_outputs_.end() && iter->second.same_as(input)) {
+      res = args[0];
+      if (enable_timer_) {
+        PassTimer::GetInstance()->AddSkipped(sub_name_);
+      }
+      tl_pass_id_++;
+      return res;
+    }
+  }
 
-  auto start_time = std::chrono::steady_clock::now();
-  packed_func->CallPacked(TVMArgs(args_values_.data(), args_types_.data(), args_values_.size() - 1), &res);
+  int64_t start_us = PassTimer::NowUs();
+  packed_func->CallPacked(args, &res);
   CHECK(res.type_code() != kNull) << "PassMgr " << tl_pass_id_ << "_" << sub_name_ << " result illegal.";
 
+  NodeRef output;
+  if (res.type_code() == kObjectHandle) {
+    output = res.operator NodeRef();
+  }
+  if (idempotent_ && output.defined()) {
+    tl_last_outputs_[sub_name_] = output;
+  }
+
   if (enable_timer_) {
-    auto end_time = std::chrono::steady_clock::now();
-    int64_t elapsed = std::chrono::duration_cast<std::chrono::seconds>(end_time - start_time).count();
+    int64_t elapsed_us = PassTimer::NowUs() - start_us;
     PassTimer *pass_timer = PassTimer::GetInstance();
-    if (pass_timer == nullptr) {
-      LOG(INFO) << "Failed to initialize PassTimer.";
-    } else {
-      pass_timer->AddItem(sub_name_, elapsed);
+    int64_t node_count = -1;
+    if (pass_timer->GetCountNodes() && res.IsObjectRef<Stmt>()) {
+      node_count = CountIrNodes(res.AsObjectRef<Stmt>());
+    }
+    // passes return their input as it is when they do not change it, so identity is enough to detect a no-op
+    int changed = kPassChangeUnknown;
+    if (input.defined() && output.defined()) {
+      changed = output.same_as(input) ? kPassUnchanged : kPassChanged;
     }
+    pass_timer->AddItem(sub_name_, start_us, elapsed_us, node_count, changed);
   }
 
   tl_pass_id_++;
@@ -62,12 +92,18 @@ std::string PassMgr::GetDumpIrFilePath() const {
 }
 
 void PassMgr::DumpIr(std::function<void(std::ostream &os)> print) const {
-  auto file_name = GetDumpIrFilePath().append(".cc");
-  std::ofstream of(file_name);
-  CHECK(of.is_open()) << "Failed to open " << file_name << " to dump ir.";
+  std::ostringstream os;
+  print(os);
+  std::string content = os.str();
 
-  print(of);
-  of.close();
+  if (IrDumpWriter::SkipUnchanged()) {
+    size_t hash = std::hash<std::string>()(content);
+    if (hash == tl_last_dump_hash_) {
+      return;
+    }
+    tl_last_dump_hash_ = hash;
+  }
+  IrDumpWriter::GetInstance()->Write(GetDumpIrFilePath().append(".cc"), std::move(content));
 }
 
 static std::unordered_set<std::string> VectorToSet(const std::vector<std::string> &list) {
@@ -100,4 +136,7 @@ thread_local int PassMgr::tl_pass_id_ = -1;
 thread_local air::BuildConfig PassMgr::tl_config_ = air::BuildConfig::Current();
 thread_local std::string PassMgr::tl_dump_ir_dir_ = "ir/";
 thread_local air::Array<NodeRef> PassMgr::tl_args_;
+thread_local size_t PassMgr::tl_last_dump_hash_ = 0;
+thread_local bool PassMgr::tl_skip_idempotent_ = false;
+thread_local std::unordered_map<std::string, NodeRef> PassMgr::tl_last_outputs_;
 }  // namespace akg
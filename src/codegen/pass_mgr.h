@@ -25,8 +25,10 @@
 #include <memory>
 #include <string>
 #include <tuple>
+#include <unordered_map>
 #include <utility>
 #include <vector>
+#include "codegen/ir_dump.h"
 #include "codegen/util.h"
 
 namespace akg {
@@ -74,11 +76,17 @@ class PassMgr {
     return *this;
   }
 
+  // Mark the pass as idempotent, it may be skipped if its input is its own last output, see SetSkipIdempotent
+  PassMgr &idempotent() {
+    idempotent_ = true;
+    return *this;
+  }
+
   template <typename T>
   operator T() const {
     auto res = Run().operator T();
 
-    if (tl_config_->dump_pass_ir) {
+    if (tl_config_->dump_pass_ir && IrDumpWriter::IsPassSelected(sub_name_, tl_pass_id_)) {
       DumpIr(std::bind(DumpRealContent<T>, res, std::placeholders::_1));
     }
     TryDumpC(res);
@@ -87,6 +95,11 @@ class PassMgr {
 
   static void ClearPassId() {
     tl_pass_id_ = -1;
+    tl_last_dump_hash_ = 0;
+    tl_last_outputs_.clear();
+  }
+  static void SetSkipIdempotent(bool skip) {
+    tl_skip_idempotent_ = skip;
   }
   static std::string &GetDir() {
     return tl_dump_ir_dir_;
@@ -109,6 +122,11 @@ class PassMgr {
   thread_local static air::BuildConfig tl_config_;
   thread_local static std::string tl_dump_ir_dir_;
   thread_local static air::Array<NodeRef> tl_args_;
+  // hash of the last dumped ir, to skip the dumps of unchanged ir
+  thread_local static size_t tl_last_dump_hash_;
+  thread_local static bool tl_skip_idempotent_;
+  // last output of the idempotent passes
+  thread_local static std::unordered_map<std::string, NodeRef> tl_last_outputs_;
 
   std::string pass_name_;
   std::string sub_name_;
@@ -116,6 +134,7 @@ class PassMgr {
   std::vector<int> args_types_;
 
   bool enable_timer_ = false;
+  bool idempotent_ = false;
 
   template <typename T>
   void TryDumpC(const T &node) const {
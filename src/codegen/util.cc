@@ -18,9 +18,11 @@
 #include <sys/stat.h>
 #include <sys/types.h>
 #include <libgen.h>
+#include <tvm/ir_visitor.h>
 
 #include <fstream>
 #include <iostream>
+#include <sstream>
 
 #include "pass/utils.h"
 
@@ -133,13 +135,39 @@ std::string AttrMap::GetStringAttr(const std::string &attr_name, const std::stri
   return dft_value;
 }
 
-void PassTimer::AddItem(const std::string &pass_name, int64_t elapsed_seconds) {
+PassTimeRecord &PassTimer::GetRecord(const std::string &pass_name) {
   auto iter = pass_time_.find(pass_name);
-  if (iter != pass_time_.end()) {
-    iter->second += elapsed_seconds;
-  } else {
-    pass_time_[pass_name] = elapsed_seconds;
+  if (iter == pass_time_.end()) {
+    pass_order_.push_back(pass_name);
+    iter = pass_time_.emplace(pass_name, PassTimeRecord()).first;
   }
+  return iter->second;
+}
+
+void PassTimer::AddItem(const std::string &pass_name, int64_t start_us, int64_t elapsed_us, int64_t node_count,
+                        int changed) {
+  PassTimeRecord &record = GetRecord(pass_name);
+  record.count++;
+  record.total_us += elapsed_us;
+  record.max_us = std::max(record.max_us, elapsed_us);
+  if (node_count >= 0) {
+    record.node_count = node_count;
+  }
+  if (changed == kPassChanged) {
+    record.changed++;
+  } else if (changed == kPassUnchanged) {
+    record.unchanged++;
+  }
+  events_.push_back(PassTimeEvent{pass_name, start_us - base_us_, elapsed_us, changed});
+}
+
+void PassTimer::AddSkipped(const std::string &pass_name) { GetRecord(pass_name).skipped++; }
+
+void PassTimer::Clear() {
+  pass_time_.clear();
+  pass_order_.clear();
+  events_.clear();
+  base_us_ = NowUs();
 }
 
 std::string PassTimer::ToString() const {
@@ -151,7 +179,7 @@ std::string PassTimer::ToString() const {
 
   std::vector<std::pair<std::string, int64_t>> timers;
   for (auto iter = pass_time_.begin(); iter != pass_time_.end(); ++iter) {
-    timers.push_back(*iter);
+    timers.emplace_back(iter->first, iter->second.total_us);
   }
   sort(timers.begin(), timers.end(),
        [](const std::pair<std::string, int64_t> t1, const std::pair<std::string, int64_t> t2) {
@@ -162,11 +190,41 @@ std::string PassTimer::ToString() const {
   }
 
   for (auto iter : timers) {
-    buf << "\n" << iter.first << " - " << iter.second << " s";
+    buf << "\n" << iter.first << " - " << static_cast<double>(iter.second) / kUsPerMs << " ms";
+  }
+  return buf.str();
+}
+
+std::string PassTimer::ToJson() const {
+  std::stringstream buf;
+  buf << "{\"passes\": [";
+  for (size_t i = 0; i < pass_order_.size(); ++i) {
+    const PassTimeRecord &record = pass_time_.at(pass_order_[i]);
+    buf << (i == 0 ? "" : ", ") << "{\"name\": \"" << pass_order_[i] << "\", \"count\": " << record.count
+        << ", \"total_us\": " << record.total_us << ", \"max_us\": " << record.max_us
+        << ", \"node_count\": " << record.node_count << ", \"changed\": " << record.changed
+        << ", \"unchanged\": " << record.unchanged << ", \"skipped\": " << record.skipped << "}";
+  }
+  buf << "], \"traceEvents\": [";
+  for (size_t i = 0; i < events_.size(); ++i) {
+    buf << (i == 0 ? "" : ", ") << "{\"name\": \"" << events_[i].pass_name
+        << "\", \"ph\": \"X\", \"pid\": 0, \"tid\": 0, \"ts\": " << events_[i].start_us
+        << ", \"dur\": " << events_[i].elapsed_us;
+    if (events_[i].changed != kPassChangeUnknown) {
+      buf << ", \"args\": {\"changed\": " << (events_[i].changed == kPassChanged ? "true" : "false") << "}";
+    }
+    buf << "}";
   }
+  buf << "]}";
   return buf.str();
 }
 
+int64_t CountIrNodes(const NodeRef &node) {
+  int64_t count = 0;
+  air::ir::PostOrderVisit(node, [&count](const NodeRef &) { count++; });
+  return count;
+}
+
 std::ostream &operator<<(std::ostream &os, const PassTimer &time) {
   os << time.ToString();
   return os;
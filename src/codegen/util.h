@@ -19,6 +19,7 @@
 #include <dlpack/dlpack.h>
 #include <stdlib.h>
 #include <algorithm>
+#include <chrono>
 #include <string>
 #include <unordered_map>
 #include <utility>
@@ -79,6 +80,7 @@ constexpr auto kEnableFeatureLibrary = "enable_feature_library";
 constexpr auto kEnableFeatureLibraryPrePoly = "enable_feature_library_pre_poly";
 constexpr auto kEnableHoistCondWrite = "enable_hoist_cond_write";
 constexpr double kUsPerSecond = 1e6;
+constexpr double kUsPerMs = 1e3;
 constexpr size_t kMaxNumOfPassTimeToPrint = 5;
 constexpr auto kIsDynamic = "is_dynamic";
 constexpr auto kEnableConvAnalyzeAlign = "enable_conv_analyze_align";
@@ -96,6 +98,8 @@ constexpr auto kUBRatio = "ub_ratio";
 constexpr auto kErrorInfo = "";
 constexpr auto kErrorScope = "";
 constexpr auto kAllocBits = "alloc_bits";
+constexpr auto kDumpPassReport = "dump_pass_report";
+constexpr auto kSkipIdempotentPass = "skip_idempotent_pass";
 
 static std::unordered_map<std::string, int> help_tiling_level = {
   {"None", 0},
@@ -119,25 +123,88 @@ class AttrMap : public Map<std::string, NodeRef> {
   std::string GetStringAttr(const std::string &attr_name, const std::string &dft_value);
 };
 
+struct PassTimeRecord {
+  int64_t count{0};
+  int64_t total_us{0};
+  int64_t max_us{0};
+  // node count of the IR returned by the last call, -1 if not counted
+  int64_t node_count{-1};
+  // calls which returned a different IR from their input, and calls which returned their input as it is
+  int64_t changed{0};
+  int64_t unchanged{0};
+  // calls skipped because the pass is idempotent and its input is its own last output
+  int64_t skipped{0};
+};
+
+// whether a pass call changed the IR, kPassChangeUnknown if the input or output is not IR
+constexpr int kPassChangeUnknown = -1;
+constexpr int kPassUnchanged = 0;
+constexpr int kPassChanged = 1;
+
+struct PassTimeEvent {
+  std::string pass_name;
+  int64_t start_us;
+  int64_t elapsed_us;
+  int changed;
+};
+
+/*!
+ * \brief Timing of the passes of one Lower call, in microseconds.
+ *
+ * Records are kept per thread, so concurrent lowering in different threads does not mix up.
+ * The json report holds the aggregated records in "passes" and every call in "traceEvents",
+ * so it can be loaded by chrome://tracing as it is.
+ */
 class PassTimer {
  public:
   ~PassTimer() = default;
 
-  void AddItem(const std::string &pass_name, int64_t elapsed_seconds);
-  void Clear() { pass_time_.clear(); }
+  void AddItem(const std::string &pass_name, int64_t start_us, int64_t elapsed_us, int64_t node_count = -1,
+               int changed = kPassChangeUnknown);
+  void AddSkipped(const std::string &pass_name);
+  void Clear();
   std::string ToString() const;
+  std::string ToJson() const;
+  void SetCountNodes(bool count_nodes) { count_nodes_ = count_nodes; }
+  bool GetCountNodes() const { return count_nodes_; }
+
+  static int64_t NowUs() {
+    return std::chrono::duration_cast<std::chrono::microseconds>(std::chrono::steady_clock::now().time_since_epoch())
+      .count();
+  }
 
   static PassTimer *GetInstance() {
-    static PassTimer pass_timer;
+    thread_local PassTimer pass_timer;
     return &pass_timer;
   }
 
  private:
   PassTimer() { Clear(); }
+  PassTimeRecord &GetRecord(const std::string &pass_name);
+
+  std::unordered_map<std::string, PassTimeRecord> pass_time_;
+  // pass names in order of first call
+  std::vector<std::string> pass_order_;
+  std::vector<PassTimeEvent> events_;
+  int64_t base_us_{0};
+  bool count_nodes_{false};
+};
+
+/*!
+ * \brief Scoped timer which adds its lifetime to PassTimer.
+ */
+class PassTimerScope {
+ public:
+  explicit PassTimerScope(const std::string &pass_name) : pass_name_(pass_name), start_us_(PassTimer::NowUs()) {}
+  ~PassTimerScope() { PassTimer::GetInstance()->AddItem(pass_name_, start_us_, PassTimer::NowUs() - start_us_); }
 
-  std::unordered_map<std::string, int64_t> pass_time_;
+ private:
+  std::string pass_name_;
+  int64_t start_us_;
 };
 
+int64_t CountIrNodes(const NodeRef &node);
+
 std::ostream &operator<<(std::ostream &os, const PassTimer &time);
 
 std::string DumpC(const Stmt &stmt, const Array<Buffer> &extern_buffer);
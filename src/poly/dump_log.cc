@@ -23,6 +23,7 @@
 #include <iostream>
 #include <iomanip>
 
+#include "codegen/ir_dump.h"
 #include "poly/poly_util.h"
 #include "poly/dma_inject.h"
 
@@ -483,7 +484,19 @@ void ScopInfo::DumpSchTree(const std::string &file_name, const isl::schedule &sc
                   << std::string(cube_info_.IsSpecGemm() ? "_specgemm" : "");
   if (user_config_.GetDumpPassIr()) {
 #if DUMP_IR
-    DumpSchTreeImpl(CreateDumpDir(final_file_name.str()), sch_dump);
+    if (IrDumpWriter::IsPassSelected(file_name, dump_schtree_count)) {
+#if PRETTY_PRINT_IR
+      std::string content = PrettyPrintSchTree(sch_dump);
+#else
+      std::string content = DumpSchTreeToString(sch_dump);
+#endif
+      size_t hash = std::hash<std::string>()(content);
+      if (!IrDumpWriter::SkipUnchanged() || hash != last_dump_schtree_hash_) {
+        last_dump_schtree_hash_ = hash;
+        IrDumpWriter::GetInstance()->Write(FilePathCanonicalize(CreateDumpDir(final_file_name.str()), false),
+                                           std::move(content));
+      }
+    }
     dump_schtree_count++;
 #endif
 
@@ -15,6 +15,7 @@
  */
 
 #include "poly/scop.h"
+#include "codegen/util.h"
 namespace akg {
 namespace ir {
 /*!
@@ -38,20 +39,32 @@ class Poly {
     scop_->ParseUserConfig(attrs, extern_buffer, is_spec_gemm, is_tuning, is_dynamic);
 
     std::chrono::high_resolution_clock::time_point timer_start;
+    std::string spec_gemm = is_spec_gemm ? "_specgemm" : "";
     // generate isl schedule from Halide
     TIMER_START;
-    isl::schedule sch = scop_->GenIsl();
-    TIMER_SHOW("GenIsl", std::string(is_spec_gemm ? "_specgemm" : ""));
+    isl::schedule sch;
+    {
+      PassTimerScope pass_timer_scope("poly.GenIsl" + spec_gemm);
+      sch = scop_->GenIsl();
+    }
+    TIMER_SHOW("GenIsl", spec_gemm);
 
     // isl schedule transform
     TIMER_START;
-    isl::schedule sched = scop_->Transform(sch);
-    TIMER_SHOW("Transform", std::string(is_spec_gemm ? "_specgemm" : ""));
+    isl::schedule sched;
+    {
+      PassTimerScope pass_timer_scope("poly.Transform" + spec_gemm);
+      sched = scop_->Transform(sch);
+    }
+    TIMER_SHOW("Transform", spec_gemm);
 
     // generate Halide from isl schedule
     TIMER_START;
-    stmt_ = scop_->GenHalide(sched);
-    TIMER_SHOW("GenHalide", std::string(is_spec_gemm ? "_specgemm" : ""));
+    {
+      PassTimerScope pass_timer_scope("poly.GenHalide" + spec_gemm);
+      stmt_ = scop_->GenHalide(sched);
+    }
+    TIMER_SHOW("GenHalide", spec_gemm);
 
     if (is_dynamic) stmt_ = RestoreCombinedParams(stmt_, scop_->info_);
 
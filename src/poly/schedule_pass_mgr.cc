@@ -16,6 +16,8 @@
 
 #include "poly/schedule_pass_mgr.h"
 
+#include "codegen/util.h"
+
 namespace akg {
 namespace ir {
 namespace poly {
@@ -44,7 +46,10 @@ isl::schedule SchedulePassMgr::Run(const isl::schedule &sch, const std::vector<s
   for (auto &pass : passes) {
     std::stringstream time_log;
     TIMER_START;
-    final_sch = pass->Run(final_sch);
+    {
+      PassTimerScope pass_timer_scope("poly." + pass->GetPassName());
+      final_sch = pass->Run(final_sch);
+    }
     time_log << "[ Polyhedral exec time" << (scop_info_.cube_info_.IsSpecGemm() ? "_specgemm" : "") << " ], "
              << pass->GetPassName() << " spent " << TIMER_DURATION << " ms";
 
@@ -118,6 +118,7 @@ class UserConfig {
     ParseBoolAttr(attrs, "dynamic_shape_conv_full_parametric", &dynamic_shape_conv_full_parametric_);
 
     ParseIntAttr(attrs, "dump_tuning_level", &dump_tuning_level_);
+    ParseBoolAttr(attrs, "lazy_tiling_space", &lazy_tiling_space_);
     ParseBoolAttr(attrs, "dump_pass_ir", &dump_pass_ir_);
     ParseStringAttr(attrs, "dump_poly_dir", &dump_poly_dir_);
 
@@ -183,6 +184,7 @@ class UserConfig {
 
   // getter for dump config
   int GetDumpTuningLevel() const { return dump_tuning_level_; }
+  bool GetLazyTilingSpace() const { return lazy_tiling_space_; }
   bool GetDumpPassIr() const { return dump_pass_ir_; }
   std::string GetDumpPolyDir() { return dump_poly_dir_; }
 
@@ -351,6 +353,8 @@ class UserConfig {
 
   // dump config
   int dump_tuning_level_{0};
+  // export candidates of each band instead of their combination
+  bool lazy_tiling_space_{false};
   bool dump_pass_ir_{false};
   std::string dump_poly_dir_;
 };
@@ -614,6 +618,8 @@ class ScopInfo {
 
   // dump tools
   int dump_schtree_count = 0;
+  // hash of the last dumped schedule tree, to skip the dumps of unchanged schedule trees
+  size_t last_dump_schtree_hash_ = 0;
   void DumpSchTree(const std::string &file_name, const isl::schedule &sch);
   bool DumpScopData(const std::string &file_name);
   void DumpScopDataAdvanced(std::ofstream &of);
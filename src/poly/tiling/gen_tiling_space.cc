@@ -27,8 +27,8 @@ namespace ir {
 namespace poly {
 class TileSpaceCollector {
  public:
-  TileSpaceCollector(TilingAnalyzer &analyzer, const int level)
-      : space_(make_node<air::TileSpaceNode>()), analyzer_(analyzer), cand_(&analyzer), level_(level) {
+  TileSpaceCollector(TilingAnalyzer &analyzer, const int level, const bool lazy)
+      : space_(make_node<air::TileSpaceNode>()), analyzer_(analyzer), cand_(&analyzer), level_(level), lazy_(lazy) {
     air::runtime::NDArray init_array = air::runtime::NDArray::Empty({}, type, ctx);
     space_->index_table = init_array;
     space_->l1_tile_range_table = init_array;
@@ -36,6 +36,8 @@ class TileSpaceCollector {
     space_->l1_tile_mod_table = init_array;
     space_->l0_tile_mod_table = init_array;
     space_->tiling_candidate = init_array;
+    space_->band_candidate = init_array;
+    space_->band_table = init_array;
   }
   ~TileSpaceCollector() = default;
 
@@ -54,7 +56,18 @@ class TileSpaceCollector {
       }
     }
 
-    if (band_size == 1) {  // fast path
+    if (lazy_ && level_ >= DUMP_LEVEL_CANDIDATE) {
+      // leave the combination of bands to the user, which draws candidates without materializing the space.
+      int tile_size = 0;
+      for (auto &band_result : result_) {
+        if (band_result.empty()) continue;
+        tile_size += static_cast<int>(band_result[0].tile.size());
+      }
+      if (band_size == 1) tile_size = analyzer_.GetNumOfAxisInBand(0);
+      CollectConstraint(tile_size, band_size);
+      CollectBandCandidate();
+      FreeResult();
+    } else if (band_size == 1) {  // fast path
       int tile_size = analyzer_.GetNumOfAxisInBand(0);
       CollectConstraint(tile_size, band_size);
       if (level_ >= DUMP_LEVEL_CANDIDATE) {
@@ -158,6 +171,33 @@ class TileSpaceCollector {
     }
   }
 
+  void CollectBandCandidate() {
+    int64_t total = 0;
+    for (auto &band_result : result_) {
+      if (band_result.empty()) continue;
+      total += static_cast<int64_t>(band_result.size() * band_result[0].tile.size());
+    }
+    space_->band_candidate = air::runtime::NDArray::Empty({total}, type, ctx);
+    space_->band_table = air::runtime::NDArray::Empty({static_cast<int64_t>(result_.size()), 3}, type, ctx);
+    space_->shared_size = result_.size() > 1 ? static_cast<int64_t>(is_shared_.size()) : 0;
+    auto candDlPack = space_->band_candidate.ToDLPack();
+    auto tableDlPack = space_->band_table.ToDLPack();
+    auto cand_ptr = reinterpret_cast<int *>(candDlPack->dl_tensor.data);
+    auto table_ptr = reinterpret_cast<int *>(tableDlPack->dl_tensor.data);
+    int offset = 0;
+    for (auto &band_result : result_) {
+      int tile_size = band_result.empty() ? 0 : static_cast<int>(band_result[0].tile.size());
+      *table_ptr++ = offset;
+      *table_ptr++ = static_cast<int>(band_result.size());
+      *table_ptr++ = tile_size;
+      for (auto &res : band_result) {
+        for (int tile : res.tile) cand_ptr[offset++] = tile;
+      }
+    }
+    delete candDlPack;
+    delete tableDlPack;
+  }
+
  private:
   NodePtr<air::TileSpaceNode> space_;
 
@@ -309,6 +349,7 @@ class TileSpaceCollector {
   TilingAnalyzer &analyzer_;
   TileCandidate cand_;
   int level_{0};
+  bool lazy_{false};
   int64_t mem_limit_[MEM_SCOPE_BULK]{0};
   DLDataType type = {kDLInt, 32, 1};
   DLContext ctx = {kDLCPU, 0};
@@ -331,7 +372,7 @@ NodeRef GenerateTilingSpace(const isl::schedule &sch, ScopInfo &scop_info, Stmt
   bool need_tiling = analyzer.Prepare();
 
   if (!analyzer.logger_.DumpLogFile()) LOG(WARNING) << "Write tiling log fail.";
-  TileSpaceCollector collector(analyzer, dump_level);
+  TileSpaceCollector collector(analyzer, dump_level, scop_info.user_config_.GetLazyTilingSpace());
   if (need_tiling) collector.Collect();
   return collector.GetSpace();
 }
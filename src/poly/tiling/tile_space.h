@@ -28,6 +28,11 @@ class TileSpaceNode : public Node {
   air::runtime::NDArray l1_tile_mod_table;
   air::runtime::NDArray l0_tile_mod_table;
   air::runtime::NDArray tiling_candidate;
+  // lazy tiling space: candidates of all bands flattened, and (offset, candidate number, tile size) of each band.
+  // Tiling candidates are the combinations of band candidates which agree on the first shared_size tiles.
+  air::runtime::NDArray band_candidate;
+  air::runtime::NDArray band_table;
+  int64_t shared_size{0};
 
   void VisitAttrs(AttrVisitor *v) {
     v->Visit("index_table", &index_table);
@@ -36,6 +41,9 @@ class TileSpaceNode : public Node {
     v->Visit("l1_tile_mod_table", &l1_tile_mod_table);
     v->Visit("l0_tile_mod_table", &l0_tile_mod_table);
     v->Visit("tiling_candidate", &tiling_candidate);
+    v->Visit("band_candidate", &band_candidate);
+    v->Visit("band_table", &band_table);
+    v->Visit("shared_size", &shared_size);
   }
   static constexpr const char *_type_key = "TileSpace";
   TVM_DECLARE_NODE_TYPE_INFO(TileSpaceNode, Node);
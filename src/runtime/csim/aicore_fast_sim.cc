@@ -16,40 +16,317 @@
 
 #include "aicore_fast_sim.h"
 
+#include <atomic>
+#include <mutex>
+#include <thread>
+#include <vector>
+
 #define UB_BLOCK_SIZE 32
 #define L0_BLOCK_SIZE 512
 #define UB_BLOCK_SIZE_BYTES (UB_BLOCK_SIZE * sizeof(uint8_t))
 #define L0_BLOCK_SIZE_BYTES (L0_BLOCK_SIZE * sizeof(uint8_t))
 
+// The state of a simulated core is thread local, so that the blocks of a multi-core kernel can run on
+// concurrent threads. The local buffers (UB, L1, L0) are allocated by every block.
 #define NUM_VA_REGS 8
 #define NUM_VA_BLOCKS 8
-static uint64_t va_reg[NUM_VA_REGS][NUM_VA_BLOCKS] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {0};
+static thread_local uint64_t va_reg[NUM_VA_REGS][NUM_VA_BLOCKS] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {0};
 
 #define BYTES_PER_REPEAT (256 * sizeof(uint8_t))
 #define NUM_BLOCKS_PER_REPEAT 8
 
 #define MAX_ELEM_PER_REPEAT 128
-static bool vector_mask[MAX_ELEM_PER_REPEAT] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {false};
+static thread_local bool vector_mask[MAX_ELEM_PER_REPEAT] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {false};
+// precomputed from vector_mask: the active lanes in order, and the number of leading active lanes
+static thread_local int vector_mask_lanes[MAX_ELEM_PER_REPEAT] = {0};
+static thread_local int vector_mask_num_lanes = 0;
+static thread_local int vector_mask_prefix = 0;
 
-static half g_deqscale = half(1.0f);
+static thread_local half g_deqscale = half(1.0f);
 
-static uint64_t g_padding = 0;
+static thread_local uint64_t g_padding = 0;
 
-static uint64_t g_l1_3d_size = 0;
+static thread_local uint64_t g_l1_3d_size = 0;
 
-static uint64_t g_fmatrix_config = 0;
+static thread_local uint64_t g_fmatrix_config = 0;
 
 #define MAD_BLOCK_SIZE 16
-static half g_mad_regs[MAD_BLOCK_SIZE][MAD_BLOCK_SIZE] __attribute__((aligned(L0_BLOCK_SIZE_BYTES)));
+static thread_local half g_mad_regs[MAD_BLOCK_SIZE][MAD_BLOCK_SIZE] __attribute__((aligned(L0_BLOCK_SIZE_BYTES)));
 
 #define NUM_CMPMASK 128
-static bool g_cmpmask[NUM_CMPMASK] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {0};
+static thread_local bool g_cmpmask[NUM_CMPMASK] __attribute__((aligned(UB_BLOCK_SIZE_BYTES))) = {0};
 
 #define CHECK_ALIGN(addr, alignment)                                                          \
   do {                                                                                        \
     CHECK((size_t)(addr) % ((alignment) * sizeof(uint8_t)) == 0)                              \
       << "Alignment check failed: address " << addr << " is not " << alignment << " aligned"; \
   } while (0);
+
+// Iterate the active lanes of the vector mask among the first elem_per_repeat lanes, in lane order
+#define FOR_EACH_MASK_LANE(lane, elem_per_repeat)                                       \
+  for (int lane_it_ = 0, lane = 0; lane_it_ < vector_mask_num_lanes &&                 \
+                                   (lane = vector_mask_lanes[lane_it_]) < (elem_per_repeat); \
+       ++lane_it_)
+
+static inline bool is_mask_full(int elem_per_repeat) { return vector_mask_prefix >= elem_per_repeat; }
+
+// Whether the blocks of every repeat are adjacent, and the repeats are adjacent too
+static inline bool is_contiguous(uint8_t repeat, uint16_t stride_m0, uint16_t stride_m1) {
+  return stride_m0 == 1 && (repeat <= 1 || stride_m1 == NUM_BLOCKS_PER_REPEAT);
+}
+
+// Fast paths of contiguous operands under a full mask.
+// They compute exactly what the element loops compute, fp16 is computed in float32 and converted in batches,
+// which is exact because every fp16 operation of the simulator rounds a float32 result.
+// cdiff tracks every element operation, so it always takes the element loops.
+#ifndef ENABLE_CDIFF
+#define FAST_SIM_CHUNK 1024
+
+static const float *half_to_float_table() {
+  static const std::vector<float> table = [] {
+    std::vector<float> values(1 << 16);
+    for (size_t bits = 0; bits < values.size(); ++bits) {
+      half h;
+      h.bits = static_cast<uint16_t>(bits);
+      values[bits] = h.ToFloat();
+    }
+    return values;
+  }();
+  return table.data();
+}
+
+static inline void half_to_float(const half *src, float *dst, size_t n) {
+  const float *table = half_to_float_table();
+  for (size_t i = 0; i < n; ++i) {
+    dst[i] = table[src[i].bits];
+  }
+}
+
+// Same truncating conversion as the float constructor of half, on the raw bits
+static inline uint16_t float_to_half_bits(float value) {
+  uint32_t f;
+  memcpy(&f, &value, sizeof(f));
+  const uint32_t sign = f >> 31;
+  const uint32_t frac = f & 0x7fffff;
+  const int exp = static_cast<int>((f >> 23) & 0xff) - 127;
+  uint32_t h_exp = 0;
+  uint32_t h_frac = 0;
+  if (exp > 15) {
+    h_exp = 31;
+    h_frac = frac != 0;
+  } else if (exp >= -14) {
+    h_exp = exp + 15;
+    h_frac = frac >> 13;
+  } else if (exp >= -24) {
+    h_frac = (1u << (24 + exp)) + (frac >> (-1 - exp));
+  }
+  return static_cast<uint16_t>((sign << 15) | (h_exp << 10) | (h_frac & 0x3ff));
+}
+
+static inline void float_to_half(const float *src, half *dst, size_t n) {
+  for (size_t i = 0; i < n; ++i) {
+    dst[i].bits = float_to_half_bits(src[i]);
+  }
+}
+
+// Batched conversion is only valid if dst does not partially overlap the sources
+static inline bool is_partial_overlap(const void *dst, const void *src, size_t bytes) {
+  const uint8_t *d = reinterpret_cast<const uint8_t *>(dst);
+  const uint8_t *s = reinterpret_cast<const uint8_t *>(src);
+  return d != s && d < s + bytes && s < d + bytes;
+}
+
+template <typename T_dst, typename T_src>
+static void contiguous_unary(T_dst *dst, T_src *src, size_t n, T_dst (*UnaryOp)(const T_src &),
+                             float (*)(const float &)) {
+  for (size_t i = 0; i < n; ++i) {
+    dst[i] = UnaryOp(src[i]);
+  }
+}
+
+static void contiguous_unary(half *dst, half *src, size_t n, half (*UnaryOp)(const half &),
+                             float (*FloatOp)(const float &)) {
+  if (FloatOp == nullptr || is_partial_overlap(dst, src, n * sizeof(half))) {
+    contiguous_unary<half, half>(dst, src, n, UnaryOp, nullptr);
+    return;
+  }
+  float buf[FAST_SIM_CHUNK];
+  for (size_t begin = 0; begin < n; begin += FAST_SIM_CHUNK) {
+    size_t len = std::min(n - begin, static_cast<size_t>(FAST_SIM_CHUNK));
+    half_to_float(src + begin, buf, len);
+    for (size_t i = 0; i < len; ++i) {
+      buf[i] = FloatOp(buf[i]);
+    }
+    float_to_half(buf, dst + begin, len);
+  }
+}
+
+template <typename T_dst, typename T_src>
+static void contiguous_binary(T_dst *dst, T_src *src0, T_src *src1, size_t n,
+                              T_dst (*BinaryOp)(const T_src &, const T_src &),
+                              float (*)(const float &, const float &)) {
+  for (size_t i = 0; i < n; ++i) {
+    dst[i] = BinaryOp(src0[i], src1[i]);
+  }
+}
+
+static void contiguous_binary(half *dst, half *src0, half *src1, size_t n, half (*BinaryOp)(const half &, const half &),
+                              float (*FloatOp)(const float &, const float &)) {
+  if (FloatOp == nullptr || is_partial_overlap(dst, src0, n * sizeof(half)) ||
+      is_partial_overlap(dst, src1, n * sizeof(half))) {
+    contiguous_binary<half, half>(dst, src0, src1, n, BinaryOp, nullptr);
+    return;
+  }
+  float buf0[FAST_SIM_CHUNK];
+  float buf1[FAST_SIM_CHUNK];
+  for (size_t begin = 0; begin < n; begin += FAST_SIM_CHUNK) {
+    size_t len = std::min(n - begin, static_cast<size_t>(FAST_SIM_CHUNK));
+    half_to_float(src0 + begin, buf0, len);
+    half_to_float(src1 + begin, buf1, len);
+    for (size_t i = 0; i < len; ++i) {
+      buf0[i] = FloatOp(buf0[i], buf1[i]);
+    }
+    float_to_half(buf0, dst + begin, len);
+  }
+}
+
+template <typename T>
+static void contiguous_binary_imm(T *dst, T *src, const T &imm, size_t n, T (*BinaryOp)(const T &, const T &),
+                                  float (*)(const float &, const float &)) {
+  for (size_t i = 0; i < n; ++i) {
+    dst[i] = BinaryOp(src[i], imm);
+  }
+}
+
+static void contiguous_binary_imm(half *dst, half *src, const half &imm, size_t n,
+                                  half (*BinaryOp)(const half &, const half &),
+                                  float (*FloatOp)(const float &, const float &)) {
+  if (FloatOp == nullptr || is_partial_overlap(dst, src, n * sizeof(half))) {
+    contiguous_binary_imm<half>(dst, src, imm, n, BinaryOp, nullptr);
+    return;
+  }
+  const float imm_value = imm.ToFloat();
+  float buf[FAST_SIM_CHUNK];
+  for (size_t begin = 0; begin < n; begin += FAST_SIM_CHUNK) {
+    size_t len = std::min(n - begin, static_cast<size_t>(FAST_SIM_CHUNK));
+    half_to_float(src + begin, buf, len);
+    for (size_t i = 0; i < len; ++i) {
+      buf[i] = FloatOp(buf[i], imm_value);
+    }
+    float_to_half(buf, dst + begin, len);
+  }
+}
+
+template <typename T_dst, typename T_src>
+static T_dst contiguous_reduce(T_src *src, size_t n, T_dst (*ReduceOp)(const T_dst &, const T_src &),
+                               float (*)(const float &, const float &)) {
+  T_dst reduce = src[0];
+  for (size_t i = 1; i < n; ++i) {
+    reduce = ReduceOp(reduce, src[i]);
+  }
+  return reduce;
+}
+
+static half contiguous_reduce(half *src, size_t n, half (*ReduceOp)(const half &, const half &),
+                              float (*FloatOp)(const float &, const float &)) {
+  if (FloatOp == nullptr || n > MAX_ELEM_PER_REPEAT) {
+    return contiguous_reduce<half, half>(src, n, ReduceOp, nullptr);
+  }
+  const float *table = half_to_float_table();
+  float buf[MAX_ELEM_PER_REPEAT];
+  half_to_float(src, buf, n);
+  // the partial result is rounded to fp16 at every step, as the element loop does
+  float reduce = buf[0];
+  for (size_t i = 1; i < n; ++i) {
+    reduce = table[float_to_half_bits(FloatOp(reduce, buf[i]))];
+  }
+  half ret;
+  ret.bits = float_to_half_bits(reduce);
+  return ret;
+}
+#endif  // ENABLE_CDIFF
+
+// Cycle-approximate performance model.
+// Every pipe of a core is an in-order queue with its own clock. The scalar unit issues instructions in program
+// order, so an instruction starts when both its pipe and the scalar pipe are free, and keeps its pipe busy for
+// an estimated number of cycles. set_flag/wait_flag carry the clock of the source pipe to the target pipe.
+// The estimate of a block is the time when its last pipe finishes.
+#define PERF_VECTOR_HEAD_CYCLES 8
+#define PERF_VECTOR_REPEAT_CYCLES 1
+#define PERF_GM_HEAD_CYCLES 200
+#define PERF_GM_BYTES_PER_CYCLE 32
+#define PERF_LOCAL_HEAD_CYCLES 16
+#define PERF_LOCAL_BYTES_PER_CYCLE 128
+#define PERF_BURST_CYCLES 1
+#define PERF_MAD_HEAD_CYCLES 8
+#define PERF_MAD_FRACTAL_CYCLES 1
+#define PERF_DEFAULT_CORE_NUM 32
+
+#define NUM_PIPES static_cast<int>(PIPE_ALL)
+#define NUM_EVENTS static_cast<int>(EVENT_ID_DUMMY)
+
+// statistics in the order returned by akg_csim_perf_stat
+enum perf_stat_t {
+  PERF_CYCLES = 0,
+  PERF_VECTOR_REPEATS,
+  PERF_DMA_BURSTS,
+  PERF_DMA_BYTES,
+  PERF_MAD_FRACTALS,
+  PERF_STALL_CYCLES,
+  PERF_PIPE_BUSY_CYCLES,  // one per pipe, in the order of pipe_t
+  PERF_NUM_STATS = PERF_PIPE_BUSY_CYCLES + NUM_PIPES,
+};
+
+static thread_local uint64_t perf_pipe_clock[NUM_PIPES] = {0};
+static thread_local uint64_t perf_flag_clock[NUM_PIPES][NUM_PIPES][NUM_EVENTS] = {{{0}}};
+static thread_local uint64_t perf_block_stat[PERF_NUM_STATS] = {0};
+
+static inline uint64_t perf_ceil_div(uint64_t a, uint64_t b) { return (a + b - 1) / b; }
+
+static void perf_reset_block() {
+  memset(perf_pipe_clock, 0, sizeof(perf_pipe_clock));
+  memset(perf_flag_clock, 0, sizeof(perf_flag_clock));
+  memset(perf_block_stat, 0, sizeof(perf_block_stat));
+}
+
+static inline void perf_issue(pipe_t pipe, uint64_t cycles) {
+  perf_pipe_clock[pipe] = std::max(perf_pipe_clock[pipe], perf_pipe_clock[PIPE_S]) + cycles;
+  perf_block_stat[PERF_PIPE_BUSY_CYCLES + pipe] += cycles;
+}
+
+// the pipe waits on a flag until clock, the waiting time is a stall
+static inline void perf_wait(pipe_t pipe, uint64_t clock) {
+  if (clock > perf_pipe_clock[pipe]) {
+    perf_block_stat[PERF_STALL_CYCLES] += clock - perf_pipe_clock[pipe];
+    perf_pipe_clock[pipe] = clock;
+  }
+}
+
+static inline void perf_vector(size_t repeat) {
+  perf_block_stat[PERF_VECTOR_REPEATS] += repeat;
+  perf_issue(PIPE_V, PERF_VECTOR_HEAD_CYCLES + repeat * PERF_VECTOR_REPEAT_CYCLES);
+}
+
+static inline void perf_dma(pipe_t pipe, size_t n_burst, size_t bytes, bool is_gm) {
+  perf_block_stat[PERF_DMA_BURSTS] += n_burst;
+  perf_block_stat[PERF_DMA_BYTES] += bytes;
+  if (is_gm) {
+    perf_issue(pipe, PERF_GM_HEAD_CYCLES + n_burst * PERF_BURST_CYCLES + perf_ceil_div(bytes, PERF_GM_BYTES_PER_CYCLE));
+  } else {
+    perf_issue(pipe,
+               PERF_LOCAL_HEAD_CYCLES + n_burst * PERF_BURST_CYCLES + perf_ceil_div(bytes, PERF_LOCAL_BYTES_PER_CYCLE));
+  }
+}
+
+static inline void perf_mad(uint16_t m, uint16_t k, uint16_t n) {
+  const uint64_t fractals = perf_ceil_div(m, MAD_BLOCK_SIZE) * perf_ceil_div(k, MAD_BLOCK_SIZE) *
+                            perf_ceil_div(n, MAD_BLOCK_SIZE);
+  perf_block_stat[PERF_MAD_FRACTALS] += fractals;
+  perf_issue(PIPE_M, PERF_MAD_HEAD_CYCLES + fractals * PERF_MAD_FRACTAL_CYCLES);
+}
+
+static uint64_t perf_block_cycles() { return *std::max_element(perf_pipe_clock, perf_pipe_clock + NUM_PIPES); }
+
 // templates
 
 static uint64_t get_bits(uint64_t config, uint8_t high_bit, uint8_t low_bit) {
@@ -62,18 +339,17 @@ static uint64_t get_bits(uint64_t config, uint8_t high_bit, uint8_t low_bit) {
 template <typename T>
 static void generic_unary_va(ub_addr8_t dst, ub_addr8_t src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride,
                              T (*UnaryOp)(const T &)) {
+  perf_vector(repeat);
   CHECK(dst < NUM_VA_REGS);
   CHECK(src < NUM_VA_REGS);
   const int elem_per_block = BYTES_PER_REPEAT / sizeof(T) / NUM_VA_REGS;
   for (int repeat_it = 0; repeat_it < repeat; ++repeat_it) {
-    for (int block = 0; block < NUM_VA_BLOCKS; ++block) {
+    FOR_EACH_MASK_LANE(lane, NUM_VA_BLOCKS * elem_per_block) {
+      const int block = lane / elem_per_block;
+      const int elem = lane % elem_per_block;
       T *dst_block = reinterpret_cast<T *>(va_reg[dst][block] + dst_stride * elem_per_block * repeat_it);
       T *src_block = reinterpret_cast<T *>(va_reg[src][block] + src_stride * elem_per_block * repeat_it);
-      for (int elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = UnaryOp(src_block[elem]);
-        }
-      }
+      dst_block[elem] = UnaryOp(src_block[elem]);
     }
   }
 }
@@ -97,18 +373,17 @@ static void generic_unary_va(ub_addr8_t dst, ub_addr8_t src, uint8_t repeat, uin
 template <typename T>
 static void generic_binary_va_imm(ub_addr8_t dst, ub_addr8_t src, T imm, uint8_t repeat, uint16_t dst_stride,
                                   uint16_t src_stride, T (*BinaryOp)(const T &, const T &)) {
+  perf_vector(repeat);
   CHECK(dst < NUM_VA_REGS);
   CHECK(src < NUM_VA_REGS);
   const int elem_per_block = BYTES_PER_REPEAT / sizeof(T) / NUM_VA_REGS;
   for (int repeat_it = 0; repeat_it < repeat; ++repeat_it) {
-    for (int block = 0; block < NUM_VA_BLOCKS; ++block) {
+    FOR_EACH_MASK_LANE(lane, NUM_VA_BLOCKS * elem_per_block) {
+      const int block = lane / elem_per_block;
+      const int elem = lane % elem_per_block;
       T *dst_block = reinterpret_cast<T *>(va_reg[dst][block] + dst_stride * elem_per_block * repeat_it);
       T *src_block = reinterpret_cast<T *>(va_reg[src][block] + src_stride * elem_per_block * repeat_it);
-      for (int elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = BinaryOp(src_block[elem], imm);
-        }
-      }
+      dst_block[elem] = BinaryOp(src_block[elem], imm);
     }
   }
 }
@@ -132,7 +407,8 @@ static void generic_binary_va_imm(ub_addr8_t dst, ub_addr8_t src, T imm, uint8_t
 template <typename T_dst, typename T_src>
 static void generic_unary_vec_2type(T_dst *dst, T_src *src, uint8_t repeat, uint16_t dst_stride_m0,
                                     uint16_t src_stride_m0, uint8_t dst_stride_m1, uint8_t src_stride_m1,
-                                    T_dst (*UnaryOp)(const T_src &)) {
+                                    T_dst (*UnaryOp)(const T_src &), float (*FloatOp)(const float &) = nullptr) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src, UB_BLOCK_SIZE);
   if (dst_stride_m0 == 0) {
@@ -141,45 +417,55 @@ static void generic_unary_vec_2type(T_dst *dst, T_src *src, uint8_t repeat, uint
   const int elem_size = sizeof(T_dst) > sizeof(T_src) ? sizeof(T_dst) : sizeof(T_src);
   const int bytes_per_block = BYTES_PER_REPEAT / NUM_BLOCKS_PER_REPEAT;
   const int elem_per_block = bytes_per_block / elem_size;
+#ifndef ENABLE_CDIFF
+  if (sizeof(T_dst) == sizeof(T_src) && is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block) &&
+      is_contiguous(repeat, dst_stride_m0, dst_stride_m1) && is_contiguous(repeat, src_stride_m0, src_stride_m1)) {
+    contiguous_unary(dst, src, (size_t)repeat * NUM_BLOCKS_PER_REPEAT * elem_per_block, UnaryOp, FloatOp);
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T_dst *dst_base = dst + dst_stride_m1 * repeat_it * bytes_per_block / sizeof(T_dst);
     T_src *src_base = src + src_stride_m1 * repeat_it * bytes_per_block / sizeof(T_src);
-    for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
+    FOR_EACH_MASK_LANE(lane, NUM_BLOCKS_PER_REPEAT * elem_per_block) {
+      const size_t block = lane / elem_per_block;
+      const size_t elem = lane % elem_per_block;
       T_dst *dst_block = dst_base + dst_stride_m0 * block * bytes_per_block / sizeof(T_dst);
       T_src *src_block = src_base + src_stride_m0 * block * bytes_per_block / sizeof(T_src);
-      for (size_t elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = UnaryOp(src_block[elem]);
-        }
-      }
+      dst_block[elem] = UnaryOp(src_block[elem]);
     }
   }
 }
 
 template <typename T>
 static void generic_unary_vec(T *dst, T *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
-                              uint8_t dst_stride_m1, uint8_t src_stride_m1, T (*UnaryOp)(const T &)) {
-  generic_unary_vec_2type<T, T>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1, UnaryOp);
+                              uint8_t dst_stride_m1, uint8_t src_stride_m1, T (*UnaryOp)(const T &),
+                              float (*FloatOp)(const float &) = nullptr) {
+  generic_unary_vec_2type<T, T>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1, UnaryOp,
+                                FloatOp);
 }
 
 template <typename T>
 static void generic_unary_vec_imm(T *dst, T src, uint8_t repeat, uint16_t dst_stride_m0, uint8_t dst_stride_m1,
                                   T (*UnaryOp)(const T &)) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   if (dst_stride_m0 == 0) {
     dst_stride_m0 = 1;
   }
   const int elem_size = sizeof(T);
   const int elem_per_block = BYTES_PER_REPEAT / elem_size / NUM_BLOCKS_PER_REPEAT;
+#ifndef ENABLE_CDIFF
+  if (is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block) && is_contiguous(repeat, dst_stride_m0, dst_stride_m1)) {
+    std::fill(dst, dst + (size_t)repeat * NUM_BLOCKS_PER_REPEAT * elem_per_block, UnaryOp(src));
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T *dst_base = dst + dst_stride_m1 * repeat_it * elem_per_block;
-    for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
-      T *dst_block = dst_base + dst_stride_m0 * block * elem_per_block;
-      for (size_t elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = UnaryOp(src);
-        }
-      }
+    FOR_EACH_MASK_LANE(lane, NUM_BLOCKS_PER_REPEAT * elem_per_block) {
+      T *dst_block = dst_base + dst_stride_m0 * (lane / elem_per_block) * elem_per_block;
+      dst_block[lane % elem_per_block] = UnaryOp(src);
     }
   }
 }
@@ -187,50 +473,65 @@ static void generic_unary_vec_imm(T *dst, T src, uint8_t repeat, uint16_t dst_st
 template <typename T>
 static void generic_binary_vec_imm(T *dst, T *src, T imm, uint8_t repeat, uint16_t dst_stride_m0,
                                    uint16_t src_stride_m0, uint8_t dst_stride_m1, uint8_t src_stride_m1,
-                                   T (*BinaryOp)(const T &, const T &)) {
+                                   T (*BinaryOp)(const T &, const T &),
+                                   float (*FloatOp)(const float &, const float &) = nullptr) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src, UB_BLOCK_SIZE);
   if (dst_stride_m0 == 0) {
     dst_stride_m0 = 1;
   }
   const int elem_per_block = BYTES_PER_REPEAT / sizeof(T) / NUM_BLOCKS_PER_REPEAT;
+#ifndef ENABLE_CDIFF
+  if (is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block) && is_contiguous(repeat, dst_stride_m0, dst_stride_m1) &&
+      is_contiguous(repeat, src_stride_m0, src_stride_m1)) {
+    contiguous_binary_imm(dst, src, imm, (size_t)repeat * NUM_BLOCKS_PER_REPEAT * elem_per_block, BinaryOp, FloatOp);
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T *dst_base = dst + dst_stride_m1 * repeat_it * elem_per_block;
     T *src_base = src + src_stride_m1 * repeat_it * elem_per_block;
-    for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
+    FOR_EACH_MASK_LANE(lane, NUM_BLOCKS_PER_REPEAT * elem_per_block) {
+      const size_t block = lane / elem_per_block;
+      const size_t elem = lane % elem_per_block;
       T *dst_block = dst_base + dst_stride_m0 * block * elem_per_block;
       T *src_block = src_base + src_stride_m0 * block * elem_per_block;
-      for (size_t elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = BinaryOp(src_block[elem], imm);
-        }
-      }
+      dst_block[elem] = BinaryOp(src_block[elem], imm);
     }
   }
 }
 
 template <typename T_dst, typename T_src>
 static void generic_reduce_2type(T_dst *dst, T_src *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
-                                 uint16_t src_stride_m1, T_dst (*ReduceOp)(const T_dst &, const T_src &)) {
+                                 uint16_t src_stride_m1, T_dst (*ReduceOp)(const T_dst &, const T_src &),
+                                 float (*FloatOp)(const float &, const float &) = nullptr) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src, UB_BLOCK_SIZE);
   const int elem_size = sizeof(T_src);
   const int elem_per_block = BYTES_PER_REPEAT / elem_size / NUM_BLOCKS_PER_REPEAT;
+#ifndef ENABLE_CDIFF
+  if (is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block) && src_stride_m0 == 1) {
+    for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
+      dst[dst_stride * repeat_it] = contiguous_reduce(src + src_stride_m1 * repeat_it * elem_per_block,
+                                                      NUM_BLOCKS_PER_REPEAT * elem_per_block, ReduceOp, FloatOp);
+    }
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T_src *src_base = src + src_stride_m1 * repeat_it * elem_per_block;
     T_dst reduce;
     bool is_first = true;
-    for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
-      T_src *src_block = src_base + src_stride_m0 * block * elem_per_block;
-      for (size_t elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          if (is_first) {
-            reduce = src_block[elem];
-            is_first = false;
-          } else {
-            reduce = ReduceOp(reduce, src_block[elem]);
-          }
-        }
+    FOR_EACH_MASK_LANE(lane, NUM_BLOCKS_PER_REPEAT * elem_per_block) {
+      T_src *src_block = src_base + src_stride_m0 * (lane / elem_per_block) * elem_per_block;
+      const size_t elem = lane % elem_per_block;
+      if (is_first) {
+        reduce = src_block[elem];
+        is_first = false;
+      } else {
+        reduce = ReduceOp(reduce, src_block[elem]);
       }
     }
     if (!is_first) {
@@ -241,19 +542,35 @@ static void generic_reduce_2type(T_dst *dst, T_src *src, uint8_t repeat, uint16_
 
 template <typename T>
 static void generic_reduce(T *dst, T *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
-                           uint16_t src_stride_m1, T (*ReduceOp)(const T &, const T &)) {
-  generic_reduce_2type<T, T>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, ReduceOp);
+                           uint16_t src_stride_m1, T (*ReduceOp)(const T &, const T &),
+                           float (*FloatOp)(const float &, const float &) = nullptr) {
+  generic_reduce_2type<T, T>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, ReduceOp, FloatOp);
 }
 
 template <typename T_dst, typename T_src>
 static void generic_reduce_group_2type(T_dst *dst, T_src *src, uint8_t repeat, uint16_t dst_stride,
                                        uint16_t src_stride_m0, uint16_t src_stride_m1,
-                                       T_dst (*ReduceOp)(const T_dst &, const T_src &)) {
+                                       T_dst (*ReduceOp)(const T_dst &, const T_src &),
+                                       float (*FloatOp)(const float &, const float &) = nullptr) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src, UB_BLOCK_SIZE);
 
   const int elem_size = sizeof(T_src);
   const int elem_per_block = BYTES_PER_REPEAT / elem_size / NUM_BLOCKS_PER_REPEAT;
+#ifndef ENABLE_CDIFF
+  if (is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block)) {
+    for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
+      T_src *src_base = src + src_stride_m1 * repeat_it * elem_per_block;
+      T_dst *dst_base = dst + dst_stride * repeat_it * elem_per_block;
+      for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
+        dst_base[block] =
+          contiguous_reduce(src_base + src_stride_m0 * block * elem_per_block, elem_per_block, ReduceOp, FloatOp);
+      }
+    }
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T_src *src_base = src + src_stride_m1 * repeat_it * elem_per_block;
     T_dst *dst_base = dst + dst_stride * repeat_it * elem_per_block;
@@ -280,8 +597,83 @@ static void generic_reduce_group_2type(T_dst *dst, T_src *src, uint8_t repeat, u
 
 template <typename T>
 static void generic_reduce_group(T *dst, T *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
-                                 uint16_t src_stride_m1, T (*ReduceOp)(const T &, const T &)) {
-  generic_reduce_group_2type<T, T>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, ReduceOp);
+                                 uint16_t src_stride_m1, T (*ReduceOp)(const T &, const T &),
+                                 float (*FloatOp)(const float &, const float &) = nullptr) {
+  generic_reduce_group_2type<T, T>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, ReduceOp, FloatOp);
+}
+
+// multi-core execution
+static size_t csim_num_threads() {
+  const char *env = getenv("CSIM_NUM_THREADS");
+  if (env == nullptr) {
+    return 1;
+  }
+  long num_threads = strtol(env, nullptr, 10);
+  if (num_threads <= 0) {
+    num_threads = static_cast<long>(std::thread::hardware_concurrency());
+  }
+  return num_threads > 0 ? static_cast<size_t>(num_threads) : 1;
+}
+
+static size_t csim_core_num() {
+  const char *env = getenv("CSIM_CORE_NUM");
+  long core_num = env == nullptr ? 0 : strtol(env, nullptr, 10);
+  return core_num > 0 ? static_cast<size_t>(core_num) : PERF_DEFAULT_CORE_NUM;
+}
+
+// performance statistics of the last launch
+static std::mutex perf_mutex;
+static uint64_t perf_launch_stat[PERF_NUM_STATS] = {0};
+
+void csim_run_blocks(size_t block_dim, const std::function<void(size_t)> &run_block) {
+  // blocks are dispatched to the cores in turn, the kernel finishes with its busiest core
+  std::vector<uint64_t> core_cycles(std::min(csim_core_num(), std::max(block_dim, static_cast<size_t>(1))), 0);
+  uint64_t launch_stat[PERF_NUM_STATS] = {0};
+  auto run_block_with_perf = [&](size_t block) {
+    perf_reset_block();
+    run_block(block);
+    const uint64_t cycles = perf_block_cycles();
+    std::lock_guard<std::mutex> lock(perf_mutex);
+    core_cycles[block % core_cycles.size()] += cycles;
+    for (int i = PERF_CYCLES + 1; i < PERF_NUM_STATS; ++i) {
+      launch_stat[i] += perf_block_stat[i];
+    }
+  };
+  auto finish = [&]() {
+    launch_stat[PERF_CYCLES] = *std::max_element(core_cycles.begin(), core_cycles.end());
+    std::lock_guard<std::mutex> lock(perf_mutex);
+    std::copy(launch_stat, launch_stat + PERF_NUM_STATS, perf_launch_stat);
+  };
+
+  const size_t num_workers = std::min(csim_num_threads(), block_dim);
+  if (num_workers <= 1) {
+    for (size_t block = 0; block < block_dim; ++block) {
+      run_block_with_perf(block);
+    }
+    finish();
+    return;
+  }
+  std::atomic<size_t> next_block(0);
+  auto worker = [&]() {
+    for (size_t block = next_block++; block < block_dim; block = next_block++) {
+      run_block_with_perf(block);
+    }
+  };
+  std::vector<std::thread> threads;
+  for (size_t i = 1; i < num_workers; ++i) {
+    threads.emplace_back(worker);
+  }
+  worker();
+  for (auto &thread : threads) {
+    thread.join();
+  }
+  finish();
+}
+
+extern "C" int akg_csim_perf_stat(uint64_t *stat, int size) {
+  std::lock_guard<std::mutex> lock(perf_mutex);
+  std::copy(perf_launch_stat, perf_launch_stat + std::min(size, static_cast<int>(PERF_NUM_STATS)), stat);
+  return PERF_NUM_STATS;
 }
 
 // AIcore function implementation
@@ -309,7 +701,7 @@ void create_cb_matrix(__cb__ half *dst, uint8_t repeat, const half &value) { cre
 
 const pipe_t num_pipes = PIPE_ALL;
 const event_t num_events = EVENT_ID_DUMMY;
-static int is_flag_set[num_pipes][num_pipes][num_events] = {0};
+static thread_local int is_flag_set[num_pipes][num_pipes][num_events] = {0};
 
 inline pipe_t &operator++(pipe_t &p) {
   p = static_cast<pipe_t>(static_cast<int>(p) + 1);
@@ -331,7 +723,10 @@ inline void internal_set_flag(pipe_t pipe, pipe_t tpipe, event_t n, int value) {
 
 void pipe_barrier(pipe_t pipe) {
   if (pipe == PIPE_ALL) {
+    // all pipes resume together when the last one finishes
+    const uint64_t clock = perf_block_cycles();
     for (pipe_t tpipe = static_cast<pipe_t>(0); tpipe < num_pipes; ++tpipe) {
+      perf_pipe_clock[tpipe] = clock;
       pipe_barrier(tpipe);
     }
     return;
@@ -364,6 +759,7 @@ void set_flag(pipe_t pipe, pipe_t tpipe, event_t n) {
     LOG(WARNING) << "duplicate set flag: pipe " << pipe << " -> " << tpipe << " event_id " << n;
   }
   internal_set_flag(pipe, tpipe, n, 1);
+  perf_flag_clock[pipe][tpipe][n] = std::max(perf_pipe_clock[pipe], perf_pipe_clock[PIPE_S]);
 }
 
 void wait_flag(pipe_t pipe, pipe_t tpipe, event_t n) {
@@ -387,11 +783,17 @@ void wait_flag(pipe_t pipe, pipe_t tpipe, event_t n) {
   CHECK(internal_get_flag(pipe, tpipe, n))
     << "possible deadlock: wait on flag " << pipe << " -> " << tpipe << " event_id " << n << " before it is set";
   internal_set_flag(pipe, tpipe, n, 0);
+  perf_wait(tpipe, perf_flag_clock[pipe][tpipe][n]);
 }
 
 static inline void eltwise_copy(uint8_t *dst, uint8_t *src, size_t length) {
 #ifdef ENABLE_CDIFF
   DisableUndefinedAssignCheck();
+#else
+  if (dst + length <= src || src + length <= dst) {
+    memcpy(dst, src, length);
+    return;
+  }
 #endif
   for (size_t elem_in_burst = 0; elem_in_burst < length; ++elem_in_burst) {
     dst[elem_in_burst] = src[elem_in_burst];
@@ -413,6 +815,11 @@ static void generic_dma(void *dst, void *src, uint16_t n_burst, uint16_t len_bur
   CHECK(n_burst > 0) << "nBurst cannot be zero";
   uint8_t *dst_base = reinterpret_cast<uint8_t *>(dst);
   uint8_t *src_base = reinterpret_cast<uint8_t *>(src);
+  if (src_stride == 0 && dst_stride == 0) {
+    // adjacent bursts are copied as one block
+    eltwise_copy(dst_base, src_base, (size_t)n_burst * len_burst * burst_length_unit);
+    return;
+  }
   for (size_t burst = 0; burst < n_burst; ++burst) {
     size_t burst_length = (size_t)len_burst * burst_length_unit;
     size_t dst_offset = burst * (burst_length + (size_t)dst_stride * dst_gap_unit);
@@ -423,6 +830,7 @@ static void generic_dma(void *dst, void *src, uint16_t n_burst, uint16_t len_bur
 
 void copy_gm_to_cbuf(__cbuf__ void *dst, __gm__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                      uint16_t src_stride, uint16_t dst_stride, pad_t pad_mode) {
+  perf_dma(PIPE_MTE2, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, true);
   if (pad_mode == 0) {
     generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE,
                 false, true);
@@ -433,18 +841,21 @@ void copy_gm_to_cbuf(__cbuf__ void *dst, __gm__ void *src, uint8_t sid, uint16_t
 
 void copy_gm_to_ubuf(__ubuf__ void *dst, __gm__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                      uint16_t src_stride, uint16_t dst_stride) {
+  perf_dma(PIPE_MTE2, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, true);
   generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE, false,
               true);
 }
 
 void copy_ubuf_to_cbuf(__cbuf__ void *dst, __ubuf__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                        uint16_t src_stride, uint16_t dst_stride) {
+  perf_dma(PIPE_MTE3, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, false);
   generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE, true,
               true);
 }
 
 void copy_ubuf_to_gm(__gm__ void *dst, __ubuf__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                      uint16_t src_stride, uint16_t dst_stride) {
+  perf_dma(PIPE_MTE3, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, true);
   generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE, true,
               false);
 }
@@ -458,6 +869,7 @@ static void generic_copy_matrix(T *dst, T *src, uint8_t sid, uint16_t n_burst, u
   check_crmode(cr_mode);
   CHECK_ALIGN(dst, dst_gap_unit);
   CHECK_ALIGN(src, src_gap_unit);
+  perf_dma(PIPE_V, n_burst, (size_t)n_burst * len_burst * burst_length_unit, false);
 
   for (int burst = 0; burst < n_burst; ++burst) {
     const size_t burst_size = (size_t)len_burst * burst_length_unit;
@@ -473,6 +885,7 @@ static void generic_copy_matrix_conv(T_dst *dst, T_src *src, uint8_t sid, uint16
                                      uint16_t dst_stride, uint16_t dst_gap_unit, ConvRelu_t cr_mode) {
   CHECK_ALIGN(dst, dst_gap_unit);
   CHECK_ALIGN(src, src_gap_unit);
+  perf_dma(PIPE_V, n_burst, (size_t)n_burst * len_burst * burst_length_unit, false);
 
   for (int burst = 0; burst < n_burst; ++burst) {
     const size_t element_size = (sizeof(T_src) > sizeof(T_dst) ? sizeof(T_src) : sizeof(T_dst));
@@ -606,12 +1019,14 @@ void copy_vector_cc_to_ubuf(__ubuf__ half *dst, __cc__ int32_t *src, uint8_t sid
 
 void copy_ubuf_to_ubuf(__ubuf__ void *dst, __ubuf__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                        uint16_t src_stride, uint16_t dst_stride) {
+  perf_dma(PIPE_V, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, false);
   generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE, true,
               true);
 }
 
 void copy_cbuf_to_ubuf(__ubuf__ void *dst, __cbuf__ void *src, uint8_t sid, uint16_t n_burst, uint16_t len_burst,
                        uint16_t src_stride, uint16_t dst_stride) {
+  perf_dma(PIPE_MTE1, n_burst, (size_t)n_burst * len_burst * UB_BLOCK_SIZE, false);
   generic_dma(dst, src, n_burst, len_burst, UB_BLOCK_SIZE, src_stride, UB_BLOCK_SIZE, dst_stride, UB_BLOCK_SIZE, true,
               true);
 }
@@ -644,11 +1059,13 @@ static void load_2d(half *dst, half *src, uint16_t base_idx, uint8_t repeat, uin
 
 void load_cbuf_to_ca(__ca__ half *dst, __cbuf__ half *src, uint16_t base_idx, uint8_t repeat, uint16_t src_stride,
                      uint8_t sid, bool transpose) {
+  perf_dma(PIPE_MTE1, repeat, (size_t)repeat * L0_BLOCK_SIZE, false);
   load_2d(dst, src, base_idx, repeat, src_stride, sid, transpose);
 }
 
 void load_cbuf_to_cb(__cb__ half *dst, __cbuf__ half *src, uint16_t base_idx, uint8_t repeat, uint16_t src_stride,
                      uint8_t sid, bool transpose) {
+  perf_dma(PIPE_MTE1, repeat, (size_t)repeat * L0_BLOCK_SIZE, false);
   load_2d(dst, src, base_idx, repeat, src_stride, sid, transpose);
 }
 
@@ -658,6 +1075,7 @@ void load_gm_generic(half *dst, half *src, uint64_t config) {
   uint16_t src_stride = get_bits(config, 39, 24);
   uint8_t sid = get_bits(config, 43, 40);
   bool transpose = false;
+  perf_dma(PIPE_MTE2, repeat, (size_t)repeat * L0_BLOCK_SIZE, true);
   load_2d(dst, src, base_idx, repeat, src_stride, sid, transpose);
 }
 
@@ -850,6 +1268,8 @@ class img2col_class {
 };
 
 static void img2col(half *dst, half *src, uint64_t xm, uint64_t xt, csize_t c) {
+  const size_t repeat = get_bits(xt, 63, 56);
+  perf_dma(PIPE_MTE1, repeat, repeat * L0_BLOCK_SIZE, false);
   img2col_class().img2col(dst, src, g_fmatrix_config, xm, xt, c);
 }
 
@@ -898,6 +1318,7 @@ static void generic_broadcast_ub_to_cc(T_dst *dst, T_src *xn, uint64_t config, u
 
   CHECK_GE(num_burst, 1);
   CHECK_GE(burst_len, 1);
+  perf_dma(PIPE_V, num_burst, num_burst * burst_len * UB_BLOCK_SIZE, false);
   size_t src_gap_bytes = src_gap * UB_BLOCK_SIZE * sizeof(uint8_t);
   size_t dst_gap_bytes = dst_gap * dst_gap_size_unit * sizeof(uint8_t);
 
@@ -943,6 +1364,7 @@ void generic_mad(__cc__ T_c *c, __ca__ T_a *a, __cb__ T_b *b, uint16_t m, uint16
   if (m == 0 || k == 0 || n == 0) {
     return;
   }
+  perf_mad(m, k, n);
 
 #define ceil_div(a, b) (((a) + (b)-1) / (b))
   const int ni_extent = MAD_BLOCK_SIZE;
@@ -1005,6 +1427,16 @@ void set_vector_mask(uint64_t m1, uint64_t m0) {
     vector_mask[i] = (m0 >> i) & (uint64_t)1;
     vector_mask[i + 64] = (m1 >> i) & (uint64_t)1;
   }
+  vector_mask_num_lanes = 0;
+  for (int i = 0; i < MAX_ELEM_PER_REPEAT; ++i) {
+    if (vector_mask[i]) {
+      vector_mask_lanes[vector_mask_num_lanes++] = i;
+    }
+  }
+  vector_mask_prefix = 0;
+  while (vector_mask_prefix < MAX_ELEM_PER_REPEAT && vector_mask[vector_mask_prefix]) {
+    ++vector_mask_prefix;
+  }
 }
 
 void set_vector_mask_dup(uint64_t m) { set_vector_mask(m, m); }
@@ -1060,7 +1492,7 @@ void scatter_vabs(vtype_t type, ub_addr8_t dst, ub_addr8_t src, uint8_t repeat,
 void vabs(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
           uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                          unary_abs<half>);
+                          unary_abs<half>, unary_abs<float>);
 }
 
 void vabs(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1082,7 +1514,7 @@ void scatter_vexp(vtype_t type, ub_addr8_t dst, ub_addr8_t src, uint8_t repeat,
 void vexp(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
           uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                          unary_exp<half>);
+                          unary_exp<half>, unary_exp<float>);
 }
 
 void vexp(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1124,7 +1556,7 @@ void scatter_vrec(vtype_t type, ub_addr8_t dst, ub_addr8_t src, uint8_t repeat,
 void vrec(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
           uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                          unary_rec<half>);
+                          unary_rec<half>, unary_rec<float>);
 }
 
 void vrec(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1145,7 +1577,8 @@ void scatter_vln(vtype_t type, ub_addr8_t dst, ub_addr8_t src, uint8_t repeat, u
 
 void vln(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
          uint8_t dst_stride_m1, uint8_t src_stride_m1) {
-  generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1, unary_ln<half>);
+  generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1, unary_ln<half>,
+                          unary_ln<float>);
 }
 
 void vln(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1171,7 +1604,7 @@ void scatter_vrsqrt(vtype_t type, ub_addr8_t dst, ub_addr8_t src, uint8_t repeat
 void vrsqrt(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
             uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_unary_vec<half>(dst, src, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                          unary_rsqrt<half>);
+                          unary_rsqrt<half>, unary_rsqrt<float>);
 }
 
 void vrsqrt(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1194,6 +1627,7 @@ void vnot(__ubuf__ void *dst, __ubuf__ void *src, uint8_t repeat, uint16_t dst_s
 template <typename T>
 static void generic_binary_va(ub_addr8_t dst, ub_addr8_t src0, ub_addr8_t src1, uint8_t repeat, uint16_t dst_stride,
                               uint16_t src0_stride, uint16_t src1_stride, T (*BinaryOp)(const T &, const T &)) {
+  perf_vector(repeat);
   CHECK(dst < NUM_VA_REGS);
   CHECK(src0 < NUM_VA_REGS);
   CHECK(src1 < NUM_VA_REGS);
@@ -1240,7 +1674,9 @@ template <typename T_dst, typename T_src>
 static void generic_binary_vec_2type(T_dst *dst, T_src *src0, T_src *src1, uint8_t repeat, uint8_t dst_stride_m0,
                                      uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1,
                                      uint8_t src0_stride_m1, uint8_t src1_stride_m1,
-                                     T_dst (*BinaryOp)(const T_src &, const T_src &)) {
+                                     T_dst (*BinaryOp)(const T_src &, const T_src &),
+                                     float (*FloatOp)(const float &, const float &) = nullptr) {
+  perf_vector(repeat);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src0, UB_BLOCK_SIZE);
   CHECK_ALIGN(src1, UB_BLOCK_SIZE);
@@ -1249,19 +1685,25 @@ static void generic_binary_vec_2type(T_dst *dst, T_src *src0, T_src *src1, uint8
   }
   const int elem_size = sizeof(T_dst) > sizeof(T_src) ? sizeof(T_dst) : sizeof(T_src);
   const int elem_per_block = BYTES_PER_REPEAT / elem_size / NUM_BLOCKS_PER_REPEAT;
+#ifndef ENABLE_CDIFF
+  if (sizeof(T_dst) == sizeof(T_src) && is_mask_full(NUM_BLOCKS_PER_REPEAT * elem_per_block) &&
+      is_contiguous(repeat, dst_stride_m0, dst_stride_m1) && is_contiguous(repeat, src0_stride_m0, src0_stride_m1) &&
+      is_contiguous(repeat, src1_stride_m0, src1_stride_m1)) {
+    contiguous_binary(dst, src0, src1, (size_t)repeat * NUM_BLOCKS_PER_REPEAT * elem_per_block, BinaryOp, FloatOp);
+    return;
+  }
+#endif
   for (size_t repeat_it = 0; repeat_it < repeat; ++repeat_it) {
     T_dst *dst_base = dst + dst_stride_m1 * repeat_it * elem_per_block;
     T_src *src0_base = src0 + src0_stride_m1 * repeat_it * elem_per_block;
     T_src *src1_base = src1 + src1_stride_m1 * repeat_it * elem_per_block;
-    for (size_t block = 0; block < NUM_BLOCKS_PER_REPEAT; ++block) {
+    FOR_EACH_MASK_LANE(lane, NUM_BLOCKS_PER_REPEAT * elem_per_block) {
+      const size_t block = lane / elem_per_block;
+      const size_t elem = lane % elem_per_block;
       T_dst *dst_block = dst_base + dst_stride_m0 * block * elem_per_block;
       T_src *src0_block = src0_base + src0_stride_m0 * block * elem_per_block;
       T_src *src1_block = src1_base + src1_stride_m0 * block * elem_per_block;
-      for (size_t elem = 0; elem < elem_per_block; ++elem) {
-        if (vector_mask[block * elem_per_block + elem]) {
-          dst_block[elem] = BinaryOp(src0_block[elem], src1_block[elem]);
-        }
-      }
+      dst_block[elem] = BinaryOp(src0_block[elem], src1_block[elem]);
     }
   }
 }
@@ -1269,9 +1711,10 @@ static void generic_binary_vec_2type(T_dst *dst, T_src *src0, T_src *src1, uint8
 template <typename T>
 static void generic_binary_vec(T *dst, T *src0, T *src1, uint8_t repeat, uint8_t dst_stride_m0, uint8_t src0_stride_m0,
                                uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
-                               uint8_t src1_stride_m1, T (*BinaryOp)(const T &, const T &)) {
+                               uint8_t src1_stride_m1, T (*BinaryOp)(const T &, const T &),
+                               float (*FloatOp)(const float &, const float &) = nullptr) {
   generic_binary_vec_2type<T, T>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                                 src0_stride_m1, src1_stride_m1, BinaryOp);
+                                 src0_stride_m1, src1_stride_m1, BinaryOp, FloatOp);
 }
 
 template <typename T>
@@ -1288,7 +1731,7 @@ void vadd(__ubuf__ half *dst, __ubuf__ half *src0, __ubuf__ half *src1, uint8_t
           uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
           uint8_t src1_stride_m1) {
   generic_binary_vec<half>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                           src0_stride_m1, src1_stride_m1, binary_add<half>);
+                           src0_stride_m1, src1_stride_m1, binary_add<half>, binary_add<float>);
 }
 
 void vadd(__ubuf__ int32_t *dst, __ubuf__ int32_t *src0, __ubuf__ int32_t *src1, uint8_t repeat, uint8_t dst_stride_m0,
@@ -1319,7 +1762,7 @@ void vsub(__ubuf__ half *dst, __ubuf__ half *src0, __ubuf__ half *src1, uint8_t
           uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
           uint8_t src1_stride_m1) {
   generic_binary_vec<half>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                           src0_stride_m1, src1_stride_m1, binary_sub<half>);
+                           src0_stride_m1, src1_stride_m1, binary_sub<half>, binary_sub<float>);
 }
 
 void vsub(__ubuf__ int32_t *dst, __ubuf__ int32_t *src0, __ubuf__ int32_t *src1, uint8_t repeat, uint8_t dst_stride_m0,
@@ -1350,7 +1793,7 @@ void vmul(__ubuf__ half *dst, __ubuf__ half *src0, __ubuf__ half *src1, uint8_t
           uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
           uint8_t src1_stride_m1) {
   generic_binary_vec<half>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                           src0_stride_m1, src1_stride_m1, binary_mul<half>);
+                           src0_stride_m1, src1_stride_m1, binary_mul<half>, binary_mul<float>);
 }
 
 void vmul(__ubuf__ int32_t *dst, __ubuf__ int32_t *src0, __ubuf__ int32_t *src1, uint8_t repeat, uint8_t dst_stride_m0,
@@ -1381,7 +1824,7 @@ void vmax(__ubuf__ half *dst, __ubuf__ half *src0, __ubuf__ half *src1, uint8_t
           uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
           uint8_t src1_stride_m1) {
   generic_binary_vec<half>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                           src0_stride_m1, src1_stride_m1, binary_max<half>);
+                           src0_stride_m1, src1_stride_m1, binary_max<half>, binary_max<float>);
 }
 
 void vmax(__ubuf__ int32_t *dst, __ubuf__ int32_t *src0, __ubuf__ int32_t *src1, uint8_t repeat, uint8_t dst_stride_m0,
@@ -1412,7 +1855,7 @@ void vmin(__ubuf__ half *dst, __ubuf__ half *src0, __ubuf__ half *src1, uint8_t
           uint8_t src0_stride_m0, uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1,
           uint8_t src1_stride_m1) {
   generic_binary_vec<half>(dst, src0, src1, repeat, dst_stride_m0, src0_stride_m0, src1_stride_m0, dst_stride_m1,
-                           src0_stride_m1, src1_stride_m1, binary_min<half>);
+                           src0_stride_m1, src1_stride_m1, binary_min<half>, binary_min<float>);
 }
 
 void vmin(__ubuf__ int32_t *dst, __ubuf__ int32_t *src0, __ubuf__ int32_t *src1, uint8_t repeat, uint8_t dst_stride_m0,
@@ -1636,6 +2079,7 @@ void scatter_vsel(vtype_t type, ub_addr8_t dst, ub_addr8_t src0, ub_addr8_t src1
 template <typename T>
 void generic_vsel(T *dst, T *src0, T *src1, uint8_t repeat, uint8_t dst_stride_m0, uint8_t src0_stride_m0,
                   uint8_t src1_stride_m0, uint8_t dst_stride_m1, uint8_t src0_stride_m1, uint8_t src1_stride_m1) {
+  perf_vector(repeat);
   if (dst_stride_m0 == 0) {
     dst_stride_m0 = 1;
   }
@@ -1684,7 +2128,7 @@ void rpn_cor_diag(__ubuf__ half *dst, __ubuf__ half *src0);
 
 void vcadd(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
            uint16_t src_stride_m1) {
-  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_add<half>);
+  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_add<half>, binary_add<float>);
 }
 
 void vcadd(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
@@ -1694,30 +2138,34 @@ void vcadd(__ubuf__ float *dst, __ubuf__ float *src, uint8_t repeat, uint16_t ds
 
 void vcmax(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
            uint16_t src_stride_m1) {
-  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_max<half>);
+  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_max<half>, binary_max<float>);
 }
 
 void vcmin(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src_stride_m0,
            uint16_t src_stride_m1) {
-  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_min<half>);
+  generic_reduce<half>(dst, src, repeat, dst_stride, src_stride_m0, src_stride_m1, binary_min<half>, binary_min<float>);
 }
 
 void vcgmax(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src0_stride,
             uint16_t src1_stride) {
-  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_max<half>);
+  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_max<half>,
+                             binary_max<float>);
 }
 
 void vcgmin(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src0_stride,
             uint16_t src1_stride) {
-  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_min<half>);
+  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_min<half>,
+                             binary_min<float>);
 }
 
 void vcgadd(__ubuf__ half *dst, __ubuf__ half *src, uint8_t repeat, uint16_t dst_stride, uint16_t src0_stride,
             uint16_t src1_stride) {
-  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_add<half>);
+  generic_reduce_group<half>(dst, src, repeat, dst_stride, src0_stride, src1_stride, binary_add<half>,
+                             binary_add<float>);
 }
 
 void vtranspose(__ubuf__ uint16_t *dst, __ubuf__ uint16_t *src) {
+  perf_vector(1);
   CHECK_ALIGN(dst, UB_BLOCK_SIZE);
   CHECK_ALIGN(src, UB_BLOCK_SIZE);
   const int matrix_size = UB_BLOCK_SIZE / sizeof(uint16_t);
@@ -1743,7 +2191,7 @@ void scatter_vadds(vtype_t type, ub_addr8_t dst, ub_addr8_t src, const float &a,
 void vadds(half *dst, half *src, const half &a, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
            uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_binary_vec_imm<half>(dst, src, a, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                               binary_add<half>);
+                               binary_add<half>, binary_add<float>);
 }
 
 void vadds(float *dst, float *src, const float &a, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
@@ -1767,7 +2215,7 @@ void scatter_vmuls(vtype_t type, ub_addr8_t dst, ub_addr8_t src, const float &a,
 void vmuls(half *dst, half *src, const half &a, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
            uint8_t dst_stride_m1, uint8_t src_stride_m1) {
   generic_binary_vec_imm<half>(dst, src, a, repeat, dst_stride_m0, src_stride_m0, dst_stride_m1, src_stride_m1,
-                               binary_mul<half>);
+                               binary_mul<half>, binary_mul<float>);
 }
 
 void vmuls(float *dst, float *src, const float &a, uint8_t repeat, uint16_t dst_stride_m0, uint16_t src_stride_m0,
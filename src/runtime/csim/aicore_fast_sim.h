@@ -24,6 +24,7 @@
 #include <cmath>
 #include <cstring>
 #include <algorithm>
+#include <functional>
 
 #define __CCE_KT_TEST__
 
@@ -91,6 +92,16 @@ using iterator_t = TrackedIterator;
 
 #endif  // ENABLE_CDIFF
 
+// Run run_block for every block of a multi-core kernel.
+// Blocks run on CSIM_NUM_THREADS worker threads (all host cores if it is 0), sequentially if it is not set.
+// The blocks are also timed by a cycle-approximate model of the pipes, see akg_csim_perf_stat.
+void csim_run_blocks(size_t block_dim, const std::function<void(size_t)> &run_block);
+
+// Copy at most size performance statistics of the last csim_run_blocks to stat, and return the number of them:
+// estimated cycles of the kernel, vector repeats, DMA bursts, DMA bytes, MAD fractals, cycles stalled on flags,
+// and the busy cycles of every pipe in the order of pipe_t.
+extern "C" int akg_csim_perf_stat(uint64_t *stat, int size);
+
 #include "aicore_debug_funcs.h"
 #include "halide_intrinsics.h"
 
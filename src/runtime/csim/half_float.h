@@ -146,7 +146,7 @@ class half {
   }
 
   half operator/(const half &b) const {
-    return half(ToFloat() * static_cast<float>(b));
+    return half(ToFloat() / static_cast<float>(b));
   }
 
   half operator+=(const half &b) {
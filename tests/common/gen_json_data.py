@@ -16,48 +16,9 @@
 
 import json
 import logging
+import functools
 import numpy as np
 from gen_random import random_gaussian
-import inspect
-
-class CodePrinter(object):
-    """print numpy file"""
-    def __init__(self, out_file):
-        self.fout_ = open(out_file, 'w')
-        self.indent_ = 0
-    def __del__(self):
-        self.fout_.close()
-    def out(self, data, new_line=False):
-        """write data"""
-        if new_line:
-            self.fout_.write("\n")
-            for i in range(0, self.indent_):
-                self.fout_.write('    ')
-        if isinstance(data, str):
-            self.fout_.write(data)
-        else:
-            self.fout_.write(str(data))
-    def null_line(self):
-        """add null line"""
-        self.fout_.write("\n")
-    def close(self):
-        """close file"""
-        self.fout_.close()
-
-def get_input(desc):
-    """get input values"""
-    value = desc.get('value', None)
-    return value if value is not None else desc['tensor_name']
-
-def sum_str(inputs, output, attr):
-    """gen sum string"""
-    if attr[0]['value'] == []:
-        s = "%s = np.sum(%s, keepdims=%s)" % (output[0]['tensor_name'], get_input(inputs[0][0]), attr[1]['value'])
-    else:
-        s = "%s = np.sum(%s, axis=tuple(%s), keepdims=%s); %s = np.reshape(%s, %s)" %\
-            (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value'], attr[1]['value'],
-             output[0]['tensor_name'], output[0]['tensor_name'], output[0]['shape'])
-    return s
 
 
 def trans_data_two2fractal(input_, src_format, dst_format):
@@ -120,115 +81,276 @@ def trans_data_fractal2two(input_, src_format, dst_format, shape_origin):
     return bench_mark
 
 
-def trans_data_dsl(inputs, output, attr):
+def reduce_sum(inputs, attr, output):
+    if attr[0]['value'] == []:
+        return np.sum(inputs[0], keepdims=attr[1]['value'])
+    res = np.sum(inputs[0], axis=tuple(attr[0]['value']), keepdims=attr[1]['value'])
+    return np.reshape(res, output[0]['shape'])
+
+
+def trans_data(inputs, attr, output):
     src_format = attr[0]['value']
     dst_format = attr[1]['value']
+    if src_format == 'DefaultFormat' and dst_format == 'FRACTAL_NZ':
+        return trans_data_two2fractal(inputs[0], src_format, dst_format)
+    if src_format == 'FRACTAL_NZ' and dst_format == 'DefaultFormat':
+        return trans_data_fractal2two(inputs[0], src_format, dst_format, attr[2]['value'])
+    raise ValueError("src_format %s and dst_format %s is not supported!" % (src_format, dst_format))
 
-    support_formats = [("DefaultFormat", "FRACTAL_NZ"),
-                       ("FRACTAL_NZ", "DefaultFormat")]
 
-    if (src_format, dst_format) not in support_formats:
-        raise ValueError("src_format %s and dst_format %s is not supported!" %
-                         (src_format, dst_format))
+# ops of one elementwise ufunc
+ufunc_ops = {
+    "Mul": np.multiply,
+    "Pow": np.power,
+    "Sub": np.subtract,
+    "TensorAdd": np.add,
+    "Neg": np.negative,
+    "Exp": np.exp,
+    "RealDiv": np.divide,
+    "Minimum": np.minimum,
+    "Maximum": np.maximum,
+    "Log": np.log,
+    "Sqrt": np.sqrt,
+    "Abs": np.absolute,
+    "Equal": np.equal,
+    "GreaterEqual": np.greater_equal,
+    "Greater": np.greater,
+    "LessEqual": np.less_equal,
+}
+# ufuncs whose result has the dtype of their float inputs, so that they can write into an input buffer
+inplace_ufuncs = (np.multiply, np.power, np.subtract, np.add, np.negative, np.exp, np.divide, np.minimum,
+                  np.maximum, np.log, np.sqrt, np.absolute)
 
-    if src_format == 'DefaultFormat' and dst_format == 'FRACTAL_NZ':
-        res = "%s \n%s = %s(%s, '%s', '%s')" % (inspect.getsource(trans_data_two2fractal),
-              output[0]['tensor_name'], trans_data_two2fractal.__name__, get_input(inputs[0][0]),
-              attr[0]['value'], attr[1]['value'])
-    elif src_format == 'FRACTAL_NZ' and dst_format == 'DefaultFormat':
-        res = "%s \n%s = %s(%s, '%s', '%s', %s)" % (inspect.getsource(trans_data_fractal2two),
-              output[0]['tensor_name'], trans_data_fractal2two.__name__, get_input(inputs[0][0]),
-              attr[0]['value'], attr[1]['value'], attr[2]['value'])
-    return res
-
-
-op_dsl = {
-    "ReduceSum" : lambda inputs, output, attr: sum_str(inputs, output, attr),
-    "Mul" : lambda inputs, output, attr: "%s = np.multiply(%s, %s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Pow" : lambda inputs, output, attr: "%s = np.power(%s, %s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Sub" : lambda inputs, output, attr: "%s = np.subtract(%s, %s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "TensorAdd" : lambda inputs, output, attr: "%s = np.add(%s, %s)" %
-                  (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Rsqrt" : lambda inputs, output, attr: "%s = 1.0/np.sqrt(%s)" %
-              (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "Neg" : lambda inputs, output, attr: "%s = np.negative(%s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "Exp" : lambda inputs, output, attr: "%s = np.exp(%s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "RealDiv" : lambda inputs, output, attr: "%s = np.divide(%s, %s)" %
-                (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Minimum" : lambda inputs, output, attr: "%s = np.minimum(%s, %s)" %
-                (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Maximum" : lambda inputs, output, attr: "%s = np.maximum(%s, %s)" %
-                (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Log" : lambda inputs, output, attr: "%s = np.log(%s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "Sqrt" : lambda inputs, output, attr: "%s = np.sqrt(%s)" %
-             (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "Cast" : lambda inputs, output, attr: "%s = %s.astype(np.%s)" %
-             (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value']),
-    "Reshape" : lambda inputs, output, attr: "%s = np.reshape(%s, %s)" %
-                (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value']),
-    "ReduceMax" : lambda inputs, output, attr: "%s = np.max(%s, %s[0], keepdims=%s)" %
-                  (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value'], attr[1]['value']),
-    "ReduceMin" : lambda inputs, output, attr: "%s = np.min(%s, %s[0], keepdims=%s)" %
-                  (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value'], attr[1]['value']),
-    "OneHot" : lambda inputs, output, attr: "%s = np.one_hot(%s, %s, %s, %s, %s, %s)" %
-               (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0]), get_input(inputs[2][0]),
-                attr[0]['value'], attr[1]['value'], inputs[0][0]['data_type']),
-    "ZerosLike" : lambda inputs, output, attr: "%s = np.zeros_like(%s)" %
-                  (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "AddN" : lambda inputs, output, attr: "%s = %s" %
-             (output[0]['tensor_name'], ' + '.join([get_input(inputs[0][i]) for i in range(0, len(inputs[0]))])),
-    "Tile" : lambda inputs, output, attr: "%s = np.tile(%s, %s)" %
-             (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value']),
-    "Reciprocal" : lambda inputs, output, attr: "%s = np.divide(1.0, %s)" %
-                   (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "Equal" : lambda inputs, output, attr: "%s = np.equal(%s, %s)" %
-              (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "GreaterEqual" : lambda inputs, output, attr: "%s = np.greater_equal(%s, %s)" %
-                     (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "Select" : lambda inputs, output, attr: "%s = np.where(%s, %s, %s)" %
-               (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0]), get_input(inputs[2][0])),
-    "InplaceAssign" : lambda inputs, output, attr: "%s = %s; %s = %s" %
-                      (get_input(inputs[0][0]), get_input(inputs[1][0]),
-                       output[0]['tensor_name'], get_input(inputs[2][0])),
-    "Greater" : lambda inputs, output, attr: "%s = np.greater(%s, %s)" %
-                (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "SelectGT" : lambda inputs, output, attr: "%s = np.where(%s > %s, %s, %s)" %
-                 (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0]),
-                  get_input(inputs[2][0]), get_input(inputs[3][0])),
-    "SelectLT" : lambda inputs, output, attr: "%s = np.where(%s < %s, %s, %s)" %
-                 (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0]),
-                  get_input(inputs[2][0]), get_input(inputs[3][0])),
-    "Abs" : lambda inputs, output, attr: "%s = np.absolute(%s)" %
-            (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "LessEqual" : lambda inputs, output, attr: "%s = np.less_equal(%s, %s)" %
-                     (output[0]['tensor_name'], get_input(inputs[0][0]), get_input(inputs[1][0])),
-    "EquivFormat" : lambda inputs, output, attr: "%s = %s" %
-                    (output[0]['tensor_name'], get_input(inputs[0][0])),
-    "ExpandDims" : lambda inputs, output, attr: "%s = np.expand_dims(%s, %s)" %
-                   (output[0]['tensor_name'], get_input(inputs[0][0]), attr[0]['value']),
-    "TransData" : trans_data_dsl,
+# other ops, as function(inputs, attr, output_desc), and whether they return a new array rather than a view
+op_funcs = {
+    "ReduceSum": (reduce_sum, True),
+    "Cast": (lambda inputs, attr, output: inputs[0].astype(attr[0]['value']), True),
+    "Reshape": (lambda inputs, attr, output: np.reshape(inputs[0], attr[0]['value']), False),
+    "ReduceMax": (lambda inputs, attr, output: np.max(inputs[0], attr[0]['value'][0], keepdims=attr[1]['value']),
+                  True),
+    "ReduceMin": (lambda inputs, attr, output: np.min(inputs[0], attr[0]['value'][0], keepdims=attr[1]['value']),
+                  True),
+    "ZerosLike": (lambda inputs, attr, output: np.zeros_like(inputs[0]), True),
+    "Tile": (lambda inputs, attr, output: np.tile(inputs[0], attr[0]['value']), True),
+    "Select": (lambda inputs, attr, output: np.where(inputs[0], inputs[1], inputs[2]), True),
+    "SelectGT": (lambda inputs, attr, output: np.where(inputs[0] > inputs[1], inputs[2], inputs[3]), True),
+    "SelectLT": (lambda inputs, attr, output: np.where(inputs[0] < inputs[1], inputs[2], inputs[3]), True),
+    "EquivFormat": (lambda inputs, attr, output: inputs[0], False),
+    "ExpandDims": (lambda inputs, attr, output: np.expand_dims(inputs[0], attr[0]['value']), False),
+    "TransData": (trans_data, False),
 }
 
+
+class _Step:
+    """one call of the plan: args are ('slot', index) or ('const', value)"""
+    __slots__ = ("func", "ufunc", "args", "attr", "output", "out", "reuse", "free")
+
+    def __init__(self, args, out, func=None, ufunc=None, attr=None, output=None):
+        self.func = func
+        self.ufunc = ufunc
+        self.args = args
+        self.attr = attr
+        self.output = output
+        self.out = out
+        # slots whose buffer may be overwritten by the ufunc, and slots released after the step
+        self.reuse = []
+        self.free = []
+
+
+def _can_write(buf, args):
+    """whether an elementwise ufunc of args can write its result into buf"""
+    if not isinstance(buf, np.ndarray) or buf.dtype.kind != 'f' or not buf.flags.writeable:
+        return False
+    shapes = []
+    for arg in args:
+        if isinstance(arg, np.ndarray):
+            if arg.dtype != buf.dtype:
+                return False
+            shapes.append(arg.shape)
+        elif not isinstance(arg, (int, float)) or isinstance(arg, (bool, np.generic)):
+            return False
+    try:
+        return np.broadcast_shapes(*shapes) == buf.shape
+    except ValueError:
+        return False
+
+
+class JsonRefPlan:
+    """
+    Reference evaluator of a composite json, computing the expected outputs with numpy.
+
+    The op_desc is walked once into a list of numpy calls on slots. Every assignment of a tensor name gets its own
+    slot, so InplaceAssign rebinding names is resolved when planning. Slots are released after their last use, and
+    elementwise ufuncs write into the buffer of an intermediate which is not used afterwards. The plan does not
+    change its inputs and can be run on any number of inputs.
+
+    Args:
+        desc (dict): composite json.
+    """
+
+    def __init__(self, desc):
+        self.input_names = [input_desc[0]["tensor_name"] for input_desc in desc["input_desc"]]
+        self.steps = []
+        self.slot_num = 0
+        # root slot of every slot, a view shares the root of the slot it is taken from
+        self._root = []
+        self._fresh = []
+        # tensor name -> its current value, ('slot', index) or ('const', value)
+        names = {}
+        for name in self.input_names:
+            names[name] = ('slot', self._new_slot(None, False))
+        self.input_slots = [names[name][1] for name in self.input_names]
+
+        for op in desc["op_desc"]:
+            self._add_op(op, names)
+
+        self.outputs = []
+        for output_desc in desc["output_desc"]:
+            name = output_desc["tensor_name"]
+            if name not in names:
+                raise ValueError("output %s of composite json is not computed" % name)
+            self.outputs.append(names[name])
+        self._plan_buffers()
+
+    def _new_slot(self, root, fresh):
+        slot = self.slot_num
+        self.slot_num += 1
+        self._root.append(slot if root is None else root)
+        self._fresh.append(fresh)
+        return slot
+
+    @staticmethod
+    def _arg(desc, names, op):
+        if desc.get('value', None) is not None:
+            return ('const', desc['value'])
+        if desc['tensor_name'] not in names:
+            raise ValueError("input %s of op %s is not computed" % (desc['tensor_name'], op["name"]))
+        return names[desc['tensor_name']]
+
+    def _add_op(self, op, names):
+        inputs = op["input_desc"]
+        output = op["output_desc"]
+        name = op["name"]
+        if name == "InplaceAssign":
+            # in the reference, the assigned input takes the value, and the output is the third input
+            names[inputs[0][0]['tensor_name']] = self._arg(inputs[1][0], names, op)
+            names[output[0]['tensor_name']] = self._arg(inputs[2][0], names, op)
+            return
+        if name == "AddN":
+            args = [self._arg(desc, names, op) for desc in inputs[0]]
+            res = args[0]
+            for arg in args[1:]:
+                res = self._add_ufunc(np.add, [res, arg])
+            names[output[0]['tensor_name']] = res
+            return
+        if name == "Rsqrt":
+            sqrt = self._add_ufunc(np.sqrt, [self._arg(inputs[0][0], names, op)])
+            names[output[0]['tensor_name']] = self._add_ufunc(np.divide, [('const', 1.0), sqrt])
+            return
+        if name == "Reciprocal":
+            names[output[0]['tensor_name']] = self._add_ufunc(
+                np.divide, [('const', 1.0), self._arg(inputs[0][0], names, op)])
+            return
+        if name in ufunc_ops:
+            args = [self._arg(desc[0], names, op) for desc in inputs]
+            names[output[0]['tensor_name']] = self._add_ufunc(ufunc_ops[name], args)
+            return
+        if name in op_funcs:
+            func, fresh = op_funcs[name]
+            args = [self._arg(desc[0], names, op) for desc in inputs]
+            root = None if fresh else self._root[args[0][1]] if args[0][0] == 'slot' else None
+            out = self._new_slot(root, fresh)
+            self.steps.append(_Step(args, out, func=func, attr=op['attr'], output=output))
+            names[output[0]['tensor_name']] = ('slot', out)
+            return
+        logging.info("[%s] is not support for %s", name, op)
+
+    def _add_ufunc(self, ufunc, args):
+        out = self._new_slot(None, True)
+        self.steps.append(_Step(args, out, ufunc=ufunc))
+        return ('slot', out)
+
+    def _plan_buffers(self):
+        """find the last use of every slot and root, and the buffers that ufuncs can write into"""
+        end = len(self.steps)
+        last_use = {}
+        root_last_use = {}
+        for i, step in enumerate(self.steps):
+            last_use[step.out] = i
+            root_last_use[self._root[step.out]] = max(root_last_use.get(self._root[step.out], i), i)
+            for kind, slot in step.args:
+                if kind == 'slot':
+                    last_use[slot] = i
+                    root_last_use[self._root[slot]] = i
+        for kind, slot in self.outputs:
+            if kind != 'slot':
+                continue
+            last_use[slot] = end
+            root_last_use[self._root[slot]] = end
+
+        for i, step in enumerate(self.steps):
+            for slot in {slot for kind, slot in step.args if kind == 'slot'} | {step.out}:
+                if last_use.get(slot) == i:
+                    step.free.append(slot)
+            if step.ufunc is None or step.ufunc not in inplace_ufuncs:
+                continue
+            for kind, slot in step.args:
+                root = self._root[slot] if kind == 'slot' else None
+                if root is not None and self._fresh[root] and root_last_use[root] == i and slot not in step.reuse:
+                    step.reuse.append(slot)
+
+    def run(self, inputs):
+        """
+        Compute the expected outputs.
+
+        Args:
+            inputs (list): numpy arrays of the inputs, in the order of input_desc.
+
+        Returns:
+            list of numpy arrays.
+        """
+        env = [None] * self.slot_num
+        for slot, value in zip(self.input_slots, inputs):
+            env[slot] = value
+        for step in self.steps:
+            args = [env[value] if kind == 'slot' else value for kind, value in step.args]
+            if step.ufunc is not None:
+                out = next((env[slot] for slot in step.reuse if _can_write(env[slot], args)), None)
+                res = step.ufunc(*args) if out is None else step.ufunc(*args, out=out)
+            else:
+                res = step.func(args, step.attr, step.output)
+            env[step.out] = res
+            for slot in step.free:
+                env[slot] = None
+        expect = []
+        for kind, value in self.outputs:
+            if kind == 'const':
+                expect.append(value)
+            elif self._root[value] in self.input_slots:
+                # outputs which are views of inputs are copied, as the kernel may write into its inputs
+                expect.append(np.array(env[value]))
+            else:
+                expect.append(env[value])
+        return expect
+
+
+@functools.lru_cache(maxsize=64)
+def get_json_ref_plan(op_desc):
+    """the reference plan of a composite json string, cached so that it is planned once"""
+    return JsonRefPlan(json.loads(op_desc))
+
+
 def gen_json_data(op_desc):
     """Generating test data for composite json"""
     desc = json.loads(op_desc)
     input_for_mod = []
-    input_dict = {}
     input_order = {}
     inplace_assign_dict = {}
     output_indexes = []
-    expect = []
     with_inplace_assign = False
     if isinstance(desc["op"], str) and desc["op"].startswith("Fused_LambUpdateWithLR"):
         with_inplace_assign = True
 
-    p = CodePrinter('json_data.py')
     idx = 0
     for input_desc in desc["input_desc"]:
         shape = [1] if not input_desc[0]["shape"] else input_desc[0]["shape"]
@@ -238,25 +360,15 @@ def gen_json_data(op_desc):
         tensor_name = input_desc[0]["tensor_name"]
         input_order[tensor_name] = idx
         idx += 1
-        input_dict[tensor_name] = item
-        p.out(tensor_name)
-        p.out(" = np.array(input_dict.get(\"")
-        p.out(tensor_name)
-        p.out("\"))")
-        p.null_line()
-
-    for op in desc["op_desc"]:
-        dsl_fun = op_dsl.get(op["name"], None)
-        if op["name"] == "InplaceAssign" and with_inplace_assign:
-            out_name = op["output_desc"][0]["tensor_name"]
-            in_name = op["input_desc"][0][0]["tensor_name"]
-            inplace_assign_dict[out_name] = in_name
-        if dsl_fun is None:
-            logging.info("[%s] is not support for %s", op["name"], op)
-            continue
-        sent = dsl_fun(op['input_desc'], op['output_desc'], op['attr'])
-        logging.debug(sent)
-        p.out(sent, True)
+
+    if with_inplace_assign:
+        for op in desc["op_desc"]:
+            if op["name"] == "InplaceAssign":
+                out_name = op["output_desc"][0]["tensor_name"]
+                in_name = op["input_desc"][0][0]["tensor_name"]
+                inplace_assign_dict[out_name] = in_name
+
+    expect = get_json_ref_plan(op_desc).run(input_for_mod)
 
     idx = 0
     inplace_assign_num = 0
@@ -277,18 +389,10 @@ def gen_json_data(op_desc):
             real_idx = idx - out_nums
         output_indexes.append(real_idx)
         idx += 1
-        p.out("expect.append(", True)
-        p.out(tensor_name)
-        p.out(")")
-    p.close()
     # offset of inplace assign index
     if inplace_assign_num > 0:
         for i in range(len(output_indexes)):
             if i > inplace_assign_idx and output_indexes[i] < 0:
                 output_indexes[i] -= inplace_assign_num
 
-    with open("json_data.py", 'r') as f:
-        sent = f.read()
-    exec(sent)
-
     return input_for_mod, expect, output_indexes
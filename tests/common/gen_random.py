@@ -12,57 +12,160 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+
 """generate gaussian random array"""
 
 import numpy as np
 import os
-import random
 import logging
 import sys
-import time
 import functools
-from multiprocessing import Pool
-from itertools import repeat
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from akg.utils.kernel_exec import func_time_required
 from akg.utils.kernel_exec import get_profiling_mode
 
-RANDOM_SEED_NUM = 20
 PROF_ERROR_CODE = 9999999999
+# elements generated by one task of the pool, every block has its own random stream spawned from the seed, so the
+# data of a seed does not depend on the number of threads
+RANDOM_BLOCK_SIZE = 1 << 20
+RANDOM_THREAD_NUM = 8
+RANDOM_DISTRIBUTIONS = ("normal", "logistic", "laplace", "uniform", "integers")
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _get_pool():
+    """thread pool shared by the calls of random_gaussian, numpy releases the GIL while filling the blocks"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=RANDOM_THREAD_NUM)
+        return _pool
+
+
+def _reset_pool_in_child():
+    """the threads of the pool do not survive fork, so a forked child creates its own pool"""
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = Lock()
+
 
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_in_child)
 
-def func(size_, miu_=0, sigma_=8, seed_=None):
+
+def _fill_block(block, seed_seq, distribution, miu, sigma):
+    """fill block in place with the distribution, generated by the random stream of seed_seq"""
+    rng = np.random.Generator(np.random.PCG64(seed_seq))
+    if distribution == "normal":
+        rng.standard_normal(out=block)
+        block *= sigma
+        block += miu
+    elif distribution == "uniform":
+        rng.random(out=block)
+        block *= sigma - miu
+        block += miu
+    elif distribution == "logistic":
+        block[:] = rng.logistic(miu, sigma, block.size)
+    elif distribution == "laplace":
+        block[:] = rng.laplace(miu, sigma, block.size)
+    else:
+        block[:] = rng.integers(0, np.iinfo(np.int64).max, block.size, endpoint=True)
+
+
+def gen_random_data(size_c, miu=0, sigma=8, seed=None, distribution="normal"):
     """
-    Select random func according to RANDOM_FUNC_MODE and randint, calculated by the length of the random_func_list.
+    Generate a flat random array, block by block in the shared thread pool.
 
     Args:
-        size_ (int): Size of data.
-        miu_ (int): Mean value. Default: 0.
-        sigma_ (int): Standard deviation. Default: 8.
-        seed_ (int): seed for random.
+        size_c (int): Number of elements.
+        miu (int): Mean value. Default: 0.
+        sigma (int): Standard deviation. Default: 8.
+        seed (int): seed for random, fresh entropy if None.
+        distribution (str): one of RANDOM_DISTRIBUTIONS.
 
     Returns:
-        Random func, from random_func_list.
+        numpy array of float64.
     """
-    size_ = (size_ + RANDOM_SEED_NUM - 1) // RANDOM_SEED_NUM
-    random_func_list = [
-        np.random.RandomState(seed_).normal(miu_, sigma_, size_),
-        np.random.RandomState(seed_).logistic(miu_, sigma_, size_),
-        np.random.RandomState(seed_).laplace(miu_, sigma_, size_),
-        np.random.RandomState(seed_).uniform(miu_, sigma_, size_),
-        np.random.RandomState(seed_).tomaxint(size_),
-    ]
-    env_dic = os.environ
-    if not env_dic.get('RANDOM_FUNC_MODE'):
-        func_idx = 0
+    seed_seq = np.random.SeedSequence(seed)
+    logging.debug("random_gaussian entropy: %s", str(seed_seq.entropy))
+    data = np.empty(size_c, dtype=np.float64)
+    block_num = max(1, (size_c + RANDOM_BLOCK_SIZE - 1) // RANDOM_BLOCK_SIZE)
+    blocks = [(data[i * RANDOM_BLOCK_SIZE:(i + 1) * RANDOM_BLOCK_SIZE], s)
+              for i, s in enumerate(seed_seq.spawn(block_num))]
+    # In the profiling scenario, data generated by multiple workers stops responding, so blocks are filled serially.
+    if block_num == 1 or get_profiling_mode():
+        for block, s in blocks:
+            _fill_block(block, s, distribution, miu, sigma)
     else:
-        func_idx = np.random.RandomState(None).randint(len(random_func_list))
-    res = random_func_list[func_idx]
-    return res
+        futures = [_get_pool().submit(_fill_block, block, s, distribution, miu, sigma) for block, s in blocks]
+        for future in futures:
+            future.result()
+    return data
+
+
+def _select_distribution():
+    """normal distribution, or a random one of RANDOM_DISTRIBUTIONS if RANDOM_FUNC_MODE is set"""
+    if not os.environ.get('RANDOM_FUNC_MODE'):
+        return "normal"
+    return RANDOM_DISTRIBUTIONS[np.random.randint(len(RANDOM_DISTRIBUTIONS))]
+
+
+def _cache_path(cache_dir, size, dtype, miu, sigma, seed):
+    key = "%s_%s_%s_%s_%s" % ("x".join(str(x) for x in size), np.dtype(dtype).name, str(miu), str(sigma), str(seed))
+    return os.path.join(cache_dir, "random_%s.npy" % hashlib.md5(key.encode()).hexdigest())
+
+
+def _load_cache(path, size, dtype):
+    """the cached data as a copy-on-write memmap, None if not cached"""
+    try:
+        data = np.load(path, mmap_mode='c')
+    except (OSError, ValueError):
+        return None
+    if data.shape != tuple(size) or data.dtype != dtype:
+        logging.warning("random data cache %s does not match shape %s dtype %s", path, str(size), str(dtype))
+        return None
+    return data
+
+
+def _save_cache(path, data):
+    """write data to the cache by a temp file and rename, so that concurrent readers never see a partial file"""
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cache = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=data.dtype, shape=data.shape)
+        cache[...] = data
+        cache.flush()
+        del cache
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning("failed to cache random data to %s: %s", path, str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 @func_time_required
-def random_gaussian(size, miu=0, sigma=8, epsilon=0, seed=None):
-    """Generate random array with absolution value obeys gaussian distribution."""
+def random_gaussian(size, miu=0, sigma=8, epsilon=0, seed=None, dtype=None):
+    """
+    Generate random array with absolution value obeys gaussian distribution.
+
+    If seed is given and RANDOM_DATA_CACHE_DIR is set, the data is cached in that directory, keyed by
+    (size, dtype, miu, sigma, seed), and later calls map the cached file instead of generating it again.
+
+    Args:
+        size (Union[list, tuple]): shape of data.
+        miu (int): Mean value. Default: 0.
+        sigma (int): Standard deviation. Default: 8.
+        epsilon (float): added to the data.
+        seed (int): seed for random, the data is not reproducible if None.
+        dtype: dtype of data, float64 if None.
+
+    Returns:
+        numpy array.
+    """
     random_data_disk_path = None
     if os.environ.get("RANDOM_DATA_DISK_PATH") is not None:
         random_data_disk_path = os.environ.get("RANDOM_DATA_DISK_PATH") + "/random_data_%s_%s.bin" % (str(miu), str(sigma))
@@ -71,31 +174,27 @@ def random_gaussian(size, miu=0, sigma=8, epsilon=0, seed=None):
         if sigma <= 0:
             sys.stderr.write("Error: Expect positive sigmal for gaussian distribution. but get %f\n" % sigma)
             sys.exit(1)
+        size = tuple(size)
         size_c = 1
         for x in size:
             size_c = size_c * x
+        dtype = np.dtype(np.float64 if dtype is None else dtype)
+
+        distribution = _select_distribution()
+        cache_path = None
+        cache_dir = os.environ.get("RANDOM_DATA_CACHE_DIR")
+        if cache_dir and seed is not None and distribution == "normal":
+            cache_path = _cache_path(cache_dir, size, dtype, miu, sigma, seed)
+            ret = _load_cache(cache_path, size, dtype)
+            if ret is not None:
+                return ret + epsilon if epsilon else ret
 
-        if seed is None:
-            seed_ = []
-            for i in range(RANDOM_SEED_NUM):
-                now = int(time.time() % 10000 * 10000) + random.randint(i, 100)
-                seed_.append(now)
-        else:
-            seed_ = [seed] * RANDOM_SEED_NUM
-        logging.debug("random_gaussian seeds: {}".format(seed_))
-        # In the profiling scenario, when a new process is used to run test cases, data generated by multiple processes
-        # stops responding. To locate the fault, please set this parameter gen_data_multi_process to False.
-        gen_data_multi_process = not bool(get_profiling_mode())
-        if gen_data_multi_process:
-            with Pool(processes=8) as pool:
-                ret = np.array(pool.starmap(func, zip(repeat(size_c), repeat(miu), repeat(sigma), seed_)))
-        else:
-            numbers = list()
-            for s in seed_:
-                numbers.extend(func(size_c, miu, sigma, s))
-            ret = np.array(numbers)
-        ret = ret.flatten()
-        return ret[:size_c].reshape(size) + epsilon
+        ret = gen_random_data(size_c, miu, sigma, seed, distribution).reshape(size)
+        if ret.dtype != dtype:
+            ret = ret.astype(dtype)
+        if cache_path is not None:
+            _save_cache(cache_path, ret)
+        return ret + epsilon if epsilon else ret
 
     data_len = functools.reduce(lambda x, y: x * y, size)
     data_pool = np.fromfile(random_data_disk_path)
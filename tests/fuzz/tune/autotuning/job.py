@@ -24,11 +24,15 @@ import numpy as np
 from collections import namedtuple
 from akg import composite
 from akg.utils import kernel_exec as utils
+from akg.utils.tiling_space import TilingSpace
+from akg.utils.tuning_db import get_tuning_db
+from akg.utils import custom_tiling as ct_util
+from akg.composite.build_module import tuning_db_key
 from autotuning.runner import KernelRunner, error_time_list, error_time_string
 from autotuning.tuner import ModelBasedTuner, Tuner
 from autotuning.type_definitions import ConvDesc, ConvBackpropDesc, MatmulCubeDesc
 from autotuning.space_generators import get_space
-from autotuning.space import ListConfigSpace
+from autotuning.space import ArrayConfigSpace, LazyConfigSpace
 from autotuning.test_data_generators import gen_data
 
 logging.basicConfig(level=logging.DEBUG)
@@ -47,21 +51,24 @@ def launch_json(debug_mode: bool = True, save_res: bool = False, json_input_dir=
         with open(json_dir + '/' + input_file, 'r') as f:
             json_input = f.read()
         json_content = json.loads(json_input)
+        db_key = tuning_db_key(json_content)
         for input_desc in json_content["input_desc"]:
             if input_desc[0]["shape"] == []:
                 input_desc[0]["shape"] = [1]
         json_input = json.dumps(json_content)
-        space_res = composite.get_tiling_space(json_input, 2)
+        space_res = composite.get_tiling_space(json_input, 2, {"lazy_tiling_space": True})
         index_table = space_res['index']
         tiling_spaces = space_res['tuning_space']
         if not tiling_spaces:
             raise RuntimeError('empty tiling spaces')
         dim_names = ['tiling_' + str(i) for i in range(len(tiling_spaces[0]))]
         input_type = namedtuple("json", dim_names)
-        space = ListConfigSpace(input_type)
-        for tiling_space in tiling_spaces:
-            config = input_type(*tiling_space)
-            space.add(config)
+        if isinstance(tiling_spaces, TilingSpace):
+            space = LazyConfigSpace(input_type, tiling_spaces)
+        else:
+            space = ArrayConfigSpace(input_type, tiling_spaces)
+        if 'l1_range' in space_res and 'l0_range' in space_res:
+            space.tile_ranges = (space_res['l1_range'], space_res['l0_range'])
         key = json_content["op"]
         input_for_mod, expect = gen_data(op_type="json", op_desc=json_input)
 
@@ -75,23 +82,26 @@ def launch_json(debug_mode: bool = True, save_res: bool = False, json_input_dir=
                 output_para.append(i - len(json_content["output_desc"]))
         runner = KernelRunner(op_type="json", op_desc=json_input, index_table=index_table, input_data=input_for_mod,
                             expect=expect, mod_output_param=output_para, timeout=180, repeat_times=1)
+        try:
+            # we can only get a valid tiling, or accurate get cycles
+            is_truly_profiling = utils.get_profiling_mode()
 
-        # we can only get a valid tiling, or accurate get cycles
-        is_truly_profiling = utils.get_profiling_mode()
+            # available device numbers, normally is 8 or 1
+            available_device_numbers = utils.get_available_devices_num()
 
-        # available device numbers, normally is 8 or 1
-        available_device_numbers = utils.get_available_devices_num()
-
-        tuner = ModelBasedTuner(runner, index_table, space,
-                                n_parallel=available_device_numbers if is_truly_profiling else 1,
-                                plan_size=64, pre_model=None)
-        least_try_times = iter_times[0 if space.length < 10 ** 4 else 1 if space.length < 10 ** 5 else 2]
-        tuner.tune(least_try_times, output_file="json.log")
+            tuner = ModelBasedTuner(runner, index_table, space,
+                                    n_parallel=available_device_numbers if is_truly_profiling else 1,
+                                    plan_size=64, pre_model=None)
+            least_try_times = iter_times[0 if space.length < 10 ** 4 else 1 if space.length < 10 ** 5 else 2]
+            tuner.tune(least_try_times, output_file="json.log")
+        finally:
+            # stop the compile workers even if tuning fails
+            runner.close()
 
         print_tuning_result("json", space, index_table, tuner, key)
 
         if save_res:
-            save_tuning_result(key, "json", None, index_table, tuner)
+            save_tuning_result(key, "json", None, index_table, tuner, db_key)
 
 def jobs(op_type: str = 'add', desc=None, debug_mode: bool = True, save_res: bool = False,
          all_space: bool = True, insert_key='', conf_of_set_dim=""):
@@ -120,29 +130,32 @@ def jobs(op_type: str = 'add', desc=None, debug_mode: bool = True, save_res: boo
         input_for_mod, output_para = input_for_mod['args'], input_for_mod['outputs']
     runner = KernelRunner(op_type, desc, index_table, input_data=input_for_mod,
                           expect=expect, mod_output_param=output_para, timeout=180, repeat_times=1)
+    try:
+        # we can only get a valid tiling, or accurate get cycles
+        is_truly_profiling = utils.get_profiling_mode()
 
-    # we can only get a valid tiling, or accurate get cycles
-    is_truly_profiling = utils.get_profiling_mode()
-
-    # available device numbers, normally is 8 or 1
-    available_device_numbers = utils.get_available_devices_num()
+        # available device numbers, normally is 8 or 1
+        available_device_numbers = utils.get_available_devices_num()
 
-    time_start_tuning = time.time()
-    if all_space:
-        tuner = Tuner(runner, index_table, space, n_parallel=available_device_numbers)
-    else:
-        tuner = ModelBasedTuner(runner, index_table, space,
-                                n_parallel=available_device_numbers if is_truly_profiling else 1,
-                                plan_size=64, pre_model=None)
-    least_try_times = iter_times[0 if space.length < 10 ** 4 else 1 if space.length < 10 ** 5 else 2]
-    tuner.tune(least_try_times, output_file=op_type + ".log")
+        time_start_tuning = time.time()
+        if all_space:
+            tuner = Tuner(runner, index_table, space, n_parallel=available_device_numbers)
+        else:
+            tuner = ModelBasedTuner(runner, index_table, space,
+                                    n_parallel=available_device_numbers if is_truly_profiling else 1,
+                                    plan_size=64, pre_model=None)
+        least_try_times = iter_times[0 if space.length < 10 ** 4 else 1 if space.length < 10 ** 5 else 2]
+        tuner.tune(least_try_times, output_file=op_type + ".log")
+    finally:
+        # stop the compile workers even if tuning fails
+        runner.close()
 
     time_end_tuning = time.time()
     print("tuning time: ", time_end_tuning - time_start_tuning)
     print_tuning_result(op_type, space, index_table, tuner, key)
 
     if save_res:
-        save_tuning_result(key, op_type, desc, index_table, tuner)
+        save_tuning_result(key, op_type, desc, index_table, tuner, space.tuning_db_key)
 
 
 def print_tuning_result(op_type, space, index_table, tuner, key):
@@ -160,8 +173,8 @@ def print_tuning_result(op_type, space, index_table, tuner, key):
         print(space.get(x), y if y not in error_time_string.keys() else error_time_string[y])
 
 
-def save_tuning_result(key, op_type, desc, index_table, tuner):
-    """save tuning result"""
+def save_tuning_result(key, op_type, desc, index_table, tuner, db_key=None):
+    """save tuning result, and record it into tuning database if db_key of the kernel is given"""
     if tuner.best_config is not None and tuner.best_time not in error_time_list:
         set_dim_configs = tuner.best_config.input
         if op_type == "matmul":
@@ -227,6 +240,11 @@ def save_tuning_result(key, op_type, desc, index_table, tuner):
                   "date": str(datetime.datetime.now()),
                   }
         tuner.export_dim_configs(config, json_file.format(op_type), False, str(key))
+        db = get_tuning_db()
+        if db is not None and db_key is not None and tiling_param:
+            family, db_key, shape = db_key
+            db.record(family, db_key, shape, ct_util.set_dims(tuple(tiling_param)),
+                      cycles=tuner.best_time, original=tuner.original_time)
 
 
 def load_json_configs(op_type):
@@ -256,12 +256,14 @@ def gen_kernel_for_vector(op_desc, _, index_table=None, config: NamedTuple = Non
     if 'attrs' in kwargs.keys():
         kwargs['attrs']['dim'] = attrs['dim']
         kwargs['attrs']['tuning'] = gen_tiling_spaces
+        kwargs['attrs']['lazy_tiling_space'] = gen_tiling_spaces
         kwargs['attrs']['kernel_name'] = kernel_name
     else:
         for _, arg_ in enumerate(args):
             if isinstance(arg_, dict):
                 arg_['dim'] = attrs['dim']
                 arg_['tuning'] = gen_tiling_spaces
+                arg_['lazy_tiling_space'] = gen_tiling_spaces
                 arg_['kernel_name'] = kernel_name
                 break
     try:
@@ -17,13 +17,18 @@ import time
 import multiprocessing
 import logging
 import os
-import subprocess
-import time
+import json
+import queue
+import shutil
+import tempfile
+from collections import namedtuple
 from typing import NamedTuple
 import numpy as np
+import akg.tvm
 from akg import composite
 from akg.utils import custom_tiling as ct_util
 from akg.utils import kernel_exec as utils
+from akg.backend import csim
 from .kernel_compiler import compile_kernel
 from .test_data_generators import gen_data
 
@@ -48,11 +53,97 @@ precision_error_time = error_time_list[1]
 compile_fail_time = error_time_list[2]
 timeout_time = error_time_list[3]
 
+# runtime modes which simulate the kernel in-process from a shared library built with the module
+CSIM_MODES = ("csim", "ccesim")
+
+
+def _pack_config(config_input):
+    """config types are made by namedtuple at runtime and cannot be pickled, so send them as plain values"""
+    if config_input is None:
+        return None
+    return type(config_input).__name__, config_input._fields, tuple(config_input)
+
+
+def _unpack_config(config_param):
+    if config_param is None:
+        return None
+    name, fields, values = config_param
+    return namedtuple(name, fields)(*values)
+
+
+def _csim_kernel_path(mod_path):
+    return os.path.splitext(mod_path)[0] + ".csim.so"
+
+
+def _compile_worker(op_type, op_desc, input_shape, index_table, config_param, idx, mod_path):
+    """
+    Compile a config of the operator in the compile pool and save the module to mod_path
+
+    In csim mode the shared library of the kernel is not part of the module, it is copied next to mod_path, as the
+    build directory of the kernel is reused by the next build of the same kernel name.
+
+    Returns:
+        tuple of the compile error or None, and the shared library of the kernel in csim mode or None.
+    """
+    config_input = _unpack_config(config_param)
+    kernel_lib = None
+    try:
+        if op_type == "json":
+            # the kernel name is made unique, so that kernels in flight do not share their files in kernel_meta,
+            # or their build directory in csim mode
+            op_desc = json.loads(op_desc) if isinstance(op_desc, str) else dict(op_desc)
+            op_desc['op'] = "%s_%d" % (op_desc['op'], idx)
+            if config_input is None:
+                mod = composite.build(op_desc)
+            else:
+                tiling = []
+                for value in config_input._asdict().values():
+                    item = [value, 1]
+                    tiling.append(item)
+                tiling_param = []
+                for i, element in enumerate(tiling):
+                    tiling_param.append(index_table[i] + element)
+                dim_info = ct_util.set_dims(tuple(tiling_param))
+                attrs = {'dim': dim_info}
+                mod = composite.build(op_desc, attrs)
+        else:
+            mod = compile_kernel(op_type, op_desc, input_shape, index_table, config_input, idx)
+        if utils.get_runtime_mode() in CSIM_MODES:
+            kernel_lib = _csim_kernel_path(mod_path)
+            shutil.copyfile(csim.module_kernel_lib(mod), kernel_lib)
+        if mod.type_key == "stackvm":
+            mod.save(mod_path)
+        else:
+            mod.export_library(mod_path)
+    except BaseException as e:
+        return str(e), None
+    return None, kernel_lib
+
+
+class _CompileTask:
+    """a config submitted to the compile pool"""
+    __slots__ = ("args", "result", "submit_time", "finished", "timed_out")
+
+    def __init__(self, args, result):
+        self.args = args
+        self.result = result
+        self.submit_time = time.time()
+        self.finished = False
+        self.timed_out = False
+
 
 class KernelRunner:
     """kernel runner
     This runner will compile and execute configs of an operator, and return their running times.
 
+    Kernels are compiled by a persistent pool of compile workers and measured by one process per kernel as
+    soon as its module is ready. Configs given as next_configs of a batch are compiled while the batch is
+    being measured, so compiling and measuring of successive batches overlap.
+
+    The pool runs compiles in the order of submission. If no compile finishes for timeout seconds while the
+    oldest unfinished one was submitted more than timeout seconds ago, the compiles being run by the workers,
+    i.e. the oldest unfinished ones, are timed out and the pool is restarted once.
+
     Parameters
     ----------
     op_type: str
@@ -60,13 +151,16 @@ class KernelRunner:
     op_desc: NamedTuple
         The definition parameters of operator
     timeout: int
-        Timeout for running one config
+        Timeout for compiling one config, and for running one config
     repeat_times:
         Run one config repeat_times
+    compile_workers: int
+        Number of compile worker processes, default to number of cpus
     """
 
     def __init__(self, op_type: str, op_desc: NamedTuple, index_table: list, timeout: int = 600,
-                 repeat_times: int = 2, input_data=None, expect=None, mod_output_param=None):
+                 repeat_times: int = 2, input_data=None, expect=None, mod_output_param=None,
+                 compile_workers: int = None):
         self.op_type = op_type
         self.op_desc = op_desc
         self._index_table = index_table
@@ -82,41 +176,96 @@ class KernelRunner:
             self.input, self.expect = input_data, expect
         self.input_shape = [x.shape for x in self.input]
 
+        self._compile_workers = compile_workers if compile_workers else os.cpu_count()
+        self._compile_pool = None
+        # compile tasks keyed by config
+        self._compile_tasks = {}
+        # last time a compile finished or the pool started
+        self._compile_progress = time.time()
+        self._mod_dir = tempfile.mkdtemp(prefix="akg_tune_")
+        self._mod_count = 0
+
     def info(self):
         print('run kernel time:', self.run_kernel_time)
 
-    def run_one_kernel(self, run_times, idx, config, best_time=np.inf, is_auto=False):
-        """Compile and execute a config of the operator on device"""
+    def close(self):
+        """stop the compile workers and remove compiled modules"""
+        if self._compile_pool is not None:
+            self._compile_pool.terminate()
+            self._compile_pool.join()
+            self._compile_pool = None
+        self._compile_tasks = {}
+        shutil.rmtree(self._mod_dir, ignore_errors=True)
+
+    def _get_compile_pool(self):
+        if self._compile_pool is None:
+            self._compile_pool = multiprocessing.Pool(self._compile_workers)
+            self._compile_progress = time.time()
+        return self._compile_pool
+
+    def _check_compile_hang(self):
+        """time out the compiles of hanging workers, restart the pool and resubmit the other unfinished compiles"""
+        now = time.time()
+        pending = []
+        for task in self._compile_tasks.values():
+            if task.finished or task.timed_out:
+                continue
+            if task.result.ready():
+                task.finished = True
+                self._compile_progress = now
+            else:
+                pending.append(task)
+        if not pending:
+            return
+        pending.sort(key=lambda task: task.submit_time)
+        if now - max(self._compile_progress, pending[0].submit_time) <= self.timeout:
+            return
+
+        for task in pending[:self._compile_workers]:
+            task.timed_out = True
+        self._compile_pool.terminate()
+        self._compile_pool.join()
+        self._compile_pool = None
+        pool = self._get_compile_pool()
+        for task in pending[self._compile_workers:]:
+            task.result = pool.apply_async(_compile_worker, task.args)
+            task.submit_time = self._compile_progress
+
+    @staticmethod
+    def _task_key(idx, config, is_auto):
+        return ("auto", idx) if is_auto else config.input_id
+
+    def compile_async(self, configs, is_auto=False):
+        """Submit configs to the compile workers, configs already submitted are skipped"""
+        pool = self._get_compile_pool()
+        for idx, config in enumerate(configs):
+            key = self._task_key(idx, config, is_auto)
+            if key in self._compile_tasks:
+                continue
+            mod_path = os.path.join(self._mod_dir, "%d.%s" % (self._mod_count, "so" if utils.get_runtime_mode() == "cpu"
+                                                              else "stackvm"))
+            # kernels are named by the module count rather than their index in the batch, as the next batch is
+            # compiled while this one is measured
+            args = (self.op_type, self.op_desc, self.input_shape, self._index_table,
+                    None if is_auto else _pack_config(config.input), self._mod_count, mod_path)
+            self._mod_count += 1
+            self._compile_tasks[key] = _CompileTask(args, pool.apply_async(_compile_worker, args))
+
+    def _measure_one_kernel(self, result_queue, idx, config, mod_path, best_time, kernel_lib=None):
+        """
+        Execute a compiled config of the operator on device, and put its run time to result_queue
+
+        kernel_lib is the shared library of the kernel in csim mode, given by the compile worker.
+        """
         time_one_kernel_start = time.time()
-        logger.debug('compile %dth kernel', idx)
+        run_time = run_failed_time
         try:
-            time_start_build = time.time()
-            if self.op_type == "json":
-                if is_auto:
-                    mod = composite.build(self.op_desc)
-                else:
-                    tiling = []
-                    for value in config.input._asdict().values():
-                        item = [value, 1]
-                        tiling.append(item)
-                    tiling_param = []
-                    for i, element in enumerate(tiling):
-                        tiling_param.append(self._index_table[i] + element)
-                    dim_info = ct_util.set_dims(tuple(tiling_param))
-                    attrs = {'dim': dim_info}
-                    mod = composite.build(self.op_desc, attrs)
-            else:
-                mod = compile_kernel(self.op_type, self.op_desc, self.input_shape, self._index_table,
-                                     None if is_auto else config.input, idx)
-            time_end_build = time.time()
-            logger.debug("build module time: %f", time_end_build - time_start_build)
-            logger.debug('finished compile %dth kernel', idx)
+            mod = akg.tvm.module.load(mod_path)
         except BaseException as e:
-            logger.debug("Compile Failed: [%s] : %s", "origin" if is_auto else str(config.input), str(e))
-            run_times[idx] = compile_fail_time
+            logger.debug("Load Failed: [%s] : %s", str(config.input), str(e))
+            result_queue.put((idx, run_time))
             return
 
-        run_times[idx] = run_failed_time
         # get available device
         if utils.get_available_devices_num() == 1:
             device_id = utils.get_device_id()
@@ -135,7 +284,7 @@ class KernelRunner:
                     time_start_launch = time.time()
                     if self.mod_output_param is not None:
                         output, stat_info = utils.mod_launch(mod, list(self.input), self.mod_output_param,
-                                                             tuning=True, device_id=device_id)
+                                                             tuning=True, device_id=device_id, kernel_lib=kernel_lib)
                         if stat_info['run_time'] < best_time:
                             if not all(map(lambda x, y: np.allclose(x, y, rtol=5e-03, atol=5e-03, equal_nan=True),
                                            output, self.expect)):
@@ -144,7 +293,8 @@ class KernelRunner:
                                              "origin" if config is None else str(config.input))
 
                     else:
-                        output, stat_info = utils.mod_launch(mod, self.input, tuning=True, device_id=device_id)
+                        output, stat_info = utils.mod_launch(mod, self.input, tuning=True, device_id=device_id,
+                                                             kernel_lib=kernel_lib)
                         if stat_info['run_time'] < best_time:
                             if not np.allclose(output, self.expect, rtol=5e-03, atol=5e-03, equal_nan=True):
                                 stat_info['run_time'] = precision_error_time
@@ -155,70 +305,82 @@ class KernelRunner:
                 except BaseException as e:
                     logger.debug("Run Failed: [%s] : %s", str(config.input), str(e))
                     stat_info['run_time'] = run_failed_time
-                run_times[idx] = np.minimum(run_times[idx], stat_info['run_time'])
+                run_time = np.minimum(run_time, stat_info['run_time'])
         finally:
             logger.debug('end of %dth kernel', idx)
             time_one_kernel_end = time.time()
             logger.debug('run one kernel time: %f', time_one_kernel_end - time_one_kernel_start)
-        return
+            result_queue.put((idx, run_time))
 
-    def run(self, configs, best_time=np.inf, is_auto_set_dim=False, all_space=False):
-        """Compile and execute a batch config of the operator on device"""
+    def run(self, configs, best_time=np.inf, is_auto_set_dim=False, all_space=False, next_configs=None):
+        """Compile and execute a batch config of the operator on device
+
+        next_configs is the batch which is going to be run next, it is compiled while this batch is measured.
+        """
         start = time.time()
         logger.setLevel(logging.DEBUG)
         logger.debug("gen cce kernels batch: %d kernels", len(configs))
-        subprocess.run("rm -rf ./jobs/JOB*", shell=True)
-        process_jobs = []
-        run_times = multiprocessing.Manager().list(np.full((len(configs),), compile_fail_time))
-        for idx, config in enumerate(configs):
-            p = multiprocessing.Process(target=self.run_one_kernel,
-                                        args=(run_times, idx, config, best_time, is_auto_set_dim))
-            process_jobs.append(p)
-            p.start()
-        timeout_error = False
-        for idx, p in enumerate(process_jobs):
-            if not timeout_error:
-                p.join(timeout=self.timeout)
-            if p.is_alive():
-                timeout_error = True
-                logger.debug("Timeout Error: [%s]", str(configs[idx].input))
-                run_times[idx] = timeout_time
-                p.terminate()
+        run_times = np.full((len(configs),), compile_fail_time)
+
+        self.compile_async(configs, is_auto_set_dim)
+        if next_configs:
+            self.compile_async(next_configs)
+        keys = [self._task_key(idx, config, is_auto_set_dim) for idx, config in enumerate(configs)]
+        compiling = set(range(len(configs)))
+        measuring = {}
+        result_queue = multiprocessing.Queue()
+        while compiling or measuring:
+            self._check_compile_hang()
+            # start measuring of the kernels which finished compiling
+            for idx in list(compiling):
+                task = self._compile_tasks[keys[idx]]
+                if task.timed_out:
+                    compiling.remove(idx)
+                    logger.debug("Compile Timeout Error: [%s]", str(configs[idx].input))
+                    run_times[idx] = timeout_time
+                elif task.result.ready():
+                    compiling.remove(idx)
+                    error, kernel_lib = task.result.get()
+                    if error is not None:
+                        logger.debug("Compile Failed: [%s] : %s",
+                                     "origin" if is_auto_set_dim else str(configs[idx].input), error)
+                        continue
+                    run_times[idx] = run_failed_time
+                    p = multiprocessing.Process(target=self._measure_one_kernel,
+                                                args=(result_queue, idx, configs[idx], task.args[-1], best_time,
+                                                      kernel_lib))
+                    p.start()
+                    measuring[idx] = (p, time.time())
+            # collect measured results
+            try:
+                while True:
+                    idx, run_time = result_queue.get(timeout=0.1)
+                    if idx in measuring:
+                        run_times[idx] = run_time
+                        measuring.pop(idx)[0].join()
+            except queue.Empty:
+                pass
+            for idx, (p, measure_start) in list(measuring.items()):
+                if time.time() - measure_start > self.timeout:
+                    logger.debug("Timeout Error: [%s]", str(configs[idx].input))
+                    run_times[idx] = timeout_time
+                    p.terminate()
+                    measuring.pop(idx)
+                elif p.exitcode is not None and p.exitcode != 0:
+                    # measure process crashed before reporting its result
+                    logger.debug("Run Failed: [%s] : exit code %d", str(configs[idx].input), p.exitcode)
+                    measuring.pop(idx)
+
+        for key in keys:
+            task = self._compile_tasks.pop(key, None)
+            if task is None:
+                continue
+            for path in (task.args[-1], _csim_kernel_path(task.args[-1])):
+                if os.path.isfile(path):
+                    os.remove(path)
 
         process_end = time.time()
         logger.debug("process time: %f", process_end - start)
-        # clean the profiling directory
-        tune_device = int(os.environ['DEVICE_ID'])
-        tune_num = int(os.environ['DEVICE_TOTAL_NUM'])
-        def exec_cmds_with_pipe(cmd_list):
-            cmd_num = len(cmd_list)
-            if cmd_num <= 1:
-                raise RuntimeError("length of cmd_list should be greater than 1.")
-            ps = []
-            for i, cmd in enumerate(cmd_list):
-                if i == 0:
-                    p = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-                else:
-                    p = subprocess.Popen(cmd, stdin=ps[-1].stdout, stdout=subprocess.PIPE)
-                ps.append(p)
-            for p in ps:
-                p.wait()
-            return ps[-1].communicate()
-        public_path = "/var/log/npu/profiling"
-        jobs = []
-        for idx in range(tune_device, tune_num + tune_device):
-            cmd_list = [
-                ["find", public_path, "-iname", "*.log.%d" % idx, "-printf", "'%T+\t%p\n'"],
-                ["grep", "JOB"],
-                ["sort", "-r"],
-                ["head", "-n10"],
-                ["awk", "{print $2}"],
-                ["head", "-n1"],
-            ]
-            p = exec_cmds_with_pipe(cmd_list)
-            if p[0].decode('utf8').strip() != '':
-                job_file = p[0].decode('utf8').strip().split('/')[-2]
-                subprocess.run("rm -rf ./jobs/%s" % job_file, shell=True)
         end = time.time()
         logger.debug("run kernels time: %f", end - start)
         self.run_kernel_time += end - start
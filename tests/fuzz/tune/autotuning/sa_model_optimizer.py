@@ -86,9 +86,7 @@ class SimulatedAnnealingOptimizer:
             cool = 0
 
         while k < n_iter and k < k_last_modify + early_stop:
-            new_points = np.empty_like(points)
-            for i, p in enumerate(points):
-                new_points[i] = self.space.random_walk(p)
+            new_points = self.space.random_walk_batch(points)
 
             new_scores = 1e8 / model.predict(new_points)
 
@@ -61,6 +61,10 @@ class ConfigSpace(metaclass=ABCMeta):
         self._dim_names = getattr(self._input_type, '_fields')
 
         self._configs = []  # List[ConfigEntity]
+        # family, key and shape extents of the tuned kernel in tuning database
+        self.tuning_db_key = None
+        # L1 and L0 tile range tables of the tiled axes, one [min, max] per dim of config
+        self.tile_ranges = None
 
     @abstractmethod
     def reset_fetch(self):
@@ -87,6 +91,17 @@ class ConfigSpace(metaclass=ABCMeta):
         """get the `idx`-th config of the space"""
         return self._configs[idx]
 
+    def random_walk_batch(self, points) -> np.ndarray:
+        """random walk from each of the points"""
+        return np.array([self.random_walk(p) for p in points], dtype=np.int64)
+
+    def get_features(self, indexes) -> np.ndarray:
+        """features of the configs at indexes, one row per config"""
+        ret = np.empty((len(indexes), len(self._dim_names)), dtype=np.float32)
+        for i, idx in enumerate(indexes):
+            ret[i, :] = np.array(self.get(idx).feature, dtype=np.float32)
+        return ret
+
     @property
     def configs(self):
         return self._configs
@@ -215,3 +230,231 @@ class ListConfigSpace(ConfigSpace):
         for config in configs:
             space.add(config)
         return space
+
+
+class ArrayConfigSpace(ConfigSpace):
+    """Searching space of configs, which stores all possible configs in a 2-D int32 array
+
+    Rows are indexed by an exact integer key folded from the per dimension value codes, so that
+    membership tests and neighbor lookups of a batch of points are vectorized with sorted searches.
+    """
+
+    # fold keys stay below this bound, beyond it they are compressed to their ranks
+    _KEY_BOUND = 1 << 62
+
+    def __init__(self, input_type, data):
+        super(ArrayConfigSpace, self).__init__(input_type)
+
+        data = np.asarray(data, dtype=np.int32)
+        if data.ndim != 2 or data.shape[1] != len(self._dim_names):
+            raise ValueError('data must be of shape (n, %d), got %s' % (len(self._dim_names), data.shape))
+        self.__data = data
+        self.__values = []
+        codes = np.empty(data.shape, dtype=np.int64)
+        for dim in range(data.shape[1]):
+            values, codes[:, dim] = np.unique(data[:, dim], return_inverse=True)
+            self.__values.append(values)
+        self.__codes = codes
+        self.__cards = [len(values) for values in self.__values]
+        self.__steps = []
+        keys = self._fold(codes, range(data.shape[1]), self.__steps)
+        self.__key_order = np.argsort(keys, kind='stable')
+        self.__sorted_keys = keys[self.__key_order]
+        self.__lines = dict()  # dim -> (sorted line keys, order, rank of each point)
+        self.__fetch_pool = np.arange(len(data), dtype=np.int64)
+        self.__fetch_size = len(data)
+
+    def _fold(self, codes, dims, steps, valid=None):
+        """fold codes of dims into int64 keys, recording compressions into steps or replaying them"""
+        build = valid is None
+        keys = np.zeros(len(codes), dtype=np.int64)
+        bound = 1
+        step = 0
+        for dim in dims:
+            card = self.__cards[dim]
+            if bound * card >= self._KEY_BOUND:
+                if build:
+                    uniq, keys = np.unique(keys, return_inverse=True)
+                    steps.append(uniq)
+                else:
+                    uniq = steps[step]
+                    pos = np.minimum(np.searchsorted(uniq, keys), len(uniq) - 1)
+                    valid &= uniq[pos] == keys
+                    keys = pos
+                step += 1
+                bound = len(uniq)
+            keys = keys * card + codes[:, dim]
+            bound *= card
+        return keys
+
+    def _line(self, dim):
+        """points grouped by their values on all the dimensions but dim"""
+        if dim not in self.__lines:
+            dims = [d for d in range(len(self._dim_names)) if d != dim]
+            keys = self._fold(self.__codes, dims, [])
+            order = np.argsort(keys, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            self.__lines[dim] = (keys[order], order, rank)
+        return self.__lines[dim]
+
+    def reset_fetch(self):
+        """reset fetch state"""
+        self.fetch_scope(0, len(self.__data))
+
+    def fetch_scope(self, start, end):
+        self.__fetch_pool = np.arange(start, end, dtype=np.int64)
+        self.__fetch_size = len(self.__fetch_pool)
+
+    def has_next(self) -> bool:
+        return self.__fetch_size > 0
+
+    def fetch_index(self) -> int:
+        """fetch a random index of config"""
+        idx = np.random.randint(self.__fetch_size)
+        ret = int(self.__fetch_pool[idx])
+        self.__fetch_size -= 1
+        self.__fetch_pool[idx] = self.__fetch_pool[self.__fetch_size]
+        return ret
+
+    def fetch_next_index(self) -> int:
+        """fetch next index of config"""
+        self.__fetch_size -= 1
+        return int(self.__fetch_pool[self.__fetch_size])
+
+    def fetch_config(self) -> ConfigEntity:
+        """fetch a random config"""
+        return self.get(self.fetch_index())
+
+    def get(self, idx: int) -> ConfigEntity:
+        """get the `idx`-th config of the space"""
+        return ConfigEntity(int(idx), self._input_type(*self.__data[idx].tolist()))
+
+    def get_features(self, indexes) -> np.ndarray:
+        """features of the configs at indexes, one row per config"""
+        return self.__data[np.asarray(indexes, dtype=np.int64)].astype(np.float32)
+
+    def index_of(self, rows) -> np.ndarray:
+        """indexes of configs equal to rows, -1 for rows not in the space"""
+        rows = np.asarray(rows).reshape(-1, len(self._dim_names))
+        valid = np.ones(len(rows), dtype=bool)
+        codes = np.empty(rows.shape, dtype=np.int64)
+        for dim, values in enumerate(self.__values):
+            pos = np.minimum(np.searchsorted(values, rows[:, dim]), len(values) - 1)
+            valid &= values[pos] == rows[:, dim]
+            codes[:, dim] = pos
+        keys = self._fold(codes, range(len(self._dim_names)), self.__steps, valid)
+        pos = np.minimum(np.searchsorted(self.__sorted_keys, keys), len(self.__sorted_keys) - 1)
+        valid &= self.__sorted_keys[pos] == keys
+        return np.where(valid, self.__key_order[pos], -1)
+
+    def contains(self, rows) -> np.ndarray:
+        """whether each of rows is a config of the space"""
+        return self.index_of(rows) >= 0
+
+    def __contains__(self, config):
+        return bool(self.contains(tuple(config))[0])
+
+    def random_walk(self, p: int) -> int:
+        """find a neighbor hood of the p-th ConfigEntity, which only differs with p in at most one dimension"""
+        return int(self.random_walk_batch([p])[0])
+
+    def random_walk_batch(self, points) -> np.ndarray:
+        """random walk from each of the points, see random_walk"""
+        points = np.asarray(points, dtype=np.int64)
+        dims = np.random.randint(len(self._dim_names), size=len(points))
+        ret = points.copy()
+        for dim in np.unique(dims):
+            mask = dims == dim
+            line_keys, order, rank = self._line(dim)
+            own = rank[points[mask]]
+            lo = np.searchsorted(line_keys, line_keys[own], side='left')
+            hi = np.searchsorted(line_keys, line_keys[own], side='right')
+            # draw another point of the line, skipping the point itself
+            pos = lo + (np.random.random(len(own)) * (hi - lo - 1)).astype(np.int64)
+            pos += pos >= own
+            ret[mask] = np.where(hi - lo > 1, order[np.minimum(pos, len(order) - 1)], points[mask])
+        return ret
+
+    @property
+    def configs(self):
+        return [self.get(i) for i in range(len(self.__data))]
+
+    @property
+    def length(self):
+        return len(self.__data)
+
+    @classmethod
+    def from_list(cls, configs: List[NamedTuple]):
+        if not isinstance(configs, list):
+            raise TypeError('configs must be of list type, got %s' % type(configs))
+        if not configs:
+            raise ValueError('configs must be non-empty')
+        return cls(type(configs[0]), configs)
+
+
+class LazyConfigSpace(ConfigSpace):
+    """Searching space of configs, which materializes configs of a lazily enumerated tiling space on demand"""
+
+    def __init__(self, input_type, tiling_space):
+        super(LazyConfigSpace, self).__init__(input_type)
+
+        self.__space = tiling_space
+        self.__length = len(tiling_space)
+        self.__configs = dict()  # materialized ConfigEntity by index
+        # sparse Fisher-Yates shuffle over [__fetch_start, __fetch_end), only the swapped slots are stored
+        self.__fetch_swapped = dict()
+        self.__fetch_start = 0
+        self.__fetch_end = self.__length
+
+    def reset_fetch(self):
+        """reset fetch state"""
+        self.fetch_scope(0, self.__length)
+
+    def fetch_scope(self, start, end):
+        self.__fetch_swapped = dict()
+        self.__fetch_start = start
+        self.__fetch_end = end
+
+    def has_next(self) -> bool:
+        return self.__fetch_end > self.__fetch_start
+
+    def fetch_index(self) -> int:
+        """fetch a random index of config"""
+        idx = self.__fetch_start + np.random.randint(self.__fetch_end - self.__fetch_start)
+        last = self.__fetch_end - 1
+        ret = self.__fetch_swapped.pop(idx, idx)
+        if idx != last:
+            self.__fetch_swapped[idx] = self.__fetch_swapped.pop(last, last)
+        else:
+            self.__fetch_swapped.pop(last, None)
+        self.__fetch_end = last
+        return ret
+
+    def fetch_next_index(self) -> int:
+        """fetch next index of config"""
+        self.__fetch_end -= 1
+        return self.__fetch_end
+
+    def fetch_config(self) -> ConfigEntity:
+        """fetch a random config"""
+        return self.get(self.fetch_index())
+
+    def get(self, idx: int) -> ConfigEntity:
+        """get the `idx`-th config of the space"""
+        idx = int(idx)
+        if idx not in self.__configs:
+            self.__configs[idx] = ConfigEntity(idx, self._input_type(*self.__space[idx]))
+        return self.__configs[idx]
+
+    def random_walk(self, p: int) -> int:
+        """find a neighbor hood of the p-th ConfigEntity, which only differs with p in the tiles of one band"""
+        return self.__space.neighbor(p)
+
+    @property
+    def configs(self):
+        return [self.get(i) for i in range(self.__length)]
+
+    @property
+    def length(self):
+        return self.__length
@@ -18,8 +18,9 @@ from typing import NamedTuple
 from collections import namedtuple
 from test_run import matmul_run
 from akg.utils import validation_check as vc_util
+from akg.utils.tiling_space import TilingSpace
 from .type_definitions import ConvDesc, ConvBackpropDesc, MatmulCubeDesc, ConvConfig, ConvBackpropInputConfig, ConvBackpropFilterConfig, MatmulCubeConfig
-from .space import ListConfigSpace
+from .space import ListConfigSpace, ArrayConfigSpace, LazyConfigSpace
 from .kernel_compiler import compile_kernel
 
 
@@ -40,10 +41,13 @@ def _get_space_vector(op_type: str, op_desc):
 
     dim_names = ['tiling_' + str(i) for i in range(len(tiling_spaces[0]))]
     input_type = namedtuple(op_type, dim_names)
-    space = ListConfigSpace(input_type)
-    for tiling_space in tiling_spaces:
-        config = input_type(*tiling_space)
-        space.add(config)
+    if isinstance(tiling_spaces, TilingSpace):
+        space = LazyConfigSpace(input_type, tiling_spaces)
+    else:
+        space = ArrayConfigSpace(input_type, tiling_spaces)
+    space.tuning_db_key = space_res.get('tuning_db_key')
+    if 'l1_range' in space_res and 'l0_range' in space_res:
+        space.tile_ranges = (space_res['l1_range'], space_res['l0_range'])
     return index_table, space, key, expect, input_for_mod
 
 
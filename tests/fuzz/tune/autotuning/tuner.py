@@ -18,10 +18,10 @@ import time
 import json
 import os
 import numpy as np
-from .xgb_cost_model import XgbCostModel
+from .xgb_cost_model import XgbCostModel, get_global_cost_model
 from .sa_model_optimizer import SimulatedAnnealingOptimizer
 from .space import ConfigSpace
-from .runner import KernelRunner
+from .runner import KernelRunner, error_time_list
 
 logger = logging.getLogger('fuzz.tune.autotuning.tuner')
 
@@ -166,11 +166,13 @@ class Tuner:
     def tune(self, least_try_times: int, output_file: str = None):
         """grid search all configs"""
         i = 0
-        while i < least_try_times:
-            if not self._space.has_next():
-                break
-            configs = self.next_config(min(self._n_parallel, least_try_times - i))
-            run_times = self._runner.run(configs, self._best_time)
+        configs = self.next_config(min(self._n_parallel, least_try_times - i))
+        while configs:
+            # fetch the next batch ahead, so that runner compiles it while this batch is measured
+            next_configs = []
+            if i + len(configs) < least_try_times:
+                next_configs = self.next_config(min(self._n_parallel, least_try_times - i - len(configs)))
+            run_times = self._runner.run(configs, self._best_time, next_configs=next_configs)
             results = []
             for idx, conf in enumerate(configs):
                 results.append((conf.input_id, run_times[idx]))
@@ -189,6 +191,7 @@ class Tuner:
             if output_file:
                 configs = [(self._space.get(res[0]).input, res[1]) for res in results]
                 self.export_configs(configs, output_file)
+            configs = next_configs
         return run_times
 
 
@@ -201,7 +204,9 @@ class ModelBasedTuner(Tuner):
     plan_size: int
         Tuner will re-fit model per `plan_size` new measure samples
     pre_model: CostModel
-        The cost model that predicts the speed of a config (IR)
+        The cost model that predicts the speed of a config (IR).
+        If it is not given, the cost model is seeded by the global cost model in AKG_TUNING_MODEL if it is set,
+        and the samples of this job are added to the global cost model after tuning.
     """
 
     def __init__(self, runner, index_table, config_space, n_parallel=1, plan_size=32, pre_model=None):
@@ -212,7 +217,7 @@ class ModelBasedTuner(Tuner):
             self.__cost_model = pre_model
             self.__cost_model.reset_space(self._space)
         else:
-            self.__cost_model = XgbCostModel(self._space)
+            self.__cost_model = XgbCostModel(self._space, get_global_cost_model())
 
         self.__model_optimizer = SimulatedAnnealingOptimizer(self._space)
         self.__train_ct = 0
@@ -241,20 +246,34 @@ class ModelBasedTuner(Tuner):
         error_ct = 0
 
         tuning_start = time.time()
-        while (i < self._space.length and (i < least_try_times
-                                           or (self._best_time > self._original_time - 0.9
-                                               and i < least_try_times * 3))):
-            if not self._space.has_next():
+        if self.__cost_model.is_ready:
+            # plan the first trials with the warm started model instead of random ones
+            self._trials = self.__model_optimizer.find_best(self.__cost_model, self.__plan_size, self._visited)
+            self._trial_pt = 0
+        next_configs = []
+        while self._should_continue(i, least_try_times):
+            if not next_configs and not self._space.has_next():
                 break
             iter_start = time.time()
-            if not self.__is_auto_set_dim:
+            if next_configs:
+                configs = next_configs
+            elif not self.__is_auto_set_dim:
                 configs = self.next_batch(min(self._n_parallel, self._space.length - i))
             else:
                 configs = self.next_batch(min(self._n_parallel, self._space.length - i), False)
 
+            # fetch the next batch ahead, so that runner compiles it while this batch is measured.
+            # It is planned with the trials known now, which lag behind a refit of the model by one batch.
+            # The last batch has nothing to prefetch, configs fetched for it would be marked visited without running.
+            next_configs = []
+            next_i = i if self.__is_auto_set_dim else i + len(configs)
+            if self._space.has_next() and not self._is_last_batch(next_i, least_try_times, early_stopping):
+                next_configs = self.next_batch(min(self._n_parallel, self._space.length - next_i))
+
             logger.debug('--indexes: %s', str([x.input_id for x in configs]))
 
-            run_times = self._runner.run(configs, self._best_time, self.__is_auto_set_dim)
+            run_times = self._runner.run(configs, self._best_time, self.__is_auto_set_dim,
+                                         next_configs=next_configs)
             if self.__is_auto_set_dim:
                 from operator import add
                 from functools import reduce
@@ -307,6 +326,7 @@ class ModelBasedTuner(Tuner):
 
             if self._best_iter > 0 and i >= self.best_iter + early_stopping:
                 logger.debug('Early stopped. Best iter: %d', self._best_iter)
+                self._update_global_model()
                 return
 
             if error_ct > 150:
@@ -316,3 +336,24 @@ class ModelBasedTuner(Tuner):
                 logger.setLevel(old_level)
 
         self._tuning_time += time.time() - tuning_start
+        self._update_global_model()
+
+    def _should_continue(self, i, least_try_times):
+        return i < self._space.length and (i < least_try_times
+                                           or (self._best_time > self._original_time - 0.9
+                                               and i < least_try_times * 3))
+
+    def _is_last_batch(self, next_i, least_try_times, early_stopping):
+        """whether tuning stops after the running batch, judged by the best time so far, which only decreases"""
+        if not self._should_continue(next_i, least_try_times):
+            return True
+        # the batch of the original tiling is not early stopped, and a better config in the running batch
+        # postpones early stopping
+        return not self.__is_auto_set_dim and self._best_iter > 0 and next_i >= self.best_iter + early_stopping
+
+    def _update_global_model(self):
+        """add the configs measured successfully to the global cost model"""
+        samples = [(x, y) for x, y in zip(self._xs, self._ys) if y not in error_time_list]
+        if samples:
+            xs, ys = zip(*samples)
+            self.__cost_model.update_global_model(list(xs), list(ys))
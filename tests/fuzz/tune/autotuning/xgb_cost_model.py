@@ -14,20 +14,222 @@
 # limitations under the License.
 
 """XGBoost cost model"""
+import os
 import time
+import fcntl
 import logging
+from contextlib import contextmanager
 import numpy as np
 import xgboost as xgb
 
 logger = logging.getLogger('fuzz.tune.autotuning.xgb_cost_model')
 
+# directory of the cost model shared by tuning jobs
+AKG_TUNING_MODEL = "AKG_TUNING_MODEL"
+# bump it when shape_features changes, models of other versions are discarded
+FEATURE_VERSION = 1
+# tiles beyond this number of axes are left out of the features
+MAX_FEATURE_AXES = 8
+FEATURES_PER_AXIS = 5
+NUM_SHAPE_FEATURES = MAX_FEATURE_AXES * FEATURES_PER_AXIS + 7
+CORE_NUM = 32
+# tiles aligned to this number of elements make full 32 byte blocks of float16
+ALIGN_ELEMENTS = 16
+# samples of the oldest jobs are dropped beyond it
+GLOBAL_MODEL_MAX_SAMPLES = 50000
+GLOBAL_MODEL_BOOST_ROUND = 200
+
+
+def shape_features(tiles, l1_range, l0_range):
+    """
+    Features of tilings which do not depend on the absolute shape, so that they transfer across shapes and operators.
+
+    For each of the first MAX_FEATURE_AXES tiled axes: the ratio of tile to axis extent, log2 of tile, whether the
+    tile is aligned, the ratio of L0 tile to extent, and log2 of the number of tiles. Then for the whole tiling:
+    log2 of the L1 and L0 footprints in elements, the ratio of L1 footprint to the whole tensor, log2 of the number of
+    blocks, the utilization of cores by the blocks, the number of axes and log2 of the whole tensor.
+
+    Args:
+        tiles (numpy.ndarray): L1 tiles of configs, one row per config.
+        l1_range (list): [min, max] L1 tile of each axis, the max is the extent of the axis.
+        l0_range (list): [min, max] L0 tile of each axis.
+
+    Returns:
+        numpy.ndarray of shape (len(tiles), NUM_SHAPE_FEATURES).
+    """
+    tiles = np.maximum(np.asarray(tiles, dtype=np.float64), 1)
+    num, axes = tiles.shape
+    extent = np.maximum(np.array([r[1] for r in l1_range], dtype=np.float64), 1)
+    l0_max = np.maximum(np.array([r[1] for r in l0_range], dtype=np.float64), 1)
+    l0_tiles = np.minimum(tiles, l0_max)
+    num_tiles = np.ceil(extent / tiles)
+
+    per_axis = np.stack([tiles / extent,
+                         np.log2(tiles),
+                         (np.mod(tiles, ALIGN_ELEMENTS) == 0).astype(np.float64),
+                         l0_tiles / extent,
+                         np.log2(num_tiles)], axis=2)
+    used_axes = min(axes, MAX_FEATURE_AXES)
+    axis_features = np.zeros((num, MAX_FEATURE_AXES, FEATURES_PER_AXIS))
+    axis_features[:, :used_axes, :] = per_axis[:, :used_axes, :]
+
+    blocks = np.prod(num_tiles, axis=1)
+    total_features = np.stack([np.sum(np.log2(tiles), axis=1),
+                               np.sum(np.log2(l0_tiles), axis=1),
+                               np.prod(tiles / extent, axis=1),
+                               np.log2(blocks),
+                               blocks / (np.ceil(blocks / CORE_NUM) * CORE_NUM),
+                               np.full(num, axes, dtype=np.float64),
+                               np.full(num, np.sum(np.log2(extent)))], axis=1)
+    return np.concatenate([axis_features.reshape(num, -1), total_features], axis=1).astype(np.float32)
+
+
+class GlobalCostModel:
+    """
+    Cost model shared by tuning jobs of all shapes and operators, on shape_features.
+
+    It is kept in directory `path` as the samples of past jobs and the booster trained on them. A job seeds its
+    cost model with the booster, and adds its own samples after tuning, merged with the samples other jobs added
+    in the meantime.
+
+    Args:
+        path (str): directory of the model.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.bst = None
+        self.xs = np.zeros((0, NUM_SHAPE_FEATURES), dtype=np.float32)
+        self.ys = np.zeros(0, dtype=np.float32)
+        self.groups = np.zeros(0, dtype=np.int64)
+        self._load()
+
+    @property
+    def _sample_file(self):
+        return os.path.join(self.path, "samples.npz")
+
+    @property
+    def _model_file(self):
+        return os.path.join(self.path, "model.bin")
+
+    @contextmanager
+    def _locked(self):
+        """hold the lock of the model, so that concurrent jobs update it one at a time"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, "lock"), 'a') as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _read_samples(self):
+        """samples saved in the model, None if there are none or they are of another feature version"""
+        if not os.path.isfile(self._sample_file):
+            return None
+        try:
+            data = np.load(self._sample_file)
+            if int(data["version"]) != FEATURE_VERSION or data["xs"].shape[1] != NUM_SHAPE_FEATURES:
+                logger.info("discard global cost model of feature version %d", int(data["version"]))
+                return None
+            return data["xs"], data["ys"], data["groups"]
+        except (IOError, KeyError, ValueError) as e:
+            logger.warning("failed to load global cost model samples from %s: %s", self.path, str(e))
+            return None
+
+    def _load(self):
+        """load the model, a model of another feature version is discarded"""
+        samples = self._read_samples()
+        if samples is None:
+            return
+        self.xs, self.ys, self.groups = samples
+        try:
+            if os.path.isfile(self._model_file):
+                self.bst = xgb.Booster(model_file=self._model_file)
+        except xgb.core.XGBoostError as e:
+            logger.warning("failed to load global cost model from %s: %s", self.path, str(e))
+            self.bst = None
+
+    def booster(self):
+        """a copy of the booster to continue training from, or None"""
+        if self.bst is None:
+            return None
+        bst = self.bst.copy()
+        # the early stopping of XgbCostModel.fit starts from the scores of its own job
+        bst.set_attr(best_score=None, best_iteration=None, best_msg=None)
+        return bst
+
+    def update(self, features, ys):
+        """
+        Add the samples of a job, retrain the booster and save the model.
+
+        Args:
+            features (numpy.ndarray): shape_features of the configs tuned.
+            ys (numpy.ndarray): their run times.
+        """
+        ys = np.asarray(ys, dtype=np.float32)
+        if len(ys) < 2:
+            return
+        with self._locked():
+            # other jobs may have saved their samples since this one loaded the model
+            samples = self._read_samples()
+            if samples is not None:
+                self.xs, self.ys, self.groups = samples
+            group = self.groups[-1] + 1 if len(self.groups) else 0
+            self.xs = np.concatenate([self.xs, np.asarray(features, dtype=np.float32)])
+            self.ys = np.concatenate([self.ys, ys / max(np.max(ys), 1e-8)])
+            self.groups = np.concatenate([self.groups, np.full(len(ys), group, dtype=np.int64)])
+            if len(self.ys) > GLOBAL_MODEL_MAX_SAMPLES:
+                # drop whole jobs, including the job of the last sample beyond the limit, so that each group keeps
+                # all of its samples, but never the job just added
+                cut = len(self.ys) - GLOBAL_MODEL_MAX_SAMPLES
+                first = min(np.searchsorted(self.groups, self.groups[cut - 1], side='right'),
+                            np.searchsorted(self.groups, group))
+                self.xs, self.ys, self.groups = self.xs[first:], self.ys[first:], self.groups[first:]
+
+            dtrain = xgb.DMatrix(self.xs, self.ys)
+            # samples are sorted by group, the ranking objective only compares the samples of one job
+            dtrain.set_group(np.unique(self.groups, return_counts=True)[1].tolist())
+            self.bst = xgb.train(XgbCostModel.default_params(), dtrain, num_boost_round=GLOBAL_MODEL_BOOST_ROUND)
+            self._save()
+
+    def _save(self):
+        """save the model by renaming, so that readers without the lock never see a partial file"""
+        pid = os.getpid()
+        tmp_samples = os.path.join(self.path, "samples.%d.npz" % pid)
+        tmp_model = os.path.join(self.path, "model.%d.bin" % pid)
+        np.savez(tmp_samples, version=FEATURE_VERSION, xs=self.xs, ys=self.ys, groups=self.groups)
+        self.bst.save_model(tmp_model)
+        os.replace(tmp_model, self._model_file)
+        os.replace(tmp_samples, self._sample_file)
+
+
+def get_global_cost_model():
+    """the global cost model in AKG_TUNING_MODEL, None if it is not set"""
+    path = os.environ.get(AKG_TUNING_MODEL)
+    if not path:
+        return None
+    return GlobalCostModel(path)
+
+
 class XgbCostModel:
-    """Cost model to predict the speed of a config"""
+    """
+    Cost model to predict the speed of a config
 
-    def __init__(self, space):
+    If the space has the range tables of its tiles, configs are featured by shape_features, and the model is
+    seeded by global_model: it predicts with the global booster before it is fitted, and fitting continues
+    from the global booster.
+    """
+
+    def __init__(self, space, global_model=None):
         self.space = space
+        self.global_model = global_model
 
-        self.xgb_params = {
+        self.xgb_params = self.default_params()
+        self._sample_size = 0
+        self.bst = None
+        self.log_interval = 25
+
+    @staticmethod
+    def default_params():
+        return {
             'max_depth': 6,
             'gamma': 0.0001,
             'min_child_weight': 1,
@@ -41,9 +243,21 @@ class XgbCostModel:
             'objective': 'rank:pairwise',
             'silent': 1
         }
-        self._sample_size = 0
-        self.bst = None
-        self.log_interval = 25
+
+    @property
+    def use_shape_features(self):
+        ranges = getattr(self.space, 'tile_ranges', None)
+        return ranges is not None and len(ranges[0]) == len(self.space.dim_names)
+
+    @property
+    def is_ready(self):
+        """whether the model is able to predict"""
+        return self.bst is not None or self._global_booster() is not None
+
+    def _global_booster(self):
+        if self.global_model is None or not self.use_shape_features:
+            return None
+        return self.global_model.bst
 
     def fit(self, xs, ys, plan_size):
         """XGBoost fitting """
@@ -60,8 +274,12 @@ class XgbCostModel:
         dtrain = xgb.DMatrix(x_train[index], y_train[index])
         self._sample_size = len(x_train)
 
+        base_model = None
+        if self._global_booster() is not None:
+            base_model = self.global_model.booster()
         self.bst = xgb.train(self.xgb_params, dtrain,
                              num_boost_round=8000,
+                             xgb_model=base_model,
                              callbacks=[custom_callback(
                                  stopping_rounds=20,
                                  metric='tr-a-recall@%d' % plan_size,
@@ -80,14 +298,20 @@ class XgbCostModel:
         feas = self._get_feature(xs)
         dtest = xgb.DMatrix(feas)
 
-        return self.bst.predict(dtest, output_margin=output_margin)
+        bst = self.bst if self.bst is not None else self._global_booster()
+        return bst.predict(dtest, output_margin=output_margin)
 
-    def _get_feature(self, indexes):
-        ret = np.empty((len(indexes), len(self.space.get(0).feature)), dtype=np.float32)
-        for i, ii in enumerate(indexes):
-            ret[i, :] = np.array(self.space.get(ii).feature, dtype=np.float32)
+    def update_global_model(self, xs, ys):
+        """add the samples of this job to the global model"""
+        if self.global_model is None or not self.use_shape_features or not xs:
+            return
+        self.global_model.update(self._get_feature(xs), ys)
 
-        return ret
+    def _get_feature(self, indexes):
+        features = self.space.get_features(indexes)
+        if self.use_shape_features:
+            features = shape_features(features, *self.space.tile_ranges)
+        return features
 
     def reset_space(self, space):
         self.space = space
@@ -0,0 +1,78 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the batch build of composite kernels"""
+import os
+import tempfile
+from akg.composite import build_module
+
+
+def stub_worker(kernel_desc, attr, mod_path):
+    """stands in for the build of a kernel, the module saved is the description itself."""
+    if kernel_desc == "crash":
+        os._exit(1)
+    if kernel_desc == "fail":
+        return "failed to build"
+    with open(mod_path, "w") as f:
+        f.write(kernel_desc + (attr["suffix"] if attr else ""))
+    return None
+
+
+def stub_load(mod_path):
+    with open(mod_path) as f:
+        return f.read()
+
+
+def run_batch(kernel_descs, attrs=None, load=stub_load):
+    old_load, old_tempdir = build_module.tvm.module.load, tempfile.tempdir
+    with tempfile.TemporaryDirectory() as tmp:
+        build_module.tvm.module.load = load
+        tempfile.tempdir = tmp
+        try:
+            try:
+                return build_module._build_batch(kernel_descs, attrs, 2, stub_worker)
+            finally:
+                # the modules are removed after they are loaded
+                assert os.listdir(tmp) == []
+        finally:
+            build_module.tvm.module.load, tempfile.tempdir = old_load, old_tempdir
+
+
+def test_build_batch_order():
+    descs = ["kernel_%d" % i for i in range(6)]
+    assert run_batch(descs) == descs
+    attrs = [{"suffix": "_%d" % i} for i in range(6)]
+    assert run_batch(descs, attrs) == ["kernel_%d_%d" % (i, i) for i in range(6)]
+
+
+def test_build_batch_failures():
+    descs = ["kernel_0", "fail", "kernel_2", "crash", "kernel_4"]
+    # the kernels taken down by the crash are built again one by one
+    assert run_batch(descs) == ["kernel_0", None, "kernel_2", None, "kernel_4"]
+
+
+def test_build_batch_cleanup():
+    def failed_load(mod_path):
+        raise RuntimeError("failed to load %s" % mod_path)
+    try:
+        run_batch(["kernel_0"], load=failed_load)
+        assert False
+    except RuntimeError:
+        pass
+
+
+if __name__ == "__main__":
+    test_build_batch_order()
+    test_build_batch_failures()
+    test_build_batch_cleanup()
@@ -0,0 +1,91 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for array backed config space"""
+from collections import namedtuple
+import numpy as np
+from autotuning.space import ArrayConfigSpace, ListConfigSpace
+
+
+def make_data(rows, dims, high, seed=0):
+    rng = np.random.RandomState(seed)
+    data = np.unique(rng.randint(0, high, size=(rows, dims)), axis=0)
+    return data[rng.permutation(len(data))]
+
+
+def check_space(data):
+    config_type = namedtuple("Config", ["d%d" % i for i in range(data.shape[1])])
+    space = ArrayConfigSpace(config_type, data)
+    assert space.length == len(data)
+    assert tuple(space.get(1).input) == tuple(data[1])
+    assert np.array_equal(space.get_features([2, 0]), data[[2, 0]].astype(np.float32))
+
+    # every row is found at its own index, rows out of the space are not found
+    assert np.array_equal(space.index_of(data), np.arange(len(data)))
+    missing = data.copy()
+    missing[:, 0] = data[:, 0].max() + 1
+    assert np.all(space.index_of(missing) == -1)
+    assert tuple(data[3]) in space
+    assert tuple(missing[3]) not in space
+
+    # a walk stays in the space and changes at most one dimension
+    np.random.seed(0)
+    points = np.arange(len(data))
+    for _ in range(5):
+        walked = space.random_walk_batch(points)
+        assert np.all((walked >= 0) & (walked < len(data)))
+        assert np.all(np.sum(data[walked] != data[points], axis=1) <= 1)
+    return space
+
+
+def test_small_space():
+    check_space(make_data(200, 3, 4))
+
+
+def test_compressed_keys():
+    # the product of the value counts of all dimensions overflows int64
+    check_space(make_data(400, 8, 1 << 20))
+
+
+def test_walk_finds_neighbors():
+    data = np.array([[1, 1], [1, 2], [1, 3], [2, 1], [5, 5]])
+    space = check_space(data)
+    np.random.seed(0)
+    walked = space.random_walk_batch(np.zeros(100, dtype=np.int64))
+    assert set(walked.tolist()) == {1, 2, 3}
+    # a point with no neighbor stays
+    assert space.random_walk(4) == 4
+
+
+def test_same_as_list_space():
+    data = make_data(100, 3, 5)
+    config_type = namedtuple("Config", ["a", "b", "c"])
+    configs = [config_type(*row) for row in data.tolist()]
+    array_space = ArrayConfigSpace.from_list(configs)
+    list_space = ListConfigSpace.from_list(configs)
+    assert array_space.length == list_space.length
+    for i in range(array_space.length):
+        assert array_space.get(i).input == list_space.get(i).input
+    np.random.seed(1)
+    array_fetched = []
+    while array_space.has_next():
+        array_fetched.append(array_space.fetch_index())
+    assert sorted(array_fetched) == list(range(array_space.length))
+
+
+if __name__ == "__main__":
+    test_small_space()
+    test_compressed_keys()
+    test_walk_finds_neighbors()
+    test_same_as_list_space()
@@ -0,0 +1,115 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the reference plan of composite jsons"""
+import os
+import json
+import functools
+import numpy as np
+from gen_json_data import JsonRefPlan, get_json_ref_plan, ufunc_ops, op_funcs
+
+JSON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../operators/composite/need_adapt")
+
+
+def load_descs():
+    descs = []
+    for file_name in sorted(os.listdir(JSON_DIR)):
+        with open(os.path.join(JSON_DIR, file_name)) as f:
+            desc = json.load(f)
+        if "op_desc" in desc:
+            descs.append((file_name, desc))
+    return descs
+
+
+def make_inputs(desc, seed):
+    rng = np.random.RandomState(seed)
+    return [rng.uniform(0.1, 2.0, input_desc[0]["shape"]).astype(input_desc[0]["data_type"])
+            for input_desc in desc["input_desc"]]
+
+
+def naive_eval(desc, inputs):
+    """evaluate the ops one by one on fresh arrays, without any buffer reuse"""
+    names = {input_desc[0]["tensor_name"]: np.array(value) for input_desc, value in zip(desc["input_desc"], inputs)}
+
+    def arg(arg_desc):
+        return arg_desc["value"] if arg_desc.get("value", None) is not None else names[arg_desc["tensor_name"]]
+
+    for op in desc["op_desc"]:
+        name, inputs_desc, output = op["name"], op["input_desc"], op["output_desc"][0]["tensor_name"]
+        if name == "InplaceAssign":
+            names[inputs_desc[0][0]["tensor_name"]] = arg(inputs_desc[1][0])
+            names[output] = arg(inputs_desc[2][0])
+        elif name == "AddN":
+            names[output] = functools.reduce(np.add, [arg(d) for d in inputs_desc[0]])
+        elif name == "Rsqrt":
+            names[output] = np.divide(1.0, np.sqrt(arg(inputs_desc[0][0])))
+        elif name == "Reciprocal":
+            names[output] = np.divide(1.0, arg(inputs_desc[0][0]))
+        elif name in ufunc_ops:
+            names[output] = ufunc_ops[name](*[arg(d[0]) for d in inputs_desc])
+        else:
+            names[output] = op_funcs[name][0]([arg(d[0]) for d in inputs_desc], op["attr"], op["output_desc"])
+    return [names[output_desc["tensor_name"]] for output_desc in desc["output_desc"]]
+
+
+def test_plan_matches_naive_eval():
+    descs = load_descs()
+    assert descs
+    for file_name, desc in descs:
+        plan = JsonRefPlan(desc)
+        for seed in (0, 1):
+            inputs = make_inputs(desc, seed)
+            copies = [np.array(value) for value in inputs]
+            expect = plan.run(inputs)
+            naive = naive_eval(desc, copies)
+            assert len(expect) == len(desc["output_desc"]), file_name
+            for out, ref, output_desc in zip(expect, naive, desc["output_desc"]):
+                assert list(np.shape(out)) == list(output_desc["shape"]) or np.size(out) == 1, file_name
+                assert np.asarray(out).dtype == np.asarray(ref).dtype, file_name
+                assert np.array_equal(out, ref, equal_nan=True), file_name
+            # the plan never writes into its inputs
+            for value, copy in zip(inputs, copies):
+                assert np.array_equal(value, copy), file_name
+
+
+def test_inplace_outputs_are_copies():
+    desc = {
+        "input_desc": [[{"data_type": "float32", "shape": [4], "tensor_name": "input_0"}],
+                       [{"data_type": "float32", "shape": [4], "tensor_name": "input_1"}]],
+        "op_desc": [
+            {"name": "Mul", "attr": None,
+             "input_desc": [[{"tensor_name": "input_0", "shape": [4], "data_type": "float32"}],
+                            [{"tensor_name": "input_1", "shape": [4], "data_type": "float32"}]],
+             "output_desc": [{"tensor_name": "output_0", "shape": [4], "data_type": "float32"}]},
+            {"name": "InplaceAssign", "attr": None,
+             "input_desc": [[{"tensor_name": "input_1", "shape": [4], "data_type": "float32"}],
+                            [{"tensor_name": "output_0", "shape": [4], "data_type": "float32"}],
+                            [{"tensor_name": "input_0", "shape": [4], "data_type": "float32"}]],
+             "output_desc": [{"tensor_name": "output_1", "shape": [4], "data_type": "float32"}]},
+        ],
+        "output_desc": [{"tensor_name": "output_1", "shape": [4], "data_type": "float32"},
+                        {"tensor_name": "input_1", "shape": [4], "data_type": "float32"}],
+    }
+    lhs = np.arange(4, dtype=np.float32)
+    rhs = np.full(4, 2, dtype=np.float32)
+    out_1, assigned = get_json_ref_plan(json.dumps(desc)).run([lhs, rhs])
+    assert get_json_ref_plan(json.dumps(desc)) is get_json_ref_plan(json.dumps(desc))
+    assert np.array_equal(out_1, lhs) and out_1 is not lhs
+    assert np.array_equal(assigned, lhs * rhs)
+    assert np.array_equal(rhs, np.full(4, 2, dtype=np.float32))
+
+
+if __name__ == "__main__":
+    test_plan_matches_naive_eval()
+    test_inplace_outputs_are_copies()
@@ -0,0 +1,95 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the keys of composite kernel cache"""
+import os
+import copy
+import json
+import tempfile
+from akg.composite import kernel_cache
+
+
+def make_desc(op_name, prefix, shape):
+    return {
+        "composite": True,
+        "composite_graph": "%s_graph" % op_name,
+        "op": op_name,
+        "platform": "AKG",
+        "process": "aicore",
+        "input_desc": [[{"data_type": "float16", "shape": shape, "tensor_name": prefix + "in_0"}],
+                       [{"data_type": "float16", "shape": shape, "tensor_name": prefix + "in_1"}]],
+        "op_desc": [
+            {"attr": None, "name": "Mul",
+             "input_desc": [[{"data_type": "float16", "name": "x", "shape": shape, "tensor_name": prefix + "in_0"}],
+                            [{"data_type": "float16", "name": "y", "shape": shape, "tensor_name": prefix + "in_1"}]],
+             "output_desc": [{"data_type": "float16", "name": "output", "shape": shape,
+                              "tensor_name": prefix + "mid"}]},
+            {"attr": None, "name": "TensorAdd",
+             "input_desc": [[{"data_type": "float16", "name": "x", "shape": shape, "tensor_name": prefix + "mid"}],
+                            [{"data_type": "float16", "name": "y", "shape": shape, "tensor_name": prefix + "in_0"}]],
+             "output_desc": [{"data_type": "float16", "name": "output", "shape": shape,
+                              "tensor_name": prefix + "out"}]},
+        ],
+        "output_desc": [{"data_type": "float16", "shape": shape, "tensor_name": prefix + "out"}],
+    }
+
+
+def test_key_ignores_names():
+    desc_a = make_desc("Fused_Mul_Add_1", "a_", [16, 16])
+    desc_b = make_desc("Fused_Mul_Add_2", "b_", [16, 16])
+    assert kernel_cache.normalize_desc(desc_a) == kernel_cache.normalize_desc(desc_b)
+    assert kernel_cache.KernelCache.key(desc_a, None, None) == kernel_cache.KernelCache.key(desc_b, None, None)
+
+
+def test_key_differs_by_content():
+    desc = make_desc("Fused_Mul_Add_1", "a_", [16, 16])
+    key = kernel_cache.KernelCache.key(desc, None, None)
+    assert key != kernel_cache.KernelCache.key(make_desc("Fused_Mul_Add_1", "a_", [16, 32]), None, None)
+    assert key != kernel_cache.KernelCache.key(desc, {"dim": "0 0 16 16"}, None)
+    assert key != kernel_cache.KernelCache.key(desc, None, {"attrs": {}, "dim": "0 0 16 16"})
+
+    # the mid tensor feeds the other input of TensorAdd
+    rewired = copy.deepcopy(desc)
+    add_inputs = rewired["op_desc"][1]["input_desc"]
+    add_inputs[1][0]["tensor_name"] = "a_in_1"
+    assert key != kernel_cache.KernelCache.key(rewired, None, None)
+
+
+def test_restore_renamed_kernel_meta():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            os.makedirs("entry")
+            os.makedirs(kernel_cache.KERNEL_META_PATH)
+            with open("entry/cached.json", "w") as f:
+                json.dump({"blockDim": 1, "kernelName": "cached_kernel0", "binFileName": "cached"}, f)
+            with open("entry/cached.o", "wb") as f:
+                f.write(b"\x7fELF")
+            for file_name in ("cached.json", "cached.o"):
+                kernel_cache._restore_kernel_meta(os.path.join("entry", file_name), file_name, "cached", "renamed")
+            with open(os.path.join(kernel_cache.KERNEL_META_PATH, "renamed.json")) as f:
+                meta = json.load(f)
+            assert meta["kernelName"] == "cached_kernel0"
+            assert meta["binFileName"] == "renamed"
+            with open(os.path.join(kernel_cache.KERNEL_META_PATH, "renamed.o"), "rb") as f:
+                assert f.read() == b"\x7fELF"
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    test_key_ignores_names()
+    test_key_differs_by_content()
+    test_restore_renamed_kernel_meta()
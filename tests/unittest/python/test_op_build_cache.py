@@ -0,0 +1,108 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the in-process cache of op_build"""
+import os
+from akg.utils import kernel_exec as utils
+
+SHAPES = [(16, 16), (16, 16)]
+DTYPES = ["float16", "float16"]
+
+
+def add_op(lhs, rhs):
+    return lhs
+
+
+class FakeBuild:
+    """counts the builds which reach _op_build, each returns a new module."""
+
+    def __init__(self):
+        self.builds = 0
+
+    def __call__(self, *args):
+        self.builds += 1
+        return object()
+
+
+def with_cache(maxsize, func):
+    old_cache, old_build = utils.op_build_cache, utils._op_build
+    old_mode = os.environ.pop("RUNTIME_MODE", None)
+    utils.op_build_cache = utils.BuildCache(maxsize)
+    fake_build = FakeBuild()
+    utils._op_build = fake_build
+    try:
+        func(fake_build)
+    finally:
+        utils.op_build_cache, utils._op_build = old_cache, old_build
+        if old_mode is not None:
+            os.environ["RUNTIME_MODE"] = old_mode
+
+
+def test_hit_and_miss():
+    def check(fake_build):
+        # default arguments, which dump ir and code
+        mod = utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add")
+        assert utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add") is mod
+        assert fake_build.builds == 1
+        assert utils.op_build_cache_info() == utils.CacheInfo(1, 1, 2, 1)
+        # another shape, another kernel name and other dump flags all miss
+        assert utils.op_build(add_op, [(32, 16), (32, 16)], DTYPES, kernel_name="add") is not mod
+        assert utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add_1") is not mod
+        assert utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add", dump_ir=False) is not mod
+        assert fake_build.builds == 4
+        # tuning builds are never cached
+        utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add", tuning=True)
+        utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add", tuning=True)
+        assert fake_build.builds == 6
+    with_cache(2, check)
+
+
+def test_eviction():
+    def check(fake_build):
+        mods = [utils.op_build(add_op, [(n, 16), (n, 16)], DTYPES, kernel_name="add") for n in (16, 32)]
+        # hit 16, so that 32 is the least recently used
+        assert utils.op_build(add_op, [(16, 16), (16, 16)], DTYPES, kernel_name="add") is mods[0]
+        utils.op_build(add_op, [(64, 16), (64, 16)], DTYPES, kernel_name="add")
+        assert utils.op_build_cache_info().currsize == 2
+        assert utils.op_build(add_op, [(16, 16), (16, 16)], DTYPES, kernel_name="add") is mods[0]
+        assert fake_build.builds == 3
+        assert utils.op_build(add_op, [(32, 16), (32, 16)], DTYPES, kernel_name="add") is not mods[1]
+        assert fake_build.builds == 4
+        utils.op_build_cache_clear()
+        assert utils.op_build_cache_info() == utils.CacheInfo(0, 0, 2, 0)
+    with_cache(2, check)
+
+
+def test_disabled_and_simulators():
+    def check_disabled(fake_build):
+        utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add")
+        utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add")
+        assert fake_build.builds == 2
+
+    def check_csim(fake_build):
+        os.environ["RUNTIME_MODE"] = "csim"
+        try:
+            utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add")
+            utils.op_build(add_op, SHAPES, DTYPES, kernel_name="add")
+        finally:
+            os.environ.pop("RUNTIME_MODE")
+        assert fake_build.builds == 2
+    with_cache(0, check_disabled)
+    with_cache(2, check_csim)
+
+
+if __name__ == "__main__":
+    test_hit_and_miss()
+    test_eviction()
+    test_disabled_and_simulators()
@@ -0,0 +1,107 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the parsing of profiling data"""
+import os
+import tempfile
+import numpy as np
+from akg.backend import parsing_profiling_data as ppd
+
+HWTS_FILE = "hwts.log.data.45.dev.profiler_default_tag"
+
+
+def make_hwts(events):
+    """HWTS records of (log type, task id, syscnt, cyc) tuples."""
+    records = np.zeros(len(events), dtype=ppd.HWTS_DTYPE)
+    for record, (log_type, task_id, syscnt, cyc) in zip(records, events):
+        record['flags'] = log_type | (1 << 4)
+        record['task_id'] = task_id
+        record['syscnt'] = syscnt
+        record['stream_id'] = 5
+        record['cyc'] = cyc
+        record['pmu_events'] = np.arange(8)
+    return records
+
+
+def write_slices(path, name, data, num_slices):
+    """write data as slices of a profiling file, cut in the middle of records."""
+    bounds = np.linspace(0, len(data), num_slices + 1).astype(int)
+    for i in range(num_slices):
+        with open(os.path.join(path, "%s.slice_%d" % (name, i)), "wb") as f:
+            f.write(data[bounds[i]:bounds[i + 1]])
+    with open(os.path.join(path, "%s.slice_0.done" % name), "wb") as f:
+        f.write(b"done")
+
+
+def test_read_records():
+    records = make_hwts([(ppd.HWTS_START_OF_TASK, 1, 100, 0), (ppd.HWTS_END_OF_TASK, 1, 350, 0)])
+    blank = b" " * ppd.HWTS_DTYPE.itemsize
+    # blank records and an incomplete record at the end are dropped
+    data = records[:1].tobytes() + blank + records[1:].tobytes() + b"\x01\x02"
+    decoded = ppd.read_records(data, ppd.HWTS_DTYPE)
+    assert decoded.tobytes() == records.tobytes()
+    assert ppd.hwts_log_type(decoded).tolist() == [ppd.HWTS_START_OF_TASK, ppd.HWTS_END_OF_TASK]
+    assert ppd.hwts_cnt(decoded).tolist() == [1, 1]
+
+
+def test_task_cycles():
+    records = make_hwts([(ppd.HWTS_START_OF_TASK, 7, 1000, 0), (ppd.HWTS_START_OF_TASK, 3, 10, 0),
+                         (ppd.HWTS_END_OF_BLOCK, 7, 1100, 0), (ppd.HWTS_END_OF_TASK, 3, 30, 0),
+                         (ppd.HWTS_END_OF_TASK, 7, 1500, 0), (ppd.HWTS_START_OF_TASK, 7, 5000, 0),
+                         (ppd.HWTS_END_OF_TASK, 7, 9000, 0), (ppd.HWTS_START_OF_TASK, 9, 40, 0)])
+    task_ids, start, end = ppd.get_task_cycles(records)
+    assert task_ids.tolist() == [3, 7, 9]
+    # the first start and end of a task are used
+    assert start.tolist() == [10, 1000, 40]
+    assert end.tolist() == [30, 1500, 0]
+
+
+def test_parsing_job():
+    records = make_hwts([(ppd.HWTS_START_OF_TASK, ppd.PROFILING_TASK_ID, 2000, 0),
+                         (ppd.HWTS_END_OF_BLOCK, ppd.PROFILING_TASK_ID, 2400, 0),
+                         (ppd.HWTS_BLOCK_PMU, ppd.PROFILING_TASK_ID, 0, 380),
+                         (ppd.HWTS_END_OF_TASK, ppd.PROFILING_TASK_ID, 2500, 0),
+                         (ppd.HWTS_START_OF_TASK, 12, 3000, 0)])
+    with tempfile.TemporaryDirectory() as tmp:
+        assert ppd.parsing(tmp, report=False) == ppd.max_time_consume
+        write_slices(tmp, HWTS_FILE, records.tobytes(), 3)
+        assert ppd.read_profiling_data(tmp, HWTS_FILE).tobytes() == records.tobytes()
+        assert ppd.parsing(tmp, report=False) == 500
+        # a task without end, and a task not in the data
+        assert ppd.parsing(tmp, task_id=12, report=False) == 3000
+        assert ppd.parsing(tmp, task_id=13, report=False) == ppd.max_time_consume
+
+        type1, type2, type3 = ppd.get_45_hwts_log(ppd.read_profiling_data(tmp, HWTS_FILE))
+        assert [row[0] for row in type1] == ["Start of task", "End of block", "Block PMU", "End of task",
+                                             "Start of task"]
+        assert type2 == [("End of block", 1, "0", 0, 0, ppd.PROFILING_TASK_ID, 2400, 5, None)]
+        assert type3 == [("Block PMU", 1, "0", 0, 0, ppd.PROFILING_TASK_ID, 5, 380, None, tuple(range(8)))]
+
+
+def test_ai_core_data():
+    records = np.zeros(2, dtype=ppd.AI_CORE_DTYPE)
+    records['flags'] = [0x28, 0x10]
+    records['total_cyc'] = [123, 456]
+    records['ov_cyc'] = [7, 0]
+    records['stream_id'] = [1, 2]
+    records['pmu_cnt'] = [np.arange(8), np.arange(8, 16)]
+    rows = ppd.get_43_ai_core_data(records.tobytes())
+    assert rows == [("1", "0010", 123, 7, 1, tuple(range(8))), ("0", "0001", 456, 0, 2, tuple(range(8, 16)))]
+
+
+if __name__ == "__main__":
+    test_read_records()
+    test_task_cycles()
+    test_parsing_job()
+    test_ai_core_data()
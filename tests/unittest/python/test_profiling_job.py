@@ -0,0 +1,92 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for locating the profiling jobs of kernel launches"""
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+from akg.backend import profiling_job
+from akg.backend import parsing_profiling_data as ppd
+
+
+def make_job(root, rel_path, device_id, mtime, task_id, done):
+    """a job directory with a device log modified at mtime and one HWTS slice holding task_id"""
+    path = os.path.join(root, rel_path)
+    os.makedirs(path)
+    log = os.path.join(path, "ai_core.log.%d" % device_id)
+    with open(log, "w") as f:
+        f.write("log")
+    os.utime(log, (mtime, mtime))
+    records = np.zeros(2, dtype=ppd.HWTS_DTYPE)
+    records['flags'] = [ppd.HWTS_START_OF_TASK, ppd.HWTS_END_OF_TASK]
+    records['task_id'] = task_id
+    records['stream_id'] = 5
+    records['syscnt'] = [100, 200]
+    records.tofile(os.path.join(path, profiling_job.HWTS_FILE + ".slice_0"))
+    if done:
+        with open(os.path.join(path, profiling_job.HWTS_FILE + ".slice_0" + profiling_job.DONE_SUFFIX), "w") as f:
+            f.write("done")
+    return path
+
+
+def test_find_job():
+    now = time.time()
+    with tempfile.TemporaryDirectory() as root:
+        job_a = make_job(root, "container/0/JOBA", 0, now - 100, ppd.PROFILING_TASK_ID, True)
+        job_b = make_job(root, "container/0/JOBB", 0, now - 10, 12, False)
+        job_c = make_job(root, "container/1/JOBC", 1, now, ppd.PROFILING_TASK_ID, True)
+        # deeper than MAX_SCAN_DEPTH
+        make_job(root, "a/b/c/JOBD", 0, now, ppd.PROFILING_TASK_ID, True)
+
+        locator = profiling_job.ProfilingJobLocator(root)
+        assert locator.find_job(0).path == job_b
+        assert locator.find_job(0, task_id=ppd.PROFILING_TASK_ID).path == job_a
+        assert locator.find_job(0, task_id=ppd.PROFILING_TASK_ID, stream_id=5).path == job_a
+        assert locator.find_job(0, task_id=ppd.PROFILING_TASK_ID, stream_id=6) is None
+        assert locator.find_job(0, since=now - 50, task_id=ppd.PROFILING_TASK_ID) is None
+        assert locator.find_job(1).path == job_c
+        assert locator.find_job(2) is None
+        assert locator.find_job(0, task_id=ppd.PROFILING_TASK_ID).hwts_ready
+        assert not locator.find_job(0, task_id=12).hwts_ready
+
+        # appending to a log changes the mtime of the file only
+        log = os.path.join(job_a, "ai_core.log.0")
+        os.utime(log, (now, now))
+        assert locator.find_job(0).path == job_a
+
+        shutil.rmtree(job_a)
+        assert locator.find_job(0, task_id=ppd.PROFILING_TASK_ID) is None
+        assert locator.find_job(0).path == job_b
+
+
+def test_wait_job():
+    now = time.time()
+    with tempfile.TemporaryDirectory() as root:
+        job_a = make_job(root, "JOBA", 0, now, ppd.PROFILING_TASK_ID, True)
+        job_b = make_job(root, "JOBB", 0, now, 12, False)
+        locator = profiling_job.get_locator(root)
+        assert locator is profiling_job.get_locator(root)
+        assert locator.wait_job(0, task_id=ppd.PROFILING_TASK_ID, timeout=1) == job_a
+        # the HWTS data of job_b is never marked done, it is returned after timeout
+        start = time.time()
+        assert locator.wait_job(0, task_id=12, timeout=0.1) == job_b
+        assert time.time() - start >= 0.1
+        assert locator.wait_job(3, timeout=0.05) is None
+
+
+if __name__ == "__main__":
+    test_find_job()
+    test_wait_job()
@@ -0,0 +1,111 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for counting the unequal elements of results"""
+import os
+import logging
+import tempfile
+import numpy as np
+from akg.utils.result_analysis import count_unequal_element
+
+
+class LogCapture(logging.Handler):
+    def __init__(self):
+        super(LogCapture, self).__init__(logging.ERROR)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def capture_count(expected, actual, **kwargs):
+    handler = LogCapture()
+    logger = logging.getLogger()
+    logger.addHandler(handler)
+    try:
+        count_unequal_element(expected, actual, 1e-3, 1e-3, **kwargs)
+    finally:
+        logger.removeHandler(handler)
+    return handler.messages
+
+
+def make_data():
+    expected = np.arange(1, 301, dtype=np.float32).reshape(3, 10, 10)
+    actual = expected.copy()
+    actual[0, 0, 3] = 8.0
+    actual[1, 2, 3] = 1000.0
+    actual[2, 9, 9] = np.nan
+    expected[0, 5, 5] = 0.0
+    actual[0, 5, 5] = 0.5
+    actual[2, 0, 0] = -actual[2, 0, 0]
+    return expected, actual
+
+
+def test_logged_mismatches():
+    expected, actual = make_data()
+    messages = capture_count(expected, actual)
+    assert messages[:5] == ["[0, 0, 3]: Actual[8.0] Expected[4.0] Ratio[1.0]",
+                            "[0, 5, 5]: Actual[0.5] Expected[0.0] Ratio[5e+09]",
+                            "[1, 2, 3]: Actual[1000.0] Expected[124.0] Ratio[7.064516]",
+                            "[2, 0, 0]: Actual[-201.0] Expected[201.0] Ratio[2.0]",
+                            "[2, 9, 9]: Actual[nan] Expected[300.0]"]
+    assert messages[5:] == ["Total 5 mismatch detected!!!"]
+
+
+def test_worst_mismatches():
+    expected, actual = make_data()
+    messages = capture_count(expected, actual, max_print=2, worst_print=3)
+    assert messages[:2] == ["[0, 0, 3]: Actual[8.0] Expected[4.0] Ratio[1.0]",
+                            "[0, 5, 5]: Actual[0.5] Expected[0.0] Ratio[5e+09]"]
+    assert messages[2:4] == ["...", "Total 5 mismatch detected!!!, Only print 2..."]
+    assert messages[4] == "Worst 3 mismatch:"
+    assert [m.split(":")[0] for m in messages[5:]] == ["[0, 5, 5]", "[1, 2, 3]", "[2, 0, 0]"]
+
+
+def test_chunked_and_memmap():
+    np.random.seed(0)
+    expected = np.random.uniform(-1, 1, (64, 33)).astype(np.float16)
+    actual = expected.copy()
+    actual.reshape(-1)[np.random.choice(actual.size, 50, replace=False)] += np.float16(0.5)
+    whole = capture_count(expected, actual, max_print=20, worst_print=5)
+    assert capture_count(expected, actual, max_print=20, worst_print=5, chunk_size=7) == whole
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "actual.npy")
+        np.save(path, actual)
+        assert capture_count(expected, np.load(path, mmap_mode='r'), max_print=20, worst_print=5,
+                             chunk_size=100) == whole
+    assert "Total 50 mismatch detected!!!, Only print 20..." in whole
+    assert len(whole) == 20 + 3 + 5
+
+
+def test_bool_and_shape():
+    expected = np.array([True, False, True, True])
+    actual = np.array([True, True, True, False])
+    assert capture_count(expected, actual) == ["[1]: Actual[True] Expected[False]",
+                                               "[3]: Actual[False] Expected[True]",
+                                               "Total 2 mismatch detected!!!"]
+    assert capture_count(expected, expected) == []
+    try:
+        count_unequal_element(expected, actual.reshape(2, 2), 1e-3, 1e-3)
+    except AssertionError:
+        pass
+    else:
+        raise AssertionError("shape mismatch is not detected")
+
+
+if __name__ == "__main__":
+    test_logged_mismatches()
+    test_worst_mismatches()
+    test_chunked_and_memmap()
+    test_bool_and_shape()
@@ -0,0 +1,111 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the pool of persistent rpc sessions"""
+import os
+import numpy as np
+from akg.utils import rpc_pool
+
+
+class FakeRemote:
+    def cce(self):
+        return "cce"
+
+
+class FakeUpload:
+    """stands in for the upload of numpy arrays, counts them."""
+
+    def __init__(self):
+        self.uploads = 0
+
+    def __call__(self, arr, ctx):
+        self.uploads += 1
+        return np.array(arr)
+
+
+def with_fake_rpc(func):
+    old_connect, old_array = rpc_pool.rpc.connect, rpc_pool.akg.tvm.nd.array
+    upload = FakeUpload()
+    rpc_pool.rpc.connect = lambda host, port, session_timeout: FakeRemote()
+    rpc_pool.akg.tvm.nd.array = upload
+    try:
+        func(upload)
+    finally:
+        rpc_pool.rpc.connect, rpc_pool.akg.tvm.nd.array = old_connect, old_array
+
+
+def test_resident_inputs():
+    def check(upload):
+        sess = rpc_pool.RpcSession("127.0.0.1", 9090, 300, 1024 * 1024)
+        arr = np.arange(64, dtype=np.float32)
+        remote = sess.array(arr)
+        assert sess.array(arr) is remote
+        # an equal copy reuses the resident array as well
+        assert sess.array(np.array(arr)) is remote
+        assert upload.uploads == 1
+        # modified in place, uploaded again
+        arr[:] = 1
+        remote_1 = sess.array(arr)
+        assert remote_1 is not remote and np.array_equal(remote_1, arr)
+        assert upload.uploads == 2
+        # a remote array is not passed twice to one launch
+        in_use = set()
+        assert sess.array(arr, in_use=in_use) is remote_1
+        assert sess.array(arr, in_use=in_use) is not remote_1
+        # outputs are never resident
+        sess.array(arr, resident=False)
+        assert upload.uploads == 4
+        assert sess.tensor_bytes == 2 * arr.nbytes
+    with_fake_rpc(check)
+
+
+def test_resident_eviction():
+    def check(upload):
+        arrs = [np.full(256, i, dtype=np.float32) for i in range(3)]
+        sess = rpc_pool.RpcSession("127.0.0.1", 9090, 300, 2 * arrs[0].nbytes)
+        remotes = [sess.array(arr) for arr in arrs[:2]]
+        assert sess.array(arrs[0]) is remotes[0]
+        sess.array(arrs[2])
+        # the least recently used array is evicted
+        assert sess.tensor_bytes == 2 * arrs[0].nbytes
+        assert sess.array(arrs[0]) is remotes[0]
+        assert sess.array(arrs[1]) is not remotes[1]
+        assert upload.uploads == 4
+    with_fake_rpc(check)
+
+
+def test_pool_reset_in_child():
+    def check(upload):
+        pool = rpc_pool.rpc_session_pool
+        with pool.session("127.0.0.1", 9090) as sess:
+            pass
+        with pool.session("127.0.0.1", 9090) as sess_1:
+            assert sess_1 is sess
+        if not hasattr(os, "register_at_fork"):
+            pool.clear()
+            return
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if not pool._idle_sessions else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+        assert pool._idle_sessions
+        pool.clear()
+    with_fake_rpc(check)
+
+
+if __name__ == "__main__":
+    test_resident_inputs()
+    test_resident_eviction()
+    test_pool_reset_in_child()
@@ -0,0 +1,80 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the load balancing of rpc launches"""
+import os
+import time
+import tempfile
+from akg.utils import rpc_scheduler
+
+BOARDS = ["10.0.0.1:9090", "10.0.0.2:9090", "10.0.0.3:9090"]
+
+
+def make_scheduler(tmp):
+    return rpc_scheduler.RpcScheduler(os.path.join(tmp, "state.json"))
+
+
+def test_unmeasured_boards_spread():
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = make_scheduler(tmp)
+        acquired = [scheduler.acquire(BOARDS) for _ in BOARDS]
+        assert sorted(board for board, _ in acquired) == BOARDS
+        for board, token in acquired:
+            scheduler.release(board, token, 1.0, True)
+        summary = scheduler.summary()
+        assert all(summary[board]["in_flight"] == 0 for board in BOARDS)
+
+
+def test_fastest_board_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = make_scheduler(tmp)
+        for board, latency in zip(BOARDS, (3.0, 1.0, 2.0)):
+            _, token = scheduler.acquire([board])
+            scheduler.release(board, token, latency, True)
+        board, token = scheduler.acquire(BOARDS)
+        assert board == BOARDS[1]
+        # one launch in flight doubles the expected wait of the fastest board
+        assert scheduler.acquire(BOARDS)[0] == BOARDS[2]
+        assert scheduler.acquire(BOARDS, exclude=[BOARDS[1], BOARDS[2]])[0] == BOARDS[0]
+        scheduler.release(board, token, 1.0, True)
+
+
+def test_failed_board_quarantined():
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = make_scheduler(tmp)
+        board, token = scheduler.acquire(BOARDS[:2])
+        scheduler.release(board, token, 1.0, False)
+        assert scheduler.summary()[board]["quarantine"] > time.time()
+        other = [b for b in BOARDS[:2] if b != board][0]
+        for _ in range(4):
+            assert scheduler.acquire(BOARDS[:2])[0] == other
+        # with every board quarantined the one released first is used
+        assert scheduler.acquire([board])[0] == board
+
+
+def test_hedge_timeout():
+    with tempfile.TemporaryDirectory() as tmp:
+        scheduler = make_scheduler(tmp)
+        assert scheduler.hedge_timeout(BOARDS, 5) == rpc_scheduler.DEFAULT_HEDGE_TIMEOUT + 5
+        for _ in range(rpc_scheduler.MIN_HEDGE_SAMPLES):
+            board, token = scheduler.acquire(BOARDS)
+            scheduler.release(board, token, 20.0, True)
+        assert scheduler.hedge_timeout(BOARDS) == int(20.0 * rpc_scheduler.HEDGE_FACTOR)
+
+
+if __name__ == "__main__":
+    test_unmeasured_boards_spread()
+    test_fastest_board_first()
+    test_failed_board_quarantined()
+    test_hedge_timeout()
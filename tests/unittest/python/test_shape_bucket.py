@@ -0,0 +1,100 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the dispatch of dynamic shape ops to shape buckets"""
+import numpy as np
+import akg.tvm
+from akg.utils import shape_bucket
+
+COLS = 16
+
+
+def add_op(lhs, rhs):
+    return akg.tvm.compute(lhs.shape, lambda *i: lhs(*i) + rhs(*i), name="output")
+
+
+class FakeKernel:
+    """kernel built by fake_op_build, runs add_op with numpy and checks the arguments of its launch."""
+
+    def __init__(self, input_shapes, attrs):
+        self.dynamic = attrs.get("dynamic", False)
+        self.input_shapes = [tuple(shape) for shape in input_shapes]
+
+    def launch(self, args, outputs):
+        tensors = args[:3]
+        if self.dynamic:
+            # the tensors are followed by the shape var and block_dim
+            assert len(args) == 5
+            assert args[3] == tensors[0].shape[0]
+        else:
+            assert len(args) == 3
+            assert [t.shape for t in tensors[:2]] == self.input_shapes
+        np.add(tensors[0], tensors[1], out=tensors[2])
+        out_list = [args[len(args) + i if i < 0 else i] for i in outputs]
+        return out_list[0] if len(out_list) == 1 else tuple(out_list)
+
+
+def fake_op_build(op_func, input_shapes, input_types, op_attrs=None, kernel_name="", attrs=None):
+    return FakeKernel(input_shapes, attrs if attrs else {})
+
+
+def fake_mod_launch(mod, args, outputs=(-1,), device_id=0, expect=None):
+    return mod.launch(args, outputs)
+
+
+def run_shapes(kernel, rows_list):
+    for rows in rows_list:
+        lhs = np.random.uniform(-1, 1, (rows, COLS)).astype(np.float32)
+        rhs = np.random.uniform(-1, 1, (rows, COLS)).astype(np.float32)
+        out = np.zeros((rows, COLS), np.float32)
+        for outputs in ((-1,), (2,)):
+            res = kernel.launch([lhs, rhs, out], outputs=outputs)
+            assert res.shape == (rows, COLS)
+            assert np.array_equal(res, lhs + rhs)
+
+
+def test_launch_paths():
+    old_build, old_launch = shape_bucket.utils.op_build, shape_bucket.utils.mod_launch
+    shape_bucket.utils.op_build = fake_op_build
+    shape_bucket.utils.mod_launch = fake_mod_launch
+    try:
+        rows = akg.tvm.var("rows")
+        shapes = [(rows, COLS), (rows, COLS)]
+        kernel = shape_bucket.BucketedKernel(add_op, shapes, ["float32", "float32"], kernel_name="add",
+                                             buckets=[8, 16, 32], pad=True)
+        run_shapes(kernel, [8, 32])
+        assert kernel.launch_count == {"static": 4, "padded": 0, "dynamic": 0}
+        run_shapes(kernel, [5, 20])
+        assert kernel.launch_count == {"static": 4, "padded": 4, "dynamic": 0}
+        run_shapes(kernel, [33, 100])
+        assert kernel.launch_count == {"static": 4, "padded": 4, "dynamic": 4}
+        assert sorted(kernel._static_mods) == [(8,), (32,)]
+
+        # without padding, shapes between buckets run the parametric kernel
+        kernel = shape_bucket.BucketedKernel(add_op, shapes, ["float32", "float32"], kernel_name="add",
+                                             buckets=[8, 16, 32])
+        run_shapes(kernel, [16, 12])
+        assert kernel.launch_count == {"static": 2, "padded": 0, "dynamic": 2}
+    finally:
+        shape_bucket.utils.op_build, shape_bucket.utils.mod_launch = old_build, old_launch
+
+
+def test_buckets():
+    assert shape_bucket.power_of_two_buckets(100) == [1, 2, 4, 8, 16, 32, 64, 100]
+    assert shape_bucket.power_of_two_buckets(64, 5) == [8, 16, 32, 64]
+
+
+if __name__ == "__main__":
+    test_launch_paths()
+    test_buckets()
@@ -0,0 +1,115 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for lazily enumerated tiling space"""
+import itertools
+from collections import namedtuple
+import numpy as np
+from akg.utils.tiling_space import TilingSpace
+from autotuning.space import LazyConfigSpace
+
+# candidates of three bands, the first tile is shared by all bands
+BANDS = [
+    [[1, 2], [1, 4], [2, 2], [3, 8]],
+    [[1, 16], [1, 32], [2, 16]],
+    [[1, 5, 7], [2, 5, 7], [2, 6, 7], [2, 6, 8]],
+]
+SHARED_SIZE = 1
+
+
+def make_space(bands=BANDS, shared_size=SHARED_SIZE):
+    band_candidate = []
+    band_table = []
+    for band in bands:
+        band_table.append([len(band_candidate), len(band), len(band[0])])
+        band_candidate.extend(v for row in band for v in row)
+    return TilingSpace(np.array(band_candidate), np.array(band_table), shared_size)
+
+
+def dense_space(bands=BANDS, shared_size=SHARED_SIZE):
+    """the dense tiling candidate table, as poly generates it"""
+    dense = []
+    for first in bands[0]:
+        rests = [[row for row in band if row[:shared_size] == first[:shared_size]] for band in bands[1:]]
+        for rows in itertools.product(*rests):
+            dense.append(first + [v for row in rows for v in row])
+    return dense
+
+
+def test_order_matches_dense_table():
+    space = make_space()
+    dense = dense_space()
+    assert len(space) == len(dense)
+    assert space.tile_size == 7
+    assert space.tolist() == dense
+    assert [space[k] for k in range(len(dense))] == dense
+    assert space[-1] == dense[-1]
+    assert space[1:4] == dense[1:4]
+
+
+def test_prefix_without_completion():
+    # the band 0 candidate with prefix 3 has no candidate of the other bands
+    space = make_space()
+    assert all(tile[0] != 3 for tile in space)
+
+
+def test_neighbor_changes_one_band():
+    space = make_space()
+    rng = np.random.RandomState(0)
+    widths = [len(band[0]) for band in BANDS]
+    bounds = np.cumsum([0] + widths)
+    for k in range(len(space)):
+        for _ in range(10):
+            n = space.neighbor(k, rng)
+            assert 0 <= n < len(space)
+            changed = [b for b in range(len(BANDS))
+                       if space[k][bounds[b]:bounds[b + 1]] != space[n][bounds[b]:bounds[b + 1]]]
+            assert len(changed) <= 1
+    assert space.sample(rng) in dense_space()
+
+
+def test_single_band_ignores_shared_size():
+    space = make_space(BANDS[:1], 1)
+    assert space.tolist() == BANDS[0]
+
+
+def test_lazy_config_space():
+    space = make_space()
+    config_type = namedtuple("Config", ["t%d" % i for i in range(space.tile_size)])
+    config_space = LazyConfigSpace(config_type, space)
+    assert config_space.length == len(space)
+    assert list(config_space.get(3).input) == space[3]
+
+    np.random.seed(0)
+    fetched = []
+    while config_space.has_next():
+        fetched.append(config_space.fetch_index())
+    assert sorted(fetched) == list(range(len(space)))
+
+    config_space.fetch_scope(2, 6)
+    fetched = []
+    while config_space.has_next():
+        fetched.append(config_space.fetch_next_index())
+    assert fetched == [5, 4, 3, 2]
+
+    for p in range(config_space.length):
+        assert 0 <= config_space.random_walk(p) < config_space.length
+
+
+if __name__ == "__main__":
+    test_order_matches_dense_table()
+    test_prefix_without_completion()
+    test_neighbor_changes_one_band()
+    test_single_band_ignores_shared_size()
+    test_lazy_config_space()
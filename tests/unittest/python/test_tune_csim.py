@@ -0,0 +1,87 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for tuning rounds measured by the fast CPU simulator"""
+import os
+from collections import namedtuple
+import numpy as np
+from autotuning.runner import KernelRunner, error_time_list
+from autotuning.space_generators import get_space
+from test_run.sub_run import sub_execute
+
+
+def test_tune_round_csim():
+    old_mode = os.environ.get("RUNTIME_MODE")
+    os.environ["RUNTIME_MODE"] = "csim"
+    try:
+        desc = ('sub_16_128_fp16', sub_execute, [(16, 128), (16, 128), 'float16'])
+        index_table, space, _, expect, input_for_mod = get_space('sub', desc)
+        runner = KernelRunner('sub', desc, index_table, input_data=input_for_mod, expect=expect,
+                              timeout=180, repeat_times=1, compile_workers=2)
+        try:
+            configs = [space.get(i) for i in range(min(4, space.length))]
+            # the next batch is compiled while this one is measured, under other kernel names
+            run_times = runner.run(configs[:2], next_configs=configs[2:])
+            run_times = list(run_times) + list(runner.run(configs[2:]))
+        finally:
+            runner.close()
+        assert run_times
+        assert all(t not in error_time_list and t > 0 for t in run_times)
+    finally:
+        if old_mode is None:
+            os.environ.pop("RUNTIME_MODE")
+        else:
+            os.environ["RUNTIME_MODE"] = old_mode
+
+
+class FakePool:
+    """records the compiles submitted to the compile pool"""
+
+    def __init__(self):
+        self.args = []
+
+    def apply_async(self, func, args):
+        self.args.append(args)
+
+
+def test_prefetch_kernel_names():
+    config = namedtuple("Config", ["input", "input_id"])
+    tile = namedtuple("Tile", ["t0"])
+    for mode in ("rpc_cloud", "cpu", "csim"):
+        old_mode = os.environ.get("RUNTIME_MODE")
+        os.environ["RUNTIME_MODE"] = mode
+        runner = KernelRunner('sub', None, [[0, 0]], input_data=[np.zeros(4)], expect=np.zeros(4))
+        try:
+            pool = FakePool()
+            runner._compile_pool = pool
+            configs = [config(tile(i), i) for i in range(4)]
+            runner.compile_async(configs[:2])
+            runner.compile_async(configs[2:])
+            # configs already submitted are skipped
+            runner.compile_async(configs[1:3])
+            # the kernel name index and the module path of every compile are unique in all runtime modes
+            assert [args[-2] for args in pool.args] == [0, 1, 2, 3]
+            assert len(set(args[-1] for args in pool.args)) == 4
+            runner._compile_pool = None
+        finally:
+            runner.close()
+            if old_mode is None:
+                os.environ.pop("RUNTIME_MODE")
+            else:
+                os.environ["RUNTIME_MODE"] = old_mode
+
+
+if __name__ == "__main__":
+    test_tune_round_csim()
+    test_prefetch_kernel_names()
@@ -0,0 +1,70 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the database of tuned tilings"""
+import os
+import tempfile
+from akg.utils import tuning_db
+
+
+def test_record_keeps_best():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = tuning_db.TuningDatabase(os.path.join(tmp, "tuning.db"))
+        db.record("add", "add_64_64", [64, 64], "0 0 32 32", {"enable_pre_poly_loop_partition": False}, 100, 200)
+        db.record("add", "add_64_64", [64, 64], "0 0 16 16", None, 150, 200)
+        assert db.lookup("add", "add_64_64") == {"dim": "0 0 32 32",
+                                                 "attrs": {"enable_pre_poly_loop_partition": False}}
+        db.record("add", "add_64_64", [64, 64], "0 0 64 64", None, 50, 200)
+        assert db.lookup("add", "add_64_64") == {"dim": "0 0 64 64", "attrs": {}}
+        # another family never matches
+        assert db.lookup("mul", "add_64_64", [64, 64]) is None
+
+
+def test_nearest_shape():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = tuning_db.TuningDatabase(os.path.join(tmp, "tuning.db"))
+        db.record("add", "add_64_64", [64, 64], "0 0 32 32", None, 100)
+        db.record("add", "add_256_64", [256, 64], "0 0 128 32", None, 100)
+        db.record("add", "add_64", [64], "0 0 64", None, 100)
+        assert db.lookup("add", "add_80_64", [80, 64])["dim"] == "0 0 32 32"
+        assert db.lookup("add", "add_200_64", [200, 64])["dim"] == "0 0 128 32"
+        assert db.lookup("add", "add_80_64", [80, 64], nearest=False) is None
+        # too far from every tuned shape of the same rank
+        assert db.lookup("add", "add_1024_64", [1024, 64]) is None
+        assert db.lookup("add", "add_16", [16]) is None
+
+
+def test_env():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tuning.db")
+        old_env = os.environ.pop(tuning_db.AKG_TUNING_DB, None)
+        try:
+            assert tuning_db.get_tuning_db() is None
+            os.environ[tuning_db.AKG_TUNING_DB] = path
+            db = tuning_db.get_tuning_db()
+            assert db is tuning_db.get_tuning_db()
+            db.record("add", "add_64_64", [64, 64], "0 0 32 32", None, 100)
+            assert tuning_db.get_tuning_db().lookup("add", "add_64_64")["dim"] == "0 0 32 32"
+        finally:
+            os.environ.pop(tuning_db.AKG_TUNING_DB, None)
+            if old_env is not None:
+                os.environ[tuning_db.AKG_TUNING_DB] = old_env
+            tuning_db._tuning_db.clear()
+    assert tuning_db.flatten_shape([[16, [32, 8]], 4, True, "x"]) == [16, 32, 8, 4]
+
+
+if __name__ == "__main__":
+    test_record_keeps_best()
+    test_nearest_shape()
+    test_env()
@@ -0,0 +1,122 @@
+# Copyright 2020 Huawei Technologies Co., Ltd
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""unittest for the global cost model of the autotuner"""
+import os
+import tempfile
+import threading
+import numpy as np
+from autotuning import xgb_cost_model
+from autotuning.xgb_cost_model import GlobalCostModel, shape_features, NUM_SHAPE_FEATURES, FEATURE_VERSION
+
+
+def random_samples(num, seed):
+    rng = np.random.RandomState(seed)
+    return rng.uniform(0, 1, (num, NUM_SHAPE_FEATURES)).astype(np.float32), rng.uniform(1, 100, num)
+
+
+def test_shape_features():
+    tiles = np.array([[16, 32], [64, 1], [0, 8]])
+    features = shape_features(tiles, [[1, 64], [1, 32]], [[1, 16], [1, 16]])
+    assert features.shape == (3, NUM_SHAPE_FEATURES)
+    assert features.dtype == np.float32
+    # ratio of tile to extent, log2 of tile, alignment, ratio of L0 tile to extent and log2 of the number of tiles
+    assert np.allclose(features[0, :10], [0.25, 4, 1, 0.25, 2, 1, 5, 1, 0.5, 0])
+    # unused axes are zero
+    assert not np.any(features[:, 10:xgb_cost_model.MAX_FEATURE_AXES * xgb_cost_model.FEATURES_PER_AXIS])
+    # a tile of 0 is taken as 1
+    assert np.allclose(features[2, :2], [1 / 64, 0])
+    totals = features[0, -7:]
+    assert np.allclose(totals, [9, 8, 0.25, 2, 4 / 32, 2, 11])
+    # the same tiling of a twice larger shape differs only in the log2 features
+    larger = shape_features(tiles[:1] * 2, [[1, 128], [1, 64]], [[1, 32], [1, 32]])
+    assert np.allclose(larger[0, [0, 2, 3, 4, 5, 7, 8, 9]], features[0, [0, 2, 3, 4, 5, 7, 8, 9]])
+
+
+def test_load_feature_version():
+    with tempfile.TemporaryDirectory() as tmp:
+        xs, ys = random_samples(4, 0)
+        groups = np.zeros(4, dtype=np.int64)
+        np.savez(os.path.join(tmp, "samples.npz"), version=FEATURE_VERSION + 1, xs=xs, ys=ys, groups=groups)
+        model = GlobalCostModel(tmp)
+        assert model.bst is None and len(model.ys) == 0
+        np.savez(os.path.join(tmp, "samples.npz"), version=FEATURE_VERSION, xs=xs[:, :8], ys=ys, groups=groups)
+        assert len(GlobalCostModel(tmp).ys) == 0
+        np.savez(os.path.join(tmp, "samples.npz"), version=FEATURE_VERSION, xs=xs, ys=ys, groups=groups)
+        assert len(GlobalCostModel(tmp).ys) == 4
+
+
+def test_update_and_save():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model")
+        model = GlobalCostModel(path)
+        assert model.booster() is None
+        # a single sample has nothing to rank
+        model.update(*random_samples(1, 0))
+        assert not os.path.exists(path)
+        model.update(*random_samples(8, 1))
+        loaded = GlobalCostModel(path)
+        assert loaded.bst is not None and loaded.booster() is not None
+        assert np.array_equal(loaded.xs, model.xs) and np.array_equal(loaded.groups, np.zeros(8))
+        # run times are normalized by the slowest config of the job
+        assert np.isclose(np.max(loaded.ys), 1)
+        loaded.update(*random_samples(6, 2))
+        assert np.array_equal(GlobalCostModel(path).groups, [0] * 8 + [1] * 6)
+
+
+def test_update_keeps_whole_jobs():
+    old_max = xgb_cost_model.GLOBAL_MODEL_MAX_SAMPLES
+    xgb_cost_model.GLOBAL_MODEL_MAX_SAMPLES = 10
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            model = GlobalCostModel(tmp)
+            for i, num in enumerate((4, 4, 4)):
+                model.update(*random_samples(num, i))
+            # the oldest job is dropped as a whole
+            assert np.array_equal(GlobalCostModel(tmp).groups, [1] * 4 + [2] * 4)
+            model.update(*random_samples(2, 3))
+            assert np.array_equal(GlobalCostModel(tmp).groups, [1] * 4 + [2] * 4 + [3] * 2)
+            # a job beyond the limit by itself is kept
+            model.update(*random_samples(12, 4))
+            assert np.array_equal(GlobalCostModel(tmp).groups, [4] * 12)
+    finally:
+        xgb_cost_model.GLOBAL_MODEL_MAX_SAMPLES = old_max
+
+
+def test_concurrent_updates():
+    with tempfile.TemporaryDirectory() as tmp:
+        # all jobs load the model before any of them saves
+        models = [GlobalCostModel(tmp) for _ in range(4)]
+        barrier = threading.Barrier(len(models))
+
+        def update(i):
+            barrier.wait()
+            models[i].update(*random_samples(5, i))
+        threads = [threading.Thread(target=update, args=(i,)) for i in range(len(models))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # no job overwrites the samples of another
+        merged = GlobalCostModel(tmp)
+        assert len(merged.ys) == 20
+        assert np.array_equal(np.unique(merged.groups, return_counts=True)[1], [5] * 4)
+
+
+if __name__ == "__main__":
+    test_shape_features()
+    test_load_feature_version()
+    test_update_and_save()
+    test_update_keeps_whole_jobs()
+    test_concurrent_updates()
@@ -27,7 +27,22 @@ casefiles=(
 "pass/test_copy_propagation.py"
 "pass/test_utils_detect_non_linear_index.py"
 "pass/test_insn_info.py"
-"pass/test_buffer_align.py")
+"pass/test_buffer_align.py"
+"python/test_kernel_cache.py"
+"python/test_tiling_space.py"
+"python/test_config_space.py"
+"python/test_rpc_scheduler.py"
+"python/test_tuning_db.py"
+"python/test_tune_csim.py"
+"python/test_shape_bucket.py"
+"python/test_parsing_profiling_data.py"
+"python/test_profiling_job.py"
+"python/test_result_analysis.py"
+"python/test_json_ref_plan.py"
+"python/test_op_build_cache.py"
+"python/test_rpc_pool.py"
+"python/test_build_batch.py"
+"python/test_xgb_cost_model.py")
 
 for case in ${casefiles[@]}
 do
@@ -0,0 +1,182 @@
+/**
+ * Copyright 2020 Huawei Technologies Co., Ltd
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+#include <gtest/gtest.h>
+#include <dirent.h>
+#include <limits.h>
+#include <stdlib.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <fstream>
+#include <sstream>
+#include <string>
+#include <vector>
+#include "tvm.h"
+#include "contrib/cce_parm/cceconf.h"
+
+namespace akg {
+namespace codegen {
+// defined in build_cce.cc
+std::string TvmCallbackCceCompile(const std::string &code, const Array<NodeRef> &third_libs,
+                                  std::string *binary_kernel_name);
+}  // namespace codegen
+
+// A stand-in ccec which copies the source to the object and counts its invocations
+constexpr char FAKE_CCEC[] =
+  "#!/bin/sh\n"
+  "echo ccec >> \"$(dirname \"$0\")/../count\"\n"
+  "while [ $# -gt 0 ]; do\n"
+  "  case \"$1\" in\n"
+  "    -o) out=\"$2\"; shift ;;\n"
+  "    *.cce) src=\"$1\" ;;\n"
+  "  esac\n"
+  "  shift\n"
+  "done\n"
+  "cat \"$src\" > \"$out\"\n";
+
+class CceCacheTest : public ::testing::Test {
+ protected:
+  void SetUp() override {
+    char dir[] = "/tmp/cce_cache_test_XXXXXX";
+    ASSERT_NE(mkdtemp(dir), nullptr);
+    work_dir_ = dir;
+    char cwd[PATH_MAX] = {0};
+    ASSERT_NE(getcwd(cwd, PATH_MAX), nullptr);
+    old_cwd_ = cwd;
+    const char *path = getenv("PATH");
+    old_path_ = path != nullptr ? path : "";
+    const char *runtime_mode = getenv("RUNTIME_MODE");
+    old_runtime_mode_ = runtime_mode != nullptr ? runtime_mode : "";
+
+    ASSERT_EQ(mkdir((work_dir_ + "/bin").c_str(), 0755), 0);
+    std::ofstream ccec(work_dir_ + "/bin/ccec");
+    ccec << FAKE_CCEC;
+    ccec.close();
+    ASSERT_EQ(chmod((work_dir_ + "/bin/ccec").c_str(), 0755), 0);
+    ASSERT_EQ(chdir(work_dir_.c_str()), 0);
+    setenv("PATH", (work_dir_ + "/bin:" + old_path_).c_str(), 1);
+    setenv("AKG_CCE_CACHE_DIR", (work_dir_ + "/cache").c_str(), 1);
+    unsetenv("RUNTIME_MODE");
+  }
+
+  void TearDown() override {
+    EXPECT_EQ(chdir(old_cwd_.c_str()), 0);
+    setenv("PATH", old_path_.c_str(), 1);
+    unsetenv("AKG_CCE_CACHE_DIR");
+    if (!old_runtime_mode_.empty()) {
+      setenv("RUNTIME_MODE", old_runtime_mode_.c_str(), 1);
+    }
+    std::string cmd = "chmod -R u+w '" + work_dir_ + "' && rm -rf '" + work_dir_ + "'";
+    EXPECT_EQ(std::system(cmd.c_str()), 0);
+  }
+
+  static std::string Code(const std::string &kernel_name, const std::string &body) {
+    return "extern \"C\" __global__ __aicore__ void " + kernel_name + "_kernel0(half *a) { " + body + " }\n";
+  }
+
+  // Compile the code, and return the kernel name of the object
+  static std::string Compile(const std::string &code) {
+    std::string binary_kernel_name;
+    codegen::TvmCallbackCceCompile(code, Array<NodeRef>(), &binary_kernel_name);
+    return binary_kernel_name;
+  }
+
+  int CompileCount() const {
+    std::ifstream count(work_dir_ + "/count");
+    std::string line;
+    int n = 0;
+    while (std::getline(count, line)) {
+      ++n;
+    }
+    return n;
+  }
+
+  static std::string ReadFile(const std::string &file_name) {
+    std::ifstream f(file_name);
+    std::stringstream ss;
+    ss << f.rdbuf();
+    return ss.str();
+  }
+
+  std::vector<std::string> CacheEntries() const {
+    std::vector<std::string> entries;
+    DIR *dir = opendir((work_dir_ + "/cache").c_str());
+    if (dir == nullptr) {
+      return entries;
+    }
+    for (struct dirent *entry = readdir(dir); entry != nullptr; entry = readdir(dir)) {
+      std::string name = entry->d_name;
+      if (name != "." && name != "..") {
+        entries.push_back(work_dir_ + "/cache/" + name);
+      }
+    }
+    closedir(dir);
+    return entries;
+  }
+
+  std::string work_dir_;
+  std::string old_cwd_;
+  std::string old_path_;
+  std::string old_runtime_mode_;
+};
+
+TEST_F(CceCacheTest, HitUnderAnotherName) {
+  EXPECT_EQ(Compile(Code("add_1", "a[0] = 1;")), "add_1");
+  EXPECT_EQ(CompileCount(), 1);
+  EXPECT_EQ(CacheEntries().size(), 1u);
+  // the same code under another kernel name is not compiled again
+  EXPECT_EQ(Compile(Code("add_2", "a[0] = 1;")), "add_1");
+  EXPECT_EQ(CompileCount(), 1);
+  EXPECT_EQ(ReadFile("kernel_meta/add_2.o"), ReadFile("kernel_meta/add_1.o"));
+  EXPECT_EQ(ReadFile("kernel_meta/add_2.o"), Code("add_1", "a[0] = 1;"));
+}
+
+TEST_F(CceCacheTest, MissOnSourceOrFlags) {
+  EXPECT_EQ(Compile(Code("add_1", "a[0] = 1;")), "add_1");
+  EXPECT_EQ(Compile(Code("add_2", "a[0] = 2;")), "add_2");
+  EXPECT_EQ(CompileCount(), 2);
+  // another arch changes the compile flags
+  cceconf::CceConf *conf = cceconf::CceConf::getInstance();
+  std::string section = conf->getSection();
+  conf->setSection("3.5");
+  EXPECT_EQ(Compile(Code("add_3", "a[0] = 1;")), "add_3");
+  conf->setSection(section);
+  EXPECT_EQ(CompileCount(), 3);
+  EXPECT_EQ(Compile(Code("add_4", "a[0] = 1;")), "add_1");
+  EXPECT_EQ(CompileCount(), 3);
+}
+
+TEST_F(CceCacheTest, KeyCollision) {
+  EXPECT_EQ(Compile(Code("add_1", "a[0] = 1;")), "add_1");
+  // an entry of the same hash holding another key is a miss
+  auto entries = CacheEntries();
+  ASSERT_EQ(entries.size(), 1u);
+  ASSERT_EQ(chmod(entries[0].c_str(), 0755), 0);
+  std::ofstream key(entries[0] + "/key");
+  key << "another key";
+  key.close();
+  EXPECT_EQ(Compile(Code("add_2", "a[0] = 1;")), "add_2");
+  EXPECT_EQ(CompileCount(), 2);
+  EXPECT_EQ(ReadFile("kernel_meta/add_2.o"), Code("add_2", "a[0] = 1;"));
+}
+
+TEST_F(CceCacheTest, Disabled) {
+  unsetenv("AKG_CCE_CACHE_DIR");
+  EXPECT_EQ(Compile(Code("add_1", "a[0] = 1;")), "add_1");
+  EXPECT_EQ(Compile(Code("add_2", "a[0] = 1;")), "add_2");
+  EXPECT_EQ(CompileCount(), 2);
+  EXPECT_TRUE(CacheEntries().empty());
+}
+}  // namespace akg
@@ -0,0 +1,113 @@
+/**
+ * Copyright 2020 Huawei Technologies Co., Ltd
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+#include <gtest/gtest.h>
+#include <stdlib.h>
+#include <sys/wait.h>
+#include <unistd.h>
+#include <fstream>
+#include <sstream>
+#include <string>
+#include "codegen/ir_dump.h"
+
+namespace akg {
+static std::string MakeTempDir() {
+  char dir[] = "/tmp/ir_dump_test_XXXXXX";
+  EXPECT_NE(mkdtemp(dir), nullptr);
+  return std::string(dir);
+}
+
+static std::string ReadFile(const std::string &file_name) {
+  std::ifstream f(file_name);
+  std::stringstream ss;
+  ss << f.rdbuf();
+  return ss.str();
+}
+
+static void RemoveDir(const std::string &dir) {
+  std::string cmd = "rm -rf '" + dir + "'";
+  EXPECT_EQ(std::system(cmd.c_str()), 0);
+}
+
+TEST(IrDumpWriter, PassSelected) {
+  unsetenv("DUMP_IR_PASS");
+  EXPECT_TRUE(IrDumpWriter::IsPassSelected("Simplify", 3));
+  setenv("DUMP_IR_PASS", "Simplify,12", 1);
+  EXPECT_TRUE(IrDumpWriter::IsPassSelected("Simplify", 3));
+  EXPECT_TRUE(IrDumpWriter::IsPassSelected("StorageFlatten", 12));
+  EXPECT_FALSE(IrDumpWriter::IsPassSelected("StorageFlatten", 1));
+  EXPECT_FALSE(IrDumpWriter::IsPassSelected("Simplify_1", 2));
+  unsetenv("DUMP_IR_PASS");
+}
+
+TEST(IrDumpWriter, WriteFiles) {
+  unsetenv("DUMP_IR_ARCHIVE");
+  unsetenv("DUMP_IR_COMPRESS");
+  std::string dir = MakeTempDir();
+  auto writer = IrDumpWriter::GetInstance();
+  writer->Write(dir + "/00_first.cc", "first");
+  writer->Write(dir + "/01_second.cc", "second");
+  writer->Flush({dir});
+  EXPECT_EQ(ReadFile(dir + "/00_first.cc"), "first");
+  EXPECT_EQ(ReadFile(dir + "/01_second.cc"), "second");
+  RemoveDir(dir);
+}
+
+TEST(IrDumpWriter, WriteArchive) {
+  setenv("DUMP_IR_ARCHIVE", "1", 1);
+  unsetenv("DUMP_IR_COMPRESS");
+  std::string dir = MakeTempDir();
+  auto writer = IrDumpWriter::GetInstance();
+  writer->Write(dir + "/00_first.cc", "first");
+  writer->Write(dir + "/01_second.cc", "second");
+  writer->Flush({dir});
+  // a later kernel dumping to the same directory appends to the archive
+  writer->Write(dir + "/00_third.cc", "third");
+  writer->Flush({dir});
+  unsetenv("DUMP_IR_ARCHIVE");
+  EXPECT_EQ(ReadFile(dir + "/ir_dump.txt"), "firstsecondthird");
+  EXPECT_EQ(ReadFile(dir + "/ir_dump.index"), "00_first.cc 0 5\n01_second.cc 5 6\n00_third.cc 11 5\n");
+  std::ifstream first(dir + "/00_first.cc");
+  EXPECT_FALSE(first.is_open());
+  RemoveDir(dir);
+}
+
+TEST(IrDumpWriter, WriteInForkedChild) {
+  unsetenv("DUMP_IR_ARCHIVE");
+  unsetenv("DUMP_IR_COMPRESS");
+  std::string dir = MakeTempDir();
+  auto writer = IrDumpWriter::GetInstance();
+  // the worker thread of the parent is started before the fork
+  writer->Write(dir + "/00_parent.cc", "parent");
+  writer->Flush({dir});
+  pid_t pid = fork();
+  ASSERT_GE(pid, 0);
+  if (pid == 0) {
+    // killed if the flush waits for the worker of the parent
+    alarm(30);
+    writer->Write(dir + "/00_child.cc", "child");
+    writer->Flush({dir});
+    _exit(ReadFile(dir + "/00_child.cc") == "child" ? 0 : 1);
+  }
+  int status = 0;
+  ASSERT_EQ(waitpid(pid, &status, 0), pid);
+  EXPECT_TRUE(WIFEXITED(status));
+  EXPECT_EQ(WEXITSTATUS(status), 0);
+  writer->Write(dir + "/01_parent.cc", "parent");
+  writer->Flush({dir});
+  EXPECT_EQ(ReadFile(dir + "/01_parent.cc"), "parent");
+  RemoveDir(dir);
+}
+}  // namespace akg
@@ -278,7 +278,8 @@ PackedFunc CceModuleNode::GetFunction(const std::string& name,
     arg_size[i] = bits / 8;
   }
 
-  f.Init(this, sptr_to_self, name, arg_size, info.thread_axis_tags);
+  // the function is registered under its name in the binary, which differs from name for a cached binary
+  f.Init(this, sptr_to_self, info.name.empty() ? name : info.name, arg_size, info.thread_axis_tags);
 
   return PackFuncVoidAddrCCE(f, info.arg_types);
 }